@@ -2,13 +2,15 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Q, Count
 from datetime import date
 from django.http import HttpResponse
 import csv
 from .models import (
     Booking, HotelBooking, BusBooking, BusBookingSeat,
-    PackageBooking, PackageBookingTraveler, Review, BookingAuditLog
+    PackageBooking, PackageBookingTraveler, Review, BookingAuditLog,
+    CoBookingRecommendation, SeatHold, RebookingOffer
 )
 
 
@@ -292,7 +294,10 @@ class BookingAdmin(admin.ModelAdmin):
     
     def confirm_booking(self, request, queryset):
         """Action to confirm bookings"""
-        count = queryset.filter(status='pending').update(status='confirmed')
+        from buses.stats_service import record_booking_transitions
+        pending = list(queryset.filter(status='pending').values_list('id', flat=True))
+        count = queryset.filter(id__in=pending).update(status='confirmed')
+        record_booking_transitions((booking_id, 'pending', 'confirmed') for booking_id in pending)
         for booking in queryset.filter(status='confirmed'):
             BookingAuditLog.objects.create(
                 booking=booking,
@@ -307,7 +312,17 @@ class BookingAdmin(admin.ModelAdmin):
     
     def cancel_booking(self, request, queryset):
         """Action to cancel bookings"""
-        count = queryset.exclude(status__in=['completed', 'cancelled']).update(status='cancelled')
+        from buses.seat_hold_service import release_booking
+        from buses.seat_inventory import RELEASED_STATUSES
+        from buses.stats_service import record_booking_transitions
+        cancellable = queryset.exclude(status__in=['completed', 'cancelled'])
+        with transaction.atomic():
+            # Free bus seats before the status flips so the seat map stays in step
+            for booking in cancellable.filter(booking_type='bus').exclude(status__in=RELEASED_STATUSES):
+                release_booking(booking)
+            previous = list(cancellable.filter(booking_type='bus').values_list('id', 'status'))
+            count = cancellable.update(status='cancelled', cancelled_at=timezone.now())
+            record_booking_transitions((booking_id, status, 'cancelled') for booking_id, status in previous)
         self.message_user(request, f"{count} booking(s) cancelled.")
     cancel_booking.short_description = "Cancel selected bookings"
     
@@ -532,3 +547,29 @@ class BookingAuditLogAdmin(admin.ModelAdmin):
         """Display shortened new value"""
         return obj.new_value[:50] + '...' if len(obj.new_value) > 50 else obj.new_value
     new_value_short.short_description = 'New Value'
+
+
+@admin.register(CoBookingRecommendation)
+class CoBookingRecommendationAdmin(admin.ModelAdmin):
+    list_display = ['item_type', 'item_id', 'computed_at']
+    list_filter = ['item_type']
+    search_fields = ['item_id']
+    readonly_fields = ['computed_at']
+
+
+@admin.register(SeatHold)
+class SeatHoldAdmin(admin.ModelAdmin):
+    list_display = ['reference_id', 'schedule', 'seat', 'status', 'expires_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['reference_id', 'booking__booking_id']
+    raw_id_fields = ['schedule', 'seat', 'booking', 'user']
+    readonly_fields = ['created_at', 'updated_at']
+
+
+@admin.register(RebookingOffer)
+class RebookingOfferAdmin(admin.ModelAdmin):
+    list_display = ['bus_booking', 'original_schedule', 'alternative_schedule', 'seats_needed', 'fare', 'status', 'expires_at']
+    list_filter = ['status']
+    search_fields = ['bus_booking__booking__booking_id']
+    raw_id_fields = ['bus_booking', 'original_schedule', 'alternative_schedule']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,19 @@
+"""
+Management command to rebuild co-booking recommendations
+Usage: python manage.py build_recommendations --top-k 6
+"""
+
+from django.core.management.base import BaseCommand
+
+from bookings.recommendation_service import DEFAULT_TOP_K, build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "guests also booked" recommendations for hotels and packages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help='Neighbours stored per item')
+
+    def handle(self, *args, **options):
+        written = build_recommendations(top_k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Stored recommendations for {written} items'))
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:30
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_alter_booking_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CoBookingRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_type', models.CharField(choices=[('hotel', 'Hotel'), ('package', 'Package')], max_length=10)),
+                ('item_id', models.PositiveIntegerField()),
+                ('neighbours', models.JSONField(blank=True, default=list)),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'unique_together': {('item_type', 'item_id')},
+            },
+        ),
+    ]
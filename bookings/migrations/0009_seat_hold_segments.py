@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_seat_hold'),
+        ('buses', '0006_segment_masks'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='seathold',
+            name='unique_live_seat_hold',
+        ),
+        migrations.AddField(
+            model_name='seathold',
+            name='segments',
+            field=models.PositiveIntegerField(default=2147483647),
+        ),
+        migrations.AddIndex(
+            model_name='seathold',
+            index=models.Index(fields=['schedule', 'seat'], name='seat_hold_seat_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0007_seat_prices'),
+        ('bookings', '0009_seat_hold_segments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RebookingOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('seats_needed', models.PositiveSmallIntegerField()),
+                ('fare', models.DecimalField(decimal_places=2, help_text='Per-seat fare when offered', max_digits=10)),
+                ('status', models.CharField(choices=[('offered', 'Offered'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('expired', 'Expired')], default='offered', max_length=20)),
+                ('expires_at', models.DateTimeField()),
+                ('alternative_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rebooking_offers', to='buses.busschedule')),
+                ('bus_booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rebooking_offers', to='bookings.busbooking')),
+                ('original_schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buses.busschedule')),
+            ],
+            options={
+                'ordering': ['bus_booking', 'alternative_schedule__date'],
+                'unique_together': {('bus_booking', 'alternative_schedule')},
+            },
+        ),
+    ]
@@ -3,7 +3,7 @@ from django.conf import settings
 from django.utils import timezone
 from core.models import TimeStampedModel
 from hotels.models import Hotel, RoomType
-from buses.models import BusSchedule, SeatLayout, BusRoute
+from buses.models import BusSchedule, SeatLayout, BusRoute, FULL_ROUTE_SEGMENTS
 from packages.models import PackageDeparture
 import uuid
 import json
@@ -257,3 +257,85 @@ class InventoryLock(TimeStampedModel):
 
     def __str__(self):
         return f"Lock {self.reference_id} ({self.get_status_display()})"
+
+
+class CoBookingRecommendation(models.Model):
+    """Precomputed "guests also booked" neighbours for a hotel or package."""
+
+    ITEM_TYPE_CHOICES = [
+        ('hotel', 'Hotel'),
+        ('package', 'Package'),
+    ]
+
+    item_type = models.CharField(max_length=10, choices=ITEM_TYPE_CHOICES)
+    item_id = models.PositiveIntegerField()
+    # Ranked list of {"type", "id", "score", "name", "location", "price"}
+    neighbours = models.JSONField(default=list, blank=True)
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ['item_type', 'item_id']
+
+    def __str__(self):
+        return f"Recommendations for {self.item_type} #{self.item_id}"
+
+
+class SeatHold(TimeStampedModel):
+    """Time-limited claim on one bus seat for one departure."""
+
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('confirmed', 'Confirmed'),
+        ('released', 'Released'),
+        ('expired', 'Expired'),
+    ]
+
+    LIVE_STATUSES = ['active', 'confirmed']
+
+    schedule = models.ForeignKey(BusSchedule, on_delete=models.CASCADE, related_name='seat_holds')
+    seat = models.ForeignKey(SeatLayout, on_delete=models.CASCADE, related_name='holds')
+    booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='seat_holds')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='seat_holds')
+
+    # Shared by every seat claimed in the same request
+    reference_id = models.CharField(max_length=40, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    expires_at = models.DateTimeField()
+    # Route legs the seat is held for; the same seat can be held on disjoint legs
+    segments = models.PositiveIntegerField(default=FULL_ROUTE_SEGMENTS)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='seat_hold_expiry_idx'),
+            models.Index(fields=['schedule', 'seat'], name='seat_hold_seat_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.reference_id} seat {self.seat_id} ({self.get_status_display()})"
+
+
+class RebookingOffer(TimeStampedModel):
+    """Alternative departure offered to a passenger whose bus was cancelled."""
+
+    STATUS_CHOICES = [
+        ('offered', 'Offered'),
+        ('accepted', 'Accepted'),
+        ('declined', 'Declined'),
+        ('expired', 'Expired'),
+    ]
+
+    bus_booking = models.ForeignKey(BusBooking, on_delete=models.CASCADE, related_name='rebooking_offers')
+    original_schedule = models.ForeignKey(BusSchedule, on_delete=models.CASCADE, related_name='+')
+    alternative_schedule = models.ForeignKey(BusSchedule, on_delete=models.CASCADE, related_name='rebooking_offers')
+    seats_needed = models.PositiveSmallIntegerField()
+    fare = models.DecimalField(max_digits=10, decimal_places=2, help_text="Per-seat fare when offered")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='offered')
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['bus_booking', 'alternative_schedule__date']
+        unique_together = ['bus_booking', 'alternative_schedule']
+
+    def __str__(self):
+        return f"Offer for {self.bus_booking_id} on schedule {self.alternative_schedule_id} ({self.get_status_display()})"
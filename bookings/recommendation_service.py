@@ -0,0 +1,163 @@
+"""
+Co-Booking Recommendation Service
+Offline item-to-item "guests also booked" neighbours for hotels and packages
+"""
+
+import heapq
+import math
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from hotels.models import Hotel
+from packages.models import Package
+from .models import CoBookingRecommendation, HotelBooking, PackageBooking
+
+COUNTED_STATUSES = ['confirmed', 'completed']
+
+DEFAULT_TOP_K = 6
+
+# Users with very long histories add O(n^2) pairs but little signal per pair;
+# only their most recent distinct items are counted.
+MAX_ITEMS_PER_USER = 50
+
+Item = Tuple[str, int]
+
+
+def collect_user_items(max_items_per_user: int = MAX_ITEMS_PER_USER) -> Dict[int, List[Item]]:
+    """
+    Return each user's distinct booked items, most recent first
+
+    Hotel and package bookings are streamed in the same (user, newest
+    first) order and merged, so the per-user cap keeps the most recent
+    items across both types.
+    """
+    histories = defaultdict(list)
+    seen = defaultdict(set)
+
+    hotel_rows = (
+        HotelBooking.objects.filter(booking__status__in=COUNTED_STATUSES)
+        .order_by('booking__user_id', '-booking__created_at')
+        .values_list('booking__user_id', 'booking__created_at', 'room_type__hotel_id')
+        .iterator()
+    )
+    package_rows = (
+        PackageBooking.objects.filter(booking__status__in=COUNTED_STATUSES)
+        .order_by('booking__user_id', '-booking__created_at')
+        .values_list('booking__user_id', 'booking__created_at', 'package_departure__package_id')
+        .iterator()
+    )
+    merged = heapq.merge(
+        ((user_id, created_at, ('hotel', hotel_id)) for user_id, created_at, hotel_id in hotel_rows),
+        ((user_id, created_at, ('package', package_id)) for user_id, created_at, package_id in package_rows),
+        key=lambda row: (row[0], -row[1].timestamp()),
+    )
+    for user_id, _, item in merged:
+        if item not in seen[user_id] and len(histories[user_id]) < max_items_per_user:
+            seen[user_id].add(item)
+            histories[user_id].append(item)
+
+    return histories
+
+
+def compute_neighbours(histories: Dict[int, List[Item]], top_k: int = DEFAULT_TOP_K) -> Dict[Item, List[Tuple[Item, float]]]:
+    """
+    Rank co-booked items by cosine similarity
+
+    The co-occurrence matrix is kept sparse as a dict of dicts: only pairs
+    that share at least one user are ever stored.
+    """
+    item_counts = defaultdict(int)
+    co_counts = defaultdict(lambda: defaultdict(int))
+    for items in histories.values():
+        for item in items:
+            item_counts[item] += 1
+        for index, item in enumerate(items):
+            for other in items[index + 1:]:
+                co_counts[item][other] += 1
+                co_counts[other][item] += 1
+
+    neighbours = {}
+    for item, row in co_counts.items():
+        scored = (
+            (count / math.sqrt(item_counts[item] * item_counts[other]), other)
+            for other, count in row.items()
+        )
+        best = heapq.nlargest(top_k, scored, key=lambda pair: (pair[0], -pair[1][1]))
+        neighbours[item] = [(other, round(score, 4)) for score, other in best]
+    return neighbours
+
+
+def _describe_items(items: Set[Item]) -> Dict[Item, dict]:
+    """Load display fields for active neighbour items in one query per type"""
+    hotel_ids = [item_id for item_type, item_id in items if item_type == 'hotel']
+    package_ids = [item_id for item_type, item_id in items if item_type == 'package']
+
+    described = {}
+    hotels = (
+        Hotel.objects.filter(id__in=hotel_ids, is_active=True)
+        .annotate(min_price=Min('room_types__base_price'))
+        .values_list('id', 'name', 'city__name', 'min_price')
+    )
+    for hotel_id, name, city, price in hotels:
+        described[('hotel', hotel_id)] = {
+            'name': name,
+            'location': city,
+            'price': float(price) if price is not None else None,
+        }
+    packages = (
+        Package.objects.filter(id__in=package_ids, is_active=True)
+        .values_list('id', 'name', 'duration_days', 'duration_nights', 'starting_price')
+    )
+    for package_id, name, days, nights, price in packages:
+        described[('package', package_id)] = {
+            'name': name,
+            'location': f"{days}D/{nights}N",
+            'price': float(price),
+        }
+    return described
+
+
+def build_recommendations(top_k: int = DEFAULT_TOP_K, batch_size: int = 500) -> int:
+    """
+    Rebuild the co-booking recommendation table. Returns rows written.
+
+    Neighbour display fields are denormalized into each row so detail pages
+    render recommendations from a single indexed lookup.
+    """
+    histories = collect_user_items()
+    # Ask for spare neighbours so inactive items can be dropped without
+    # leaving short lists
+    neighbours = compute_neighbours(histories, top_k=top_k * 2)
+    described = _describe_items({other for ranked in neighbours.values() for other, _ in ranked})
+
+    now = timezone.now()
+    rows = []
+    for (item_type, item_id), ranked in neighbours.items():
+        entries = [
+            {'type': other[0], 'id': other[1], 'score': score, **described[other]}
+            for other, score in ranked
+            if other in described
+        ][:top_k]
+        if entries:
+            rows.append(CoBookingRecommendation(
+                item_type=item_type, item_id=item_id, neighbours=entries, computed_at=now,
+            ))
+
+    with transaction.atomic():
+        CoBookingRecommendation.objects.all().delete()
+        CoBookingRecommendation.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def get_recommendations(item_type: str, item_id: int, limit: int = DEFAULT_TOP_K) -> List[dict]:
+    """Return stored neighbours for an item (one indexed lookup)"""
+    neighbours = (
+        CoBookingRecommendation.objects.filter(item_type=item_type, item_id=item_id)
+        .values_list('neighbours', flat=True)
+        .first()
+    )
+    return (neighbours or [])[:limit]
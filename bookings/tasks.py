@@ -0,0 +1,10 @@
+from celery import shared_task
+
+
+@shared_task
+def build_recommendations_task():
+    """Nightly rebuild of co-booking recommendations"""
+    from .recommendation_service import build_recommendations
+
+    written = build_recommendations()
+    return f"Stored recommendations for {written} items"
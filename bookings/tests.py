@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+
+from hotels.models import City, Hotel, RoomType
+from packages.models import Package, PackageDeparture
+from .models import Booking, HotelBooking, PackageBooking
+from .recommendation_service import build_recommendations, collect_user_items, get_recommendations
+
+
+class CoBookingRecommendationTests(TestCase):
+    """Test offline "guests also booked" recommendations"""
+    
+    def setUp(self):
+        self.city = City.objects.create(name='Mumbai', state='Maharashtra', country='India')
+        self.hotel = Hotel.objects.create(
+            name='Taj Mahal Palace', description='Luxury hotel', city=self.city, address='Apollo Bunder',
+            contact_phone='1', contact_email='taj@example.com'
+        )
+        self.room_deluxe = RoomType.objects.create(
+            hotel=self.hotel, name='Deluxe Room', description='Sea view', base_price=Decimal('15000.00')
+        )
+        self.other_hotel = Hotel.objects.create(
+            name='Trident', description='Business hotel', city=self.city, address='Nariman Point',
+            contact_phone='1', contact_email='trident@example.com'
+        )
+        RoomType.objects.create(
+            hotel=self.other_hotel, name='Standard', description='Standard room', base_price=Decimal('6000.00')
+        )
+        self.package = Package.objects.create(
+            name='Goa Getaway', description='Beach trip', package_type='beach',
+            duration_days=4, duration_nights=3, starting_price=Decimal('20000.00')
+        )
+        departure = PackageDeparture.objects.create(
+            package=self.package, departure_date=date.today(), return_date=date.today() + timedelta(days=3),
+            available_slots=10, price_per_person=Decimal('20000.00')
+        )
+        User = get_user_model()
+        for index in range(3):
+            user = User.objects.create_user(username=f'traveller{index}', password='pass')
+            self._book_hotel(user, self.room_deluxe)
+            if index < 2:
+                self._book_hotel(user, self.other_hotel.room_types.first())
+            else:
+                booking = self._booking(user, 'package')
+                PackageBooking.objects.create(booking=booking, package_departure=departure)
+    
+    def _booking(self, user, booking_type):
+        return Booking.objects.create(
+            user=user, booking_type=booking_type, status='confirmed', total_amount=Decimal('1000.00'),
+            customer_name='Guest', customer_email='guest@example.com', customer_phone='9999999999'
+        )
+    
+    def _book_hotel(self, user, room_type):
+        HotelBooking.objects.create(
+            booking=self._booking(user, 'hotel'), room_type=room_type, check_in=date.today(),
+            check_out=date.today() + timedelta(days=1), total_nights=1
+        )
+    
+    def test_neighbours_ranked_by_co_bookings(self):
+        """Items booked by more of the same guests rank first, across types"""
+        self.assertEqual(build_recommendations(), 3)
+        
+        neighbours = get_recommendations('hotel', self.hotel.id)
+        self.assertEqual([(item['type'], item['id']) for item in neighbours],
+                         [('hotel', self.other_hotel.id), ('package', self.package.id)])
+        self.assertEqual(neighbours[0]['price'], 6000.0)
+        self.assertEqual(get_recommendations('package', self.package.id)[0]['id'], self.hotel.id)
+    
+    def test_history_cap_keeps_most_recent_across_types(self):
+        """A package booked after a hotel survives a cap of one item"""
+        traveller = get_user_model().objects.get(username='traveller2')
+        
+        histories = collect_user_items(max_items_per_user=1)
+        self.assertEqual(histories[traveller.id], [('package', self.package.id)])
+        self.assertEqual(collect_user_items()[traveller.id], [('package', self.package.id), ('hotel', self.hotel.id)])
+    
+    def test_inactive_items_are_dropped(self):
+        """Deactivated neighbours are not recommended"""
+        self.other_hotel.is_active = False
+        self.other_hotel.save()
+        build_recommendations()
+        
+        neighbours = get_recommendations('hotel', self.hotel.id)
+        self.assertEqual([item['id'] for item in neighbours], [self.package.id])
+    
+    def test_detail_page_reads_one_row(self):
+        """Hotel detail renders stored neighbours"""
+        build_recommendations()
+        
+        response = Client().get(f'/hotels/{self.hotel.id}/')
+        self.assertContains(response, 'Guests Also Booked')
+        self.assertContains(response, 'Goa Getaway')
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import BusOperator, Bus, BusRoute, BusStop, BusSchedule, SeatLayout, BoardingPoint, DroppingPoint
+from .models import BusOperator, Bus, BusRoute, BusStop, BusSchedule, SeatLayout, BoardingPoint, DroppingPoint, BusSearchEntry, BusPosition, BusDailyStats, BusChannelMapping
 
 
 def verify_operator(modeladmin, request, queryset):
@@ -34,6 +34,24 @@ def suspend_operator(modeladmin, request, queryset):
 suspend_operator.short_description = "⏸️ Suspend selected operators"
 
 
+def cancel_departures(modeladmin, request, queryset):
+    """Admin action to cancel departures and queue passenger handling"""
+    from django.utils import timezone
+    from .disruption_service import enqueue_disruptions
+    schedule_ids = list(queryset.filter(is_cancelled=False).values_list('id', flat=True))
+    updated = BusSchedule.objects.filter(id__in=schedule_ids).update(
+        is_active=False,
+        is_cancelled=True,
+        cancellation_reason='Cancelled by operator',
+        updated_at=timezone.now()
+    )
+    BusSearchEntry.objects.filter(schedule_id__in=schedule_ids).delete()
+    enqueue_disruptions(schedule_ids)
+    modeladmin.message_user(request, f"{updated} departure(s) cancelled; passengers are being rebooked and refunded.")
+
+cancel_departures.short_description = "🚫 Cancel selected departures"
+
+
 @admin.register(BusOperator)
 class BusOperatorAdmin(admin.ModelAdmin):
     list_display = ['name', 'get_status_badge', 'contact_phone', 'contact_email', 'rating', 'total_buses', 'is_active']
@@ -120,6 +138,10 @@ class BusAdmin(admin.ModelAdmin):
                        'has_gps_tracking', 'has_cctv', 'get_amenities_display'),
             'classes': ('collapse',)
         }),
+        ('Seat Reservations', {
+            'fields': ('reservation_rules',),
+            'classes': ('collapse',)
+        }),
         ('Ratings & Reviews', {
             'fields': ('average_rating', 'total_reviews'),
             'classes': ('collapse',)
@@ -208,6 +230,7 @@ class BusScheduleAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     list_editable = ['available_seats', 'fare', 'is_active']
     readonly_fields = ['booked_seats', 'occupancy_display', 'is_almost_full']
+    actions = [cancel_departures]
     
     fieldsets = (
         ('Schedule', {
@@ -217,7 +240,7 @@ class BusScheduleAdmin(admin.ModelAdmin):
             'fields': ('available_seats', 'booked_seats', 'occupancy_display')
         }),
         ('Pricing', {
-            'fields': ('fare', 'window_seat_charge')
+            'fields': ('fare', 'base_fare_override', 'window_seat_charge')
         }),
         ('Status', {
             'fields': ('is_active', 'is_cancelled', 'cancellation_reason', 'is_almost_full')
@@ -309,3 +332,43 @@ class SeatLayoutAdmin(admin.ModelAdmin):
     search_fields = ['bus__bus_number', 'seat_number']
     list_select_related = ['bus', 'bus__operator']
     ordering = ['bus', 'deck', 'row', 'column']
+
+
+@admin.register(BusSearchEntry)
+class BusSearchEntryAdmin(admin.ModelAdmin):
+    list_display = ['bus_number', 'source_name', 'destination_name', 'date', 'departure_time', 'fare', 'available_seats', 'updated_at']
+    list_filter = ['date', 'bus_type']
+    search_fields = ['bus_number', 'bus_name', 'operator_name', 'source_name', 'destination_name']
+    readonly_fields = [field.name for field in BusSearchEntry._meta.fields]
+
+
+@admin.register(BusPosition)
+class BusPositionAdmin(admin.ModelAdmin):
+    list_display = ['bus', 'recorded_at', 'latitude', 'longitude', 'speed_kmh', 'heading']
+    list_filter = ['day']
+    search_fields = ['bus__bus_number']
+    list_select_related = ['bus']
+    date_hierarchy = 'day'
+    readonly_fields = [field.name for field in BusPosition._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BusDailyStats)
+class BusDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ['route', 'date', 'bookings', 'seats_sold', 'capacity', 'revenue', 'cancellations']
+    list_filter = ['operator']
+    search_fields = ['bus__bus_number', 'route__route_name']
+    list_select_related = ['route', 'route__source_city', 'route__destination_city']
+    date_hierarchy = 'date'
+    readonly_fields = [field.name for field in BusDailyStats._meta.fields]
+
+
+@admin.register(BusChannelMapping)
+class BusChannelMappingAdmin(admin.ModelAdmin):
+    list_display = ['route', 'provider', 'external_service_id', 'is_active', 'last_synced_at']
+    list_filter = ['provider', 'is_active']
+    search_fields = ['route__route_name', 'route__bus__bus_number', 'external_service_id']
+    list_select_related = ['route', 'route__source_city', 'route__destination_city']
+    readonly_fields = ['last_synced_at', 'created_at', 'updated_at']
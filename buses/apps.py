@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BusesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'buses'
+
+    def ready(self):
+        # Import signals to keep schedules in step with routes
+        from . import signals  # noqa: F401
@@ -0,0 +1,130 @@
+"""
+Bus Booking Service
+Creates a bus booking, its seat holds and passenger rows as one unit of work
+"""
+
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+
+from bookings.models import Booking, BusBooking, BusBookingSeat
+from .fare_service import price_for_seats
+from .layout_cache import RESERVED_FOR_LABELS, get_layout
+from .models import BoardingPoint, BusSchedule, DroppingPoint, SeatLayout
+from .reservation_rules import denied_mask, departure_reservations, seat_kind
+from .seat_hold_service import hold_seats
+from .seat_inventory import InvalidJourneyError, SeatUnavailableError, blocked_positions, journey_segments
+
+# Placeholder ids the seat page submits when a route has no configured points
+FALLBACK_POINT_IDS = ['__source__', '__dest__']
+
+
+class BookingValidationError(Exception):
+    """Raised when a booking request is invalid before any seat is touched"""
+
+
+def _resolve_point(model, route, point_id) -> Optional[Dict]:
+    if not point_id or point_id in FALLBACK_POINT_IDS:
+        return None
+    try:
+        return model.objects.filter(route=route, id=int(point_id)).values('name', 'city_id').first()
+    except (ValueError, TypeError):
+        return None
+
+
+def create_bus_booking(user, bus, route, travel_date: date, seat_ids: Iterable, passenger: Dict,
+                       boarding_point=None, dropping_point=None) -> Booking:
+    """
+    Book seats on a departure for one passenger profile
+
+    Seats are loaded once and checked in memory for bus ownership, the
+    departure's occupancy on the legs travelled and the bus's reservation
+    rules for the passenger's gender.
+    The schedule row is locked for the unit of work, holds and passenger
+    rows are bulk-inserted, and the seat counters move in one conditional
+    UPDATE (see seat_inventory). Raises BookingValidationError or
+    SeatUnavailableError without writing anything.
+    """
+    try:
+        seat_ids = {int(seat_id) for seat_id in seat_ids}
+    except (ValueError, TypeError):
+        raise BookingValidationError('Invalid seat selection')
+    if not seat_ids:
+        raise BookingValidationError('Please select at least one seat')
+
+    seats = list(SeatLayout.objects.filter(id__in=seat_ids, bus=bus).order_by('deck', 'row', 'column'))
+    if len(seats) != len(seat_ids):
+        raise BookingValidationError('Selected seats do not belong to this bus')
+
+    gender = passenger['gender']
+    boarding = _resolve_point(BoardingPoint, route, boarding_point)
+    dropping = _resolve_point(DroppingPoint, route, dropping_point)
+    try:
+        segments = journey_segments(
+            route, boarding['city_id'] if boarding else None, dropping['city_id'] if dropping else None
+        )
+    except InvalidJourneyError as exc:
+        raise BookingValidationError(str(exc))
+    boarding_text = boarding['name'] if boarding else (
+        f"{route.source_city.name} ({route.departure_time.strftime('%H:%M')})"
+    )
+    dropping_text = dropping['name'] if dropping else (
+        f"{route.destination_city.name} ({route.arrival_time.strftime('%H:%M')})"
+    )
+
+    with transaction.atomic():
+        schedule, _ = BusSchedule.objects.get_or_create(
+            route=route,
+            date=travel_date,
+            defaults={'available_seats': bus.total_seats, 'fare': route.base_fare},
+        )
+        # Lock the departure so the in-memory check and the writes below agree
+        schedule = BusSchedule.objects.select_for_update().select_related('route').get(pk=schedule.pk)
+        if schedule.is_cancelled or not schedule.is_active:
+            raise SeatUnavailableError('This departure is no longer available')
+        taken = blocked_positions(schedule.segment_masks, segments)
+        unavailable = [seat.seat_number for seat in seats if seat.position in taken]
+        if unavailable:
+            raise SeatUnavailableError(f"Seat {', '.join(unavailable)} already booked")
+        # Static and passenger-triggered reservations in one mask test
+        reserved = departure_reservations(get_layout(bus.id), schedule.pk, schedule.segment_masks)
+        denied = denied_mask(reserved, gender)
+        for seat in seats:
+            if denied >> seat.position & 1:
+                raise BookingValidationError(
+                    f'Seat {seat.seat_number} is reserved for '
+                    f'{RESERVED_FOR_LABELS[seat_kind(reserved, seat.position)]}. '
+                    f'Male passengers cannot book ladies seats.'
+                )
+
+        booking = Booking.objects.create(
+            user=user,
+            booking_type='bus',
+            total_amount=price_for_seats(schedule, seats),
+            customer_name=passenger['name'] or user.get_full_name() or user.username,
+            customer_email=user.email,
+            customer_phone=getattr(user, 'phone', '') or '',
+        )
+        # Seats stay held until payment; a conflict rolls the booking back
+        hold_seats(schedule, seats, user=user, booking=booking, segments=segments)
+
+        bus_booking = BusBooking.objects.create(
+            booking=booking,
+            bus_schedule=schedule,
+            bus_route=route,
+            journey_date=travel_date,
+            boarding_point=boarding_text,
+            dropping_point=dropping_text,
+        )
+        BusBookingSeat.objects.bulk_create([
+            BusBookingSeat(
+                bus_booking=bus_booking,
+                seat=seat,
+                passenger_name=passenger['name'],
+                passenger_age=passenger['age'] or 0,
+                passenger_gender=gender,
+            )
+            for seat in seats
+        ])
+    return booking
@@ -0,0 +1,431 @@
+"""
+Bus Operator Bulk Upload
+Schedules, fares, seat counts and boarding/dropping points for many routes
+and dates from one CSV or JSON file, validated in a streaming pass and
+written in chunks
+"""
+
+import codecs
+import csv
+import json
+from datetime import date, time, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import City
+from .channel_sync import mark_dirty
+from .connection_search import invalidate_graph
+from .fare_service import reprice_schedules
+from .models import BoardingPoint, BusRoute, BusSchedule, DroppingPoint
+from .search_index import sync_schedule_ids
+
+UPLOAD_KINDS = ['schedules', 'boarding_points', 'dropping_points']
+UPLOAD_FORMATS = ['csv', 'json']
+UPLOAD_CHUNK_SIZE = 500
+# Caps both file rows and the schedule days their date ranges expand to
+MAX_UPLOAD_ROWS = 50000
+# One schedule row may cover a date range up to this long
+MAX_DATE_RANGE_DAYS = 92
+# The report lists this many changes and errors; counts are always complete
+MAX_REPORTED_ROWS = 200
+
+ROUTE_COLUMNS = ['bus_number', 'source', 'destination']
+REQUIRED_COLUMNS = {
+    'schedules': ROUTE_COLUMNS + ['date'],
+    'boarding_points': ROUTE_COLUMNS + ['name'],
+    'dropping_points': ROUTE_COLUMNS + ['name'],
+}
+POINT_MODELS = {'boarding_points': BoardingPoint, 'dropping_points': DroppingPoint}
+POINT_TIME_FIELDS = {'boarding_points': 'pickup_time', 'dropping_points': 'drop_time'}
+POINT_TEXT_FIELDS = ['address', 'landmark', 'pincode', 'contact_person', 'contact_phone']
+
+
+class UploadError(Exception):
+    """Raised when a file cannot be read at all (format, kind or header problems)"""
+
+
+class RowError(ValueError):
+    """A single row is invalid; the upload reports it and carries on"""
+
+
+def iter_rows(fileobj, file_format: str, kind: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Yield (line, row) pairs from an uploaded file
+
+    CSV is decoded and parsed line by line. JSON is either a list of rows
+    or an object keyed by upload kind; the standard library has no
+    incremental JSON parser, so the document is loaded whole.
+    """
+    if kind not in UPLOAD_KINDS:
+        raise UploadError(f"Unknown upload kind {kind!r}")
+    if file_format == 'csv':
+        reader = csv.DictReader(codecs.iterdecode(fileobj, 'utf-8-sig'))
+        missing = [column for column in REQUIRED_COLUMNS[kind] if column not in (reader.fieldnames or [])]
+        if missing:
+            raise UploadError(f"Missing columns: {', '.join(missing)}")
+        for line, row in enumerate(reader, start=2):
+            yield line, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+    elif file_format == 'json':
+        try:
+            data = json.load(codecs.getreader('utf-8-sig')(fileobj))
+        except ValueError as exc:
+            raise UploadError(f"Invalid JSON: {exc}")
+        if isinstance(data, dict):
+            data = data.get(kind, [])
+        if not isinstance(data, list):
+            raise UploadError(f"Expected a list of {kind}")
+        for line, row in enumerate(data, start=1):
+            if not isinstance(row, dict):
+                yield line, {}
+            else:
+                yield line, {key: '' if value is None else str(value).strip() for key, value in row.items()}
+    else:
+        raise UploadError(f"Unknown file format {file_format!r}")
+
+
+def _date(value: str, column: str) -> date:
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"{column} must be YYYY-MM-DD")
+
+
+def _time(value: str, column: str) -> time:
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        raise RowError(f"{column} must be HH:MM")
+
+
+def _decimal(value: str, column: str, minimum=Decimal('0'), maximum=None) -> Decimal:
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        raise RowError(f"{column} must be a number")
+    if not number.is_finite() or number < minimum or (maximum is not None and number > maximum):
+        raise RowError(f"{column} is out of range")
+    return number
+
+
+def _int(value: str, column: str, minimum: int = 0) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise RowError(f"{column} must be a whole number")
+    if number < minimum:
+        raise RowError(f"{column} must be at least {minimum}")
+    return number
+
+
+def _bool(value: str, column: str) -> bool:
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes', 'y'):
+        return True
+    if lowered in ('0', 'false', 'no', 'n'):
+        return False
+    raise RowError(f"{column} must be true or false")
+
+
+def _display(value) -> str:
+    return '' if value is None else str(value)
+
+
+class OperatorUpload:
+    """
+    One upload run for one operator
+
+    Rows stream through validation; valid rows collect into chunks that are
+    diffed against the database with one query each and, unless dry_run,
+    written with bulk_create/bulk_update. Everything runs in one
+    transaction, so a file with any invalid row changes nothing.
+    """
+
+    def __init__(self, operator, kind: str, dry_run: bool = True, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        self.operator = operator
+        self.kind = kind
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.today = timezone.localdate()
+        self.routes: Dict[tuple, List[BusRoute]] = {}
+        for route in BusRoute.objects.filter(bus__operator=operator).select_related(
+            'bus', 'source_city', 'destination_city'
+        ):
+            key = (route.bus.bus_number.upper(), route.source_city.code.upper(), route.destination_city.code.upper())
+            self.routes.setdefault(key, []).append(route)
+        self.cities = {code.upper(): city_id for code, city_id in City.objects.values_list('code', 'id')}
+        self.seen = set()
+        self.entries = 0
+        self.touched_schedule_ids = set()
+        self.report = {
+            'kind': kind,
+            'dry_run': dry_run,
+            'rows': 0,
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'error_count': 0,
+            'errors': [],
+            'changes': [],
+            'applied': False,
+        }
+
+    def run(self, rows: Iterator[Tuple[int, dict]]) -> dict:
+        with transaction.atomic():
+            chunk = []
+            for line, row in rows:
+                self.report['rows'] += 1
+                if self.report['rows'] > MAX_UPLOAD_ROWS:
+                    raise UploadError(f"Uploads are limited to {MAX_UPLOAD_ROWS} rows")
+                try:
+                    parsed = self._parse(line, row)
+                except RowError as exc:
+                    self._error(line, str(exc))
+                    continue
+                self.entries += len(parsed)
+                if self.entries > MAX_UPLOAD_ROWS:
+                    raise UploadError(f"Uploads are limited to {MAX_UPLOAD_ROWS} schedule days")
+                chunk.extend(parsed)
+                if len(chunk) >= self.chunk_size:
+                    self._apply(chunk)
+                    chunk = []
+            if chunk:
+                self._apply(chunk)
+
+            if self.dry_run or self.report['error_count']:
+                transaction.set_rollback(True)
+            else:
+                self._finish()
+                self.report['applied'] = True
+        return self.report
+
+    # Validation
+
+    def _error(self, line: int, message: str):
+        self.report['error_count'] += 1
+        if len(self.report['errors']) < MAX_REPORTED_ROWS:
+            self.report['errors'].append({'line': line, 'error': message})
+
+    def _route(self, row: dict) -> BusRoute:
+        key = (row.get('bus_number', '').upper(), row.get('source', '').upper(), row.get('destination', '').upper())
+        routes = self.routes.get(key)
+        if not routes:
+            raise RowError(f"No route {key[1]}-{key[2]} for bus {key[0]} in your fleet")
+        if len(routes) > 1:
+            if not row.get('departure_time'):
+                raise RowError("Bus runs this corridor more than once, add departure_time")
+            departure = _time(row['departure_time'], 'departure_time')
+            routes = [route for route in routes if route.departure_time == departure]
+            if not routes:
+                raise RowError(f"No {key[1]}-{key[2]} departure at {departure:%H:%M} for bus {key[0]}")
+        return routes[0]
+
+    def _parse(self, line: int, row: dict) -> List[tuple]:
+        if not row:
+            raise RowError("Row must be an object with column values")
+        missing = [column for column in REQUIRED_COLUMNS[self.kind] if not row.get(column)]
+        if missing:
+            raise RowError(f"Missing values: {', '.join(missing)}")
+        route = self._route(row)
+        if self.kind == 'schedules':
+            return self._parse_schedule(line, row, route)
+        return [self._parse_point(line, row, route)]
+
+    def _parse_schedule(self, line: int, row: dict, route: BusRoute) -> List[tuple]:
+        first = _date(row['date'], 'date')
+        last = _date(row['date_to'], 'date_to') if row.get('date_to') else first
+        if first < self.today:
+            raise RowError("date is in the past")
+        if last < first or (last - first).days >= MAX_DATE_RANGE_DAYS:
+            raise RowError(f"date_to must be within {MAX_DATE_RANGE_DAYS} days on or after date")
+
+        values = {}
+        if row.get('seats'):
+            seats = _int(row['seats'], 'seats')
+            if seats > route.bus.total_seats:
+                raise RowError(f"seats exceeds the bus capacity of {route.bus.total_seats}")
+            values['available_seats'] = seats
+        if row.get('fare'):
+            values['base_fare_override'] = _decimal(row['fare'], 'fare', minimum=Decimal('1'), maximum=Decimal('100000'))
+        if row.get('window_seat_charge'):
+            values['window_seat_charge'] = _decimal(row['window_seat_charge'], 'window_seat_charge')
+        if row.get('is_active'):
+            values['is_active'] = _bool(row['is_active'], 'is_active')
+
+        days = []
+        for offset in range((last - first).days + 1):
+            day = first + timedelta(days=offset)
+            if (route.id, day) in self.seen:
+                raise RowError(f"{day} for this route appears more than once in the file")
+            days.append((line, route, day, values))
+        self.seen.update((route.id, day) for _, _, day, _ in days)
+        return days
+
+    def _parse_point(self, line: int, row: dict, route: BusRoute) -> tuple:
+        name = row['name']
+        if (route.id, name) in self.seen:
+            raise RowError(f"Point {name!r} for this route appears more than once in the file")
+        self.seen.add((route.id, name))
+
+        values = {field: row[field] for field in POINT_TEXT_FIELDS if row.get(field)}
+        if row.get('city'):
+            if row['city'].upper() not in self.cities:
+                raise RowError(f"Unknown city code {row['city']!r}")
+            values['city_id'] = self.cities[row['city'].upper()]
+        time_field = POINT_TIME_FIELDS[self.kind]
+        if row.get(time_field):
+            values[time_field] = _time(row[time_field], time_field)
+        for field, bound in (('latitude', 90), ('longitude', 180)):
+            if row.get(field):
+                values[field] = _decimal(row[field], field, minimum=Decimal(-bound), maximum=Decimal(bound)).quantize(
+                    Decimal('0.0000001')
+                )
+        if row.get('sequence_order'):
+            values['sequence_order'] = _int(row['sequence_order'], 'sequence_order', minimum=1)
+        if row.get('is_active'):
+            values['is_active'] = _bool(row['is_active'], 'is_active')
+        return line, route, name, values
+
+    # Diff and write
+
+    def _record(self, line: int, action: str, label: str, fields: Dict[str, tuple]):
+        self.report['created' if action == 'create' else 'updated'] += 1
+        if len(self.report['changes']) < MAX_REPORTED_ROWS:
+            self.report['changes'].append({
+                'line': line,
+                'action': action,
+                'key': label,
+                'fields': {field: [_display(old), _display(new)] for field, (old, new) in fields.items()},
+            })
+
+    def _apply(self, chunk: List[tuple]):
+        if self.kind == 'schedules':
+            self._apply_schedules(chunk)
+        else:
+            self._apply_points(chunk)
+
+    def _apply_schedules(self, chunk: List[tuple]):
+        existing = BusSchedule.objects.filter(
+            route_id__in={route.id for _, route, _, _ in chunk},
+            date__in={day for _, _, day, _ in chunk},
+        )
+        if not self.dry_run:
+            # Bookings must not move seat counters under a pending bulk_update
+            existing = existing.select_for_update()
+        existing = {(schedule.route_id, schedule.date): schedule for schedule in existing}
+
+        created, updated, fields = [], [], set()
+        for line, route, day, values in chunk:
+            label = f"{route.bus.bus_number} {route.source_city.code}-{route.destination_city.code} {day}"
+            schedule = existing.get((route.id, day))
+            if schedule is None:
+                schedule = BusSchedule(
+                    route=route,
+                    date=day,
+                    available_seats=values.get('available_seats', route.bus.total_seats),
+                    fare=values.get('base_fare_override', route.base_fare),
+                    **{field: value for field, value in values.items() if field != 'available_seats'},
+                )
+                created.append(schedule)
+                self._record(line, 'create', label, {field: (None, value) for field, value in values.items()})
+                continue
+
+            schedule.route = route
+            if schedule.is_cancelled:
+                self._error(line, f"{label} is cancelled and cannot be edited")
+                continue
+            if values.get('available_seats', 0) > route.bus.total_seats - schedule.booked_seats:
+                self._error(line, f"{label} has {schedule.booked_seats} seats sold, seats is too high")
+                continue
+            changes = {
+                field: (getattr(schedule, field), value)
+                for field, value in values.items()
+                if getattr(schedule, field) != value
+            }
+            if not changes:
+                self.report['unchanged'] += 1
+                continue
+            for field, (_, value) in changes.items():
+                setattr(schedule, field, value)
+            fields.update(changes)
+            updated.append(schedule)
+            self._record(line, 'update', label, changes)
+
+        if self.dry_run or self.report['error_count']:
+            return
+        now = timezone.now()
+        BusSchedule.objects.bulk_create(created, batch_size=self.chunk_size)
+        if updated:
+            for schedule in updated:
+                schedule.updated_at = now
+            BusSchedule.objects.bulk_update(updated, sorted(fields | {'updated_at'}), batch_size=self.chunk_size)
+        # New fares and seat counts feed straight into the engine's prices
+        reprice_schedules(created + updated, self.today, sync_index=False)
+        self.touched_schedule_ids.update(schedule.id for schedule in created + updated)
+
+    def _apply_points(self, chunk: List[tuple]):
+        model = POINT_MODELS[self.kind]
+        time_field = POINT_TIME_FIELDS[self.kind]
+        existing = {
+            (point.route_id, point.name): point
+            for point in model.objects.filter(
+                route_id__in={route.id for _, route, _, _ in chunk},
+                name__in={name for _, _, name, _ in chunk},
+            )
+        }
+
+        created, updated, fields = [], [], set()
+        for line, route, name, values in chunk:
+            label = f"{route.bus.bus_number} {route.source_city.code}-{route.destination_city.code} {name}"
+            point = existing.get((route.id, name))
+            if point is None:
+                missing = [field for field in ('city_id', 'address', time_field) if field not in values]
+                if missing:
+                    self._error(line, f"New point {name!r} needs {', '.join(field.replace('_id', '') for field in missing)}")
+                    continue
+                created.append(model(route=route, name=name, **values))
+                self._record(line, 'create', label, {field: (None, value) for field, value in values.items()})
+                continue
+
+            changes = {
+                field: (getattr(point, field), value)
+                for field, value in values.items()
+                if getattr(point, field) != value
+            }
+            if not changes:
+                self.report['unchanged'] += 1
+                continue
+            for field, (_, value) in changes.items():
+                setattr(point, field, value)
+            fields.update(changes)
+            updated.append(point)
+            self._record(line, 'update', label, changes)
+
+        if self.dry_run or self.report['error_count']:
+            return
+        model.objects.bulk_create(created, batch_size=self.chunk_size)
+        if updated:
+            model.objects.bulk_update(updated, sorted(fields), batch_size=self.chunk_size)
+
+    def _finish(self):
+        # bulk writes skip signals, so refresh derived data once per upload
+        if self.touched_schedule_ids:
+            sync_schedule_ids(self.touched_schedule_ids)
+            invalidate_graph()
+            mark_dirty(self.touched_schedule_ids)
+
+
+def import_operator_file(operator, fileobj, file_format: str, kind: str, dry_run: bool = True,
+                         chunk_size: int = UPLOAD_CHUNK_SIZE) -> dict:
+    """
+    Validate and (unless dry_run) apply an operator's upload
+
+    Returns the diff report: counts of created, updated and unchanged rows,
+    the first MAX_REPORTED_ROWS changes with old and new values, row errors
+    and whether the changes were applied. Raises UploadError when the file
+    itself cannot be read.
+    """
+    upload = OperatorUpload(operator, kind, dry_run=dry_run, chunk_size=chunk_size)
+    return upload.run(iter_rows(fileobj, file_format, kind))
@@ -0,0 +1,223 @@
+"""
+Bus Channel Sync
+Coalesced, batched inventory pushes to bus channels (redBus, AbhiBus) and
+merging of channel availability into the search index
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.services.adapters.abhibus_adapter import AbhiBusAdapter
+from core.services.adapters.http_bus_adapter import ChannelError
+from core.services.adapters.redbus_adapter import RedbusAdapter
+from core.services.bus_channel_base import BusChannelBase
+from .fare_calendar import invalidate_corridors
+from .models import BusChannelMapping, BusChannelUpdate, BusSchedule, BusSearchEntry
+
+logger = logging.getLogger(__name__)
+
+ADAPTERS = {
+    'redbus': RedbusAdapter,
+    'abhibus': AbhiBusAdapter,
+}
+
+# Changes within this window go out in one flush
+COALESCE_SECONDS = 5
+FLUSH_SCHEDULED_KEY = 'buses:channel_sync:flush_scheduled'
+MAX_FLUSH_SIZE = 5000
+# Days ahead pulled from channels on each refresh
+FETCH_DAYS = 7
+# Departure fields sent to channels; a save changing any of them is queued
+CHANNEL_FIELDS = ('available_seats', 'fare', 'is_active', 'is_cancelled')
+
+
+def get_adapter(provider: str) -> Optional[BusChannelBase]:
+    """Adapter for a provider from settings.BUS_CHANNELS, None while it has no base URL"""
+    credentials = getattr(settings, 'BUS_CHANNELS', {}).get(provider) or {}
+    if provider not in ADAPTERS or not credentials.get('base_url'):
+        return None
+    return ADAPTERS[provider](credentials)
+
+
+def mark_dirty(schedule_ids: Iterable[int]):
+    """
+    Queue departures on channel-mapped routes for the next push
+
+    Repeated changes to a departure before the flush collapse into its one
+    row; a flush is scheduled once the change commits.
+    """
+    schedule_ids = list(schedule_ids)
+    if not schedule_ids:
+        return
+    mapped = list(
+        BusSchedule.objects.filter(id__in=schedule_ids, route__channel_mappings__is_active=True)
+        .values_list('id', flat=True)
+        .distinct()
+    )
+    if not mapped:
+        return
+    now = timezone.now()
+    BusChannelUpdate.objects.bulk_create(
+        [BusChannelUpdate(schedule_id=schedule_id, queued_at=now) for schedule_id in mapped],
+        update_conflicts=True,
+        unique_fields=['schedule'],
+        update_fields=['queued_at'],
+    )
+    transaction.on_commit(schedule_flush)
+
+
+def schedule_flush():
+    """Queue one delayed flush per coalescing window; the beat flush is the backstop"""
+    from .tasks import flush_bus_channel_updates_task
+
+    if not cache.add(FLUSH_SCHEDULED_KEY, True, COALESCE_SECONDS):
+        return
+    try:
+        flush_bus_channel_updates_task.apply_async(countdown=COALESCE_SECONDS)
+    except Exception:
+        logger.exception("Could not queue channel flush, leaving it to the periodic run")
+        cache.delete(FLUSH_SCHEDULED_KEY)
+
+
+def flush_channel_updates(limit: int = MAX_FLUSH_SIZE) -> List[Tuple[str, List[int]]]:
+    """
+    Take queued departures off the queue as (provider, schedule_ids) batches
+
+    Batches are sized to each provider's request limit. Departures queued
+    again while the flush runs carry a newer queued_at and stay for the
+    next one. Providers without credentials are skipped.
+    """
+    cutoff = timezone.now()
+    pending = list(
+        BusChannelUpdate.objects.filter(queued_at__lte=cutoff)
+        .order_by('queued_at')
+        .values_list('schedule_id', flat=True)[:limit]
+    )
+    if not pending:
+        return []
+    by_provider = defaultdict(list)
+    for provider, schedule_id in BusChannelMapping.objects.filter(
+        is_active=True, route__schedules__id__in=pending
+    ).values_list('provider', 'route__schedules__id'):
+        by_provider[provider].append(schedule_id)
+
+    batches = []
+    for provider, schedule_ids in sorted(by_provider.items()):
+        adapter = get_adapter(provider)
+        if adapter is None:
+            continue
+        schedule_ids.sort()
+        for start in range(0, len(schedule_ids), adapter.batch_size):
+            batches.append((provider, schedule_ids[start:start + adapter.batch_size]))
+    BusChannelUpdate.objects.filter(schedule_id__in=pending, queued_at__lte=cutoff).delete()
+    return batches
+
+
+def build_updates(provider: str, schedule_ids: Iterable[int]) -> List[dict]:
+    """Current seats and fare of each departure under the channel's service id, one query"""
+    rows = BusSchedule.objects.filter(
+        id__in=list(schedule_ids),
+        route__channel_mappings__provider=provider,
+        route__channel_mappings__is_active=True,
+    ).values(
+        'date', 'available_seats', 'fare', 'is_active', 'is_cancelled', 'route__channel_mappings__external_service_id'
+    )
+    return [
+        {
+            'service_id': row['route__channel_mappings__external_service_id'],
+            'date': row['date'].isoformat(),
+            'available_seats': row['available_seats'],
+            'fare': str(row['fare']),
+            'is_active': row['is_active'] and not row['is_cancelled'],
+        }
+        for row in rows
+    ]
+
+
+def push_schedules(provider: str, schedule_ids: List[int]) -> dict:
+    """
+    Send the current state of departures to a channel
+
+    State is read when the push runs, not when the change was queued, so
+    a retried push never overwrites newer values with stale ones.
+    """
+    adapter = get_adapter(provider)
+    if adapter is None:
+        return {'provider': provider, 'sent': 0, 'batches': 0}
+    result = adapter.push_inventory({'updates': build_updates(provider, schedule_ids)})
+    BusChannelMapping.objects.filter(provider=provider, route__schedules__id__in=schedule_ids).update(
+        last_synced_at=timezone.now()
+    )
+    return result
+
+
+def merge_channel_inventory(provider: str, services: List[dict]) -> int:
+    """
+    Cap search-index seats at what a channel reports left
+
+    The channel sells from the same seats; until its bookings reach us,
+    listing more than it has left would oversell. Returns index rows
+    lowered.
+    """
+    routes = dict(
+        BusChannelMapping.objects.filter(
+            provider=provider, is_active=True, external_service_id__in={service['service_id'] for service in services}
+        ).values_list('external_service_id', 'route_id')
+    )
+    remote = {
+        (routes[service['service_id']], date.fromisoformat(service['date'])): max(service['available_seats'], 0)
+        for service in services
+        if service['service_id'] in routes
+    }
+    if not remote:
+        return 0
+    entries = BusSearchEntry.objects.filter(
+        route_id__in={route_id for route_id, _ in remote}, date__in={day for _, day in remote}
+    )
+    capped = []
+    for entry in entries:
+        seats = remote.get((entry.route_id, entry.date))
+        if seats is not None and seats < entry.available_seats:
+            entry.available_seats = seats
+            capped.append(entry)
+    if capped:
+        BusSearchEntry.objects.bulk_update(capped, ['available_seats'])
+        invalidate_corridors((entry.source_city_id, entry.destination_city_id) for entry in capped)
+    return len(capped)
+
+
+def refresh_channel_availability(days: int = FETCH_DAYS, start: Optional[date] = None) -> Dict[str, int]:
+    """
+    Pull each mapped corridor's availability from its channels for the
+    coming days and merge it
+
+    A corridor whose channel fails is logged and skipped; the others are
+    still merged and the next refresh retries it.
+    """
+    start = start or timezone.localdate()
+    corridors = (
+        BusChannelMapping.objects.filter(is_active=True)
+        .values_list('provider', 'route__source_city__code', 'route__destination_city__code')
+        .distinct()
+    )
+    merged = defaultdict(int)
+    for provider, source, destination in corridors:
+        adapter = get_adapter(provider)
+        if adapter is None:
+            continue
+        try:
+            for offset in range(days):
+                services = adapter.fetch_inventory({
+                    'source': source, 'destination': destination, 'date': (start + timedelta(days=offset)).isoformat(),
+                })['services']
+                merged[provider] += merge_channel_inventory(provider, services)
+        except ChannelError as exc:
+            logger.warning('Skipping %s %s-%s availability: %s', provider, source, destination, exc)
+    return dict(merged)
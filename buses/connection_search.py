@@ -0,0 +1,267 @@
+"""
+Bus Connection Search
+Direct and one-transfer itineraries over a time-expanded route/stop graph,
+answered with the Connection Scan Algorithm (CSA)
+"""
+
+import uuid
+from bisect import bisect_left
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import BusSchedule, BusStop
+
+MIN_LAYOVER_MINUTES = 30
+# Days of departures held in a worker's graph, starting the day before the
+# travel date so overnight buses that pass through after midnight are included
+GRAPH_WINDOW_DAYS = 8
+# A journey may end at most this long after the last departure of the day
+MAX_JOURNEY_MINUTES = 36 * 60
+
+GRAPH_VERSION_KEY = 'buses:connection_graph:version'
+
+# Per-process cache: {'version': token, 'graph': ConnectionGraph}
+_graph_cache: Dict[str, object] = {}
+
+
+def _minutes(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+def _after(previous: int, clock: time) -> int:
+    """Absolute minute of a wall-clock time, rolling past midnight as needed"""
+    candidate = previous - previous % 1440 + _minutes(clock)
+    while candidate < previous:
+        candidate += 1440
+    return candidate
+
+
+class ConnectionGraph:
+    """
+    Elementary connections (one hop between consecutive stops of a departure)
+    sorted by departure minute, counted from midnight of the window's first day
+    """
+
+    def __init__(self, origin: date, days: int):
+        self.origin = origin
+        self.days = days
+        self.connections = []  # (departure, arrival, from_city, to_city, schedule_id)
+        self.departures = []
+        self.trips = {}  # schedule_id -> leg metadata
+        self.cities = {}
+
+    def covers(self, travel_date: date) -> bool:
+        # The second leg of a transfer may run into the following day
+        return self.origin < travel_date and travel_date + timedelta(days=1) < self.origin + timedelta(days=self.days)
+
+    def minute(self, travel_date: date) -> int:
+        return (travel_date - self.origin).days * 1440
+
+    def timestamp(self, minute: int) -> datetime:
+        return datetime.combine(self.origin, time()) + timedelta(minutes=minute)
+
+    def add_schedule(self, schedule: BusSchedule):
+        route = schedule.route
+        bus = route.bus
+        points = [(route.source_city_id, route.source_city.name, None, route.departure_time)]
+        points += [(stop.city_id, stop.city.name, stop.arrival_time, stop.departure_time) for stop in route.stops.all()]
+        points.append((route.destination_city_id, route.destination_city.name, route.arrival_time, None))
+
+        current = self.minute(schedule.date) + _minutes(route.departure_time)
+        for (from_city, from_name, _, departs), (to_city, to_name, arrives, _) in zip(points, points[1:]):
+            departure = _after(current, departs)
+            arrival = _after(departure, arrives)
+            current = arrival
+            self.cities[from_city] = from_name
+            self.cities[to_city] = to_name
+            self.connections.append((departure, arrival, from_city, to_city, schedule.id))
+
+        self.trips[schedule.id] = {
+            'schedule_id': schedule.id,
+            'route_id': route.id,
+            'bus_id': bus.id,
+            'bus_number': bus.bus_number,
+            'bus_name': bus.bus_name,
+            'bus_type': bus.bus_type,
+            'operator': bus.operator.name if bus.operator_id else 'Unknown',
+        }
+
+    def finalize(self):
+        self.connections.sort()
+        self.departures = [connection[0] for connection in self.connections]
+
+
+def build_graph(origin: date, days: int = GRAPH_WINDOW_DAYS) -> ConnectionGraph:
+    """Load every bookable departure in the window with its stops in three queries"""
+    graph = ConnectionGraph(origin, days)
+    schedules = (
+        BusSchedule.objects.filter(
+            date__gte=origin,
+            date__lt=origin + timedelta(days=days),
+            is_active=True,
+            is_cancelled=False,
+            route__is_active=True,
+            route__bus__is_active=True,
+        )
+        .select_related('route__bus__operator', 'route__source_city', 'route__destination_city')
+        .prefetch_related(Prefetch('route__stops', queryset=BusStop.objects.select_related('city')))
+    )
+    for schedule in schedules:
+        graph.add_schedule(schedule)
+    graph.finalize()
+    return graph
+
+
+def graph_version() -> str:
+    version = cache.get(GRAPH_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(GRAPH_VERSION_KEY, version, None)
+    return version
+
+
+def invalidate_graph():
+    """Tell every worker to rebuild its graph on the next search"""
+    cache.set(GRAPH_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_graph(travel_date: date) -> ConnectionGraph:
+    """Return this worker's graph for the date, rebuilding it when stale"""
+    version = graph_version()
+    graph = _graph_cache.get('graph')
+    if graph is not None and _graph_cache.get('version') == version and graph.covers(travel_date):
+        return graph
+
+    origin = min(timezone.localdate(), travel_date) - timedelta(days=1)
+    if not travel_date + timedelta(days=1) < origin + timedelta(days=GRAPH_WINDOW_DAYS):
+        origin = travel_date - timedelta(days=1)
+    graph = build_graph(origin)
+    _graph_cache['version'] = version
+    _graph_cache['graph'] = graph
+    return graph
+
+
+def scan(graph: ConnectionGraph, source_id: int, destination_id: int, travel_date: date,
+         min_layover: int = MIN_LAYOVER_MINUTES) -> List[dict]:
+    """
+    One pass of CSA over connections in departure order
+
+    Trips boarded at the source reach cities directly; a second trip may be
+    boarded wherever a first trip arrived at least min_layover minutes
+    earlier. For each second trip we keep the feasible first leg that leaves
+    the source latest, so every candidate has the shortest door-to-door time
+    for its arrival. Returns raw candidates, unsorted.
+    """
+    day_start = graph.minute(travel_date)
+    day_end = day_start + 1440
+    horizon = day_end + MAX_JOURNEY_MINUTES
+
+    first_legs = {}   # schedule_id -> (boarded_at, departure)
+    arrivals = {}     # city_id -> [(arrival, schedule_id, departure)]
+    second_legs = {}  # schedule_id -> (boarded_at, departure, first schedule_id, first arrival, first departure)
+    direct = []
+    transfers = []
+
+    for index in range(bisect_left(graph.departures, day_start), len(graph.connections)):
+        departure, arrival, from_city, to_city, trip = graph.connections[index]
+        if departure >= horizon:
+            break
+
+        if trip not in first_legs and from_city == source_id and departure < day_end:
+            first_legs[trip] = (from_city, departure)
+        if trip in first_legs:
+            leg_departure = first_legs[trip][1]
+            if to_city == destination_id:
+                direct.append({'legs': [(trip, source_id, to_city, leg_departure, arrival)]})
+            elif to_city != source_id:
+                arrivals.setdefault(to_city, []).append((arrival, trip, leg_departure))
+            continue
+
+        # Board (or re-board later for a shorter trip) as a second leg
+        if from_city != source_id and from_city in arrivals:
+            feasible = [
+                (first_departure, first_arrival, first_trip)
+                for first_arrival, first_trip, first_departure in arrivals[from_city]
+                if first_arrival + min_layover <= departure
+            ]
+            if feasible:
+                first_departure, first_arrival, first_trip = max(feasible)
+                current = second_legs.get(trip)
+                if current is None or first_departure > current[4]:
+                    second_legs[trip] = (from_city, departure, first_trip, first_arrival, first_departure)
+        if trip in second_legs and to_city == destination_id:
+            boarded_at, leg_departure, first_trip, first_arrival, first_departure = second_legs[trip]
+            transfers.append({'legs': [
+                (first_trip, source_id, boarded_at, first_departure, first_arrival),
+                (trip, boarded_at, to_city, leg_departure, arrival),
+            ]})
+    return direct + transfers
+
+
+def _describe(graph: ConnectionGraph, candidate: dict, live: Dict[int, tuple]) -> dict:
+    legs = []
+    for trip, from_city, to_city, departure, arrival in candidate['legs']:
+        leg = dict(graph.trips[trip])
+        seats, fare = live[trip]
+        leg.update({
+            'fare': float(fare),
+            'available_seats': seats,
+            'from_city_id': from_city,
+            'from_city': graph.cities.get(from_city, ''),
+            'to_city_id': to_city,
+            'to_city': graph.cities.get(to_city, ''),
+            'departure': graph.timestamp(departure).isoformat(),
+            'arrival': graph.timestamp(arrival).isoformat(),
+        })
+        legs.append(leg)
+    first, last = candidate['legs'][0], candidate['legs'][-1]
+    return {
+        'transfers': len(legs) - 1,
+        'departure': legs[0]['departure'],
+        'arrival': legs[-1]['arrival'],
+        'duration_minutes': last[4] - first[3],
+        'layover_minutes': last[3] - first[4] if len(legs) > 1 else 0,
+        'total_fare': sum(leg['fare'] for leg in legs),
+        'legs': legs,
+    }
+
+
+def search_connections(source_id: int, destination_id: int, travel_date: date,
+                       min_layover: int = MIN_LAYOVER_MINUTES, passengers: int = 1,
+                       limit: int = 5) -> List[dict]:
+    """
+    Best itineraries from source to destination departing on travel_date
+
+    Ranked by arrival time, then shortest duration, then fewest transfers.
+    Seat counts and fares change too often to live in the graph (the fare
+    engine reprices without touching the timetable), so they are read
+    fresh for the candidate departures in one query.
+    """
+    if source_id == destination_id:
+        return []
+    graph = get_graph(travel_date)
+    candidates = scan(graph, source_id, destination_id, travel_date, max(min_layover, MIN_LAYOVER_MINUTES))
+    candidates.sort(key=lambda candidate: (
+        candidate['legs'][-1][4],
+        candidate['legs'][-1][4] - candidate['legs'][0][3],
+        len(candidate['legs']),
+    ))
+
+    schedule_ids = {leg[0] for candidate in candidates for leg in candidate['legs']}
+    live = {
+        schedule_id: (seats, fare)
+        for schedule_id, seats, fare in BusSchedule.objects.filter(id__in=schedule_ids, is_cancelled=False)
+        .values_list('id', 'available_seats', 'fare')
+    }
+
+    itineraries = []
+    for candidate in candidates:
+        if all(leg[0] in live and live[leg[0]][0] >= passengers for leg in candidate['legs']):
+            itineraries.append(_describe(graph, candidate, live))
+            if len(itineraries) >= limit:
+                break
+    return itineraries
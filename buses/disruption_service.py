@@ -0,0 +1,227 @@
+"""
+Bus Disruption Service
+Rebooking offers, refunds and passenger notifications for cancelled departures
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from bookings.models import Booking, BusBooking, RebookingOffer
+from payments.models import Refund
+from .models import BusSchedule, BusSearchEntry
+from .seat_hold_service import release_bookings
+from .seat_inventory import RELEASED_STATUSES
+from .stats_service import record_booking_transitions
+
+logger = logging.getLogger(__name__)
+
+DISRUPTION_CHUNK_SIZE = 200
+MAX_OFFERS_PER_BOOKING = 3
+# Alternatives may leave this many days either side of the cancelled departure
+ALTERNATIVE_WINDOW_DAYS = 1
+OFFER_VALID_HOURS = 24
+# Bookings with money taken get a refund; unpaid ones are simply cancelled
+PAID_STATUSES = ['confirmed', 'completed']
+
+
+def find_alternatives(schedule: BusSchedule) -> List[BusSearchEntry]:
+    """Bookable departures on the same corridor around the cancelled date, one index range scan"""
+    route = schedule.route
+    entries = BusSearchEntry.objects.filter(
+        source_city_id=route.source_city_id,
+        destination_city_id=route.destination_city_id,
+        date__gte=schedule.date - timedelta(days=ALTERNATIVE_WINDOW_DAYS),
+        date__lte=schedule.date + timedelta(days=ALTERNATIVE_WINDOW_DAYS),
+        available_seats__gt=0,
+    ).exclude(schedule_id=schedule.id).only('schedule_id', 'date', 'departure_time', 'fare', 'available_seats')
+    # Closest in time to the original departure first
+    return sorted(
+        entries,
+        key=lambda entry: (abs((entry.date - schedule.date).days), entry.date, entry.departure_time),
+    )
+
+
+def _process_chunk(schedule: BusSchedule, bus_bookings: List[BusBooking], alternatives: List[BusSearchEntry],
+                   reason: str) -> Dict[str, int]:
+    now = timezone.now()
+    expires_at = now + timedelta(hours=OFFER_VALID_HOURS)
+    offers = []
+    refunds = []
+    for bus_booking in bus_bookings:
+        seats = bus_booking.seat_count or 1
+        fitting = [entry for entry in alternatives if entry.available_seats >= seats][:MAX_OFFERS_PER_BOOKING]
+        offers.extend(
+            RebookingOffer(
+                bus_booking=bus_booking,
+                original_schedule=schedule,
+                alternative_schedule_id=entry.schedule_id,
+                seats_needed=seats,
+                fare=entry.fare,
+                expires_at=expires_at,
+            )
+            for entry in fitting
+        )
+        booking = bus_booking.booking
+        if booking.status in PAID_STATUSES and booking.paid_amount > 0:
+            refunds.append(Refund(booking=booking, amount=booking.paid_amount, reason='schedule_cancelled'))
+
+    booking_ids = [bus_booking.booking_id for bus_booking in bus_bookings]
+    with transaction.atomic():
+        RebookingOffer.objects.bulk_create(offers, ignore_conflicts=True)
+        Refund.objects.bulk_create(refunds, ignore_conflicts=True)
+        refunded_ids = [refund.booking_id for refund in refunds]
+        Booking.objects.filter(id__in=booking_ids).exclude(status__in=RELEASED_STATUSES).update(
+            status='cancelled',
+            cancellation_reason=reason,
+            cancelled_at=now,
+            updated_at=now,
+        )
+        Booking.objects.filter(id__in=refunded_ids).update(refund_amount=F('paid_amount'))
+        # The UPDATE above skips signals, so the dashboard rollups are told directly
+        record_booking_transitions(
+            (bus_booking.booking_id, bus_booking.booking.status, 'cancelled')
+            for bus_booking in bus_bookings
+            if bus_booking.booking.status not in RELEASED_STATUSES
+        )
+        # Free the seats too: a departure cancelled with its route is reopened
+        # when the route comes back and must not keep these seats sold
+        release_bookings(booking_ids)
+        transaction.on_commit(lambda: enqueue_notifications(booking_ids))
+    return {'bookings': len(bus_bookings), 'offers': len(offers), 'refunds': len(refunds)}
+
+
+def process_cancelled_schedule(schedule_id: int, chunk_size: int = DISRUPTION_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Handle every passenger of a cancelled departure
+
+    Streams affected bookings in chunks; each chunk bulk-creates rebooking
+    offers and refunds, cancels the bookings in one UPDATE and queues a
+    notification task. Safe to re-run: handled bookings are no longer
+    affected and offers/refunds are unique per booking.
+    """
+    totals = {'bookings': 0, 'offers': 0, 'refunds': 0}
+    schedule = BusSchedule.objects.select_related('route').filter(pk=schedule_id, is_cancelled=True).first()
+    if schedule is None:
+        return totals
+
+    reason = schedule.cancellation_reason or 'Departure cancelled by operator'
+    alternatives = find_alternatives(schedule)
+    affected = (
+        BusBooking.objects.filter(bus_schedule=schedule)
+        .exclude(booking__status__in=RELEASED_STATUSES)
+        .select_related('booking')
+        .annotate(seat_count=Count('seats'))
+        .order_by('id')
+    )
+
+    chunk = []
+    for bus_booking in affected.iterator(chunk_size=chunk_size):
+        chunk.append(bus_booking)
+        if len(chunk) >= chunk_size:
+            for key, value in _process_chunk(schedule, chunk, alternatives, reason).items():
+                totals[key] += value
+            chunk = []
+    if chunk:
+        for key, value in _process_chunk(schedule, chunk, alternatives, reason).items():
+            totals[key] += value
+    return totals
+
+
+def _enqueue(task, *args):
+    try:
+        task.delay(*args)
+    except Exception:
+        # Broker unreachable: do the work here rather than lose it
+        logger.exception("Could not queue %s, running inline", task.name)
+        task.apply(args=args)
+
+
+def enqueue_notifications(booking_ids: List[int]):
+    from .tasks import notify_disrupted_passengers_task
+
+    _enqueue(notify_disrupted_passengers_task, booking_ids)
+
+
+def enqueue_disruptions(schedule_ids: Iterable[int]):
+    """Fan out one pipeline run per cancelled departure once the cancellation commits"""
+    from .tasks import handle_cancelled_schedule_task
+
+    schedule_ids = list(schedule_ids)
+
+    def dispatch():
+        for schedule_id in schedule_ids:
+            _enqueue(handle_cancelled_schedule_task, schedule_id)
+
+    if schedule_ids:
+        transaction.on_commit(dispatch)
+
+
+def notify_disrupted_passengers(booking_ids: List[int]) -> int:
+    """Email each affected passenger their alternatives and refund, in one SMTP session"""
+    from django.conf import settings
+    from django.core.mail import get_connection, EmailMessage
+    from notifications.models import Notification
+
+    bookings = (
+        Booking.objects.filter(id__in=booking_ids)
+        .select_related('user', 'bus_details__bus_schedule__route__source_city',
+                        'bus_details__bus_schedule__route__destination_city')
+        .prefetch_related('bus_details__rebooking_offers__alternative_schedule__route', 'refunds')
+    )
+
+    messages = []
+    notifications = []
+    for booking in bookings:
+        bus_booking = booking.bus_details
+        route = bus_booking.bus_schedule.route
+        lines = [
+            f"Dear {booking.customer_name},",
+            "",
+            f"Your bus {route.source_city.name} to {route.destination_city.name} on "
+            f"{bus_booking.journey_date:%d %b %Y} (booking {booking.booking_id}) has been cancelled by the operator.",
+        ]
+        offers = list(bus_booking.rebooking_offers.all())
+        if offers:
+            lines += ["", "You can move to one of these departures instead:"]
+            lines += [
+                f"- {offer.alternative_schedule.date:%d %b} at "
+                f"{offer.alternative_schedule.route.departure_time:%H:%M}"
+                for offer in offers
+            ]
+        refunds = [refund for refund in booking.refunds.all() if refund.reason == 'schedule_cancelled']
+        if refunds:
+            lines += ["", f"A refund of ₹{refunds[0].amount} has been initiated."]
+        lines += ["", "We apologise for the inconvenience.", "GoExplorer Team"]
+
+        subject = f'Your bus booking {booking.booking_id} was cancelled'
+        body = "\n".join(lines)
+        messages.append(EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [booking.customer_email]))
+        notifications.append(Notification(
+            user=booking.user,
+            notification_type='email',
+            recipient=booking.customer_email,
+            subject=subject,
+            body=body,
+            booking_id=booking.booking_id,
+        ))
+
+    if not messages:
+        return 0
+    try:
+        sent = get_connection(fail_silently=False).send_messages(messages) or 0
+        status, error = 'sent', ''
+    except Exception as exc:
+        logger.exception("Disruption emails failed for %s bookings", len(messages))
+        sent, status, error = 0, 'failed', str(exc)
+    now = timezone.now()
+    for notification in notifications:
+        notification.status = status
+        notification.error_message = error
+        notification.sent_at = now if status == 'sent' else None
+    Notification.objects.bulk_create(notifications)
+    return sent
@@ -0,0 +1,87 @@
+"""
+Bus Fare Calendar
+Cheapest fare and seats left per day on a corridor, read from the search
+index in one grouped query and cached per corridor
+"""
+
+import uuid
+from datetime import date, timedelta
+from typing import Iterable, List, Tuple
+
+from django.core.cache import cache
+from django.db.models import Count, Min, Q, Sum
+
+from .models import BusSearchEntry
+
+CALENDAR_VERSION_KEY = 'buses:fare_calendar:version:{source_id}:{destination_id}'
+CALENDAR_KEY = 'buses:fare_calendar:{source_id}:{destination_id}:{version}:{start}:{days}'
+# Schedule and fare changes bump the corridor version; seat counts move with
+# every booking and are only as fresh as this TTL
+CALENDAR_TTL_SECONDS = 10 * 60
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 60
+
+
+def _version(source_id: int, destination_id: int) -> str:
+    key = CALENDAR_VERSION_KEY.format(source_id=source_id, destination_id=destination_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(key, version, None)
+    return version
+
+
+def build_calendar(source_id: int, destination_id: int, start: date, days: int) -> List[dict]:
+    """
+    One row per day from start: cheapest fare with seats left, seats left
+    across all operators and departures run. Days without a bookable
+    departure have min_fare None.
+    """
+    end = start + timedelta(days=days - 1)
+    rows = {
+        row['date']: row
+        for row in BusSearchEntry.objects.filter(
+            source_city_id=source_id, destination_city_id=destination_id, date__gte=start, date__lte=end
+        )
+        .values('date')
+        .annotate(
+            cheapest=Min('fare', filter=Q(available_seats__gt=0)),
+            seats_left=Sum('available_seats'),
+            departures=Count('id'),
+        )
+    }
+    calendar = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day, {})
+        calendar.append({
+            'date': day.isoformat(),
+            'min_fare': float(row['cheapest']) if row.get('cheapest') is not None else None,
+            'available_seats': row.get('seats_left') or 0,
+            'departures': row.get('departures', 0),
+        })
+    return calendar
+
+
+def get_fare_calendar(source_id: int, destination_id: int, start: date, days: int = DEFAULT_DAYS) -> List[dict]:
+    """Cached calendar for a corridor: one cache read when warm, one grouped query when not"""
+    key = CALENDAR_KEY.format(
+        source_id=source_id, destination_id=destination_id,
+        version=_version(source_id, destination_id), start=start.isoformat(), days=days,
+    )
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = build_calendar(source_id, destination_id, start, days)
+        cache.set(key, calendar, CALENDAR_TTL_SECONDS)
+    return calendar
+
+
+def invalidate_corridors(corridors: Iterable[Tuple[int, int]]):
+    """Point every cached calendar for these (source_id, destination_id) pairs at a fresh version"""
+    versions = {
+        CALENDAR_VERSION_KEY.format(source_id=source_id, destination_id=destination_id): uuid.uuid4().hex
+        for source_id, destination_id in set(corridors)
+    }
+    if versions:
+        cache.set_many(versions, None)
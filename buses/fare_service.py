@@ -0,0 +1,191 @@
+"""
+Bus Fare Service
+Occupancy and lead-time driven fares for upcoming departures, with per-seat
+prices cached on each BusSchedule
+"""
+
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List, Optional, Tuple
+
+from django.utils import timezone
+
+from .channel_sync import mark_dirty
+from .models import BusSchedule, SeatLayout
+from .schedule_service import SCHEDULE_HORIZON_DAYS
+from .search_index import sync_schedule_ids
+
+FARE_BATCH_SIZE = 500
+
+# (minimum share of seats sold, multiplier), highest band first
+OCCUPANCY_BANDS = [
+    (Decimal('0.90'), Decimal('1.30')),
+    (Decimal('0.75'), Decimal('1.20')),
+    (Decimal('0.50'), Decimal('1.10')),
+    (Decimal('0.25'), Decimal('1.00')),
+    (Decimal('0'), Decimal('0.95')),
+]
+
+# (maximum days to departure, multiplier), nearest band first
+LEAD_TIME_BANDS = [
+    (1, Decimal('1.15')),
+    (3, Decimal('1.08')),
+    (7, Decimal('1.00')),
+    (30, Decimal('0.97')),
+]
+FAR_OUT_MULTIPLIER = Decimal('0.95')
+
+# Fares never leave this band around the route's base fare
+MIN_FARE_RATIO = Decimal('0.80')
+MAX_FARE_RATIO = Decimal('1.60')
+
+# Share of the seat fare added for the seat type
+SEAT_TYPE_PREMIUMS = {
+    'seater': Decimal('0'),
+    'sleeper_lower': Decimal('0.10'),
+    'sleeper_upper': Decimal('0.05'),
+}
+
+
+def _rupees(amount: Decimal) -> Decimal:
+    return amount.quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+
+
+def occupancy_multiplier(booked: int, available: int) -> Decimal:
+    total = booked + available
+    share = Decimal(booked) / total if total > 0 else Decimal('0')
+    for threshold, multiplier in OCCUPANCY_BANDS:
+        if share >= threshold:
+            return multiplier
+    return Decimal('1')
+
+
+def lead_time_multiplier(days_out: int) -> Decimal:
+    for max_days, multiplier in LEAD_TIME_BANDS:
+        if days_out <= max_days:
+            return multiplier
+    return FAR_OUT_MULTIPLIER
+
+
+def compute_fare(base_fare: Decimal, booked: int, available: int, days_out: int) -> Decimal:
+    """Per-seat fare for a departure before seat premiums"""
+    fare = base_fare * occupancy_multiplier(booked, available) * lead_time_multiplier(days_out)
+    fare = min(max(fare, base_fare * MIN_FARE_RATIO), base_fare * MAX_FARE_RATIO)
+    return _rupees(fare)
+
+
+def window_positions(seats: List[Tuple[int, int, int]]) -> set:
+    """Positions of seats in the outermost column of their deck, from (position, deck, column)"""
+    columns = defaultdict(list)
+    for _, deck, column in seats:
+        columns[deck].append(column)
+    edges = {deck: (min(values), max(values)) for deck, values in columns.items()}
+    return {position for position, deck, column in seats if column in edges[deck]}
+
+
+def seat_price(fare: Decimal, seat_type: str, is_window: bool, window_charge: Decimal) -> Decimal:
+    price = fare * (1 + SEAT_TYPE_PREMIUMS.get(seat_type, Decimal('0')))
+    if is_window:
+        price += window_charge
+    return _rupees(price)
+
+
+def price_seats(fare: Decimal, layout: List[Tuple[int, str, bool]], window_charge: Decimal) -> Dict[str, str]:
+    """{position: price} for a bus layout given as (position, seat_type, is_window)"""
+    return {
+        str(position): str(seat_price(fare, seat_type, is_window, window_charge))
+        for position, seat_type, is_window in layout
+    }
+
+
+def load_layouts(bus_ids) -> Dict[int, List[Tuple[int, str, bool]]]:
+    """Seat layouts for many buses in one query"""
+    rows = defaultdict(list)
+    seats = SeatLayout.objects.filter(bus_id__in=bus_ids, position__isnull=False).values_list(
+        'bus_id', 'position', 'seat_type', 'deck', 'column'
+    )
+    for bus_id, position, seat_type, deck, column in seats:
+        rows[bus_id].append((position, seat_type, deck, column))
+
+    layouts = {}
+    for bus_id, seats in rows.items():
+        windows = window_positions([(position, deck, column) for position, _, deck, column in seats])
+        layouts[bus_id] = [(position, seat_type, position in windows) for position, seat_type, _, _ in seats]
+    return layouts
+
+
+def recompute_fares(start: Optional[date] = None, days: int = SCHEDULE_HORIZON_DAYS,
+                    batch_size: int = FARE_BATCH_SIZE) -> int:
+    """
+    Reprice every bookable departure in the horizon
+
+    Streams schedules in batches, loads each batch's seat layouts in one
+    query and writes only the schedules whose prices changed with
+    bulk_update. Returns the number of schedules repriced.
+    """
+    start = start or timezone.localdate()
+    schedules = (
+        BusSchedule.objects.filter(
+            date__gte=start,
+            date__lt=start + timedelta(days=days),
+            is_active=True,
+            is_cancelled=False,
+        )
+        .select_related('route')
+        .only('id', 'date', 'fare', 'base_fare_override', 'seat_prices', 'window_seat_charge', 'booked_seats',
+              'available_seats', 'route__base_fare', 'route__bus')
+        .order_by('id')
+    )
+
+    repriced = 0
+    batch = []
+    for schedule in schedules.iterator(chunk_size=batch_size):
+        batch.append(schedule)
+        if len(batch) >= batch_size:
+            repriced += reprice_schedules(batch, start)
+            batch = []
+    if batch:
+        repriced += reprice_schedules(batch, start)
+    return repriced
+
+
+def reprice_schedules(schedules: List[BusSchedule], today: date, sync_index: bool = True) -> int:
+    """
+    Reprice loaded schedules (with their routes) and save the changed ones
+    in one bulk_update. Callers that re-index and queue channel pushes
+    afterwards pass sync_index=False.
+    """
+    layouts = load_layouts({schedule.route.bus_id for schedule in schedules})
+    now = timezone.now()
+    changed = []
+    for schedule in schedules:
+        base_fare = schedule.base_fare_override or schedule.route.base_fare
+        fare = compute_fare(base_fare, schedule.booked_seats, schedule.available_seats, (schedule.date - today).days)
+        prices = price_seats(fare, layouts.get(schedule.route.bus_id, []), schedule.window_seat_charge)
+        if fare != schedule.fare or prices != schedule.seat_prices:
+            schedule.fare = fare
+            schedule.seat_prices = prices
+            schedule.fares_updated_at = now
+            schedule.updated_at = now
+            changed.append(schedule)
+    if changed:
+        BusSchedule.objects.bulk_update(changed, ['fare', 'seat_prices', 'fares_updated_at', 'updated_at'])
+        if sync_index:
+            sync_schedule_ids([schedule.id for schedule in changed])
+            mark_dirty(schedule.id for schedule in changed)
+    return len(changed)
+
+
+def price_for_seats(schedule: BusSchedule, seats) -> Decimal:
+    """
+    Total price of the given seats on a departure
+
+    Reads the cached per-seat prices; a departure the engine has not priced
+    yet (e.g. one created on demand) is priced at its current fare.
+    """
+    prices = schedule.seat_prices
+    if not prices:
+        layout = load_layouts([schedule.route.bus_id]).get(schedule.route.bus_id, [])
+        prices = price_seats(schedule.fare, layout, schedule.window_seat_charge)
+    return sum((Decimal(prices.get(str(seat.position), schedule.fare)) for seat in seats), Decimal('0'))
@@ -0,0 +1,118 @@
+"""
+Bus Seat Layout Cache
+Precomputed, versioned seat-layout templates per bus, held in the shared
+cache and in per-process memory
+"""
+
+import uuid
+from typing import Dict, Iterable, Optional, Set
+
+from django.core.cache import cache
+
+from .models import Bus, SeatLayout
+from .reservation_rules import compile_rules, seat_kind
+
+LAYOUT_VERSION_KEY = 'buses:seat_layout:version:{bus_id}'
+LAYOUT_KEY = 'buses:seat_layout:{bus_id}:{version}'
+LAYOUT_TTL_SECONDS = 24 * 60 * 60
+
+# bus_id -> (version, template)
+_layout_cache: Dict[int, tuple] = {}
+
+RESERVED_FOR_LABELS = dict(SeatLayout.RESERVED_FOR_CHOICES)
+
+
+def build_template(bus_id: int) -> dict:
+    """
+    Seat-layout template for a bus
+
+    seats are ordered by deck, row and column; decks hold a row x column
+    grid of seat positions (None for gaps) so callers can walk neighbours
+    without touching the database.
+    """
+    rows = SeatLayout.objects.filter(bus_id=bus_id).order_by('deck', 'row', 'column').values(
+        'id', 'seat_number', 'seat_type', 'row', 'column', 'deck', 'reserved_for', 'position'
+    )
+    seats = []
+    decks = {}
+    for seat in rows:
+        seats.append(seat)
+        deck = decks.setdefault(seat['deck'], {'min_row': seat['row'], 'max_row': seat['row'], 'columns': set()})
+        deck['min_row'] = min(deck['min_row'], seat['row'])
+        deck['max_row'] = max(deck['max_row'], seat['row'])
+        deck['columns'].add(seat['column'])
+
+    grids = []
+    for number, deck in sorted(decks.items()):
+        columns = sorted(deck['columns'])
+        column_index = {column: index for index, column in enumerate(columns)}
+        grid = [[None] * len(columns) for _ in range(deck['max_row'] - deck['min_row'] + 1)]
+        for seat in seats:
+            if seat['deck'] == number:
+                grid[seat['row'] - deck['min_row']][column_index[seat['column']]] = seat['position']
+        grids.append({'deck': number, 'first_row': deck['min_row'], 'columns': columns, 'grid': grid})
+
+    # Outermost columns of a deck are window seats
+    edges = {deck['deck']: (deck['columns'][0], deck['columns'][-1]) for deck in grids}
+    for seat in seats:
+        seat['is_window'] = seat['column'] in edges[seat['deck']]
+
+    # Seats show the reservation their bus's static rules give them
+    rules = compile_rules(Bus.objects.filter(pk=bus_id).values_list('reservation_rules', flat=True).first(), seats)
+    for seat in seats:
+        seat['reserved_for'] = seat_kind(rules['static'], seat['position'])
+        seat['reserved_for_display'] = RESERVED_FOR_LABELS[seat['reserved_for']]
+
+    return {'bus_id': bus_id, 'decks': grids, 'seats': seats, 'rules': rules}
+
+
+def _version(bus_id: int) -> str:
+    key = LAYOUT_VERSION_KEY.format(bus_id=bus_id)
+    version = cache.get(key)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(key, version, None)
+    return version
+
+
+def get_layout(bus_id: int) -> dict:
+    """Return the current template for a bus: process memory, then cache, then database"""
+    version = _version(bus_id)
+    local = _layout_cache.get(bus_id)
+    if local is not None and local[0] == version:
+        return local[1]
+
+    key = LAYOUT_KEY.format(bus_id=bus_id, version=version)
+    template = cache.get(key)
+    if template is None:
+        template = build_template(bus_id)
+        template['version'] = version
+        cache.set(key, template, LAYOUT_TTL_SECONDS)
+    _layout_cache[bus_id] = (version, template)
+    return template
+
+
+def invalidate_layout(bus_id: int):
+    """Point every process at a fresh version; the old template ages out of the cache"""
+    cache.set(LAYOUT_VERSION_KEY.format(bus_id=bus_id), uuid.uuid4().hex, None)
+    _layout_cache.pop(bus_id, None)
+
+
+def merge_occupancy(template: dict, occupied: Iterable[int], seat_prices: Optional[dict] = None,
+                    reserved: Optional[Dict[str, int]] = None) -> list:
+    """
+    Per-request seat list: template seats plus is_booked and cached price
+
+    reserved, the departure's masks from reservation_rules, overrides the
+    template's static reservations where passengers on board trigger a rule.
+    """
+    occupied: Set[int] = set(occupied)
+    seat_prices = seat_prices or {}
+    seats = []
+    for seat in template['seats']:
+        row = dict(seat, is_booked=seat['position'] in occupied, price=seat_prices.get(str(seat['position'])))
+        kind = seat_kind(reserved, seat['position']) if reserved is not None else seat['reserved_for']
+        if kind != seat['reserved_for']:
+            row.update(reserved_for=kind, reserved_for_display=RESERVED_FOR_LABELS[kind])
+        seats.append(row)
+    return seats
@@ -0,0 +1,76 @@
+"""
+Benchmark bus channel inventory pushes against the local fake provider
+Usage: python manage.py benchmark_bus_channel_sync --updates 5000 --batch-sizes 1 25 100 --latency 20
+       python manage.py benchmark_bus_channel_sync --provider abhibus --rps 5 --server-limit 10
+
+Starts the fake provider in-process and pushes synthetic seat/fare updates
+through the real adapter for each batch size, reporting updates and
+requests per second. The database is not touched.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from buses.channel_sync import ADAPTERS
+from core.services.adapters.fake_bus_provider import FakeBusProviderServer
+from core.services.adapters.http_bus_adapter import ChannelRateLimited
+
+
+class Command(BaseCommand):
+    help = 'Measure channel push throughput for different batch sizes against a fake provider'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', choices=sorted(ADAPTERS), default='redbus')
+        parser.add_argument('--updates', type=int, default=2000, help='Departure updates to push per run')
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 50, 100])
+        parser.add_argument('--latency', type=float, default=10, help='Fake provider latency per request, ms')
+        parser.add_argument('--rps', type=float, default=1000, help='Client-side requests per second')
+        parser.add_argument('--server-limit', type=float, help='Fake provider requests per second before 429s')
+
+    def handle(self, *args, **options):
+        adapter_class = ADAPTERS[options['provider']]
+        today = timezone.localdate()
+        updates = [
+            {
+                'service_id': f'SVC{index % 200:04d}',
+                'date': (today + timedelta(days=index // 200)).isoformat(),
+                'available_seats': index % 40,
+                'fare': '799.00',
+                'is_active': True,
+            }
+            for index in range(options['updates'])
+        ]
+        server = FakeBusProviderServer(
+            rate_limit=options['server_limit'], latency=options['latency'] / 1000
+        ).start()
+        try:
+            for batch_size in options['batch_sizes']:
+                server.reset()
+                adapter = adapter_class({
+                    'base_url': server.url(options['provider']),
+                    'api_key': 'benchmark',
+                    'operator_code': 'BENCH',
+                    'partner_id': 'BENCH',
+                    'batch_size': batch_size,
+                    'requests_per_second': options['rps'],
+                })
+                started = time.perf_counter()
+                limited = 0
+                try:
+                    result = adapter.push_inventory({'updates': updates})
+                except ChannelRateLimited:
+                    limited = 1
+                    result = {'sent': sum(request['size'] for request in server.pushes(options['provider'])),
+                              'batches': len(server.pushes(options['provider']))}
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"  batch {adapter.batch_size:>4}: {result['sent']} updates in {result['batches']} requests, "
+                    f"{elapsed:.2f}s, {result['sent'] / elapsed:,.0f} updates/s"
+                    + (' (stopped by provider rate limit)' if limited else '')
+                )
+        finally:
+            server.stop()
+        self.stdout.write(self.style.SUCCESS(f"✓ Benchmarked {options['provider']} pushes"))
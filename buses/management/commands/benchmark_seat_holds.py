@@ -0,0 +1,122 @@
+"""
+Benchmark concurrent seat holds on one popular bus departure
+Usage: python manage.py benchmark_seat_holds --workers 200 --seats 40 --group-size 2
+
+Creates a throwaway bus and departure, lets many buyers race for the same
+seats in parallel and reports throughput plus a double-sale check. Run
+against PostgreSQL for meaningful numbers; SQLite serializes every writer.
+"""
+
+import random
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from bookings.models import SeatHold
+from buses.models import Bus, BusOperator, BusRoute, BusSchedule, SeatLayout
+from buses.seat_hold_service import hold_seats
+from buses.seat_inventory import SeatUnavailableError, occupied_positions, to_bytes
+from core.models import City
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent bus seat holds against a single departure'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=200, help='Concurrent buyers')
+        parser.add_argument('--seats', type=int, default=40, help='Seats on the bus')
+        parser.add_argument('--group-size', type=int, default=2, help='Seats each buyer tries to hold')
+        parser.add_argument('--attempts', type=int, default=3, help='Retries per buyer after a conflict')
+
+    def handle(self, *args, **options):
+        city, _ = City.objects.get_or_create(
+            code='BENCH', defaults={'name': 'Benchmark City', 'state': 'Benchmark'}
+        )
+        operator = BusOperator.objects.create(
+            name='Seat Hold Benchmark', contact_phone='0000000000', contact_email='bench@example.com', is_active=False
+        )
+        try:
+            self._run(operator, city, options)
+        finally:
+            operator.delete()
+
+    def _run(self, operator, city, options):
+        seat_count = options['seats']
+        bus = Bus.objects.create(
+            operator=operator, bus_number=f'BENCH-{int(time.time())}', bus_name='Benchmark',
+            bus_type='seater', total_seats=seat_count, is_active=False
+        )
+        route = BusRoute.objects.create(
+            bus=bus, route_name='Benchmark', source_city=city, destination_city=city,
+            departure_time='22:00', arrival_time='06:00', duration_hours=Decimal('8'),
+            distance_km=Decimal('400'), base_fare=Decimal('999'), is_active=False
+        )
+        seats = [
+            SeatLayout.objects.create(
+                bus=bus, seat_number=str(number + 1), seat_type='seater', row=number // 4 + 1, column=number % 4 + 1
+            )
+            for number in range(seat_count)
+        ]
+        schedule = BusSchedule.objects.create(
+            route=route, date=timezone.localdate() + timedelta(days=1),
+            available_seats=seat_count, fare=Decimal('999')
+        )
+
+        workers = options['workers']
+        group_size = options['group_size']
+        results = {'held': 0, 'conflicts': 0, 'errors': 0}
+        results_lock = threading.Lock()
+        barrier = threading.Barrier(workers)
+
+        def buyer():
+            held = conflicts = errors = 0
+            try:
+                barrier.wait()
+                for _ in range(options['attempts'] + 1):
+                    wanted = random.sample(seats, min(group_size, len(seats)))
+                    try:
+                        hold_seats(schedule, wanted)
+                        held += len(wanted)
+                        break
+                    except SeatUnavailableError:
+                        conflicts += 1
+                    except DatabaseError:
+                        errors += 1
+            finally:
+                connection.close()
+                with results_lock:
+                    results['held'] += held
+                    results['conflicts'] += conflicts
+                    results['errors'] += errors
+
+        threads = [threading.Thread(target=buyer) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        schedule.refresh_from_db()
+        live_holds = SeatHold.objects.filter(schedule=schedule, status__in=SeatHold.LIVE_STATUSES)
+        distinct_seats = live_holds.values('seat').distinct().count()
+        consistent = (
+            live_holds.count() == distinct_seats == schedule.booked_seats
+            == len(occupied_positions(to_bytes(schedule.seat_bitmap)))
+            and schedule.available_seats + schedule.booked_seats == seat_count
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"workers={workers} seats={seat_count} held={results['held']} "
+            f"conflicts={results['conflicts']} db_errors={results['errors']} "
+            f"elapsed={elapsed:.2f}s throughput={results['held'] / elapsed if elapsed else 0:.1f} seats/s"
+        ))
+        if consistent:
+            self.stdout.write(self.style.SUCCESS('✓ No seat sold twice; bitmap and counters agree'))
+        else:
+            self.stdout.write(self.style.ERROR('✗ Seat holds, bitmap and counters disagree'))
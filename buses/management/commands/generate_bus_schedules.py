@@ -0,0 +1,26 @@
+"""
+Management command to materialize bus schedules from route operating days
+Usage: python manage.py generate_bus_schedules --days 60 [--route 12]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from buses.models import BusRoute
+from buses.schedule_service import SCHEDULE_HORIZON_DAYS, generate_schedules
+
+
+class Command(BaseCommand):
+    help = 'Create missing BusSchedule rows for active routes over a rolling horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=SCHEDULE_HORIZON_DAYS, help='Days ahead to cover')
+        parser.add_argument('--route', type=int, help='Only this route id')
+
+    def handle(self, *args, **options):
+        route = None
+        if options['route']:
+            route = BusRoute.objects.filter(pk=options['route']).first()
+            if route is None:
+                raise CommandError(f"Route {options['route']} not found")
+        created = generate_schedules(route=route, days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Created {created} bus schedules'))
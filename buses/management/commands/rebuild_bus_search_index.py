@@ -0,0 +1,16 @@
+"""
+Management command to rebuild the denormalized bus search index
+Usage: python manage.py rebuild_bus_search_index
+"""
+
+from django.core.management.base import BaseCommand
+
+from buses.search_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Re-index every upcoming bus schedule into BusSearchEntry'
+
+    def handle(self, *args, **options):
+        written = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'✓ Indexed {written} bus schedules'))
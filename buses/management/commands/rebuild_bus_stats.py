@@ -0,0 +1,16 @@
+"""
+Management command to rebuild the operator dashboard rollups
+Usage: python manage.py rebuild_bus_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from buses.stats_service import rebuild_bus_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute BusDailyStats from bus bookings (backfill or repair)'
+
+    def handle(self, *args, **options):
+        written = rebuild_bus_stats()
+        self.stdout.write(self.style.SUCCESS(f'✓ Wrote {written} bus daily stats rows'))
@@ -0,0 +1,20 @@
+"""
+Management command to reprice upcoming bus departures
+Usage: python manage.py recompute_bus_fares --days 60
+"""
+
+from django.core.management.base import BaseCommand
+
+from buses.fare_service import recompute_fares
+from buses.schedule_service import SCHEDULE_HORIZON_DAYS
+
+
+class Command(BaseCommand):
+    help = 'Recompute dynamic fares and cached per-seat prices for upcoming bus schedules'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=SCHEDULE_HORIZON_DAYS, help='Days ahead to reprice')
+
+    def handle(self, *args, **options):
+        repriced = recompute_fares(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Repriced {repriced} bus schedules'))
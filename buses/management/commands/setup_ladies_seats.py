@@ -1,109 +1,107 @@
-from django.core.management.base import BaseCommand
+"""
+Management command to generate seat layouts and reservation rules for buses
+Usage: python manage.py setup_ladies_seats
+       python manage.py setup_ladies_seats --bus TN02BIT --rules '[{"reserve": "ladies", "adjacent_to": "F"}]'
+"""
+
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from buses.layout_cache import invalidate_layout
 from buses.models import Bus, SeatLayout
+from buses.reservation_rules import compile_rules, seat_kind, validate_rules
+
+
+def seater_layout(bus):
+    # 2x10 layout, 1A, 1B, 2A, 2B, ...
+    return [
+        {'seat_number': f'{row}{chr(64 + col)}', 'seat_type': 'seater', 'row': row, 'column': col, 'deck': 1}
+        for row in range(1, 11) for col in range(1, 3)
+    ]
+
+
+def sleeper_layout(bus):
+    # 2x6 berths on each deck, 1AL, 1BL, ... 1AU, 1BU, ...
+    return [
+        {
+            'seat_number': f"{row}{chr(64 + col)}{'L' if deck == 1 else 'U'}",
+            'seat_type': 'sleeper_lower' if deck == 1 else 'sleeper_upper',
+            'row': row, 'column': col, 'deck': deck,
+        }
+        for deck in (1, 2) for row in range(1, 7) for col in range(1, 3)
+    ]
+
+
+def default_layout(bus):
+    seats = []
+    for number in range(1, bus.total_seats + 1):
+        row, col = divmod(number - 1, 2)
+        seats.append({'seat_number': str(number), 'seat_type': 'seater', 'row': row + 1, 'column': col + 1, 'deck': 1})
+    return seats
+
+
+def default_rules(seats, bus):
+    rows = sorted({seat['row'] for seat in seats})
+    if bus.bus_type in ['sleeper', 'ac_sleeper']:
+        # Women section at the front of both decks
+        return [{'reserve': 'ladies', 'rows': [1, 2]}]
+    # Alternate rows, starting from row 2
+    return [{'reserve': 'ladies', 'rows': [row for row in rows if row % 2 == 0]}]
+
+
+LAYOUTS = {
+    'seater': seater_layout,
+    'ac_seater': seater_layout,
+    'sleeper': sleeper_layout,
+    'ac_sleeper': sleeper_layout,
+}
 
 
 class Command(BaseCommand):
-    help = 'Setup ladies seats for buses'
+    help = 'Regenerate seat layouts with bulk inserts and apply reservation rules for buses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bus', help='Only this bus number')
+        parser.add_argument('--rules', help='Reservation rules as JSON, instead of the per-type defaults')
 
     def handle(self, *args, **options):
-        # Get all buses
+        rules = None
+        if options['rules']:
+            try:
+                rules = json.loads(options['rules'])
+                validate_rules(rules)
+            except (ValueError, ValidationError) as exc:
+                raise CommandError(f'Invalid --rules: {exc}')
+
         buses = Bus.objects.all()
-        
+        if options['bus']:
+            buses = buses.filter(bus_number=options['bus'])
+
         for bus in buses:
-            # Clear existing seats
-            SeatLayout.objects.filter(bus=bus).delete()
-            
-            # Create seat layout based on bus type
-            if bus.bus_type in ['seater', 'ac_seater']:
-                # 2x10 layout for seater buses
-                seats_created = 0
-                for row in range(1, 11):
-                    for col in range(1, 3):
-                        seat_number = f"{row}{chr(64+col)}"  # 1A, 1B, 2A, 2B, etc.
-                        
-                        # Mark alternate rows as ladies seats (starting from row 2)
-                        reserved_for = 'ladies' if row % 2 == 0 else 'general'
-                        
-                        SeatLayout.objects.create(
-                            bus=bus,
-                            seat_number=seat_number,
-                            seat_type='seater',
-                            row=row,
-                            column=col,
-                            deck=1,
-                            reserved_for=reserved_for,
-                        )
-                        seats_created += 1
-                
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Created {seats_created} seats for {bus.bus_number} (Seater)'
-                    )
-                )
-            
-            elif bus.bus_type in ['sleeper', 'ac_sleeper']:
-                # 2x12 layout with lower and upper berths
-                seats_created = 0
-                for deck in [1, 2]:
-                    deck_name = 'Lower' if deck == 1 else 'Upper'
-                    for row in range(1, 7):
-                        for col in range(1, 3):
-                            seat_number = f"{row}{chr(64+col)}{deck_name[0]}"  # 1AL, 1AU, 2AL, 2AU, etc.
-                            seat_type = 'sleeper_lower' if deck == 1 else 'sleeper_upper'
-                            
-                            # Mark women section (rows 1-2) as ladies seats
-                            reserved_for = 'ladies' if row <= 2 else 'general'
-                            
-                            SeatLayout.objects.create(
-                                bus=bus,
-                                seat_number=seat_number,
-                                seat_type=seat_type,
-                                row=row,
-                                column=col,
-                                deck=deck,
-                                reserved_for=reserved_for,
-                            )
-                            seats_created += 1
-                
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Created {seats_created} seats for {bus.bus_number} (Sleeper)'
-                    )
-                )
-            
-            else:
-                # Default layout for other bus types
-                total_seats = bus.total_seats
-                seats_created = 0
-                seat_num = 0
-                
-                for row in range(1, (total_seats // 2) + 1):
-                    for col in range(1, 3):
-                        seat_num += 1
-                        if seat_num > total_seats:
-                            break
-                        
-                        reserved_for = 'ladies' if row % 2 == 0 else 'general'
-                        
-                        SeatLayout.objects.create(
-                            bus=bus,
-                            seat_number=str(seat_num),
-                            seat_type='seater',
-                            row=row,
-                            column=col,
-                            deck=1,
-                            reserved_for=reserved_for,
-                        )
-                        seats_created += 1
-                
-                self.stdout.write(
-                    self.style.SUCCESS(
-                        f'Created {seats_created} seats for {bus.bus_number} ({bus.get_bus_type_display()})'
-                    )
-                )
-        
-        self.stdout.write(
-            self.style.SUCCESS(
-                'Ladies seat setup complete! Alternate rows/sections are reserved for ladies.'
-            )
-        )
+            seats = LAYOUTS.get(bus.bus_type, default_layout)(bus)
+            for position, seat in enumerate(seats):
+                seat.update(position=position, reserved_for='general')
+            bus_rules = rules if rules is not None else default_rules(seats, bus)
+            # Static rules are written to reserved_for so reports read them
+            # directly; passenger-triggered rules apply per departure
+            static = compile_rules(bus_rules, seats)['static']
+
+            with transaction.atomic():
+                SeatLayout.objects.filter(bus=bus).delete()
+                SeatLayout.objects.bulk_create([
+                    SeatLayout(bus=bus, **dict(seat, reserved_for=seat_kind(static, seat['position'])))
+                    for seat in seats
+                ])
+                Bus.objects.filter(pk=bus.pk).update(reservation_rules=bus_rules)
+            invalidate_layout(bus.pk)
+
+            ladies = bin(static['ladies']).count('1')
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Created {len(seats)} seats for {bus.bus_number} ({bus.get_bus_type_display()}), '
+                f'{ladies} ladies seats, {len(bus_rules)} rules'
+            ))
+
+        self.stdout.write(self.style.SUCCESS('Ladies seat setup complete!'))
@@ -0,0 +1,103 @@
+"""
+Management command to simulate a GPS device on a bus
+Usage: python manage.py simulate_bus_telemetry TN02BIT --pings 120 --interval 10
+       python manage.py simulate_bus_telemetry TN02BIT --url http://localhost:8000/api/buses/telemetry/ --realtime
+"""
+
+import json
+import time
+import urllib.request
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from buses.models import Bus
+from buses.telemetry import MAX_BATCH_SIZE, ingest_pings
+
+
+def _coordinates(value):
+    try:
+        latitude, longitude = (float(part) for part in value.split(','))
+    except ValueError:
+        raise CommandError(f'Expected "lat,lng", got {value!r}')
+    return latitude, longitude
+
+
+class Command(BaseCommand):
+    help = 'Send GPS pings for a bus moving along its route, in batches, as a device would'
+
+    def add_arguments(self, parser):
+        parser.add_argument('bus_number', help='Bus number the device reports')
+        parser.add_argument('--pings', type=int, default=60, help='Number of pings to send')
+        parser.add_argument('--interval', type=int, default=10, help='Seconds between pings')
+        parser.add_argument('--batch', type=int, default=20, help='Pings per upload')
+        parser.add_argument('--speed', type=float, default=55, help='Reported speed in km/h')
+        parser.add_argument('--start', help='"lat,lng" to start from (default first boarding point)')
+        parser.add_argument('--end', help='"lat,lng" to head towards (default last dropping point)')
+        parser.add_argument('--url', help='Telemetry endpoint to POST to; ingests in-process when omitted')
+        parser.add_argument('--token', default=getattr(settings, 'BUS_TELEMETRY_TOKEN', ''),
+                            help='Device token for --url')
+        parser.add_argument('--realtime', action='store_true', help='Wait between uploads instead of backdating')
+
+    def handle(self, *args, **options):
+        bus = Bus.objects.filter(bus_number=options['bus_number']).first()
+        if bus is None:
+            raise CommandError(f"Bus {options['bus_number']} not found")
+        start, end = self._path(bus, options)
+        count = max(options['pings'], 1)
+        batch_size = min(max(options['batch'], 1), MAX_BATCH_SIZE)
+        interval = timedelta(seconds=options['interval'])
+
+        # Backdated runs end now so the last ping is the live position
+        first_ping = timezone.now() if options['realtime'] else timezone.now() - interval * (count - 1)
+        pings = []
+        accepted = 0
+        for index in range(count):
+            progress = index / max(count - 1, 1)
+            pings.append({
+                'bus': bus.bus_number,
+                'ts': (first_ping + interval * index).isoformat(),
+                'lat': round(start[0] + (end[0] - start[0]) * progress, 7),
+                'lng': round(start[1] + (end[1] - start[1]) * progress, 7),
+                'speed': options['speed'],
+                'heading': 0,
+            })
+            if len(pings) >= batch_size or index == count - 1:
+                accepted += self._send(pings, options)
+                pings = []
+                if options['realtime'] and index < count - 1:
+                    time.sleep(interval.total_seconds() * batch_size)
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Sent {count} pings for {bus.bus_number}, {accepted} accepted'))
+        if not bus.has_gps_tracking:
+            self.stdout.write(self.style.WARNING('  Bus has GPS tracking disabled, pings were rejected'))
+
+    def _path(self, bus, options):
+        if options['start'] and options['end']:
+            return _coordinates(options['start']), _coordinates(options['end'])
+        route = bus.routes.filter(is_active=True).first()
+        boarding = route and route.boarding_points.filter(latitude__isnull=False, longitude__isnull=False).first()
+        dropping = route and route.dropping_points.filter(
+            latitude__isnull=False, longitude__isnull=False
+        ).order_by('-sequence_order').first()
+        if not boarding or not dropping:
+            raise CommandError('Route points have no coordinates, pass --start and --end')
+        start = _coordinates(options['start']) if options['start'] else (
+            float(boarding.latitude), float(boarding.longitude)
+        )
+        end = _coordinates(options['end']) if options['end'] else (float(dropping.latitude), float(dropping.longitude))
+        return start, end
+
+    def _send(self, pings, options) -> int:
+        if not options['url']:
+            return ingest_pings(pings)['accepted']
+        request = urllib.request.Request(
+            options['url'],
+            data=json.dumps({'pings': pings}).encode(),
+            headers={'Content-Type': 'application/json', 'X-Telemetry-Token': options['token']},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())['accepted']
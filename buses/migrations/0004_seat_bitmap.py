@@ -0,0 +1,64 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:33
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+RELEASED_STATUSES = ['cancelled', 'refunded', 'deleted']
+
+
+def backfill_seat_bitmaps(apps, schema_editor):
+    SeatLayout = apps.get_model('buses', 'SeatLayout')
+    BusSchedule = apps.get_model('buses', 'BusSchedule')
+    BusBookingSeat = apps.get_model('bookings', 'BusBookingSeat')
+
+    next_position = defaultdict(int)
+    seats = SeatLayout.objects.order_by('bus_id', 'deck', 'row', 'column', 'id')
+    for seat in seats.iterator():
+        seat.position = next_position[seat.bus_id]
+        next_position[seat.bus_id] += 1
+        seat.save(update_fields=['position'])
+
+    occupied = defaultdict(set)
+    rows = (
+        BusBookingSeat.objects.exclude(bus_booking__booking__status__in=RELEASED_STATUSES)
+        .values_list('bus_booking__bus_schedule_id', 'seat__position')
+    )
+    for schedule_id, position in rows.iterator():
+        occupied[schedule_id].add(position)
+
+    for schedule_id, positions in occupied.items():
+        bitmap = bytearray((max(positions) >> 3) + 1)
+        for position in positions:
+            bitmap[position >> 3] |= 1 << (position & 7)
+        BusSchedule.objects.filter(pk=schedule_id).update(seat_bitmap=bytes(bitmap))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0003_seatlayout_reserved_for'),
+        ('bookings', '0007_cobooking_recommendation'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='seatlayout',
+            unique_together={('bus', 'seat_number')},
+        ),
+        migrations.AddField(
+            model_name='busschedule',
+            name='seat_bitmap',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.AddField(
+            model_name='seatlayout',
+            name='position',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_seat_bitmaps, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='seatlayout',
+            unique_together={('bus', 'position'), ('bus', 'seat_number')},
+        ),
+    ]
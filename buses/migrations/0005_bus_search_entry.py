@@ -0,0 +1,45 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+        ('buses', '0004_seat_bitmap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusSearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('departure_time', models.TimeField()),
+                ('arrival_time', models.TimeField()),
+                ('duration_hours', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('distance_km', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('base_fare', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('fare', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('available_seats', models.IntegerField()),
+                ('bus_type', models.CharField(choices=[('seater', 'Seater'), ('sleeper', 'Sleeper'), ('semi_sleeper', 'Semi-Sleeper'), ('ac_seater', 'AC Seater'), ('ac_sleeper', 'AC Sleeper'), ('volvo', 'Volvo'), ('luxury', 'Luxury')], max_length=20)),
+                ('amenities', models.PositiveIntegerField(default=0, help_text='Bitmask, see buses.search_index.AMENITY_BITS')),
+                ('bus_number', models.CharField(max_length=50)),
+                ('bus_name', models.CharField(max_length=200)),
+                ('operator_name', models.CharField(max_length=200)),
+                ('source_name', models.CharField(max_length=100)),
+                ('destination_name', models.CharField(max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buses.bus')),
+                ('destination_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.city')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buses.busroute')),
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_entry', to='buses.busschedule')),
+                ('source_city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.city')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source_city', 'destination_city', 'date', 'departure_time'], name='bus_search_corridor_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:44
+
+from django.db import migrations, models
+
+FULL_ROUTE_SEGMENTS = 0x7FFFFFFF
+
+
+def backfill_segment_masks(apps, schema_editor):
+    """Seats already in the bitmap were sold for the whole route"""
+    BusSchedule = apps.get_model('buses', 'BusSchedule')
+    full = FULL_ROUTE_SEGMENTS.to_bytes(4, 'little')
+    for schedule_id, bitmap in BusSchedule.objects.exclude(seat_bitmap=b'').values_list('id', 'seat_bitmap').iterator():
+        bitmap = bytes(bitmap)
+        masks = b''.join(
+            full if bitmap[position >> 3] & (1 << (position & 7)) else bytes(4)
+            for position in range(len(bitmap) * 8)
+        )
+        BusSchedule.objects.filter(pk=schedule_id).update(segment_masks=masks.rstrip(b'\x00'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0005_bus_search_entry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='busschedule',
+            name='segment_masks',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.RunPython(backfill_segment_masks, migrations.RunPython.noop),
+    ]
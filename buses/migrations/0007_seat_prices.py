@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0006_segment_masks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='busschedule',
+            name='fares_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='busschedule',
+            name='seat_prices',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
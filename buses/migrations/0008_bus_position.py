@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0007_seat_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusPosition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('recorded_at', models.DateTimeField()),
+                ('latitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, max_digits=10)),
+                ('speed_kmh', models.DecimalField(blank=True, decimal_places=1, max_digits=5, null=True)),
+                ('heading', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('bus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='positions', to='buses.bus')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'bus', 'recorded_at'], name='bus_position_day_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0008_bus_position'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='busschedule',
+            name='base_fare_override',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text="Operator's base fare for this date; the route base fare applies when empty", max_digits=10, null=True),
+        ),
+    ]
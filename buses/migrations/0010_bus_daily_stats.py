@@ -0,0 +1,35 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0009_schedule_base_fare_override'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Departure date')),
+                ('capacity', models.IntegerField(default=0, help_text='Seats on the bus when the first booking arrived')),
+                ('bookings', models.IntegerField(default=0)),
+                ('seats_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cancellations', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bus', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='buses.bus')),
+                ('operator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='buses.busoperator')),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='buses.busroute')),
+            ],
+            options={
+                'verbose_name_plural': 'Bus daily stats',
+                'indexes': [models.Index(fields=['operator', 'date'], name='bus_daily_stats_operator_idx')],
+                'unique_together': {('route', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:12
+
+import buses.reservation_rules
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0010_bus_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bus',
+            name='reservation_rules',
+            field=models.JSONField(blank=True, default=list, help_text='e.g. [{"reserve": "ladies", "adjacent_to": "F"}]', validators=[buses.reservation_rules.validate_rules]),
+        ),
+    ]
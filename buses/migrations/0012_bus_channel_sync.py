@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buses', '0011_bus_reservation_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BusChannelUpdate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('queued_at', models.DateTimeField(db_index=True)),
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='buses.busschedule')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='BusChannelMapping',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('provider', models.CharField(choices=[('redbus', 'redBus'), ('abhibus', 'AbhiBus')], max_length=20)),
+                ('external_service_id', models.CharField(max_length=120)),
+                ('is_active', models.BooleanField(default=True)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('metadata', models.JSONField(blank=True, default=dict)),
+                ('route', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='channel_mappings', to='buses.busroute')),
+            ],
+            options={
+                'ordering': ['provider', 'external_service_id'],
+                'unique_together': {('route', 'provider'), ('provider', 'external_service_id')},
+            },
+        ),
+    ]
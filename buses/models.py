@@ -3,6 +3,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from core.models import TimeStampedModel, City
 from datetime import date
+from .reservation_rules import ALLOWED_GENDERS, validate_rules
 
 
 class BusOperator(TimeStampedModel):
@@ -83,6 +84,10 @@ class Bus(TimeStampedModel):
     has_gps_tracking = models.BooleanField(default=False)
     has_cctv = models.BooleanField(default=False)
     
+    # Declarative seat reservations, compiled by buses.reservation_rules
+    reservation_rules = models.JSONField(default=list, blank=True, validators=[validate_rules],
+                                         help_text="e.g. [{\"reserve\": \"ladies\", \"adjacent_to\": \"F\"}]")
+    
     # Ratings & Reviews
     average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, validators=[MinValueValidator(0), MaxValueValidator(5)])
     total_reviews = models.IntegerField(default=0)
@@ -270,6 +275,10 @@ class BusStop(models.Model):
         return f"{self.route} - {self.stop_name}"
 
 
+# Segment mask covering every leg of a route; a route may have at most 31 legs
+FULL_ROUTE_SEGMENTS = 0x7FFFFFFF
+
+
 class BusSchedule(TimeStampedModel):
     """Bus schedule for specific dates - tracks daily availability"""
     route = models.ForeignKey(BusRoute, on_delete=models.CASCADE, related_name='schedules')
@@ -278,6 +287,10 @@ class BusSchedule(TimeStampedModel):
     booked_seats = models.IntegerField(default=0, help_text="Seats already booked")
     
     fare = models.DecimalField(max_digits=10, decimal_places=2, help_text="Dynamic pricing per seat")
+    base_fare_override = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True,
+        help_text="Operator's base fare for this date; the route base fare applies when empty"
+    )
     
     # Status tracking
     is_active = models.BooleanField(default=True)
@@ -287,6 +300,17 @@ class BusSchedule(TimeStampedModel):
     # Window seat pricing (premium)
     window_seat_charge = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     
+    # Seat occupancy, one bit per SeatLayout.position (see buses.seat_inventory)
+    seat_bitmap = models.BinaryField(default=b'', blank=True, editable=False)
+    
+    # Per-seat occupancy by route segment: one little-endian uint32 per
+    # SeatLayout.position, bit i set when the leg from stop i to i+1 is sold
+    segment_masks = models.BinaryField(default=b'', blank=True, editable=False)
+    
+    # Per-seat prices keyed by SeatLayout.position, cached by buses.fare_service
+    seat_prices = models.JSONField(default=dict, blank=True, editable=False)
+    fares_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    
     class Meta:
         unique_together = ['route', 'date']
         ordering = ['date']
@@ -342,19 +366,164 @@ class SeatLayout(models.Model):
     reserved_for = models.CharField(max_length=20, choices=RESERVED_FOR_CHOICES, default='general', 
                                      help_text="Reserve seats for specific passenger types")
     
+    # Stable bit index of this seat in BusSchedule.seat_bitmap
+    position = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    
     class Meta:
-        unique_together = ['bus', 'seat_number']
+        unique_together = [['bus', 'seat_number'], ['bus', 'position']]
         ordering = ['deck', 'row', 'column']
     
     def __str__(self):
         return f"{self.bus.bus_number} - Seat {self.seat_number} ({self.get_reserved_for_display()})"
     
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            last = SeatLayout.objects.filter(bus_id=self.bus_id).aggregate(models.Max('position'))['position__max']
+            self.position = 0 if last is None else last + 1
+        super().save(*args, **kwargs)
+    
     def can_be_booked_by(self, passenger_gender):
         """Check if seat can be booked by passenger gender"""
-        if self.reserved_for == 'general':
-            return True
-        elif self.reserved_for == 'ladies':
-            return passenger_gender == 'F'  # Only females can book ladies seats
-        elif self.reserved_for == 'disabled':
-            return True  # Disabled passengers can book disabled seats
-        return False
+        # Only females can book ladies seats; general and disabled seats are open
+        allowed = ALLOWED_GENDERS.get(self.reserved_for)
+        return allowed is None or passenger_gender in allowed
+
+
+class BusSearchEntry(models.Model):
+    """
+    Denormalized search row, one per bookable schedule
+
+    Maintained by buses.search_index so searches are a single index range
+    scan on (source, destination, date) with no joins.
+    """
+    schedule = models.OneToOneField(BusSchedule, on_delete=models.CASCADE, related_name='search_entry')
+    route = models.ForeignKey(BusRoute, on_delete=models.CASCADE, related_name='+')
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='+')
+    source_city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='+')
+    destination_city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='+')
+    date = models.DateField()
+    
+    departure_time = models.TimeField()
+    arrival_time = models.TimeField()
+    duration_hours = models.DecimalField(max_digits=5, decimal_places=2)
+    distance_km = models.DecimalField(max_digits=7, decimal_places=2)
+    base_fare = models.DecimalField(max_digits=10, decimal_places=2)
+    fare = models.DecimalField(max_digits=10, decimal_places=2)
+    available_seats = models.IntegerField()
+    
+    bus_type = models.CharField(max_length=20, choices=Bus.BUS_TYPES)
+    amenities = models.PositiveIntegerField(default=0, help_text="Bitmask, see buses.search_index.AMENITY_BITS")
+    
+    # Display fields so results render without joins
+    bus_number = models.CharField(max_length=50)
+    bus_name = models.CharField(max_length=200)
+    operator_name = models.CharField(max_length=200)
+    source_name = models.CharField(max_length=100)
+    destination_name = models.CharField(max_length=100)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['source_city', 'destination_city', 'date', 'departure_time'],
+                name='bus_search_corridor_idx',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.source_name} to {self.destination_name} on {self.date} ({self.bus_number})"
+
+
+class BusPosition(models.Model):
+    """
+    One GPS ping from a bus, append-only
+
+    Rows are bulk-inserted by buses.telemetry and never updated. `day` is
+    the partition key: reads and retention work on whole days, and pings
+    older than the raw window are thinned to one per bucket.
+    """
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='positions')
+    day = models.DateField()
+    recorded_at = models.DateTimeField()
+    latitude = models.DecimalField(max_digits=10, decimal_places=7)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7)
+    speed_kmh = models.DecimalField(max_digits=5, decimal_places=1, null=True, blank=True)
+    heading = models.PositiveSmallIntegerField(null=True, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['day', 'bus', 'recorded_at'], name='bus_position_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.bus_id} at {self.recorded_at:%Y-%m-%d %H:%M:%S}"
+
+
+class BusDailyStats(models.Model):
+    """
+    Daily rollup per route and departure date for operator dashboards
+
+    Maintained incrementally by buses.stats_service as bookings are sold
+    and cancelled; counters are net of cancellations.
+    """
+    operator = models.ForeignKey(BusOperator, on_delete=models.CASCADE, related_name='daily_stats')
+    bus = models.ForeignKey(Bus, on_delete=models.CASCADE, related_name='daily_stats')
+    route = models.ForeignKey(BusRoute, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField(help_text="Departure date")
+    
+    capacity = models.IntegerField(default=0, help_text="Seats on the bus when the first booking arrived")
+    bookings = models.IntegerField(default=0)
+    seats_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancellations = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['route', 'date']
+        indexes = [
+            models.Index(fields=['operator', 'date'], name='bus_daily_stats_operator_idx'),
+        ]
+        verbose_name_plural = 'Bus daily stats'
+    
+    def __str__(self):
+        return f"{self.route_id} on {self.date}: {self.seats_sold} seats, ₹{self.revenue}"
+
+
+class BusChannelMapping(TimeStampedModel):
+    """Maps a route to the service id a bus channel sells it under"""
+    PROVIDER_CHOICES = [
+        ('redbus', 'redBus'),
+        ('abhibus', 'AbhiBus'),
+    ]
+    
+    route = models.ForeignKey(BusRoute, on_delete=models.CASCADE, related_name='channel_mappings')
+    provider = models.CharField(max_length=20, choices=PROVIDER_CHOICES)
+    external_service_id = models.CharField(max_length=120)
+    is_active = models.BooleanField(default=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)
+    
+    class Meta:
+        unique_together = [['route', 'provider'], ['provider', 'external_service_id']]
+        ordering = ['provider', 'external_service_id']
+    
+    def __str__(self):
+        return f"{self.route} -> {self.external_service_id} ({self.get_provider_display()})"
+
+
+class BusChannelUpdate(models.Model):
+    """
+    Departure with inventory changes not yet pushed to its channels
+
+    One row per schedule however often it changes before the next flush;
+    the push reads the schedule's current seats and fare, see
+    buses.channel_sync.
+    """
+    schedule = models.OneToOneField(BusSchedule, on_delete=models.CASCADE, related_name='+')
+    queued_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"Schedule {self.schedule_id} queued at {self.queued_at:%Y-%m-%d %H:%M:%S}"
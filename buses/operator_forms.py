@@ -1,7 +1,10 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db.models import Count, Q
 from buses.models import BusOperator
+from buses.stats_service import operator_bus_stats, operator_daily_chart
+from buses.bulk_upload import UPLOAD_FORMATS, UploadError, import_operator_file
 from django import forms
 
 
@@ -36,6 +39,27 @@ class BusOperatorRegistrationForm(forms.ModelForm):
         return cleaned_data
 
 
+class BulkUploadForm(forms.Form):
+    """Operator upload of schedules, fares, seat counts or boarding/dropping points"""
+    KIND_CHOICES = [
+        ('schedules', 'Schedules, fares & seats'),
+        ('boarding_points', 'Boarding points'),
+        ('dropping_points', 'Dropping points'),
+    ]
+    
+    kind = forms.ChoiceField(choices=KIND_CHOICES, widget=forms.Select(attrs={'class': 'form-select'}))
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json'}))
+    dry_run = forms.BooleanField(required=False, initial=True, label='Preview changes only')
+    
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        extension = upload.name.rsplit('.', 1)[-1].lower() if '.' in upload.name else ''
+        if extension not in UPLOAD_FORMATS:
+            raise forms.ValidationError('Upload a .csv or .json file.')
+        upload.format = extension
+        return upload
+
+
 def register_bus_operator(request):
     """Register as a bus operator"""
     from django.contrib.auth import authenticate, login
@@ -89,16 +113,66 @@ def operator_dashboard(request):
         messages.warning(request, "Please register as a bus operator first.")
         return redirect('buses:operator_register')
     
-    buses = operator.buses.all()
-    routes = sum(b.routes.count() for b in buses)
+    buses = list(operator.buses.annotate(total_routes=Count('routes', filter=Q(routes__is_active=True))))
+    # Sales, revenue and occupancy come from the daily rollups in one grouped query
+    bus_stats = operator_bus_stats(operator)
+    for bus in buses:
+        stats = bus_stats.get(bus.id, {})
+        bus.occupancy = stats.get('occupancy', 0)
+        bus.total_bookings = stats.get('bookings', 0)
+        bus.revenue = stats.get('revenue') or 0
     
     context = {
         'operator': operator,
+        'bus_operator': operator,
         'buses': buses,
+        'buses_count': len(buses),
+        'total_routes': sum(bus.total_routes for bus in buses),
+        'total_bookings': sum(stats['bookings'] for stats in bus_stats.values()),
+        'total_revenue': sum(stats['revenue'] for stats in bus_stats.values()),
+        'total_cancellations': sum(stats['cancellations'] for stats in bus_stats.values()),
+        'chart': operator_daily_chart(operator),
         'stats': {
-            'total_buses': buses.count(),
-            'total_routes': routes,
+            'total_buses': len(buses),
             'verification_status': operator.get_verification_status_display(),
         }
     }
     return render(request, 'buses/operator_dashboard.html', context)
+
+
+@login_required
+def operator_bulk_upload(request):
+    """Bulk upload of schedules and boarding/dropping points, previewed as a diff before applying"""
+    try:
+        operator = request.user.bus_operator_profile
+    except BusOperator.DoesNotExist:
+        messages.warning(request, "Please register as a bus operator first.")
+        return redirect('buses:operator_register')
+    
+    report = None
+    if request.method == 'POST':
+        form = BulkUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = import_operator_file(
+                    operator, upload, upload.format, form.cleaned_data['kind'], dry_run=form.cleaned_data['dry_run']
+                )
+            except UploadError as exc:
+                form.add_error('file', str(exc))
+            else:
+                if report['applied']:
+                    messages.success(
+                        request, f"Upload applied: {report['created']} created, {report['updated']} updated."
+                    )
+                elif report['error_count']:
+                    messages.error(request, f"{report['error_count']} rows have errors; nothing was changed.")
+    else:
+        form = BulkUploadForm()
+    
+    context = {
+        'form': form,
+        'report': report,
+        'page_title': 'Bulk Upload',
+    }
+    return render(request, 'buses/operator_upload.html', context)
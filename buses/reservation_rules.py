@@ -0,0 +1,196 @@
+"""
+Bus Reservation Rules
+Declarative per-bus seat reservation rules, compiled to bitmasks over the
+seat layout so booking checks and seat maps are bitwise operations
+
+A bus carries a list of rules such as:
+
+    [{"reserve": "ladies", "rows": [1, 2]},
+     {"reserve": "disabled", "near_door": 1, "columns": [1]},
+     {"reserve": "ladies", "adjacent_to": "F"}]
+
+Static rules select seats by rows, columns, deck, seat numbers or the
+first rows from the door. An adjacent_to rule reserves the seats next to
+a passenger of that gender on the departure, limited to seats matched by
+its other selectors if it has any.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from django.core.exceptions import ValidationError
+
+# Checked in this order; a seat matched by several kinds shows the first
+RESERVATION_KINDS = ['ladies', 'disabled']
+# Genders allowed on a reserved kind; kinds not listed are open to everyone
+ALLOWED_GENDERS = {'ladies': {'F'}}
+PASSENGER_GENDERS = {'M', 'F', 'O'}
+
+LIST_SELECTORS = {'rows': int, 'columns': int, 'seats': str}
+SELECTORS = set(LIST_SELECTORS) | {'deck', 'near_door', 'adjacent_to'}
+
+
+def validate_rules(rules):
+    """Model-field validator for Bus.reservation_rules"""
+    if not isinstance(rules, list):
+        raise ValidationError('Reservation rules must be a list')
+    for index, rule in enumerate(rules, start=1):
+        if not isinstance(rule, dict):
+            raise ValidationError(f'Rule {index} must be an object')
+        if rule.get('reserve') not in RESERVATION_KINDS:
+            raise ValidationError(f"Rule {index}: reserve must be one of {', '.join(RESERVATION_KINDS)}")
+        unknown = set(rule) - SELECTORS - {'reserve'}
+        if unknown:
+            raise ValidationError(f"Rule {index}: unknown keys {', '.join(sorted(unknown))}")
+        if not set(rule) & SELECTORS:
+            raise ValidationError(f'Rule {index} selects no seats')
+        for key, kind in LIST_SELECTORS.items():
+            if key in rule and (
+                not isinstance(rule[key], list) or not all(isinstance(value, kind) for value in rule[key])
+            ):
+                raise ValidationError(f'Rule {index}: {key} must be a list of {kind.__name__} values')
+        for key in ('deck', 'near_door'):
+            if key in rule and (not isinstance(rule[key], int) or rule[key] < 1):
+                raise ValidationError(f'Rule {index}: {key} must be a positive number')
+        if 'adjacent_to' in rule and rule['adjacent_to'] not in PASSENGER_GENDERS:
+            raise ValidationError(f'Rule {index}: adjacent_to must be M, F or O')
+
+
+def positions_mask(positions: Iterable[int]) -> int:
+    mask = 0
+    for position in positions:
+        mask |= 1 << position
+    return mask
+
+
+def mask_positions(mask: int) -> List[int]:
+    positions = []
+    while mask:
+        low = mask & -mask
+        positions.append(low.bit_length() - 1)
+        mask ^= low
+    return positions
+
+
+def _select(rule: dict, seats: List[dict], door_rows: Dict[int, List[int]]) -> int:
+    """Mask of seats matched by every static selector of a rule"""
+    rows = set(rule.get('rows', ()))
+    columns = set(rule.get('columns', ()))
+    numbers = set(rule.get('seats', ()))
+    near_door = set(door_rows.get(1, [])[:rule['near_door']]) if 'near_door' in rule else None
+    mask = 0
+    for seat in seats:
+        if (
+            (not rows or seat['row'] in rows)
+            and (not columns or seat['column'] in columns)
+            and (not numbers or seat['seat_number'] in numbers)
+            and ('deck' not in rule or seat['deck'] == rule['deck'])
+            # The door is at the front of the lower deck
+            and (near_door is None or (seat['deck'] == 1 and seat['row'] in near_door))
+        ):
+            mask |= 1 << seat['position']
+    return mask
+
+
+def _neighbours(seats: List[dict]) -> Dict[int, int]:
+    """Per position, the mask of seats beside it in the same row with no aisle between"""
+    by_place = {(seat['deck'], seat['row'], seat['column']): seat['position'] for seat in seats}
+    neighbours = {}
+    for seat in seats:
+        mask = 0
+        for offset in (-1, 1):
+            beside = by_place.get((seat['deck'], seat['row'], seat['column'] + offset))
+            if beside is not None:
+                mask |= 1 << beside
+        neighbours[seat['position']] = mask
+    return neighbours
+
+
+def compile_rules(rules: Optional[list], seats: List[dict]) -> dict:
+    """
+    Compile a bus's rules over its seats (layout-template seat dicts)
+
+    static holds one mask per kind: seats stored with that reserved_for
+    plus seats matched by static rules. adjacent keeps the per-departure
+    rules with their scope mask, and neighbours the adjacency mask per
+    position they are evaluated with.
+    """
+    door_rows = {}
+    for seat in seats:
+        door_rows.setdefault(seat['deck'], set()).add(seat['row'])
+    door_rows = {deck: sorted(rows) for deck, rows in door_rows.items()}
+    everything = positions_mask(seat['position'] for seat in seats)
+
+    static = {kind: 0 for kind in RESERVATION_KINDS}
+    for seat in seats:
+        if seat['reserved_for'] in static:
+            static[seat['reserved_for']] |= 1 << seat['position']
+    adjacent = []
+    for rule in rules or []:
+        if 'adjacent_to' in rule:
+            scoped = set(rule) & (SELECTORS - {'adjacent_to'})
+            scope = _select(rule, seats, door_rows) if scoped else everything
+            adjacent.append({'reserve': rule['reserve'], 'gender': rule['adjacent_to'], 'scope': scope})
+        else:
+            static[rule['reserve']] |= _select(rule, seats, door_rows)
+    return {'static': static, 'adjacent': adjacent, 'neighbours': _neighbours(seats) if adjacent else {}}
+
+
+def seat_kind(masks: Dict[str, int], position: int) -> str:
+    for kind in RESERVATION_KINDS:
+        if masks.get(kind, 0) >> position & 1:
+            return kind
+    return 'general'
+
+
+def reserved_masks(compiled: dict, passenger_masks: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Masks per kind for a departure: static masks plus seats beside passengers that trigger adjacent rules"""
+    masks = dict(compiled['static'])
+    for rule in compiled['adjacent']:
+        reach = 0
+        for position in mask_positions((passenger_masks or {}).get(rule['gender'], 0)):
+            reach |= compiled['neighbours'].get(position, 0)
+        masks[rule['reserve']] |= reach & rule['scope']
+    return masks
+
+
+def denied_mask(masks: Dict[str, int], gender: str) -> int:
+    """Seats a passenger of this gender may not book"""
+    denied = 0
+    for kind, allowed in ALLOWED_GENDERS.items():
+        if gender not in allowed:
+            denied |= masks.get(kind, 0)
+    return denied
+
+
+def passenger_masks(schedule_id: int, segment_masks, genders: Iterable[str]) -> Dict[str, int]:
+    """
+    Occupied seats per passenger gender on a departure, one query
+
+    Passengers of cancelled or refunded bookings are skipped, so a seat
+    resold after a cancellation carries its new passenger's gender only.
+    Seats are also ANDed with the departure's occupancy, which drops
+    bookings whose seats were released without a status change.
+    """
+    from bookings.models import BusBookingSeat
+    from .seat_inventory import RELEASED_STATUSES, blocked_positions
+
+    occupied = positions_mask(blocked_positions(segment_masks))
+    masks = {}
+    rows = BusBookingSeat.objects.filter(
+        bus_booking__bus_schedule_id=schedule_id, passenger_gender__in=set(genders)
+    ).exclude(
+        bus_booking__booking__status__in=RELEASED_STATUSES
+    ).values_list('seat__position', 'passenger_gender')
+    for position, gender in rows:
+        if position is not None:
+            masks[gender] = masks.get(gender, 0) | (1 << position)
+    return {gender: mask & occupied for gender, mask in masks.items()}
+
+
+def departure_reservations(template: dict, schedule_id: Optional[int], segment_masks) -> Dict[str, int]:
+    """Reserved masks for one departure; touches the database only if the bus has adjacent rules"""
+    compiled = template['rules']
+    if not compiled['adjacent'] or schedule_id is None:
+        return dict(compiled['static'])
+    genders = {rule['gender'] for rule in compiled['adjacent']}
+    return reserved_masks(compiled, passenger_masks(schedule_id, segment_masks, genders))
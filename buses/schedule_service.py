@@ -0,0 +1,143 @@
+"""
+Bus Schedule Service
+Materializes BusSchedule rows from each route's operating-day flags
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Set
+
+from django.utils import timezone
+
+from .channel_sync import mark_dirty
+from .connection_search import invalidate_graph
+from .fare_calendar import invalidate_corridors
+from .models import BusRoute, BusSchedule, BusSearchEntry
+from .search_index import sync_schedules
+
+SCHEDULE_HORIZON_DAYS = 60
+ROUTE_DEACTIVATED_REASON = 'Route deactivated by operator'
+NOT_OPERATING_REASON = 'Route no longer operates on this day'
+
+WEEKDAY_FLAGS = [
+    'operates_monday',
+    'operates_tuesday',
+    'operates_wednesday',
+    'operates_thursday',
+    'operates_friday',
+    'operates_saturday',
+    'operates_sunday',
+]
+
+
+def operating_weekdays(route: BusRoute) -> Set[int]:
+    """Weekday numbers (Monday=0) the route runs on"""
+    return {weekday for weekday, flag in enumerate(WEEKDAY_FLAGS) if getattr(route, flag)}
+
+
+def _week_days(weekdays: Iterable[int]) -> List[int]:
+    """Python weekdays (Monday=0) as values for the __week_day lookup (Sunday=1)"""
+    return [(weekday + 1) % 7 + 1 for weekday in weekdays]
+
+
+def generate_schedules(route: Optional[BusRoute] = None, start: Optional[date] = None,
+                       days: int = SCHEDULE_HORIZON_DAYS, batch_size: int = 1000) -> int:
+    """
+    Create missing schedules for active routes over a rolling horizon
+
+    Existing rows are left alone, apart from schedules that were cancelled
+    only because their route was deactivated; those are reopened once the
+    route is active again. Returns the number of schedules created.
+    """
+    start = start or timezone.localdate()
+    end = start + timedelta(days=days)
+    routes = BusRoute.objects.filter(is_active=True, bus__is_active=True).select_related('bus')
+    if route is not None:
+        routes = routes.filter(pk=route.pk)
+    routes = list(routes)
+    if not routes:
+        return 0
+
+    window = BusSchedule.objects.filter(route__in=routes, date__gte=start, date__lt=end)
+    reopened = list(
+        window.filter(is_cancelled=True, cancellation_reason=ROUTE_DEACTIVATED_REASON).values_list('id', flat=True)
+    )
+    if reopened:
+        BusSchedule.objects.filter(id__in=reopened).update(
+            is_active=True, is_cancelled=False, cancellation_reason='', updated_at=timezone.now()
+        )
+        mark_dirty(reopened)
+    existing = set(window.values_list('route_id', 'date'))
+
+    new_schedules = []
+    for candidate in routes:
+        weekdays = operating_weekdays(candidate)
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            if day.weekday() in weekdays and (candidate.id, day) not in existing:
+                new_schedules.append(BusSchedule(
+                    route=candidate,
+                    date=day,
+                    available_seats=candidate.bus.total_seats,
+                    fare=candidate.base_fare,
+                ))
+    # ignore_conflicts covers a booking's get_or_create racing the generator
+    BusSchedule.objects.bulk_create(new_schedules, batch_size=batch_size, ignore_conflicts=True)
+    # bulk_create skips signals, so index the whole window in one pass
+    sync_schedules(window)
+    invalidate_graph()
+    return len(new_schedules)
+
+
+def cancel_route_schedules(route: BusRoute, reason: str = ROUTE_DEACTIVATED_REASON,
+                           from_date: Optional[date] = None, weekdays: Optional[Set[int]] = None) -> int:
+    """
+    Bulk-cancel a route's upcoming schedules, or only those falling on the
+    given weekdays (Monday=0). Returns schedules cancelled.
+    """
+    from .disruption_service import enqueue_disruptions
+
+    from_date = from_date or timezone.localdate()
+    upcoming = BusSchedule.objects.filter(route=route, date__gte=from_date, is_cancelled=False)
+    if weekdays is not None:
+        upcoming = upcoming.filter(date__week_day__in=_week_days(weekdays))
+    schedule_ids = list(upcoming.values_list('id', flat=True))
+    if not schedule_ids:
+        return 0
+    cancelled = BusSchedule.objects.filter(id__in=schedule_ids).update(
+        is_active=False, is_cancelled=True, cancellation_reason=reason, updated_at=timezone.now()
+    )
+    BusSearchEntry.objects.filter(schedule_id__in=schedule_ids).delete()
+    invalidate_corridors([(route.source_city_id, route.destination_city_id)])
+    mark_dirty(schedule_ids)
+    enqueue_disruptions(schedule_ids)
+    return cancelled
+
+
+def reconcile_operating_days(route: BusRoute, previous: Set[int]) -> int:
+    """
+    Follow a change to a route's operating-day flags
+
+    Upcoming departures on days the route stopped running are cancelled
+    through the disruption pipeline; ones cancelled that way are reopened,
+    and missing ones created, on days it runs again. Departures added for
+    other days later (e.g. by bulk upload) are left alone. Returns
+    schedules cancelled.
+    """
+    current = operating_weekdays(route)
+    cancelled = 0
+    if previous - current:
+        cancelled = cancel_route_schedules(route, NOT_OPERATING_REASON, weekdays=previous - current)
+    if current - previous and route.is_active:
+        reopened = list(BusSchedule.objects.filter(
+            route=route,
+            date__gte=timezone.localdate(),
+            date__week_day__in=_week_days(current - previous),
+            is_cancelled=True,
+            cancellation_reason=NOT_OPERATING_REASON,
+        ).values_list('id', flat=True))
+        BusSchedule.objects.filter(id__in=reopened).update(
+            is_active=True, is_cancelled=False, cancellation_reason='', updated_at=timezone.now()
+        )
+        mark_dirty(reopened)
+        generate_schedules(route)
+    return cancelled
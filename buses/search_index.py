@@ -0,0 +1,131 @@
+"""
+Bus Search Index
+Keeps BusSearchEntry rows in step with schedules, routes, buses and cities
+"""
+
+from typing import Dict, Iterable, List
+
+from django.utils import timezone
+
+from .fare_calendar import invalidate_corridors
+from .models import BusSchedule, BusSearchEntry
+
+INDEX_CHUNK_SIZE = 1000
+
+# Bit order is part of the stored data; append new amenities at the end
+AMENITY_BITS = [
+    ('ac', 'has_ac'),
+    ('wifi', 'has_wifi'),
+    ('charging', 'has_charging_point'),
+    ('blanket', 'has_blanket'),
+    ('water', 'has_water_bottle'),
+    ('tv', 'has_tv'),
+    ('reading_light', 'has_reading_light'),
+    ('gps', 'has_gps_tracking'),
+    ('cctv', 'has_cctv'),
+]
+
+ENTRY_FIELDS = [
+    'route', 'bus', 'source_city', 'destination_city', 'date', 'departure_time', 'arrival_time',
+    'duration_hours', 'distance_km', 'base_fare', 'fare', 'available_seats', 'bus_type', 'amenities',
+    'bus_number', 'bus_name', 'operator_name', 'source_name', 'destination_name', 'updated_at',
+]
+
+
+def amenity_mask(bus) -> int:
+    return sum(1 << bit for bit, (_, field) in enumerate(AMENITY_BITS) if getattr(bus, field))
+
+
+def amenity_flags(mask: int) -> Dict[str, bool]:
+    return {name: bool(mask & (1 << bit)) for bit, (name, _) in enumerate(AMENITY_BITS)}
+
+
+def is_searchable(schedule) -> bool:
+    route = schedule.route
+    return (
+        schedule.is_active
+        and not schedule.is_cancelled
+        and schedule.date >= timezone.localdate()
+        and route.is_active
+        and route.bus.is_active
+    )
+
+
+def build_entry(schedule) -> BusSearchEntry:
+    """Unsaved search row for a schedule with route, bus, operator and cities loaded"""
+    route = schedule.route
+    bus = route.bus
+    return BusSearchEntry(
+        schedule=schedule,
+        route=route,
+        bus=bus,
+        source_city=route.source_city,
+        destination_city=route.destination_city,
+        date=schedule.date,
+        departure_time=route.departure_time,
+        arrival_time=route.arrival_time,
+        duration_hours=route.duration_hours,
+        distance_km=route.distance_km,
+        base_fare=route.base_fare,
+        fare=schedule.fare,
+        available_seats=schedule.available_seats,
+        bus_type=bus.bus_type,
+        amenities=amenity_mask(bus),
+        bus_number=bus.bus_number,
+        bus_name=bus.bus_name,
+        operator_name=bus.operator.name if bus.operator_id else 'Unknown',
+        source_name=route.source_city.name,
+        destination_name=route.destination_city.name,
+        updated_at=timezone.now(),
+    )
+
+
+def _write_chunk(schedules: List[BusSchedule]) -> int:
+    live = [schedule for schedule in schedules if is_searchable(schedule)]
+    dead_ids = [schedule.id for schedule in schedules if not is_searchable(schedule)]
+    if dead_ids:
+        BusSearchEntry.objects.filter(schedule_id__in=dead_ids).delete()
+    if live:
+        BusSearchEntry.objects.bulk_create(
+            [build_entry(schedule) for schedule in live],
+            update_conflicts=True,
+            unique_fields=['schedule'],
+            update_fields=ENTRY_FIELDS,
+        )
+    invalidate_corridors(
+        (schedule.route.source_city_id, schedule.route.destination_city_id) for schedule in schedules
+    )
+    return len(live)
+
+
+def sync_schedules(schedules, chunk_size: int = INDEX_CHUNK_SIZE) -> int:
+    """
+    Upsert search rows for bookable schedules and drop the rest
+
+    Accepts a BusSchedule queryset and streams it in chunks. Returns the
+    number of rows written.
+    """
+    schedules = schedules.select_related(
+        'route__bus__operator', 'route__source_city', 'route__destination_city'
+    ).iterator(chunk_size=chunk_size)
+    written = 0
+    chunk = []
+    for schedule in schedules:
+        chunk.append(schedule)
+        if len(chunk) >= chunk_size:
+            written += _write_chunk(chunk)
+            chunk = []
+    if chunk:
+        written += _write_chunk(chunk)
+    return written
+
+
+def sync_schedule_ids(schedule_ids: Iterable[int]) -> int:
+    return sync_schedules(BusSchedule.objects.filter(id__in=list(schedule_ids)))
+
+
+def rebuild_index() -> int:
+    """Re-index every upcoming schedule and purge past rows"""
+    today = timezone.localdate()
+    BusSearchEntry.objects.filter(date__lt=today).delete()
+    return sync_schedules(BusSchedule.objects.filter(date__gte=today))
@@ -0,0 +1,144 @@
+"""
+Bus Seat Hold Service
+Seat-level holds for bus departures, analogous to InventoryLock for hotels
+"""
+
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from bookings.models import BusBooking, SeatHold
+from .models import FULL_ROUTE_SEGMENTS, BusSchedule
+from .seat_inventory import occupy_seats, release_booking_seats, release_seats
+
+DEFAULT_HOLD_MINUTES = 10
+EXPIRY_BATCH_SIZE = 500
+
+
+def hold_seats(schedule, seats: Iterable, user=None, booking=None, hold_minutes: int = DEFAULT_HOLD_MINUTES,
+               segments: int = FULL_ROUTE_SEGMENTS) -> str:
+    """
+    Claim seats on a departure until the hold expires. Returns the hold reference.
+
+    segments limits the claim to part of the route (see
+    seat_inventory.journey_segments). The seat-level lock is the
+    compare-and-swap on the schedule's segment masks: a concurrent buyer of
+    an overlapping leg fails there and its hold rows roll back with it.
+    """
+    seats = list(seats)
+    reference_id = f"BSH-{uuid.uuid4().hex[:10].upper()}"
+    expires_at = timezone.now() + timedelta(minutes=hold_minutes)
+
+    with transaction.atomic():
+        SeatHold.objects.bulk_create([
+            SeatHold(
+                schedule=schedule,
+                seat=seat,
+                booking=booking,
+                user=user,
+                reference_id=reference_id,
+                expires_at=expires_at,
+                segments=segments,
+            )
+            for seat in seats
+        ])
+        occupy_seats(schedule, [seat.position for seat in seats], segments)
+    return reference_id
+
+
+def confirm_holds(booking) -> int:
+    """
+    Turn a paid booking's holds into permanent ones. Returns seats confirmed.
+
+    When the payment lands after the holds lapsed, the seats of the
+    booking's latest hold are claimed again; if any of them was resold
+    meanwhile, SeatUnavailableError is raised and nothing is confirmed.
+    """
+    with transaction.atomic():
+        confirmed = SeatHold.objects.filter(booking=booking, status='active').update(
+            status='confirmed', updated_at=timezone.now()
+        )
+        if confirmed or SeatHold.objects.filter(booking=booking, status='confirmed').exists():
+            return confirmed
+        latest = SeatHold.objects.filter(booking=booking).order_by('-created_at', '-id').first()
+        if latest is None:
+            return 0
+        lapsed = SeatHold.objects.filter(booking=booking, reference_id=latest.reference_id)
+        by_journey = defaultdict(list)
+        for schedule_id, segments, position in lapsed.values_list('schedule_id', 'segments', 'seat__position'):
+            if position is not None:
+                by_journey[schedule_id, segments].append(position)
+        for (schedule_id, segments), positions in by_journey.items():
+            occupy_seats(BusSchedule(pk=schedule_id), positions, segments)
+        return lapsed.update(status='confirmed', updated_at=timezone.now())
+
+
+def _release(holds, new_status: str) -> int:
+    """Move holds to a terminal status and free their seats, once per hold"""
+    released = 0
+    with transaction.atomic():
+        rows = list(
+            holds.select_for_update(of=('self',)).values_list('id', 'schedule_id', 'segments', 'seat__position')
+        )
+        by_journey = defaultdict(list)
+        for hold_id, schedule_id, segments, position in rows:
+            by_journey[schedule_id, segments].append((hold_id, position))
+
+        for (schedule_id, segments), entries in by_journey.items():
+            ids = [hold_id for hold_id, _ in entries]
+            # Conditional on the live status so a hold is only ever freed once
+            released += SeatHold.objects.filter(id__in=ids, status__in=SeatHold.LIVE_STATUSES).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            release_seats(
+                BusSchedule(pk=schedule_id), [position for _, position in entries if position is not None], segments
+            )
+    return released
+
+
+def release_holds(reference_id: str) -> int:
+    """Give back the seats of an unpaid hold"""
+    return _release(SeatHold.objects.filter(reference_id=reference_id, status='active'), 'released')
+
+
+def release_booking(booking) -> int:
+    """
+    Free every seat a booking occupies, e.g. on cancellation or failed payment
+
+    Bookings made before seat holds existed fall back to their seat rows.
+    """
+    holds = SeatHold.objects.filter(booking=booking)
+    if not holds.exists():
+        bus_booking = getattr(booking, 'bus_details', None)
+        if bus_booking is not None:
+            release_booking_seats(bus_booking)
+        return 0
+    return _release(holds.filter(status__in=SeatHold.LIVE_STATUSES), 'released')
+
+
+def release_bookings(booking_ids: Iterable[int]) -> int:
+    """Free the seats of many bookings at once, one seat-map swap per departure and leg"""
+    booking_ids = set(booking_ids)
+    held = set(SeatHold.objects.filter(booking_id__in=booking_ids).values_list('booking_id', flat=True))
+    for bus_booking in BusBooking.objects.filter(booking_id__in=booking_ids - held).select_related('bus_schedule'):
+        release_booking_seats(bus_booking)
+    return _release(SeatHold.objects.filter(booking_id__in=held, status__in=SeatHold.LIVE_STATUSES), 'released')
+
+
+def expire_stale_seat_holds(now: Optional[datetime] = None, batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    """Expire active holds past their TTL and free their seats. Returns holds expired."""
+    now = now or timezone.now()
+    expired = 0
+    while True:
+        ids = list(
+            SeatHold.objects.filter(status='active', expires_at__lte=now)
+            .order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return expired
+        expired += _release(SeatHold.objects.filter(id__in=ids, status='active'), 'expired')
@@ -0,0 +1,220 @@
+"""
+Bus Seat Inventory
+Per-schedule seat occupancy bitmaps indexed by SeatLayout.position
+
+Each seat also carries an interval bitmask over the route's legs (source,
+then BusStop rows by stop_order, then destination), so a seat sold for
+Bangalore to Vellore can be sold again for Vellore to Chennai. The seat
+bitmap marks seats occupied on any leg and drives the seat counters.
+"""
+
+import sys
+from array import array
+from typing import Iterable, List, Optional, Set
+
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .channel_sync import mark_dirty
+from .models import FULL_ROUTE_SEGMENTS, BusSchedule, BusSearchEntry
+
+# Booking statuses whose seats have already been given back
+RELEASED_STATUSES = ['cancelled', 'refunded', 'deleted']
+
+# Bytes per seat in BusSchedule.segment_masks
+MASK_BYTES = 4
+
+# Concurrent writers to one schedule retry their compare-and-swap this many times
+MAX_SWAP_ATTEMPTS = 20
+
+
+class SeatUnavailableError(Exception):
+    """Raised when a requested seat is already occupied"""
+
+
+class InvalidJourneyError(Exception):
+    """Raised when boarding and dropping points do not make a journey on the route"""
+
+
+def to_bytes(bitmap) -> bytes:
+    """Normalize a BinaryField value (bytes, memoryview or None)"""
+    return bytes(bitmap) if bitmap else b''
+
+
+def is_set(bitmap: bytes, position: int) -> bool:
+    byte_index = position >> 3
+    return byte_index < len(bitmap) and bool(bitmap[byte_index] & (1 << (position & 7)))
+
+
+def set_bits(bitmap: bytes, positions: Iterable[int]) -> bytes:
+    positions = list(positions)
+    if not positions:
+        return bitmap
+    updated = bytearray(bitmap)
+    needed = (max(positions) >> 3) + 1
+    if len(updated) < needed:
+        updated.extend(bytes(needed - len(updated)))
+    for position in positions:
+        updated[position >> 3] |= 1 << (position & 7)
+    return bytes(updated)
+
+
+def clear_bits(bitmap: bytes, positions: Iterable[int]) -> bytes:
+    updated = bytearray(bitmap)
+    for position in positions:
+        if position >> 3 < len(updated):
+            updated[position >> 3] &= ~(1 << (position & 7)) & 0xFF
+    return bytes(updated).rstrip(b'\x00')
+
+
+def occupied_positions(bitmap: bytes) -> Set[int]:
+    return {
+        (byte_index << 3) + bit
+        for byte_index, byte in enumerate(bitmap) if byte
+        for bit in range(8) if byte & (1 << bit)
+    }
+
+
+def unpack_masks(data) -> array:
+    """Per-position segment masks from a BinaryField value"""
+    data = to_bytes(data)
+    masks = array('I', data + bytes(-len(data) % MASK_BYTES))
+    if sys.byteorder == 'big':
+        masks.byteswap()
+    return masks
+
+
+def pack_masks(masks: Iterable[int]) -> bytes:
+    """Inverse of unpack_masks, dropping trailing free seats"""
+    masks = list(masks)
+    while masks and not masks[-1]:
+        masks.pop()
+    return b''.join(mask.to_bytes(MASK_BYTES, 'little') for mask in masks)
+
+
+def interval_mask(board: int, drop: int) -> int:
+    """Segments covered between route point indexes board < drop"""
+    return ((1 << drop) - 1) ^ ((1 << board) - 1)
+
+
+def route_points(route) -> List[int]:
+    """City ids the route calls at, in order: source, stops by stop_order, destination"""
+    stops = route.stops.order_by('stop_order').values_list('city_id', flat=True)
+    return [route.source_city_id, *stops, route.destination_city_id]
+
+
+def journey_segments(route, boarding_city_id: Optional[int] = None, dropping_city_id: Optional[int] = None) -> int:
+    """
+    Segment mask for travelling between two cities on a route
+
+    Missing cities default to the route ends; a whole-route journey always
+    maps to FULL_ROUTE_SEGMENTS so it conflicts with any partial sale.
+    Raises InvalidJourneyError when the journey covers no leg, e.g.
+    boarding at the last point or dropping before boarding, since an
+    empty mask would conflict with nothing and claim nothing.
+    """
+    points = route_points(route)
+    last = len(points) - 1
+    board = points.index(boarding_city_id) if boarding_city_id in points else 0
+    if board >= last:
+        raise InvalidJourneyError('Boarding point is the last stop of this route')
+    drop = last
+    if dropping_city_id in points:
+        if dropping_city_id not in points[board + 1:]:
+            raise InvalidJourneyError('Dropping point must come after the boarding point')
+        drop = points.index(dropping_city_id, board + 1)
+    if board == 0 and drop == last:
+        return FULL_ROUTE_SEGMENTS
+    segments = interval_mask(board, drop)
+    if not segments:
+        raise InvalidJourneyError('Journey covers no part of this route')
+    return segments
+
+
+def blocked_positions(masks, segments: int = FULL_ROUTE_SEGMENTS) -> Set[int]:
+    """Seat positions sold on any of the given segments, computed over all seats in one pass"""
+    return {position for position, mask in enumerate(unpack_masks(masks)) if mask & segments}
+
+
+def _swap(schedule_id: int, transform):
+    """
+    Apply transform(bitmap, masks, available) -> (new_bitmap, new_masks, seat_delta)
+    with an optimistic compare-and-swap on the schedule row, so the bitmap,
+    the segment masks and the seat counters always change together in one UPDATE.
+    """
+    schedules = BusSchedule.objects.filter(pk=schedule_id)
+    if connection.in_atomic_block:
+        # Inside a unit of work, lock the row so the swap succeeds first time
+        # instead of spinning against other writers
+        schedules = schedules.select_for_update()
+    for _ in range(MAX_SWAP_ATTEMPTS):
+        current, masks, available = schedules.values_list('seat_bitmap', 'segment_masks', 'available_seats').get()
+        current, masks = to_bytes(current), to_bytes(masks)
+        new_bitmap, new_masks, delta = transform(current, unpack_masks(masks), available)
+        if new_bitmap == current and new_masks == masks:
+            return current
+        updated = BusSchedule.objects.filter(
+            pk=schedule_id, seat_bitmap=current, segment_masks=masks, available_seats__gte=delta
+        ).update(
+            seat_bitmap=new_bitmap,
+            segment_masks=new_masks,
+            available_seats=F('available_seats') - delta,
+            booked_seats=F('booked_seats') + delta,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            if delta:
+                BusSearchEntry.objects.filter(schedule_id=schedule_id).update(
+                    available_seats=F('available_seats') - delta
+                )
+                mark_dirty([schedule_id])
+            return new_bitmap
+    raise SeatUnavailableError("Seat map is busy, please try again")
+
+
+def _grow(masks: array, positions: List[int]):
+    if positions and len(masks) <= positions[-1]:
+        masks.extend([0] * (positions[-1] + 1 - len(masks)))
+
+
+def occupy_seats(schedule: BusSchedule, positions: Iterable[int], segments: int = FULL_ROUTE_SEGMENTS) -> bytes:
+    """Mark seats as occupied on the given segments, failing if any of them is already taken"""
+    positions = sorted(set(positions))
+
+    def transform(bitmap, masks, available):
+        _grow(masks, positions)
+        if any(masks[position] & segments for position in positions):
+            raise SeatUnavailableError("One or more selected seats are already booked")
+        # Only seats that were completely free come off the counters
+        newly_occupied = [position for position in positions if not masks[position]]
+        if available < len(newly_occupied):
+            raise SeatUnavailableError(f"Only {available} seats left on this departure")
+        for position in positions:
+            masks[position] |= segments
+        return set_bits(bitmap, newly_occupied), pack_masks(masks), len(newly_occupied)
+
+    schedule.seat_bitmap = _swap(schedule.pk, transform)
+    return schedule.seat_bitmap
+
+
+def release_seats(schedule: BusSchedule, positions: Iterable[int], segments: int = FULL_ROUTE_SEGMENTS) -> bytes:
+    """Free seats on the given segments; seats that are already free are ignored"""
+    positions = sorted(set(positions))
+
+    def transform(bitmap, masks, available):
+        _grow(masks, positions)
+        for position in positions:
+            masks[position] &= ~segments & FULL_ROUTE_SEGMENTS
+        freed = [position for position in positions if is_set(bitmap, position) and not masks[position]]
+        return clear_bits(bitmap, freed), pack_masks(masks), -len(freed)
+
+    schedule.seat_bitmap = _swap(schedule.pk, transform)
+    return schedule.seat_bitmap
+
+
+def release_booking_seats(bus_booking) -> bytes:
+    """Free every seat held by a bus booking, e.g. when it is cancelled"""
+    positions = bus_booking.seats.filter(seat__position__isnull=False).values_list('seat__position', flat=True)
+    return release_seats(bus_booking.bus_schedule, positions)
+
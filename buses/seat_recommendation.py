@@ -0,0 +1,138 @@
+"""
+Bus Seat Recommendation
+Best seat blocks for a travelling group over the cached seat-layout grid
+"""
+
+from typing import List, Optional, Sequence
+
+from .layout_cache import get_layout
+from .models import SeatLayout
+from .reservation_rules import departure_reservations, seat_kind
+
+MAX_GROUP_SIZE = 6
+
+# Score weights, lower scores are better
+EXTRA_ROW_PENALTY = 10
+AISLE_PENALTY = 3
+GAP_PENALTY = 2
+DECK_PENALTY = 5
+WINDOW_BONUS = 2
+ROW_WEIGHT = 0.1
+
+
+def _prefix_sums(free: List[List[int]]) -> List[List[int]]:
+    """Summed-area table so any rectangle's free-seat count is four lookups"""
+    rows, columns = len(free), len(free[0]) if free else 0
+    sums = [[0] * (columns + 1) for _ in range(rows + 1)]
+    for r in range(rows):
+        running = 0
+        for c in range(columns):
+            running += free[r][c]
+            sums[r + 1][c + 1] = sums[r][c + 1] + running
+    return sums
+
+
+def _rect_sum(sums, top: int, left: int, height: int, width: int) -> int:
+    return sums[top + height][left + width] - sums[top][left + width] - sums[top + height][left] + sums[top][left]
+
+
+def _shapes(count: int, rows: int, columns: int):
+    """Smallest rectangles (height, width) that can seat the group"""
+    for height in range(1, min(rows, count) + 1):
+        width = -(-count // height)
+        if width <= columns:
+            yield height, width
+
+
+def recommend_seats(schedule, occupied: Sequence[int], count: int, genders: Sequence[str],
+                    prefer_window: bool = False, deck: Optional[int] = None, limit: int = 3) -> List[dict]:
+    """
+    Rank seat blocks for a group on a departure
+
+    Sweeps every minimal rectangle of each deck grid, counts free seats in
+    it from a summed-area table and keeps blocks the group can sit in
+    together. A block is valid only if its ladies-only seats, static or
+    triggered by passengers on board, can go to travellers allowed to book
+    them (SeatLayout.can_be_booked_by).
+    """
+    template = get_layout(schedule.route.bus_id)
+    reserved = departure_reservations(template, schedule.id, schedule.segment_masks)
+    occupied = set(occupied)
+    by_position = {seat['position']: seat for seat in template['seats']}
+    probe = SeatLayout(reserved_for='ladies')
+    ladies_ok = [gender for gender in genders if probe.can_be_booked_by(gender)]
+    prices = schedule.seat_prices or {}
+
+    candidates = {}
+    for layout in template['decks']:
+        grid = layout['grid']
+        columns = layout['columns']
+        free = [[int(position is not None and position not in occupied) for position in row] for row in grid]
+        sums = _prefix_sums(free)
+        for height, width in _shapes(count, len(grid), len(columns)):
+            for top in range(len(grid) - height + 1):
+                for left in range(len(columns) - width + 1):
+                    if _rect_sum(sums, top, left, height, width) < count:
+                        continue
+                    block = _pick(grid, free, reserved['ladies'], top, left, height, width, count, len(ladies_ok))
+                    if block is None:
+                        continue
+                    key = frozenset(block)
+                    if key in candidates:
+                        continue
+                    span = columns[left:left + width]
+                    aisles = sum(1 for a, b in zip(span, span[1:]) if b - a > 1)
+                    windows = sum(1 for position in block if by_position[position]['is_window'])
+                    score = (
+                        EXTRA_ROW_PENALTY * (height - 1)
+                        + AISLE_PENALTY * aisles
+                        + GAP_PENALTY * (height * width - count)
+                        + (DECK_PENALTY if deck is not None and layout['deck'] != deck else 0)
+                        - (WINDOW_BONUS * windows if prefer_window else 0)
+                        + ROW_WEIGHT * top
+                    )
+                    candidates[key] = (score, layout['deck'], block)
+
+    ranked = sorted(candidates.values(), key=lambda candidate: (candidate[0], candidate[1], candidate[2]))
+    return [_describe(block, score, by_position, reserved, genders, prices) for score, _, block in ranked[:limit]]
+
+
+def _pick(grid, free, ladies_mask, top, left, height, width, count, ladies_quota) -> Optional[List[int]]:
+    """Free seats of a rectangle in row-major order, using ladies seats only up to the quota"""
+    general, ladies = [], []
+    for r in range(top, top + height):
+        for c in range(left, left + width):
+            if free[r][c]:
+                position = grid[r][c]
+                (ladies if ladies_mask >> position & 1 else general).append(position)
+    usable = general + ladies[:ladies_quota]
+    if len(usable) < count:
+        return None
+    chosen = set(usable[:count]) if len(general) >= count else set(general + ladies[:count - len(general)])
+    return sorted(chosen)
+
+
+def _describe(block, score, by_position, reserved, genders, prices) -> dict:
+    # Travellers allowed on ladies seats take those first
+    probe = SeatLayout(reserved_for='ladies')
+    travellers = sorted(range(len(genders)), key=lambda index: not probe.can_be_booked_by(genders[index]))
+    seats = sorted(block, key=lambda position: not reserved['ladies'] >> position & 1)
+    assigned = dict(zip(seats, travellers))
+    return {
+        'score': round(score, 2),
+        'seats': [
+            {
+                'id': by_position[position]['id'],
+                'seat_number': by_position[position]['seat_number'],
+                'deck': by_position[position]['deck'],
+                'row': by_position[position]['row'],
+                'column': by_position[position]['column'],
+                'is_window': by_position[position]['is_window'],
+                'reserved_for': seat_kind(reserved, position),
+                'price': prices.get(str(position)),
+                'traveller': assigned[position],
+                'gender': genders[assigned[position]],
+            }
+            for position in block
+        ],
+    }
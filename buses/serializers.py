@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from .fare_calendar import DEFAULT_DAYS, MAX_DAYS
 from .models import Bus, BusRoute, BusSchedule, BusOperator, SeatLayout
 
 
@@ -46,3 +47,43 @@ class SeatLayoutSerializer(serializers.ModelSerializer):
     class Meta:
         model = SeatLayout
         fields = ['id', 'seat_number', 'seat_type', 'row', 'column', 'deck']
+
+
+class ConnectionSearchSerializer(serializers.Serializer):
+    """Serializer for connecting-journey search requests"""
+    source = serializers.CharField(help_text="Source city id or name")
+    destination = serializers.CharField(help_text="Destination city id or name")
+    date = serializers.DateField()
+    min_layover = serializers.IntegerField(default=30, min_value=30, max_value=720)
+    passengers = serializers.IntegerField(default=1, min_value=1, max_value=10)
+    limit = serializers.IntegerField(default=5, min_value=1, max_value=20)
+
+
+class FareCalendarSerializer(serializers.Serializer):
+    """Serializer for corridor fare calendar requests; `from` arrives as start"""
+    source = serializers.CharField(help_text="Source city id or name")
+    destination = serializers.CharField(help_text="Destination city id or name")
+    start = serializers.DateField(required=False)
+    days = serializers.IntegerField(default=DEFAULT_DAYS, min_value=1, max_value=MAX_DAYS)
+
+
+class SeatRecommendationSerializer(serializers.Serializer):
+    """Serializer for group seat recommendation requests"""
+    count = serializers.IntegerField(min_value=1, max_value=6)
+    genders = serializers.CharField(required=False, help_text="Comma-separated M/F/O, one per traveller")
+    window = serializers.BooleanField(default=False)
+    deck = serializers.IntegerField(required=False, min_value=1, max_value=2)
+    boarding_point = serializers.CharField(required=False)
+    dropping_point = serializers.CharField(required=False)
+    limit = serializers.IntegerField(default=3, min_value=1, max_value=10)
+    
+    def validate(self, data):
+        genders = [part.strip().upper() for part in data.get('genders', '').split(',') if part.strip()]
+        if not genders:
+            genders = ['O'] * data['count']
+        if len(genders) != data['count']:
+            raise serializers.ValidationError("Provide one gender per traveller")
+        if any(gender not in ('M', 'F', 'O') for gender in genders):
+            raise serializers.ValidationError("Genders must be M, F or O")
+        data['genders'] = genders
+        return data
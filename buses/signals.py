@@ -0,0 +1,152 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from bookings.models import Booking, BusBooking
+from core.models import City
+from .channel_sync import CHANNEL_FIELDS, mark_dirty
+from .connection_search import invalidate_graph
+from .disruption_service import enqueue_disruptions
+from .fare_calendar import invalidate_corridors
+from .layout_cache import invalidate_layout
+from .models import Bus, BusOperator, BusRoute, BusSchedule, BusSearchEntry, BusStop, SeatLayout
+from .schedule_service import WEEKDAY_FLAGS, cancel_route_schedules, operating_weekdays, reconcile_operating_days
+from .search_index import sync_schedules
+from .stats_service import record_booking_transitions
+
+
+@receiver(post_save, sender=BusRoute)
+def cancel_schedules_for_inactive_route(sender, instance, created, **kwargs):
+    """Bulk-cancel upcoming departures when a route is switched off"""
+    if not created and not instance.is_active:
+        cancel_route_schedules(instance)
+
+
+@receiver(post_init, sender=BusRoute)
+def remember_operating_days(sender, instance, **kwargs):
+    if all(flag in instance.__dict__ for flag in WEEKDAY_FLAGS):
+        instance._operating_weekdays = operating_weekdays(instance)
+
+
+@receiver(post_save, sender=BusRoute)
+def reconcile_route_operating_days(sender, instance, created, **kwargs):
+    """Cancel or reopen upcoming departures when operating days are switched"""
+    previous = getattr(instance, '_operating_weekdays', None)
+    current = operating_weekdays(instance)
+    if not created and previous is not None and previous != current:
+        reconcile_operating_days(instance, previous)
+    instance._operating_weekdays = current
+
+
+@receiver(post_save, sender=BusSchedule)
+def index_schedule(sender, instance, **kwargs):
+    sync_schedules(BusSchedule.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=BusSchedule)
+def invalidate_schedule_calendar(sender, instance, **kwargs):
+    route = BusRoute.objects.filter(pk=instance.route_id).values_list('source_city_id', 'destination_city_id').first()
+    if route:
+        invalidate_corridors([route])
+
+
+@receiver(post_init, sender=BusSchedule)
+def remember_cancellation(sender, instance, **kwargs):
+    if 'is_cancelled' in instance.__dict__:
+        instance._was_cancelled = instance.is_cancelled
+
+
+@receiver(post_save, sender=BusSchedule)
+def handle_cancelled_schedule(sender, instance, created, **kwargs):
+    """Queue rebooking offers, refunds and notifications when a departure becomes cancelled"""
+    # Unknown previous state (deferred field) queues anyway; the pipeline is idempotent
+    if instance.is_cancelled and not created and not getattr(instance, '_was_cancelled', False):
+        enqueue_disruptions([instance.pk])
+    instance._was_cancelled = instance.is_cancelled
+
+
+@receiver(post_init, sender=BusSchedule)
+def remember_channel_fields(sender, instance, **kwargs):
+    if all(field in instance.__dict__ for field in CHANNEL_FIELDS):
+        instance._channel_values = tuple(getattr(instance, field) for field in CHANNEL_FIELDS)
+
+
+@receiver(post_save, sender=BusSchedule)
+def queue_channel_update(sender, instance, created, **kwargs):
+    """Queue a departure for channel push when a save changes what channels are sent"""
+    current = tuple(getattr(instance, field) for field in CHANNEL_FIELDS)
+    if created or getattr(instance, '_channel_values', None) != current:
+        mark_dirty([instance.pk])
+    instance._channel_values = current
+
+
+@receiver(post_save, sender=BusRoute)
+def index_route_schedules(sender, instance, created, **kwargs):
+    if not created:
+        sync_schedules(BusSchedule.objects.filter(route=instance, date__gte=timezone.localdate()))
+
+
+@receiver(post_save, sender=Bus)
+def index_bus_schedules(sender, instance, created, **kwargs):
+    if not created:
+        sync_schedules(BusSchedule.objects.filter(route__bus=instance, date__gte=timezone.localdate()))
+
+
+@receiver(post_save, sender=BusOperator)
+def rename_operator_entries(sender, instance, created, **kwargs):
+    if not created:
+        BusSearchEntry.objects.filter(bus__operator=instance).update(operator_name=instance.name)
+
+
+@receiver(post_save, sender=City)
+def rename_city_entries(sender, instance, created, **kwargs):
+    if not created:
+        BusSearchEntry.objects.filter(source_city=instance).update(source_name=instance.name)
+        BusSearchEntry.objects.filter(destination_city=instance).update(destination_name=instance.name)
+
+
+@receiver([post_save, post_delete], sender=BusSchedule)
+@receiver([post_save, post_delete], sender=BusRoute)
+@receiver([post_save, post_delete], sender=BusStop)
+@receiver(post_save, sender=Bus)
+@receiver(post_save, sender=BusOperator)
+@receiver(post_save, sender=City)
+def invalidate_connection_graph(sender, **kwargs):
+    """Any timetable change makes every worker rebuild its connection graph"""
+    invalidate_graph()
+
+
+@receiver([post_save, post_delete], sender=SeatLayout)
+def invalidate_seat_layout(sender, instance, **kwargs):
+    invalidate_layout(instance.bus_id)
+
+
+@receiver(post_save, sender=Bus)
+def recompile_reservation_rules(sender, instance, created, **kwargs):
+    # Compiled rules live in the layout template
+    if not created:
+        invalidate_layout(instance.pk)
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status is not fetched on every load
+    if 'status' in instance.__dict__:
+        instance._rollup_status = instance.status
+
+
+@receiver(post_save, sender=Booking)
+def roll_up_booking_status(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, '_rollup_status'):
+        return
+    previous = None if created else instance._rollup_status
+    if instance.booking_type == 'bus' and previous != instance.status:
+        record_booking_transitions([(instance.id, previous, instance.status)])
+    instance._rollup_status = instance.status
+
+
+@receiver(post_save, sender=BusBooking)
+def roll_up_new_bus_booking(sender, instance, created, **kwargs):
+    # Bookings saved as already sold only gain bus details afterwards
+    if created:
+        record_booking_transitions([(instance.booking_id, None, instance.booking.status)])
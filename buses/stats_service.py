@@ -0,0 +1,156 @@
+"""
+Bus Stats Service
+Daily operator rollups kept in step with bus booking state changes, and
+the dashboard reads over them
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Tuple
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from core.rollups import apply_deltas, status_delta
+from .models import BusDailyStats
+
+# Statuses in which a booking's seats count as sold
+SOLD_STATUSES = {'confirmed', 'completed'}
+CANCELLED_STATUSES = {'cancelled', 'refunded'}
+CHART_DAYS = 30
+
+
+def record_booking_transitions(transitions: Iterable[Tuple[int, str, str]]):
+    """
+    Fold (booking_id, old_status, new_status) changes into the rollups
+
+    Changes into or out of a sold status move the sales counters, and
+    changes into or out of a cancelled status the cancellations, so a
+    reinstated booking stops counting. Bus details for every affected
+    booking come from one grouped query; each touched route/date row is
+    then adjusted in place.
+    """
+    signs = {}
+    for booking_id, old_status, new_status in transitions:
+        sign = (status_delta(old_status, new_status, SOLD_STATUSES),
+                status_delta(old_status, new_status, CANCELLED_STATUSES))
+        if any(sign):
+            signs[booking_id] = sign
+    if not signs:
+        return
+
+    from bookings.models import BusBooking
+
+    details = (
+        BusBooking.objects.filter(booking_id__in=list(signs))
+        .values(
+            'booking_id', 'booking__total_amount', 'bus_schedule__route_id', 'bus_schedule__date',
+            'bus_schedule__route__bus_id', 'bus_schedule__route__bus__operator_id',
+            'bus_schedule__route__bus__total_seats',
+        )
+        .annotate(seat_count=Count('seats'))
+    )
+    rows = {}
+    for row in details:
+        sign, cancelled = signs[row['booking_id']]
+        key = (row['bus_schedule__route_id'], row['bus_schedule__date'])
+        defaults = {
+            'operator_id': row['bus_schedule__route__bus__operator_id'],
+            'bus_id': row['bus_schedule__route__bus_id'],
+            'capacity': row['bus_schedule__route__bus__total_seats'],
+        }
+        deltas = rows.setdefault(key, (defaults, defaultdict(int)))[1]
+        deltas['bookings'] += sign
+        deltas['seats_sold'] += sign * row['seat_count']
+        deltas['revenue'] += sign * row['booking__total_amount']
+        deltas['cancellations'] += cancelled
+    apply_deltas(BusDailyStats, ['route_id', 'date'], rows)
+
+
+def rebuild_bus_stats() -> int:
+    """Recompute every rollup row from bookings, for backfills and repairs"""
+    from bookings.models import BusBooking
+
+    group = ('bus_schedule__route_id', 'bus_schedule__date', 'bus_schedule__route__bus_id',
+             'bus_schedule__route__bus__operator_id', 'bus_schedule__route__bus__total_seats')
+    sold = Q(booking__status__in=SOLD_STATUSES)
+    bookings = BusBooking.objects.values(*group).annotate(
+        bookings=Count('id', filter=sold),
+        revenue=Sum('booking__total_amount', filter=sold),
+        cancellations=Count('id', filter=Q(booking__status__in=CANCELLED_STATUSES)),
+    )
+    seats = dict(
+        ((row['bus_schedule__route_id'], row['bus_schedule__date']), row['seats'])
+        for row in BusBooking.objects.filter(sold).values('bus_schedule__route_id', 'bus_schedule__date').annotate(
+            seats=Count('seats')
+        )
+    )
+    rows = [
+        BusDailyStats(
+            route_id=row['bus_schedule__route_id'],
+            date=row['bus_schedule__date'],
+            bus_id=row['bus_schedule__route__bus_id'],
+            operator_id=row['bus_schedule__route__bus__operator_id'],
+            capacity=row['bus_schedule__route__bus__total_seats'],
+            bookings=row['bookings'],
+            seats_sold=seats.get((row['bus_schedule__route_id'], row['bus_schedule__date']), 0),
+            revenue=row['revenue'] or 0,
+            cancellations=row['cancellations'],
+        )
+        for row in bookings
+        if row['bookings'] or row['cancellations']
+    ]
+    BusDailyStats.objects.all().delete()
+    BusDailyStats.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def operator_bus_stats(operator) -> Dict[int, dict]:
+    """
+    Lifetime totals per bus for an operator, one grouped query
+
+    occupancy is seats sold over seats offered on departures that took
+    bookings.
+    """
+    stats = {}
+    rows = BusDailyStats.objects.filter(operator=operator).values('bus_id').annotate(
+        total_bookings=Sum('bookings'),
+        total_seats_sold=Sum('seats_sold'),
+        total_capacity=Sum('capacity'),
+        total_revenue=Sum('revenue'),
+        total_cancellations=Sum('cancellations'),
+    )
+    for row in rows:
+        stats[row['bus_id']] = {
+            'bookings': row['total_bookings'],
+            'seats_sold': row['total_seats_sold'],
+            'capacity': row['total_capacity'],
+            'revenue': row['total_revenue'],
+            'cancellations': row['total_cancellations'],
+            'occupancy': round(100 * row['total_seats_sold'] / row['total_capacity'], 1)
+            if row['total_capacity'] else 0,
+        }
+    return stats
+
+
+def operator_daily_chart(operator, days: int = CHART_DAYS) -> List[dict]:
+    """Revenue and seats per departure date for the last `days` days, gaps filled with zeros"""
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = {
+        row['date']: row
+        for row in BusDailyStats.objects.filter(operator=operator, date__gte=start, date__lte=today)
+        .values('date')
+        .annotate(day_revenue=Sum('revenue'), day_seats_sold=Sum('seats_sold'))
+    }
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day, {})
+        series.append({'date': day, 'revenue': row.get('day_revenue') or Decimal('0'),
+                       'seats_sold': row.get('day_seats_sold') or 0})
+    peak = max((row['revenue'] for row in series), default=0) or 1
+    for row in series:
+        row['height'] = int(100 * row['revenue'] / peak)
+    return series
@@ -0,0 +1,102 @@
+from celery import shared_task
+
+
+@shared_task
+def expire_stale_seat_holds_task():
+    """Free bus seats held by unpaid bookings past their TTL"""
+    from .seat_hold_service import expire_stale_seat_holds
+
+    expired = expire_stale_seat_holds()
+    return f"Expired {expired} seat holds"
+
+
+@shared_task
+def generate_bus_schedules_task(days=None):
+    """Roll the schedule horizon forward from each route's operating days"""
+    from .schedule_service import SCHEDULE_HORIZON_DAYS, generate_schedules
+
+    created = generate_schedules(days=days or SCHEDULE_HORIZON_DAYS)
+    return f"Created {created} bus schedules"
+
+
+@shared_task
+def recompute_bus_fares_task():
+    """Reprice upcoming departures from occupancy and days to departure"""
+    from .fare_service import recompute_fares
+
+    repriced = recompute_fares()
+    return f"Repriced {repriced} bus schedules"
+
+
+@shared_task
+def handle_cancelled_schedule_task(schedule_id):
+    """Offer alternatives and refunds to everyone booked on a cancelled departure"""
+    from .disruption_service import process_cancelled_schedule
+
+    totals = process_cancelled_schedule(schedule_id)
+    return (
+        f"Schedule {schedule_id}: {totals['bookings']} bookings, "
+        f"{totals['offers']} offers, {totals['refunds']} refunds"
+    )
+
+
+@shared_task
+def notify_disrupted_passengers_task(booking_ids):
+    """Email passengers of a cancelled departure"""
+    from .disruption_service import notify_disrupted_passengers
+
+    sent = notify_disrupted_passengers(booking_ids)
+    return f"Sent {sent} disruption emails"
+
+
+@shared_task
+def compact_bus_telemetry_task():
+    """Thin old GPS pings and drop days past retention"""
+    from .telemetry import compact_positions
+
+    result = compact_positions()
+    return f"Downsampled {result['downsampled']} GPS pings, expired {result['expired']}"
+
+
+@shared_task
+def flush_bus_channel_updates_task():
+    """Hand departures changed since the last flush to per-channel push tasks"""
+    from .channel_sync import flush_channel_updates
+
+    batches = flush_channel_updates()
+    for provider, schedule_ids in batches:
+        push_bus_inventory_task.delay(provider, schedule_ids)
+    return f"Queued {sum(len(ids) for _, ids in batches)} departures in {len(batches)} channel pushes"
+
+
+# Per worker; adapters also throttle per provider within a process
+@shared_task(bind=True, rate_limit='120/m', max_retries=5)
+def push_bus_inventory_task(self, provider, schedule_ids):
+    """
+    Send current seats and fares of departures to a bus channel
+
+    The flush already took the departures off the queue, so a push that
+    runs out of retries puts them back for a later flush.
+    """
+    from core.services.adapters.http_bus_adapter import ChannelError, ChannelRateLimited
+    from .channel_sync import mark_dirty, push_schedules
+
+    try:
+        result = push_schedules(provider, schedule_ids)
+    except ChannelError as exc:
+        if self.request.retries >= self.max_retries:
+            mark_dirty(schedule_ids)
+            raise
+        if isinstance(exc, ChannelRateLimited):
+            raise self.retry(exc=exc, countdown=exc.retry_after)
+        raise self.retry(exc=exc, countdown=5 * 2 ** self.request.retries)
+    return f"Pushed {result['sent']} departures to {provider} in {result['batches']} requests"
+
+
+@shared_task
+def refresh_bus_channel_inventory_task():
+    """Merge channel availability for the coming days into the search index"""
+    from .channel_sync import refresh_channel_availability
+
+    merged = refresh_channel_availability()
+    return f"Capped {sum(merged.values())} search rows from channel availability"
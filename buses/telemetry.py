@@ -0,0 +1,235 @@
+"""
+Bus Telemetry
+Batched GPS ping ingestion, latest-position cache, live ETA to boarding
+points and downsampling of old pings
+"""
+
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Optional
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Bus, BusPosition
+
+MAX_BATCH_SIZE = 1000
+POSITION_KEY = 'buses:position:{bus_id}'
+POSITION_TTL_SECONDS = 6 * 60 * 60
+# A cached position older than this is shown as stale
+STALE_AFTER_SECONDS = 5 * 60
+# Pings from devices with a skewed clock are dropped
+MAX_FUTURE_SKEW_SECONDS = 2 * 60
+
+# Raw pings are kept this many days, then thinned to one per bucket
+RAW_RETENTION_DAYS = 2
+DOWNSAMPLE_BUCKET_SECONDS = 5 * 60
+# Whole days older than this are dropped
+RETENTION_DAYS = 90
+DELETE_BATCH_SIZE = 500
+
+# Used for ETAs when the bus is crawling or reports no speed
+DEFAULT_SPEED_KMH = 35
+MIN_SPEED_KMH = 10
+EARTH_RADIUS_KM = 6371.0
+
+
+def _decimal(value, low, high) -> Optional[Decimal]:
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    if not number.is_finite() or not low <= number <= high:
+        return None
+    return number
+
+
+def _parse_ping(ping, now) -> Optional[dict]:
+    if not isinstance(ping, dict):
+        return None
+    recorded_at = parse_datetime(str(ping.get('ts', '')))
+    if recorded_at is None:
+        return None
+    # Devices without a zone report UTC
+    if timezone.is_naive(recorded_at):
+        recorded_at = recorded_at.replace(tzinfo=dt_timezone.utc)
+    recorded_at = recorded_at.astimezone(dt_timezone.utc)
+    if recorded_at > now + timedelta(seconds=MAX_FUTURE_SKEW_SECONDS):
+        return None
+    latitude = _decimal(ping.get('lat'), -90, 90)
+    longitude = _decimal(ping.get('lng'), -180, 180)
+    if latitude is None or longitude is None:
+        return None
+    speed = ping.get('speed')
+    heading = ping.get('heading')
+    speed = _decimal(speed, 0, 200) if speed is not None else None
+    heading = _decimal(heading, 0, 359) if heading is not None else None
+    return {
+        'bus_number': str(ping.get('bus', '')),
+        'recorded_at': recorded_at,
+        'latitude': latitude.quantize(Decimal('0.0000001')),
+        'longitude': longitude.quantize(Decimal('0.0000001')),
+        'speed_kmh': speed.quantize(Decimal('0.1')) if speed is not None else None,
+        'heading': int(heading) if heading is not None else None,
+    }
+
+
+def _cached_position(position: BusPosition) -> dict:
+    return {
+        'bus_id': position.bus_id,
+        'latitude': float(position.latitude),
+        'longitude': float(position.longitude),
+        'speed_kmh': float(position.speed_kmh) if position.speed_kmh is not None else None,
+        'heading': position.heading,
+        'recorded_at': position.recorded_at.isoformat(),
+    }
+
+
+def ingest_pings(pings: Iterable[dict]) -> Dict[str, int]:
+    """
+    Store a batch of GPS pings and refresh the latest position per bus
+
+    Each ping is {bus, ts, lat, lng[, speed, heading]} with the bus number
+    as sent by the device. Buses are resolved in one query, valid pings are
+    written with one bulk_create and the cache moves forward only for
+    buses whose newest ping beats what is already cached, so late or
+    replayed batches never rewind a position.
+    """
+    now = timezone.now()
+    pings = list(pings)
+    parsed = [row for row in (_parse_ping(ping, now) for ping in pings) if row is not None]
+    bus_ids = dict(
+        Bus.objects.filter(
+            bus_number__in={row['bus_number'] for row in parsed}, has_gps_tracking=True, is_active=True
+        ).values_list('bus_number', 'id')
+    )
+
+    positions = []
+    for row in parsed:
+        bus_id = bus_ids.get(row.pop('bus_number'))
+        if bus_id is not None:
+            positions.append(BusPosition(bus_id=bus_id, day=timezone.localdate(row['recorded_at']), **row))
+    BusPosition.objects.bulk_create(positions, batch_size=MAX_BATCH_SIZE)
+
+    newest = {}
+    for position in positions:
+        current = newest.get(position.bus_id)
+        if current is None or position.recorded_at > current.recorded_at:
+            newest[position.bus_id] = position
+    keys = {POSITION_KEY.format(bus_id=bus_id): position for bus_id, position in newest.items()}
+    cached = cache.get_many(keys.keys())
+    updates = {
+        key: _cached_position(position)
+        for key, position in keys.items()
+        if key not in cached or position.recorded_at > datetime.fromisoformat(cached[key]['recorded_at'])
+    }
+    if updates:
+        cache.set_many(updates, POSITION_TTL_SECONDS)
+
+    return {'accepted': len(positions), 'rejected': len(pings) - len(positions), 'buses': len(newest)}
+
+
+def latest_position(bus_id: int) -> Optional[dict]:
+    """Last known position of a bus, one cache read"""
+    return cache.get(POSITION_KEY.format(bus_id=bus_id))
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance between two coordinates"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def scheduled_pickup(schedule, boarding_point) -> datetime:
+    """Pickup time as a datetime; points after midnight belong to the next day"""
+    day = schedule.date
+    if boarding_point.pickup_time < schedule.route.departure_time:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, boarding_point.pickup_time))
+
+
+def estimate_pickup(schedule, boarding_point, position: Optional[dict], now=None) -> dict:
+    """
+    Expected pickup at a boarding point
+
+    With a live position and point coordinates the bus is projected to the
+    point at its reported speed; it never picks up earlier than the
+    timetable. Otherwise the timetable pickup is returned as-is.
+    """
+    now = now or timezone.now()
+    scheduled = scheduled_pickup(schedule, boarding_point)
+    estimate = {
+        'boarding_point_id': boarding_point.id,
+        'boarding_point': boarding_point.name,
+        'scheduled_pickup': scheduled.isoformat(),
+        'expected_pickup': scheduled.isoformat(),
+        'delay_minutes': 0,
+        'distance_km': None,
+        'source': 'timetable',
+    }
+    if position is None or boarding_point.latitude is None or boarding_point.longitude is None:
+        return estimate
+
+    distance = distance_km(
+        position['latitude'], position['longitude'], float(boarding_point.latitude), float(boarding_point.longitude)
+    )
+    speed = position['speed_kmh'] or DEFAULT_SPEED_KMH
+    travel = timedelta(hours=distance / max(speed, MIN_SPEED_KMH))
+    # A projected arrival already in the past means the bus is late, not early
+    recorded_at = datetime.fromisoformat(position['recorded_at'])
+    arrival = max(recorded_at + travel, now) if distance > 0.1 else recorded_at
+    expected = max(arrival, scheduled)
+    estimate.update(
+        expected_pickup=expected.isoformat(),
+        delay_minutes=int((expected - scheduled).total_seconds() // 60),
+        distance_km=round(distance, 2),
+        source='gps',
+    )
+    return estimate
+
+
+def downsample_day(day, bucket_seconds: int = DOWNSAMPLE_BUCKET_SECONDS) -> int:
+    """
+    Thin one day of pings to the first ping per bus per bucket
+
+    Streams the day's index in (bus, time) order, so memory stays flat, and
+    deletes the surplus in batches. Running it again is a no-op.
+    """
+    pings = (
+        BusPosition.objects.filter(day=day)
+        .order_by('bus_id', 'recorded_at', 'id')
+        .values_list('id', 'bus_id', 'recorded_at')
+    )
+    surplus = []
+    deleted = 0
+    last_bucket = None
+    for position_id, bus_id, recorded_at in pings.iterator(chunk_size=5000):
+        bucket = (bus_id, int(recorded_at.timestamp()) // bucket_seconds)
+        if bucket == last_bucket:
+            surplus.append(position_id)
+        last_bucket = bucket
+        if len(surplus) >= DELETE_BATCH_SIZE:
+            deleted += BusPosition.objects.filter(id__in=surplus).delete()[0]
+            surplus = []
+    if surplus:
+        deleted += BusPosition.objects.filter(id__in=surplus).delete()[0]
+    return deleted
+
+
+def compact_positions(today=None) -> Dict[str, int]:
+    """Downsample days past the raw window and drop days past retention"""
+    today = today or timezone.localdate()
+    expired = BusPosition.objects.filter(day__lt=today - timedelta(days=RETENTION_DAYS)).delete()[0]
+    days = (
+        BusPosition.objects.filter(
+            day__gte=today - timedelta(days=RETENTION_DAYS),
+            day__lt=today - timedelta(days=RAW_RETENTION_DAYS),
+        )
+        .values_list('day', flat=True)
+        .distinct()
+    )
+    downsampled = sum(downsample_day(day) for day in list(days))
+    return {'expired': expired, 'downsampled': downsampled}
@@ -1,4 +1,5 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
+from django.utils import timezone
 from core.models import City
 from buses.models import BusOperator, Bus, BusRoute, BusSchedule
 from datetime import date, timedelta
@@ -42,3 +43,1204 @@ class BusSearchTests(TestCase):
         self.assertEqual(response.status_code, 200)
         data = response.json()
         self.assertGreater(len(data.get('results', [])), 0)
+
+
+class SeatMapTestSetup(TestCase):
+    def setUp(self):
+        from buses.models import SeatLayout
+        from django.contrib.auth import get_user_model
+        self.client = Client()
+        self.source = City.objects.create(name='Chennai', state='Tamil Nadu', code='MAA')
+        self.dest = City.objects.create(name='Bangalore', state='Karnataka', code='BLR')
+        self.op = BusOperator.objects.create(name='Bitmap Travels', contact_phone='9999999999')
+        self.bus = Bus.objects.create(bus_number='TN02BIT', operator=self.op, total_seats=12, bus_type='seater')
+        self.route = BusRoute.objects.create(
+            bus=self.bus, source_city=self.source, destination_city=self.dest, route_name='MAA-BLR',
+            departure_time='21:00', arrival_time='05:00', duration_hours=8, distance_km=350, base_fare=800
+        )
+        self.seats = [
+            SeatLayout.objects.create(bus=self.bus, seat_number=f'{row}{col}', seat_type='seater', row=row, column=index + 1)
+            for row in range(1, 7) for index, col in enumerate('AB')
+        ]
+        self.schedule = BusSchedule.objects.create(
+            route=self.route, date=date.today() + timedelta(days=2), available_seats=12, fare=800
+        )
+        self.user = get_user_model().objects.create_user(username='rider', password='pass', email='rider@example.com')
+
+
+class SeatBitmapTests(SeatMapTestSetup):
+    def test_positions_assigned_in_creation_order(self):
+        self.assertEqual([seat.position for seat in self.seats], list(range(12)))
+
+    def test_occupy_and_release_keep_counters_in_step(self):
+        from buses.seat_inventory import SeatUnavailableError, occupied_positions, occupy_seats, release_seats
+        occupy_seats(self.schedule, [0, 9])
+        with self.assertRaises(SeatUnavailableError):
+            occupy_seats(self.schedule, [9, 10])
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(occupied_positions(bytes(self.schedule.seat_bitmap)), {0, 9})
+        self.assertEqual((self.schedule.available_seats, self.schedule.booked_seats), (10, 2))
+
+        release_seats(self.schedule, [9, 11])
+        self.schedule.refresh_from_db()
+        self.assertEqual(occupied_positions(bytes(self.schedule.seat_bitmap)), {0})
+        self.assertEqual(self.schedule.available_seats, 11)
+
+    def test_booking_marks_seats_on_seat_map(self):
+        self.client.login(username='rider', password='pass')
+        travel_date = self.schedule.date.isoformat()
+        payload = {
+            'route_id': self.route.id, 'travel_date': travel_date, 'seat_ids': [self.seats[3].id],
+            'passenger_name': 'Rider', 'passenger_age': 30, 'passenger_gender': 'M',
+        }
+        self.client.post(f'/buses/{self.bus.id}/book/', payload)
+        # The same seat cannot be sold twice
+        self.client.post(f'/buses/{self.bus.id}/book/', payload)
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.booked_seats, 1)
+        response = self.client.get(f'/buses/{self.bus.id}/?route_id={self.route.id}&travel_date={travel_date}')
+        self.assertEqual(response.context['booked_seat_ids'], [self.seats[3].id])
+
+
+class SeatHoldTests(SeatMapTestSetup):
+    def test_second_buyer_cannot_hold_same_seat(self):
+        from buses.seat_hold_service import hold_seats
+        from buses.seat_inventory import SeatUnavailableError
+        hold_seats(self.schedule, self.seats[:2], user=self.user)
+        with self.assertRaises(SeatUnavailableError):
+            hold_seats(self.schedule, self.seats[1:3])
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.booked_seats, 2)
+
+    def test_expired_holds_free_seats_once(self):
+        from bookings.models import SeatHold
+        from buses.seat_hold_service import expire_stale_seat_holds, hold_seats
+        reference = hold_seats(self.schedule, self.seats[:3], hold_minutes=-1)
+        hold_seats(self.schedule, self.seats[3:4])
+
+        self.assertEqual(expire_stale_seat_holds(), 3)
+        self.assertEqual(expire_stale_seat_holds(), 0)
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.available_seats, self.schedule.booked_seats), (11, 1))
+        self.assertEqual(SeatHold.objects.filter(reference_id=reference, status='expired').count(), 3)
+        # The expired seats can be sold again
+        hold_seats(self.schedule, self.seats[:1])
+
+    def test_payment_confirms_and_cancellation_releases(self):
+        from bookings.models import Booking, SeatHold
+        from buses.seat_hold_service import hold_seats, release_booking
+        from hotels.channel_manager_service import finalize_booking_after_payment
+        booking = Booking.objects.create(
+            user=self.user, booking_type='bus', total_amount=1600,
+            customer_name='Rider', customer_email='rider@example.com', customer_phone='9999999999'
+        )
+        hold_seats(self.schedule, self.seats[:2], user=self.user, booking=booking)
+        finalize_booking_after_payment(booking)
+        self.assertEqual(SeatHold.objects.filter(booking=booking, status='confirmed').count(), 2)
+
+        release_booking(booking)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.available_seats, 12)
+        self.assertFalse(SeatHold.objects.filter(booking=booking, status__in=SeatHold.LIVE_STATUSES).exists())
+
+    def test_late_payment_after_resale_is_not_confirmed(self):
+        from bookings.models import Booking, SeatHold
+        from buses.seat_hold_service import expire_stale_seat_holds, hold_seats
+        from buses.seat_inventory import SeatUnavailableError
+        from hotels.channel_manager_service import finalize_booking_after_payment
+
+        def new_booking():
+            return Booking.objects.create(
+                user=self.user, booking_type='bus', total_amount=800,
+                customer_name='Rider', customer_email='rider@example.com', customer_phone='9999999999'
+            )
+
+        late, prompt = new_booking(), new_booking()
+        hold_seats(self.schedule, self.seats[:1], booking=late, hold_minutes=-1)
+        expire_stale_seat_holds()
+        hold_seats(self.schedule, self.seats[:1], booking=prompt)
+        finalize_booking_after_payment(prompt)
+
+        with self.assertRaises(SeatUnavailableError):
+            finalize_booking_after_payment(late)
+        late.refresh_from_db()
+        self.assertNotEqual(late.status, 'confirmed')
+        self.assertFalse(SeatHold.objects.filter(booking=late, status='confirmed').exists())
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.booked_seats, 1)
+
+    def test_late_payment_reclaims_free_seats(self):
+        from bookings.models import Booking, SeatHold
+        from buses.seat_hold_service import expire_stale_seat_holds, hold_seats
+        from hotels.channel_manager_service import finalize_booking_after_payment
+        booking = Booking.objects.create(
+            user=self.user, booking_type='bus', total_amount=1600,
+            customer_name='Rider', customer_email='rider@example.com', customer_phone='9999999999'
+        )
+        hold_seats(self.schedule, self.seats[:2], booking=booking, hold_minutes=-1)
+        expire_stale_seat_holds()
+
+        finalize_booking_after_payment(booking)
+        self.assertEqual(SeatHold.objects.filter(booking=booking, status='confirmed').count(), 2)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.booked_seats, 2)
+
+
+class BusListQueryTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.source = City.objects.create(name='Chennai', state='Tamil Nadu', code='MAA')
+        self.dest = City.objects.create(name='Madurai', state='Tamil Nadu', code='IXM')
+        self.other = City.objects.create(name='Trichy', state='Tamil Nadu', code='TRZ')
+        self.op = BusOperator.objects.create(name='List Travels', contact_phone='9999999999')
+
+    def _add_buses(self, count):
+        for index in range(count):
+            bus = Bus.objects.create(
+                bus_number=f'TN10L{Bus.objects.count()}', operator=self.op, total_seats=30, bus_type='seater'
+            )
+            for destination, departure in [(self.other, '06:00'), (self.dest, '22:00'), (self.dest, '21:00')]:
+                BusRoute.objects.create(
+                    bus=bus, source_city=self.source, destination_city=destination, route_name='Route',
+                    departure_time=departure, arrival_time='05:00', duration_hours=7, distance_km=450, base_fare=700
+                )
+
+    def test_query_count_independent_of_fleet_size(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        url = f'/buses/?source={self.source.id}&destination={self.dest.id}'
+        self._add_buses(2)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self._add_buses(6)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+        self.assertEqual(len(response.context['buses']), 8)
+
+    def test_picks_earliest_matching_route_per_bus(self):
+        self._add_buses(1)
+        response = self.client.get('/buses/?source=Chennai&destination=Madurai')
+        route = response.context['buses'][0].selected_route
+        self.assertEqual((route.destination_city_id, route.departure_time.strftime('%H:%M')), (self.dest.id, '21:00'))
+
+
+class ScheduleGenerationTests(TestCase):
+    def setUp(self):
+        self.source = City.objects.create(name='Pune', state='Maharashtra', code='PNQ')
+        self.dest = City.objects.create(name='Goa', state='Goa', code='GOI')
+        self.op = BusOperator.objects.create(name='Weekend Lines', contact_phone='9999999999')
+        self.bus = Bus.objects.create(bus_number='MH12GEN', operator=self.op, total_seats=36, bus_type='sleeper')
+        self.route = BusRoute.objects.create(
+            bus=self.bus, source_city=self.source, destination_city=self.dest, route_name='PNQ-GOI',
+            departure_time='20:00', arrival_time='07:00', duration_hours=11, distance_km=450, base_fare=950,
+            operates_monday=False, operates_tuesday=False, operates_wednesday=False, operates_thursday=False,
+        )
+        # Start on a Monday so the horizon has a known weekday mix
+        today = date.today()
+        self.start = today + timedelta(days=7 - today.weekday())
+
+    def test_generates_only_operating_days(self):
+        from buses.schedule_service import generate_schedules
+        self.assertEqual(generate_schedules(start=self.start, days=14), 6)
+        self.assertEqual(generate_schedules(start=self.start, days=14), 0)
+
+        schedules = BusSchedule.objects.filter(route=self.route)
+        self.assertEqual({schedule.date.weekday() for schedule in schedules}, {4, 5, 6})
+        self.assertEqual({(schedule.available_seats, schedule.fare) for schedule in schedules}, {(36, Decimal('950'))})
+
+    def test_deactivation_cancels_and_reactivation_reopens(self):
+        from buses.schedule_service import generate_schedules
+        generate_schedules(start=self.start, days=7)
+        self.route.is_active = False
+        self.route.save()
+        self.assertFalse(BusSchedule.objects.filter(route=self.route, is_active=True).exists())
+
+        self.route.is_active = True
+        self.route.save()
+        generate_schedules(start=self.start, days=7)
+        self.assertEqual(BusSchedule.objects.filter(route=self.route, is_active=True, is_cancelled=False).count(), 3)
+
+
+class BusSearchIndexTests(SeatMapTestSetup):
+    def test_schedule_save_indexes_and_search_reads_entries(self):
+        from buses.models import BusSearchEntry
+        entry = BusSearchEntry.objects.get(schedule=self.schedule)
+        self.assertEqual((entry.source_name, entry.available_seats, entry.operator_name), ('Chennai', 12, 'Bitmap Travels'))
+
+        response = self.client.get(f'/api/buses/search/?source={self.source.id}&destination=bangalore')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['schedule_id'], self.schedule.id)
+
+    def test_occupancy_and_cancellation_update_entry(self):
+        from buses.models import BusSearchEntry
+        from buses.seat_inventory import occupy_seats
+        occupy_seats(self.schedule, [0, 1])
+        self.assertEqual(BusSearchEntry.objects.get(schedule=self.schedule).available_seats, 10)
+
+        self.schedule.refresh_from_db()
+        self.schedule.is_cancelled = True
+        self.schedule.save()
+        self.assertFalse(BusSearchEntry.objects.filter(schedule=self.schedule).exists())
+
+    def test_operator_rename_propagates(self):
+        from buses.models import BusSearchEntry
+        self.op.name = 'Bitmap Express'
+        self.op.save()
+        self.assertEqual(BusSearchEntry.objects.get(schedule=self.schedule).operator_name, 'Bitmap Express')
+
+
+class ConnectionSearchTests(TestCase):
+    def setUp(self):
+        from buses.models import BusStop
+        self.client = Client()
+        self.chennai = City.objects.create(name='Chennai', state='Tamil Nadu', code='MAA')
+        self.vellore = City.objects.create(name='Vellore', state='Tamil Nadu', code='VLR')
+        self.bangalore = City.objects.create(name='Bangalore', state='Karnataka', code='BLR')
+        self.mysore = City.objects.create(name='Mysore', state='Karnataka', code='MYQ')
+        self.op = BusOperator.objects.create(name='Transfer Lines', contact_phone='9999999999')
+        self.day = date.today() + timedelta(days=2)
+
+        first = self._route('TN01CSA', self.chennai, self.bangalore, '21:00', '05:00', self.day)
+        BusStop.objects.create(
+            route=first, city=self.vellore, stop_name='Vellore', stop_order=1,
+            arrival_time='22:30', departure_time='22:40'
+        )
+        self._route('KA01CSA', self.bangalore, self.mysore, '06:00', '09:00', self.day + timedelta(days=1))
+        # Leaves 15 minutes after the first bus arrives, below the minimum layover
+        self._route('KA02CSA', self.bangalore, self.mysore, '05:15', '08:00', self.day + timedelta(days=1))
+
+    def _route(self, number, source, destination, departs, arrives, day):
+        bus = Bus.objects.create(bus_number=number, operator=self.op, total_seats=30, bus_type='seater')
+        route = BusRoute.objects.create(
+            bus=bus, source_city=source, destination_city=destination, route_name=number,
+            departure_time=departs, arrival_time=arrives, duration_hours=4, distance_km=200, base_fare=500
+        )
+        BusSchedule.objects.create(route=route, date=day, available_seats=30, fare=500)
+        return route
+
+    def test_one_transfer_respects_min_layover(self):
+        response = self.client.get(
+            f'/api/buses/connections/?source=chennai&destination={self.mysore.id}&date={self.day}'
+        )
+        self.assertEqual(response.status_code, 200)
+        itineraries = response.json()['itineraries']
+        self.assertEqual(len(itineraries), 1)
+        itinerary = itineraries[0]
+        self.assertEqual((itinerary['transfers'], itinerary['layover_minutes']), (1, 60))
+        self.assertEqual([leg['bus_number'] for leg in itinerary['legs']], ['TN01CSA', 'KA01CSA'])
+        self.assertEqual(itinerary['total_fare'], 1000.0)
+
+    def test_direct_trip_to_intermediate_stop(self):
+        from buses.connection_search import search_connections
+        itineraries = search_connections(self.chennai.id, self.vellore.id, self.day)
+        self.assertEqual(len(itineraries), 1)
+        self.assertEqual((itineraries[0]['transfers'], itineraries[0]['duration_minutes']), (0, 90))
+
+    def test_timetable_change_invalidates_cached_graph(self):
+        from buses.connection_search import search_connections
+        self.assertEqual(len(search_connections(self.chennai.id, self.mysore.id, self.day)), 1)
+        self._route('TN09CSA', self.chennai, self.mysore, '23:00', '07:00', self.day)
+        itineraries = search_connections(self.chennai.id, self.mysore.id, self.day)
+        self.assertEqual([itinerary['transfers'] for itinerary in itineraries], [0, 1])
+
+    def test_repriced_fares_show_without_graph_rebuild(self):
+        from buses.connection_search import search_connections
+        from buses.fare_service import reprice_schedules
+        self.assertEqual(search_connections(self.chennai.id, self.mysore.id, self.day)[0]['total_fare'], 1000.0)
+        schedules = list(BusSchedule.objects.select_related('route').filter(route__bus__bus_number='KA01CSA'))
+        self.assertEqual(reprice_schedules(schedules, date.today()), 1)
+
+        itinerary = search_connections(self.chennai.id, self.mysore.id, self.day)[0]
+        self.assertEqual(itinerary['total_fare'], 500 + float(schedules[0].fare))
+        self.assertNotEqual(schedules[0].fare, 500)
+
+
+class SegmentInventoryTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        from buses.models import BoardingPoint, BusStop, DroppingPoint
+        self.vellore = City.objects.create(name='Vellore', state='Tamil Nadu', code='VLR')
+        BusStop.objects.create(
+            route=self.route, city=self.vellore, stop_name='Vellore', stop_order=1,
+            arrival_time='22:30', departure_time='22:40'
+        )
+        self.board_vellore = BoardingPoint.objects.create(
+            route=self.route, name='Vellore Fort', address='Fort Road', city=self.vellore, pickup_time='22:40'
+        )
+        self.drop_vellore = DroppingPoint.objects.create(
+            route=self.route, name='Vellore Bypass', address='NH48', city=self.vellore, drop_time='22:30'
+        )
+
+    def test_disjoint_legs_share_a_seat(self):
+        from buses.seat_hold_service import hold_seats
+        from buses.seat_inventory import SeatUnavailableError, blocked_positions, journey_segments
+        first_leg = journey_segments(self.route, dropping_city_id=self.vellore.id)
+        second_leg = journey_segments(self.route, boarding_city_id=self.vellore.id)
+        self.assertEqual((first_leg, second_leg), (0b01, 0b10))
+
+        hold_seats(self.schedule, self.seats[:1], segments=first_leg)
+        hold_seats(self.schedule, self.seats[:1], segments=second_leg)
+        with self.assertRaises(SeatUnavailableError):
+            hold_seats(self.schedule, self.seats[:1])
+
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.available_seats, self.schedule.booked_seats), (11, 1))
+        self.assertEqual(blocked_positions(self.schedule.segment_masks, second_leg), {0})
+
+    def test_seat_map_and_booking_follow_boarding_point(self):
+        from bookings.models import SeatHold
+        from buses.seat_hold_service import release_holds
+        travel_date = self.schedule.date.isoformat()
+        self.client.login(username='rider', password='pass')
+        self.client.post(f'/buses/{self.bus.id}/book/', {
+            'route_id': self.route.id, 'travel_date': travel_date, 'seat_ids': [self.seats[0].id],
+            'passenger_name': 'Rider', 'passenger_age': 30, 'passenger_gender': 'M',
+            'boarding_point': '__source__', 'dropping_point': self.drop_vellore.id,
+        })
+        hold = SeatHold.objects.get(schedule=self.schedule)
+        self.assertEqual(hold.segments, 0b01)
+
+        url = f'/buses/{self.bus.id}/?route_id={self.route.id}&travel_date={travel_date}'
+        self.assertEqual(self.client.get(url).context['booked_seat_ids'], [self.seats[0].id])
+        response = self.client.get(f'{url}&boarding_point={self.board_vellore.id}')
+        self.assertEqual(response.context['booked_seat_ids'], [])
+
+        release_holds(hold.reference_id)
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.available_seats, self.schedule.segment_masks), (12, b''))
+
+    def test_journeys_covering_no_leg_are_rejected(self):
+        from buses.booking_service import BookingValidationError, create_bus_booking
+        from buses.models import BoardingPoint
+        from buses.seat_inventory import InvalidJourneyError, journey_segments
+        with self.assertRaises(InvalidJourneyError):
+            journey_segments(self.route, self.dest.id, None)
+        with self.assertRaises(InvalidJourneyError):
+            journey_segments(self.route, self.vellore.id, self.source.id)
+
+        board_last = BoardingPoint.objects.create(
+            route=self.route, name='Majestic', address='KG Road', city=self.dest, pickup_time='05:00'
+        )
+        with self.assertRaises(BookingValidationError):
+            create_bus_booking(
+                self.user, self.bus, self.route, self.schedule.date, [self.seats[0].id],
+                {'name': 'Rider', 'age': 30, 'gender': 'M'}, boarding_point=board_last.id,
+            )
+        response = self.client.get(
+            f'/api/buses/schedules/{self.schedule.id}/seat-map/?boarding_point={board_last.id}'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.booked_seats, 0)
+
+
+class FareEngineTests(SeatMapTestSetup):
+    def test_occupancy_and_lead_time_raise_fares(self):
+        from buses.fare_service import compute_fare
+        self.assertEqual(compute_fare(Decimal('800'), 0, 12, 45), Decimal('722'))
+        self.assertEqual(compute_fare(Decimal('800'), 11, 1, 1), Decimal('1196'))
+        self.assertEqual(compute_fare(Decimal('800'), 12, 0, 0), Decimal('1196'))
+
+    def test_recompute_caches_seat_prices_used_at_checkout(self):
+        from bookings.models import Booking
+        from buses.fare_service import recompute_fares
+        self.schedule.window_seat_charge = 50
+        self.schedule.save()
+        aisle = self.seats[0]
+        aisle.column = 2
+        aisle.save()
+        for seat in self.seats[1:]:
+            seat.column = 3 if seat.column == 2 else 1
+            seat.save()
+
+        self.assertEqual(recompute_fares(), 1)
+        self.assertEqual(recompute_fares(), 0)
+        self.schedule.refresh_from_db()
+        # Two days out, nothing sold: 800 x 0.95 x 1.08
+        self.assertEqual(self.schedule.fare, Decimal('821'))
+        self.assertEqual((self.schedule.seat_prices['0'], self.schedule.seat_prices['1']), ('821', '871'))
+
+        self.client.login(username='rider', password='pass')
+        self.client.post(f'/buses/{self.bus.id}/book/', {
+            'route_id': self.route.id, 'travel_date': self.schedule.date.isoformat(),
+            'seat_ids': [aisle.id, self.seats[1].id], 'passenger_name': 'Rider',
+            'passenger_age': 30, 'passenger_gender': 'M',
+        })
+        self.assertEqual(Booking.objects.get(user=self.user).total_amount, Decimal('1692'))
+
+
+class SeatLayoutTemplateTests(SeatMapTestSetup):
+    def test_template_is_served_from_memory_until_layout_changes(self):
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        from buses.layout_cache import get_layout
+        template = get_layout(self.bus.id)
+        self.assertEqual(len(template['decks'][0]['grid']), 6)
+        self.assertEqual(template['decks'][0]['grid'][0], [0, 1])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIs(get_layout(self.bus.id), template)
+        # Only the version check
+        self.assertEqual(len(queries), 1)
+
+        self.seats[0].reserved_for = 'ladies'
+        self.seats[0].save()
+        refreshed = get_layout(self.bus.id)
+        self.assertNotEqual(refreshed['version'], template['version'])
+        self.assertEqual(refreshed['seats'][0]['reserved_for'], 'ladies')
+
+    def test_seat_map_api_merges_occupancy(self):
+        from buses.seat_inventory import occupy_seats
+        occupy_seats(self.schedule, [2])
+        response = self.client.get(f'/api/buses/schedules/{self.schedule.id}/seat-map/')
+        self.assertEqual(response.status_code, 200)
+        seats = response.json()['seats']
+        self.assertEqual([seat['seat_number'] for seat in seats if seat['is_booked']], ['2A'])
+        self.assertEqual(response.json()['available_seats'], 11)
+
+
+class SeatRecommendationTests(SeatMapTestSetup):
+    def _recommend(self, query):
+        response = self.client.get(f'/api/buses/schedules/{self.schedule.id}/recommend-seats/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [[seat['seat_number'] for seat in block['seats']] for block in response.json()['recommendations']]
+
+    def test_pairs_prefer_a_free_row_front_first(self):
+        from buses.seat_inventory import occupy_seats
+        occupy_seats(self.schedule, [0])
+        self.assertEqual(self._recommend('count=2')[0], ['2A', '2B'])
+
+    def test_ladies_seats_only_go_to_women(self):
+        for seat in self.seats[:2]:
+            seat.reserved_for = 'ladies'
+            seat.save()
+        self.assertEqual(self._recommend('count=2&genders=M,M')[0], ['2A', '2B'])
+        self.assertEqual(self._recommend('count=2&genders=F,M')[0], ['2A', '2B'])
+        self.assertEqual(self._recommend('count=2&genders=F,F')[0], ['1A', '1B'])
+
+    def test_rejects_gender_count_mismatch(self):
+        response = self.client.get(f'/api/buses/schedules/{self.schedule.id}/recommend-seats/?count=3&genders=F,M')
+        self.assertEqual(response.status_code, 400)
+
+
+class BookingUnitOfWorkTests(SeatMapTestSetup):
+    def _book(self, seat_ids, gender='M'):
+        self.client.login(username='rider', password='pass')
+        return self.client.post(f'/buses/{self.bus.id}/book/', {
+            'route_id': self.route.id, 'travel_date': self.schedule.date.isoformat(), 'seat_ids': seat_ids,
+            'passenger_name': 'Rider', 'passenger_age': 30, 'passenger_gender': gender,
+        })
+
+    def test_books_all_seats_with_constant_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from bookings.models import BusBookingSeat
+        # Warm the session and per-process caches
+        self._book([self.seats[0].id])
+        with CaptureQueriesContext(connection) as two_seats:
+            self._book([seat.id for seat in self.seats[1:3]])
+        with CaptureQueriesContext(connection) as five_seats:
+            self._book([seat.id for seat in self.seats[3:8]])
+        self.assertEqual(len(two_seats), len(five_seats))
+        self.assertEqual(BusBookingSeat.objects.count(), 8)
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.available_seats, self.schedule.booked_seats), (4, 8))
+
+    def test_rejects_foreign_taken_and_restricted_seats_without_writes(self):
+        from bookings.models import Booking
+        from buses.models import SeatLayout
+        other_bus = Bus.objects.create(bus_number='TN02OTH', operator=self.op, total_seats=1, bus_type='seater')
+        foreign = SeatLayout.objects.create(bus=other_bus, seat_number='1A', seat_type='seater', row=1, column=1)
+        self._book([self.seats[0].id, foreign.id])
+
+        ladies = self.seats[1]
+        ladies.reserved_for = 'ladies'
+        ladies.save()
+        self._book([ladies.id])
+
+        self._book([self.seats[2].id])
+        self._book([self.seats[2].id, self.seats[3].id])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.booked_seats, 1)
+
+
+class DisruptionPipelineTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        from bookings.models import Booking, BusBooking, BusBookingSeat
+        self.alternative = BusSchedule.objects.create(
+            route=self.route, date=self.schedule.date + timedelta(days=1), available_seats=12, fare=850
+        )
+        self.bookings = []
+        for index, (status, paid) in enumerate([('confirmed', 1600), ('payment_pending', 0)]):
+            booking = Booking.objects.create(
+                user=self.user, booking_type='bus', status=status, total_amount=1600, paid_amount=paid,
+                customer_name='Rider', customer_email='rider@example.com', customer_phone='9999999999'
+            )
+            bus_booking = BusBooking.objects.create(
+                booking=booking, bus_schedule=self.schedule, bus_route=self.route, journey_date=self.schedule.date
+            )
+            for seat in self.seats[index * 2:index * 2 + 2]:
+                BusBookingSeat.objects.create(
+                    bus_booking=bus_booking, seat=seat, passenger_name='Rider', passenger_age=30, passenger_gender='M'
+                )
+            self.bookings.append(booking)
+
+    def test_cancellation_queues_pipeline_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.schedule.is_cancelled = True
+            self.schedule.save()
+        self.assertEqual(len(callbacks), 1)
+
+        # Later edits to the cancelled departure do not queue it again
+        with self.captureOnCommitCallbacks() as callbacks:
+            schedule = BusSchedule.objects.get(pk=self.schedule.pk)
+            schedule.cancellation_reason = 'Vehicle breakdown'
+            schedule.save()
+        self.assertEqual(len(callbacks), 0)
+
+    def test_operating_days_switched_off_cancel_upcoming_departures(self):
+        from buses.schedule_service import NOT_OPERATING_REASON, WEEKDAY_FLAGS
+        flag = WEEKDAY_FLAGS[self.schedule.date.weekday()]
+        self.route.refresh_from_db()
+        setattr(self.route, flag, False)
+        self.route.save()
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.is_cancelled, self.schedule.cancellation_reason),
+                         (True, NOT_OPERATING_REASON))
+        self.assertFalse(BusSchedule.objects.get(pk=self.alternative.pk).is_cancelled)
+
+        setattr(self.route, flag, True)
+        self.route.save()
+        self.schedule.refresh_from_db()
+        self.assertFalse(self.schedule.is_cancelled)
+
+    def test_pipeline_offers_alternatives_refunds_and_notifies(self):
+        from django.core import mail
+        from bookings.models import Booking, RebookingOffer
+        from buses.disruption_service import notify_disrupted_passengers, process_cancelled_schedule
+        from notifications.models import Notification
+        from payments.models import Refund
+        BusSchedule.objects.filter(pk=self.schedule.pk).update(is_cancelled=True)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            totals = process_cancelled_schedule(self.schedule.id, chunk_size=1)
+        self.assertEqual(totals, {'bookings': 2, 'offers': 2, 'refunds': 1})
+        self.assertEqual(len(callbacks), 2)
+        self.assertEqual(set(RebookingOffer.objects.values_list('alternative_schedule', flat=True)), {self.alternative.id})
+        self.assertEqual(Refund.objects.get().booking, self.bookings[0])
+        self.assertEqual(Booking.objects.filter(status='cancelled').count(), 2)
+        # Nothing left to do on a re-run
+        self.assertEqual(process_cancelled_schedule(self.schedule.id)['bookings'], 0)
+
+        self.assertEqual(notify_disrupted_passengers([booking.id for booking in self.bookings]), 2)
+        self.assertEqual(sum('refund of ₹1600.00' in message.body for message in mail.outbox), 1)
+        self.assertEqual(Notification.objects.filter(status='sent').count(), 2)
+
+    def test_departure_reopened_with_route_has_its_seats_back(self):
+        from bookings.models import SeatHold
+        from buses.booking_service import create_bus_booking
+        from buses.disruption_service import process_cancelled_schedule
+        from buses.schedule_service import generate_schedules
+        self.route.refresh_from_db()
+        create_bus_booking(
+            self.user, self.bus, self.route, self.schedule.date, [self.seats[5].id],
+            {'name': 'Rider', 'age': 30, 'gender': 'M'},
+        )
+        self.route.is_active = False
+        self.route.save()
+        process_cancelled_schedule(self.schedule.id)
+        self.route.is_active = True
+        self.route.save()
+        generate_schedules(self.route, start=self.schedule.date, days=1)
+
+        self.schedule.refresh_from_db()
+        self.assertFalse(self.schedule.is_cancelled)
+        self.assertEqual((self.schedule.booked_seats, self.schedule.available_seats), (0, 12))
+        self.assertEqual(self.schedule.seat_bitmap, b'')
+        self.assertFalse(SeatHold.objects.filter(status__in=SeatHold.LIVE_STATUSES).exists())
+
+
+@override_settings(BUS_TELEMETRY_TOKEN='device-secret')
+class TelemetryTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        from django.core.cache import cache
+        from buses.models import BoardingPoint
+        cache.clear()
+        Bus.objects.filter(pk=self.bus.pk).update(has_gps_tracking=True)
+        self.point = BoardingPoint.objects.create(
+            route=self.route, name='Koyambedu', address='CMBT', city=self.source,
+            latitude='13.0694000', longitude='80.1948000', pickup_time='21:00'
+        )
+        self.point.refresh_from_db()
+        self.schedule.refresh_from_db()
+
+    def _post(self, pings, token='device-secret'):
+        return self.client.post(
+            '/api/buses/telemetry/', {'pings': pings}, content_type='application/json',
+            HTTP_X_TELEMETRY_TOKEN=token
+        )
+
+    def test_batch_is_stored_and_latest_position_cached(self):
+        from buses.models import BusPosition
+        from buses.telemetry import latest_position
+        now = timezone.now()
+        response = self._post([
+            {'bus': 'TN02BIT', 'ts': (now - timedelta(seconds=20)).isoformat(), 'lat': 13.1, 'lng': 80.2, 'speed': 40},
+            {'bus': 'TN02BIT', 'ts': (now - timedelta(seconds=10)).isoformat(), 'lat': 13.2, 'lng': 80.1, 'speed': 45},
+            {'bus': 'TN02BIT', 'ts': now.isoformat(), 'lat': 123, 'lng': 80.1},
+            {'bus': 'UNKNOWN', 'ts': now.isoformat(), 'lat': 13.2, 'lng': 80.1},
+        ])
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.json()['accepted'], response.json()['rejected']), (2, 2))
+        self.assertEqual(BusPosition.objects.filter(bus=self.bus).count(), 2)
+        self.assertEqual(latest_position(self.bus.id)['latitude'], 13.2)
+
+        # A late batch is stored but does not rewind the live position
+        self._post([{'bus': 'TN02BIT', 'ts': (now - timedelta(minutes=5)).isoformat(), 'lat': 12.9, 'lng': 80.2}])
+        self.assertEqual(BusPosition.objects.filter(bus=self.bus).count(), 3)
+        self.assertEqual(latest_position(self.bus.id)['latitude'], 13.2)
+
+    def test_ingestion_requires_device_token(self):
+        response = self._post([{'bus': 'TN02BIT', 'ts': timezone.now().isoformat(), 'lat': 13, 'lng': 80}], token='x')
+        self.assertEqual(response.status_code, 403)
+
+    def test_where_is_my_bus_reads_cached_position(self):
+        self._post([{'bus': 'TN02BIT', 'ts': timezone.now().isoformat(), 'lat': 13.0, 'lng': 80.2, 'speed': 50}])
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/buses/schedules/{self.schedule.id}/live/')
+        data = response.json()
+        self.assertTrue(data['tracking'])
+        self.assertEqual(data['position']['latitude'], 13.0)
+        self.assertEqual(data['pickup']['boarding_point_id'], self.point.id)
+        self.assertEqual(data['pickup']['source'], 'gps')
+
+    def test_eta_reports_delay_against_pickup_time(self):
+        from datetime import datetime
+        from buses.telemetry import estimate_pickup, scheduled_pickup
+        scheduled = scheduled_pickup(self.schedule, self.point)
+        self.assertEqual(timezone.localtime(scheduled).time().strftime('%H:%M'), '21:00')
+
+        # Roughly 55 km out at 55 km/h, ten minutes before pickup
+        position = {'latitude': 13.0694, 'longitude': 79.6870, 'speed_kmh': 55.0,
+                    'recorded_at': (scheduled - timedelta(minutes=10)).isoformat()}
+        estimate = estimate_pickup(self.schedule, self.point, position, now=scheduled - timedelta(minutes=10))
+        self.assertAlmostEqual(estimate['delay_minutes'], 50, delta=2)
+        expected = datetime.fromisoformat(estimate['expected_pickup'])
+        self.assertGreater(expected, scheduled)
+
+        # An early bus waits for the timetable
+        early = dict(position, recorded_at=(scheduled - timedelta(hours=3)).isoformat())
+        estimate = estimate_pickup(self.schedule, self.point, early, now=scheduled - timedelta(hours=3))
+        self.assertEqual(estimate['delay_minutes'], 0)
+
+    def test_compaction_keeps_one_ping_per_bucket(self):
+        from datetime import datetime, timezone as dt_timezone
+        from buses.models import BusPosition
+        from buses.telemetry import compact_positions
+        start = datetime(2026, 1, 10, 4, 0, tzinfo=dt_timezone.utc)
+        BusPosition.objects.bulk_create([
+            BusPosition(bus=self.bus, day=date(2026, 1, 10), recorded_at=start + timedelta(minutes=minute),
+                        latitude=13, longitude=80)
+            for minute in range(13)
+        ] + [
+            BusPosition(bus=self.bus, day=date(2025, 9, 1), recorded_at=start - timedelta(days=131),
+                        latitude=13, longitude=80)
+        ])
+
+        result = compact_positions(today=date(2026, 1, 20))
+        self.assertEqual(result, {'expired': 1, 'downsampled': 10})
+        kept = BusPosition.objects.values_list('recorded_at', flat=True).order_by('recorded_at')
+        self.assertEqual([value.minute for value in kept], [0, 5, 10])
+        self.assertEqual(compact_positions(today=date(2026, 1, 20))['downsampled'], 0)
+
+
+class BulkUploadTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        self.op.user = self.user
+        self.op.save()
+        self.route.refresh_from_db()
+        self.day = self.schedule.date
+
+    def _csv(self, *lines):
+        from io import BytesIO
+        return BytesIO(('\n'.join(lines) + '\n').encode())
+
+    def test_dry_run_reports_diff_without_writing(self):
+        from buses.bulk_upload import import_operator_file
+        upload = self._csv(
+            'bus_number,source,destination,date,date_to,seats,fare',
+            f'TN02BIT,MAA,BLR,{self.day},,10,900',
+            f'TN02BIT,MAA,BLR,{self.day + timedelta(days=1)},{self.day + timedelta(days=3)},,950',
+        )
+        report = import_operator_file(self.op, upload, 'csv', 'schedules', dry_run=True)
+
+        self.assertEqual((report['created'], report['updated'], report['error_count']), (3, 1, 0))
+        self.assertFalse(report['applied'])
+        update = next(change for change in report['changes'] if change['action'] == 'update')
+        self.assertEqual(update['fields']['available_seats'], ['12', '10'])
+        self.assertEqual(BusSchedule.objects.count(), 1)
+
+    def test_apply_writes_chunks_and_reprices(self):
+        from buses.bulk_upload import import_operator_file
+        from buses.models import BusSearchEntry
+        upload = self._csv(
+            'bus_number,source,destination,date,date_to,seats,fare',
+            f'tn02bit,maa,blr,{self.day},{self.day + timedelta(days=29)},,1000',
+        )
+        report = import_operator_file(self.op, upload, 'csv', 'schedules', dry_run=False, chunk_size=7)
+
+        self.assertTrue(report['applied'])
+        self.assertEqual((report['created'], report['updated']), (29, 1))
+        schedules = BusSchedule.objects.filter(route=self.route)
+        self.assertEqual(schedules.count(), 30)
+        self.assertFalse(schedules.exclude(base_fare_override=1000).exists())
+        self.assertFalse(schedules.filter(seat_prices={}).exists())
+        self.assertEqual(BusSearchEntry.objects.filter(route=self.route).count(), 30)
+
+        # Re-uploading the same file changes nothing
+        upload.seek(0)
+        report = import_operator_file(self.op, upload, 'csv', 'schedules', dry_run=False)
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (0, 0, 30))
+
+    def test_any_invalid_row_rolls_back_the_upload(self):
+        from buses.bulk_upload import import_operator_file
+        self.schedule.booked_seats = 4
+        self.schedule.save()
+        upload = self._csv(
+            'bus_number,source,destination,date,seats',
+            f'TN02BIT,MAA,BLR,{self.day + timedelta(days=1)},12',
+            f'TN02BIT,MAA,BLR,{self.day},10',
+            f'KA01XX,MAA,BLR,{self.day},10',
+            f'TN02BIT,MAA,BLR,{self.day + timedelta(days=1)},11',
+        )
+        report = import_operator_file(self.op, upload, 'csv', 'schedules', dry_run=False, chunk_size=2)
+
+        self.assertFalse(report['applied'])
+        self.assertEqual([error["line"] for error in report["errors"]], [3, 4, 5])
+        self.assertEqual(BusSchedule.objects.count(), 1)
+
+    def test_date_ranges_count_towards_the_row_limit(self):
+        from unittest import mock
+        from buses.bulk_upload import UploadError, import_operator_file
+        upload = self._csv(
+            'bus_number,source,destination,date,date_to,fare',
+            f'TN02BIT,MAA,BLR,{self.day},{self.day + timedelta(days=9)},1000',
+        )
+        with mock.patch('buses.bulk_upload.MAX_UPLOAD_ROWS', 5), self.assertRaises(UploadError):
+            import_operator_file(self.op, upload, 'csv', 'schedules', dry_run=False)
+        self.assertEqual(BusSchedule.objects.count(), 1)
+
+    def test_json_points_upsert_by_name(self):
+        import json
+        from io import BytesIO
+        from buses.bulk_upload import import_operator_file
+        from buses.models import BoardingPoint
+        point = {'bus_number': 'TN02BIT', 'source': 'MAA', 'destination': 'BLR', 'name': 'Koyambedu',
+                 'city': 'MAA', 'address': 'CMBT', 'pickup_time': '21:00'}
+        payload = {'boarding_points': [point, dict(point, name='Guindy')]}
+        report = import_operator_file(self.op, BytesIO(json.dumps(payload).encode()), 'json', 'boarding_points',
+                                      dry_run=False)
+        self.assertEqual(report['created'], 2)
+
+        payload = [dict(point, pickup_time='21:15', address=None, latitude='13.0694')]
+        report = import_operator_file(self.op, BytesIO(json.dumps(payload).encode()), 'json', 'boarding_points',
+                                      dry_run=False)
+        self.assertEqual(report['updated'], 1)
+        self.assertEqual(BoardingPoint.objects.get(name='Koyambedu').pickup_time.strftime('%H:%M'), '21:15')
+
+    def test_rows_missing_required_values_are_reported(self):
+        import json
+        from io import BytesIO
+        from buses.bulk_upload import import_operator_file
+        route = {'bus_number': 'TN02BIT', 'source': 'MAA', 'destination': 'BLR'}
+        report = import_operator_file(self.op, BytesIO(json.dumps([dict(route, seats=10)]).encode()), 'json',
+                                      'schedules', dry_run=False)
+        self.assertEqual(report['errors'], [{'line': 1, 'error': 'Missing values: date'}])
+
+        report = import_operator_file(self.op, BytesIO(json.dumps([route]).encode()), 'json', 'boarding_points',
+                                      dry_run=False)
+        self.assertEqual(report['errors'], [{'line': 1, 'error': 'Missing values: name'}])
+        report = import_operator_file(self.op, self._csv('bus_number,source,destination,name', 'TN02BIT,MAA,BLR,'),
+                                      'csv', 'dropping_points', dry_run=False)
+        self.assertEqual(report['error_count'], 1)
+
+    def test_fleet_month_imports_in_batched_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from buses.bulk_upload import import_operator_file
+        lines = ['bus_number,source,destination,date,date_to,fare']
+        for index in range(50):
+            bus = Bus.objects.create(bus_number=f'TN50F{index:02d}', operator=self.op, total_seats=12, bus_type='seater')
+            BusRoute.objects.create(
+                bus=bus, source_city=self.source, destination_city=self.dest, route_name='MAA-BLR',
+                departure_time='22:00', arrival_time='06:00', duration_hours=8, distance_km=350, base_fare=700
+            )
+            lines.append(f'{bus.bus_number},MAA,BLR,{self.day},{self.day + timedelta(days=29)},750')
+
+        with CaptureQueriesContext(connection) as queries:
+            report = import_operator_file(self.op, self._csv(*lines), 'csv', 'schedules', dry_run=False)
+        self.assertEqual(report['created'], 1500)
+        self.assertLess(len(queries), 100)
+
+    def test_operator_upload_page_previews(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.client.login(username='rider', password='pass')
+        upload = SimpleUploadedFile('fleet.csv', f'bus_number,source,destination,date\nTN02BIT,MAA,BLR,{self.day}\n'.encode())
+        response = self.client.post('/buses/operator/upload/', {'kind': 'schedules', 'file': upload, 'dry_run': 'on'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report']['unchanged'], 1)
+
+
+class DashboardRollupTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        self.op.user = self.user
+        self.op.save()
+        self.route.refresh_from_db()
+
+    def _book(self):
+        from buses.booking_service import create_bus_booking
+        return create_bus_booking(
+            self.user, self.bus, self.route, self.schedule.date, [self.seats[0].id, self.seats[1].id],
+            {'name': 'Rider', 'age': 30, 'gender': 'M'}
+        )
+
+    def test_rollup_follows_booking_status(self):
+        from buses.models import BusDailyStats
+        booking = self._book()
+        self.assertFalse(BusDailyStats.objects.exists())
+
+        booking.status = 'confirmed'
+        booking.save()
+        stats = BusDailyStats.objects.get(route=self.route, date=self.schedule.date)
+        self.assertEqual((stats.bookings, stats.seats_sold, stats.capacity, stats.operator_id), (1, 2, 12, self.op.id))
+        self.assertEqual(stats.revenue, booking.total_amount)
+
+        booking.status = 'cancelled'
+        booking.save()
+        stats.refresh_from_db()
+        self.assertEqual((stats.bookings, stats.seats_sold, stats.revenue, stats.cancellations), (0, 0, 0, 1))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        from bookings.models import Booking
+        from buses.booking_service import create_bus_booking
+        from buses.models import BusDailyStats
+        from buses.stats_service import rebuild_bus_stats
+        fields = ('route_id', 'date', 'bookings', 'seats_sold', 'revenue', 'cancellations')
+        booking = self._book()
+        booking.status = 'confirmed'
+        booking.save()
+        # Unpaid and paid cancellations count alike on both paths
+        abandoned = create_bus_booking(
+            self.user, self.bus, self.route, self.schedule.date, [self.seats[2].id],
+            {'name': 'Rider', 'age': 30, 'gender': 'M'}
+        )
+        abandoned.status = 'cancelled'
+        abandoned.save()
+        refunded = Booking.objects.get(pk=booking.pk)
+        refunded.status = 'refunded'
+        refunded.save()
+        incremental = list(BusDailyStats.objects.values(*fields))
+        self.assertEqual(incremental[0]['cancellations'], 2)
+
+        self.assertEqual(rebuild_bus_stats(), 1)
+        self.assertEqual(list(BusDailyStats.objects.values(*fields)), incremental)
+
+    def test_dashboard_reads_rollups_in_fixed_queries(self):
+        booking = self._book()
+        booking.status = 'confirmed'
+        booking.save()
+        self.client.login(username='rider', password='pass')
+        response = self.client.get('/buses/operator/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_bookings'], 1)
+        self.assertEqual(response.context['total_revenue'], booking.total_amount)
+        self.assertEqual(response.context['buses'][0].occupancy, round(100 * 2 / 12, 1))
+
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get('/buses/operator/dashboard/')
+        for index in range(5):
+            bus = Bus.objects.create(bus_number=f'TN02X{index}', operator=self.op, total_seats=30, bus_type='seater')
+            BusRoute.objects.create(
+                bus=bus, source_city=self.source, destination_city=self.dest, route_name='MAA-BLR',
+                departure_time='22:00', arrival_time='06:00', duration_hours=8, distance_km=350, base_fare=700
+            )
+        with CaptureQueriesContext(connection) as larger_fleet:
+            self.client.get('/buses/operator/dashboard/')
+        self.assertEqual(len(larger_fleet), len(baseline))
+
+
+class FareCalendarTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        other = BusOperator.objects.create(name='Budget Lines', contact_phone='8888888888')
+        bus = Bus.objects.create(bus_number='TN03CAL', operator=other, total_seats=30, bus_type='seater')
+        route = BusRoute.objects.create(
+            bus=bus, source_city=self.source, destination_city=self.dest, route_name='MAA-BLR Budget',
+            departure_time='23:00', arrival_time='07:00', duration_hours=8, distance_km=350, base_fare=650
+        )
+        BusSchedule.objects.create(route=route, date=self.schedule.date, available_seats=30, fare=650)
+        BusSchedule.objects.create(
+            route=self.route, date=self.schedule.date + timedelta(days=1), available_seats=12, fare=900
+        )
+        self.url = f'/api/buses/fare-calendar/?source={self.source.id}&destination=Bangalore'
+
+    def test_calendar_reports_cheapest_fare_and_seats_per_day(self):
+        response = self.client.get(f'{self.url}&from={date.today().isoformat()}&days=5')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['calendar']), 5)
+        today, _, departure_day, next_day, _ = data['calendar']
+        self.assertEqual((today['min_fare'], today['available_seats']), (None, 0))
+        self.assertEqual(
+            (departure_day['min_fare'], departure_day['available_seats'], departure_day['departures']), (650.0, 42, 2)
+        )
+        self.assertEqual(next_day['min_fare'], 900.0)
+        self.assertEqual(data['cheapest_date'], self.schedule.date.isoformat())
+
+    def test_calendar_is_cached_until_a_fare_changes(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from buses.fare_calendar import get_fare_calendar
+        start = date.today()
+        get_fare_calendar(self.source.id, self.dest.id, start, 5)
+        with CaptureQueriesContext(connection) as queries:
+            get_fare_calendar(self.source.id, self.dest.id, start, 5)
+        self.assertFalse([query for query in queries if 'buses_bussearchentry' in query['sql']])
+
+        self.schedule.fare = 500
+        self.schedule.save()
+        calendar = get_fare_calendar(self.source.id, self.dest.id, start, 5)
+        self.assertEqual(calendar[2]['min_fare'], 500.0)
+
+    def test_rejects_bad_parameters(self):
+        self.assertEqual(self.client.get(f'{self.url}&days=0').status_code, 400)
+        self.assertEqual(self.client.get(f'{self.url}&from=tomorrow').status_code, 400)
+        response = self.client.get('/api/buses/fare-calendar/?source=Atlantis&destination=Bangalore')
+        self.assertEqual(response.status_code, 404)
+
+
+class ReservationRuleTests(SeatMapTestSetup):
+    def setUp(self):
+        super().setUp()
+        self.route.refresh_from_db()
+
+    def _seat_map(self):
+        response = self.client.get(f'/api/buses/schedules/{self.schedule.id}/seat-map/')
+        return {seat['seat_number']: seat['reserved_for'] for seat in response.json()['seats']}
+
+    def _book(self, seat, gender):
+        from buses.booking_service import create_bus_booking
+        return create_bus_booking(
+            self.user, self.bus, self.route, self.schedule.date, [seat.id], {'name': 'Rider', 'age': 30, 'gender': gender}
+        )
+
+    def test_static_rules_compile_into_seat_map_and_booking_checks(self):
+        from buses.booking_service import BookingValidationError
+        self.bus.reservation_rules = [
+            {'reserve': 'ladies', 'rows': [1]},
+            {'reserve': 'disabled', 'near_door': 2, 'columns': [1]},
+        ]
+        self.bus.save()
+        reserved = self._seat_map()
+        self.assertEqual([reserved['1A'], reserved['1B'], reserved['2A'], reserved['2B']],
+                         ['ladies', 'ladies', 'disabled', 'general'])
+
+        with self.assertRaises(BookingValidationError):
+            self._book(self.seats[1], 'M')
+        self._book(self.seats[2], 'M')
+        self._book(self.seats[1], 'F')
+
+    def test_seat_beside_a_woman_becomes_ladies_only(self):
+        from buses.booking_service import BookingValidationError
+        from buses.seat_inventory import release_booking_seats
+        self.bus.reservation_rules = [{'reserve': 'ladies', 'adjacent_to': 'F'}]
+        self.bus.save()
+        booking = self._book(self.seats[4], 'F')
+        reserved = self._seat_map()
+        self.assertEqual((reserved['3A'], reserved['3B'], reserved['4A']), ('general', 'ladies', 'general'))
+        with self.assertRaises(BookingValidationError):
+            self._book(self.seats[5], 'M')
+
+        release_booking_seats(booking.bus_details)
+        self.assertEqual(self._seat_map()['3B'], 'general')
+        self._book(self.seats[5], 'M')
+
+    def test_resold_seat_drops_cancelled_passenger(self):
+        from buses.seat_inventory import release_booking_seats
+        self.bus.reservation_rules = [{'reserve': 'ladies', 'adjacent_to': 'F'}]
+        self.bus.save()
+        booking = self._book(self.seats[4], 'F')
+        booking.status = 'cancelled'
+        booking.save(update_fields=['status'])
+        release_booking_seats(booking.bus_details)
+
+        self._book(self.seats[4], 'M')
+        self.assertEqual(self._seat_map()['3B'], 'general')
+        self._book(self.seats[5], 'M')
+
+    def test_invalid_rules_are_rejected(self):
+        from django.core.exceptions import ValidationError
+        for rules in ({'reserve': 'ladies'}, [{'reserve': 'vip', 'rows': [1]}], [{'reserve': 'ladies'}],
+                      [{'reserve': 'ladies', 'rows': 'even'}], [{'reserve': 'ladies', 'adjacent_to': 'X'}]):
+            self.bus.reservation_rules = rules
+            with self.assertRaises(ValidationError):
+                self.bus.full_clean()
+
+    def test_setup_command_bulk_creates_layout_from_rules(self):
+        from django.core.management import call_command
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from io import StringIO
+        from buses.layout_cache import get_layout
+        from buses.models import SeatLayout
+        with CaptureQueriesContext(connection) as queries:
+            call_command('setup_ladies_seats', '--bus', 'TN02BIT', stdout=StringIO())
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "buses_seatlayout"')]
+        self.assertEqual(len(inserts), 1)
+        seats = list(SeatLayout.objects.filter(bus=self.bus).order_by('position'))
+        self.assertEqual([seat.position for seat in seats], list(range(20)))
+        self.assertEqual({seat.seat_number for seat in seats if seat.reserved_for == 'ladies'},
+                         {f'{row}{col}' for row in (2, 4, 6, 8, 10) for col in 'AB'})
+        self.bus.refresh_from_db()
+        self.assertEqual(self.bus.reservation_rules, [{'reserve': 'ladies', 'rows': [2, 4, 6, 8, 10]}])
+        self.assertEqual(len(get_layout(self.bus.id)['seats']), 20)
+
+
+class ChannelSyncTests(SeatMapTestSetup):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from core.services.adapters.fake_bus_provider import FakeBusProviderServer
+        cls.server = FakeBusProviderServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        from buses.models import BusChannelMapping
+        self.server.reset()
+        self.server.rate_limit = None
+        BusChannelMapping.objects.create(route=self.route, provider='redbus', external_service_id='RB-MAA-BLR-21')
+        self.channels = override_settings(BUS_CHANNELS={
+            'redbus': {'base_url': self.server.url('redbus'), 'api_key': 'test', 'operator_code': 'GOEXP',
+                       'batch_size': 2},
+            'abhibus': {'base_url': self.server.url('abhibus'), 'api_key': 'test', 'partner_id': '42'},
+        })
+        self.channels.enable()
+        self.addCleanup(self.channels.disable)
+
+    def _flush_and_push(self):
+        from buses.channel_sync import flush_channel_updates, push_schedules
+        batches = flush_channel_updates()
+        for provider, schedule_ids in batches:
+            push_schedules(provider, schedule_ids)
+        return batches
+
+    def test_rapid_seat_changes_coalesce_into_one_push(self):
+        from buses.models import BusChannelUpdate
+        from buses.seat_inventory import occupy_seats, release_seats
+        occupy_seats(self.schedule, [0])
+        occupy_seats(self.schedule, [1, 2])
+        release_seats(self.schedule, [0])
+        self.assertEqual(BusChannelUpdate.objects.count(), 1)
+
+        self.assertEqual(self._flush_and_push(), [('redbus', [self.schedule.id])])
+        pushes = self.server.pushes('redbus')
+        self.assertEqual(len(pushes), 1)
+        self.assertEqual(pushes[0]['body']['inventory'], [{
+            'serviceId': 'RB-MAA-BLR-21', 'journeyDate': self.schedule.date.isoformat(),
+            'availableSeats': 10, 'fare': '800.00', 'status': 'OPEN',
+        }])
+        self.assertFalse(BusChannelUpdate.objects.exists())
+        self.assertEqual(self._flush_and_push(), [])
+
+    def test_unmapped_departures_are_not_queued_and_pushes_are_batched(self):
+        from buses.models import BusChannelUpdate
+        other = Bus.objects.create(bus_number='TN02UNM', operator=self.op, total_seats=12, bus_type='seater')
+        unmapped = BusRoute.objects.create(
+            bus=other, source_city=self.source, destination_city=self.dest, route_name='MAA-BLR Local',
+            departure_time='22:00', arrival_time='06:00', duration_hours=8, distance_km=350, base_fare=700
+        )
+        BusSchedule.objects.create(route=unmapped, date=self.schedule.date, available_seats=12, fare=700)
+        self.schedule.save()
+        self.assertFalse(BusChannelUpdate.objects.exists())
+        self.schedule.fare = 850
+        self.schedule.save()
+        for offset in range(1, 5):
+            BusSchedule.objects.create(
+                route=self.route, date=self.schedule.date + timedelta(days=offset), available_seats=12, fare=800
+            )
+        self.assertEqual(BusChannelUpdate.objects.count(), 5)
+
+        batches = self._flush_and_push()
+        self.assertEqual([len(schedule_ids) for _, schedule_ids in batches], [2, 2, 1])
+        self.assertEqual(sum(push['size'] for push in self.server.pushes('redbus')), 5)
+
+    def test_rate_limited_push_raises_for_retry(self):
+        from buses.channel_sync import push_schedules
+        from core.services.adapters.http_bus_adapter import ChannelRateLimited
+        self.server.rate_limit = 1
+        push_schedules('redbus', [self.schedule.id])
+        with self.assertRaises(ChannelRateLimited) as raised:
+            push_schedules('redbus', [self.schedule.id])
+        self.assertEqual(raised.exception.retry_after, 1.0)
+
+    def test_push_out_of_retries_requeues_departures(self):
+        from buses.models import BusChannelUpdate
+        from buses.tasks import push_bus_inventory_task
+        from core.services.adapters.http_bus_adapter import ChannelError
+        self.server.rate_limit = 0.5  # every request is refused
+        result = push_bus_inventory_task.apply(
+            args=('redbus', [self.schedule.id]), retries=push_bus_inventory_task.max_retries
+        )
+        self.assertIsInstance(result.result, ChannelError)
+        self.assertEqual(list(BusChannelUpdate.objects.values_list('schedule_id', flat=True)), [self.schedule.id])
+
+    def test_channel_availability_caps_search_index(self):
+        from buses.channel_sync import refresh_channel_availability
+        from buses.models import BusSearchEntry
+        self.server.seed('redbus', [
+            {'service_id': 'RB-MAA-BLR-21', 'date': self.schedule.date.isoformat(), 'available_seats': 3,
+             'fare': '800.00'},
+            {'service_id': 'RB-UNKNOWN', 'date': self.schedule.date.isoformat(), 'available_seats': 0, 'fare': '1.00'},
+        ])
+        self.assertEqual(refresh_channel_availability(days=3), {'redbus': 1})
+        self.assertEqual(BusSearchEntry.objects.get(schedule=self.schedule).available_seats, 3)
+
+    def test_failing_channel_does_not_stop_other_corridors(self):
+        from buses.channel_sync import refresh_channel_availability
+        from buses.models import BusChannelMapping
+        BusChannelMapping.objects.create(route=self.route, provider='abhibus', external_service_id='AB-21')
+        self.server.seed('redbus', [
+            {'service_id': 'RB-MAA-BLR-21', 'date': self.schedule.date.isoformat(), 'available_seats': 3,
+             'fare': '800.00'},
+        ])
+        # Nothing listens on the discard port, so every abhibus fetch fails
+        with override_settings(BUS_CHANNELS={
+            'redbus': {'base_url': self.server.url('redbus'), 'api_key': 'test', 'operator_code': 'GOEXP'},
+            'abhibus': {'base_url': 'http://127.0.0.1:9', 'api_key': 'test', 'partner_id': '42'},
+        }), self.assertLogs('buses.channel_sync', 'WARNING'):
+            self.assertEqual(refresh_channel_availability(days=3), {'redbus': 1})
+
+    def test_adapters_create_and_cancel_bookings(self):
+        from buses.channel_sync import get_adapter
+        for provider in ('redbus', 'abhibus'):
+            adapter = get_adapter(provider)
+            booking = adapter.create_booking({'seats': ['1A'], 'journeyDate': self.schedule.date.isoformat()})
+            self.assertEqual(booking['status'], 'CONFIRMED')
+            cancelled = adapter.cancel_booking(booking['bookingId'], reason='Passenger request')
+            self.assertEqual(cancelled, {'bookingId': booking['bookingId'], 'status': 'CANCELLED'})
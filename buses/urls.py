@@ -1,6 +1,6 @@
 from django.urls import path
 from . import views
-from .operator_forms import register_bus_operator, operator_dashboard
+from .operator_forms import register_bus_operator, operator_dashboard, operator_bulk_upload
 
 app_name = 'buses'
 
@@ -13,9 +13,16 @@ urlpatterns = [
     # Operator registration & dashboard
     path('operator/register/', register_bus_operator, name='operator_register'),
     path('operator/dashboard/', operator_dashboard, name='operator_dashboard'),
+    path('operator/upload/', operator_bulk_upload, name='operator_upload'),
     
     # API routes
     path('search/', views.BusSearchView.as_view(), name='bus-search'),
+    path('connections/', views.connection_search_view, name='bus-connections'),
+    path('fare-calendar/', views.fare_calendar_view, name='fare-calendar'),
+    path('schedules/<int:schedule_id>/seat-map/', views.schedule_seat_map_view, name='schedule-seat-map'),
+    path('schedules/<int:schedule_id>/recommend-seats/', views.recommend_seats_view, name='recommend-seats'),
+    path('schedules/<int:schedule_id>/live/', views.live_position_view, name='live-position'),
+    path('telemetry/', views.telemetry_ingest_view, name='telemetry-ingest'),
     path('routes/', views.BusRouteListView.as_view(), name='route-list'),
     path('routes/<int:pk>/', views.BusRouteDetailView.as_view(), name='route-detail'),
 ]
@@ -1,4 +1,5 @@
-from rest_framework import generics, filters
+from rest_framework import generics, filters, status
+from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import render, get_object_or_404, redirect
@@ -6,17 +7,45 @@ from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
 from django.urls import reverse
-from datetime import date
-from .models import Bus, BusRoute, BusSchedule, BusOperator
-from bookings.models import Booking
-from .serializers import BusRouteSerializer, BusScheduleSerializer
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from datetime import date, datetime
+from .models import FULL_ROUTE_SEGMENTS, Bus, BusRoute, BusSchedule, BusOperator, BusSearchEntry
+from .serializers import (
+    BusRouteSerializer, BusScheduleSerializer, ConnectionSearchSerializer, FareCalendarSerializer,
+    SeatRecommendationSerializer
+)
+from .seat_inventory import InvalidJourneyError, SeatUnavailableError, blocked_positions, journey_segments
+from .booking_service import BookingValidationError, create_bus_booking
+from .search_index import amenity_flags
+from .connection_search import search_connections
+from .fare_calendar import get_fare_calendar
+from .layout_cache import get_layout, merge_occupancy
+from .reservation_rules import departure_reservations
+from .seat_recommendation import recommend_seats
+from .telemetry import MAX_BATCH_SIZE, STALE_AFTER_SECONDS, estimate_pickup, ingest_pings, latest_position
 from hotels.models import City
 
 
+def _city_q(field, value):
+    """Match a city FK by numeric id or, for legacy links, by name"""
+    try:
+        return Q(**{f'{field}_id': int(value)})
+    except (ValueError, TypeError):
+        return Q(**{f'{field}__name__iexact': value})
+
+
+def _point_city(points, point_id):
+    """City of a boarding/dropping point id; fallback tokens mean the route end"""
+    try:
+        return points.filter(id=int(point_id)).values_list('city_id', flat=True).first()
+    except (ValueError, TypeError):
+        return None
+
+
 def bus_list(request):
     """Display all buses with search and filter"""
-    buses = Bus.objects.filter(operator__isnull=False).select_related('operator')
-    
     # Search by source and destination cities
     # Accept both legacy and current query param keys
     source_city = request.GET.get('source_city') or request.GET.get('source')
@@ -33,73 +62,60 @@ def bus_list(request):
     
     has_search = any([source_city, destination_city, travel_date, bus_type, ac_filter, bus_age_min, bus_age_max, departure_time])
     
-    # Filter buses by routes if search parameters provided
-    if source_city or destination_city:
-        routes = BusRoute.objects.all()
-        if source_city:
-            try:
-                scid = int(source_city)
-                routes = routes.filter(source_city_id=scid)
-            except (ValueError, TypeError):
-                routes = routes.filter(source_city__name__iexact=source_city)
-        if destination_city:
-            try:
-                dcid = int(destination_city)
-                routes = routes.filter(destination_city_id=dcid)
-            except (ValueError, TypeError):
-                routes = routes.filter(destination_city__name__iexact=destination_city)
-        bus_ids = routes.values_list('bus_id', flat=True)
-        buses = buses.filter(id__in=bus_ids)
-    
-    # Filter by bus type
+    # Bus-level filters apply to the route query through the bus join
+    bus_filters = {'operator__isnull': False}
     if bus_type:
-        buses = buses.filter(bus_type=bus_type)
-    
-    # Filter by AC/Non-AC
+        bus_filters['bus_type'] = bus_type
     if ac_filter == 'ac':
-        buses = buses.filter(has_ac=True)
+        bus_filters['has_ac'] = True
     elif ac_filter == 'non_ac':
-        buses = buses.filter(has_ac=False)
-    
-    # Filter by bus age (manufacturing year)
+        bus_filters['has_ac'] = False
     current_year = date.today().year
     if bus_age_min:
-        min_mfg_year = current_year - int(bus_age_min)
-        buses = buses.filter(manufacturing_year__gte=min_mfg_year)
+        bus_filters['manufacturing_year__gte'] = current_year - int(bus_age_min)
     if bus_age_max:
-        max_mfg_year = current_year - int(bus_age_max)
-        buses = buses.filter(manufacturing_year__lte=max_mfg_year)
-    
-    # Filter by departure time (filter routes)
-    if departure_time:
-        routes = BusRoute.objects.filter(bus__in=buses)
-        if departure_time == 'early':
-            routes = routes.filter(departure_time__lt='12:00:00')
-        elif departure_time == 'late':
-            routes = routes.filter(departure_time__gte='12:00:00')
-        bus_ids = routes.values_list('bus_id', flat=True).distinct()
-        buses = buses.filter(id__in=bus_ids)
+        bus_filters['manufacturing_year__lte'] = current_year - int(bus_age_max)
+    
+    # Route-level filters: a bus is listed when one of its routes matches all of them
+    route_filters = Q()
+    if source_city:
+        route_filters &= _city_q('source_city', source_city)
+    if destination_city:
+        route_filters &= _city_q('destination_city', destination_city)
+    if departure_time == 'early':
+        route_filters &= Q(departure_time__lt='12:00:00')
+    elif departure_time == 'late':
+        route_filters &= Q(departure_time__gte='12:00:00')
+    
+    # One query resolves every bus and its candidate routes; the earliest
+    # matching departure is picked per bus in memory
+    routes = (
+        BusRoute.objects.filter(route_filters, **{f'bus__{key}': value for key, value in bus_filters.items()})
+        .select_related('bus__operator', 'source_city', 'destination_city')
+        .order_by(
+            '-bus__operator__rating', 'bus__operator__name', 'bus__operator_id', 'bus__bus_number',
+            'departure_time', 'id'
+        )
+    )
+    
+    buses = []
+    route_map = {}
+    for route in routes:
+        if route.bus_id in route_map:
+            continue
+        bus = route.bus
+        bus.selected_route = route
+        route_map[bus.id] = route
+        buses.append(bus)
+    
+    # Without route filters, buses that have no routes yet are still listed
+    if not route_filters:
+        buses.extend(
+            Bus.objects.filter(routes__isnull=True, **bus_filters).select_related('operator')
+        )
     
     # Get all cities for search dropdown
     cities = City.objects.all().order_by('name')
-
-    # Map a best-fit route per bus (respecting search params when provided)
-    route_map = {}
-    for bus in buses:
-        route = None
-        if source_city and destination_city:
-            # Accept either numeric IDs or city names
-            try:
-                scid = int(source_city)
-                dcid = int(destination_city)
-                route = bus.routes.filter(source_city_id=scid, destination_city_id=dcid).first()
-            except (ValueError, TypeError):
-                route = bus.routes.filter(source_city__name__iexact=source_city, destination_city__name__iexact=destination_city).first()
-        if not route:
-            route = bus.routes.first()
-        if route:
-            route_map[bus.id] = route
-            bus.selected_route = route
     
     context = {
         'buses': buses,
@@ -124,7 +140,6 @@ def bus_list(request):
 def bus_detail(request, bus_id):
     """Display bus details and booking options with seat layout"""
     from .models import SeatLayout
-    from bookings.models import BusBookingSeat
     from datetime import datetime
     
     bus = get_object_or_404(Bus, id=bus_id)
@@ -161,30 +176,38 @@ def bus_detail(request, bus_id):
     conv_fee_pct = 2  # percent convenience fee (placeholder)
     gst_pct = 5       # percent GST on base + fee (placeholder)
     
-    # Get seat layout for the bus
-    seats = bus.seat_layout.all().order_by('deck', 'row', 'column')
-    
-    # Get booked seats for the selected date
-    booked_seat_ids = []
+    # Seat occupancy is one row read for the selected departure, narrowed to
+    # the legs between the chosen boarding and dropping points
+    occupied = set()
+    seat_prices = {}
+    departure = {}
     if travel_date and selected_route:
-        # Get all bookings for this bus on this date
-        from bookings.models import BusBooking
+        boarding_city = _point_city(selected_route.boarding_points, request.GET.get('boarding_point'))
+        dropping_city = _point_city(selected_route.dropping_points, request.GET.get('dropping_point'))
         try:
-            date_obj = datetime.strptime(travel_date, '%Y-%m-%d').date()
-            bookings = BusBooking.objects.filter(
-                bus_schedule__route=selected_route,
-                bus_schedule__date=date_obj
-            )
-            booked_seat_ids = BusBookingSeat.objects.filter(
-                bus_booking__in=bookings
-            ).values_list('seat_id', flat=True)
-        except (ValueError, BusBooking.DoesNotExist):
+            departure = (
+                BusSchedule.objects.filter(route=selected_route, date=datetime.strptime(travel_date, '%Y-%m-%d').date())
+                .values('id', 'segment_masks', 'seat_prices')
+                .first()
+            ) or {}
+            try:
+                segments = journey_segments(selected_route, boarding_city, dropping_city)
+            except InvalidJourneyError:
+                # Show every seat sold on any leg; booking rejects the points
+                segments = FULL_ROUTE_SEGMENTS
+            occupied = blocked_positions(departure.get('segment_masks'), segments)
+            seat_prices = departure.get('seat_prices') or {}
+        except ValueError:
             pass
     
-    # Mark booked seats
-    for seat in seats:
-        seat.is_booked = seat.id in booked_seat_ids
-        seat.can_book = not seat.is_booked
+    # The layout comes from the cached per-bus template; only occupancy and
+    # prices are per request
+    template = get_layout(bus.id)
+    seats = merge_occupancy(
+        template, occupied, seat_prices,
+        departure_reservations(template, departure.get('id'), departure.get('segment_masks'))
+    )
+    booked_seat_ids = [seat['id'] for seat in seats if seat['is_booked']]
     
     # Get passenger gender if user is authenticated for ladies seat filtering
     passenger_gender = None
@@ -203,7 +226,7 @@ def bus_detail(request, bus_id):
         'conv_fee_pct': conv_fee_pct,
         'gst_pct': gst_pct,
         'seats': seats,
-        'booked_seat_ids': list(booked_seat_ids),
+        'booked_seat_ids': booked_seat_ids,
         'passenger_gender': passenger_gender,
         'seat_types': SeatLayout.RESERVED_FOR_CHOICES,
     }
@@ -214,8 +237,6 @@ def bus_detail(request, bus_id):
 @require_http_methods(["POST"])
 def book_bus(request, bus_id):
     """Handle bus booking with ladies seat validation"""
-    from .models import SeatLayout
-    from bookings.models import BusBooking, BusBookingSeat
     from datetime import datetime
     
     bus = get_object_or_404(Bus, id=bus_id)
@@ -224,11 +245,7 @@ def book_bus(request, bus_id):
         route_id = request.POST.get('route_id')
         travel_date = request.POST.get('travel_date')
         seat_ids = request.POST.getlist('seat_ids')  # List of seat IDs
-        passenger_name = request.POST.get('passenger_name')
-        passenger_age = request.POST.get('passenger_age')
         passenger_gender = request.POST.get('passenger_gender')
-        boarding_point = request.POST.get('boarding_point')
-        dropping_point = request.POST.get('dropping_point')
         
         # Validate passenger gender
         if not passenger_gender or passenger_gender not in ['M', 'F', 'O']:
@@ -240,81 +257,27 @@ def book_bus(request, bus_id):
             return redirect('buses:bus_detail', bus_id=bus_id)
         
         route = get_object_or_404(BusRoute, id=route_id, bus=bus)
-        
-        # Validate ladies seats for male passengers
-        seats = SeatLayout.objects.filter(id__in=seat_ids)
-        for seat in seats:
-            if not seat.can_be_booked_by(passenger_gender):
-                messages.error(request, 
-                    f'Seat {seat.seat_number} is reserved for {seat.get_reserved_for_display()}. '
-                    f'Male passengers cannot book ladies seats.')
-                return redirect('buses:bus_detail', bus_id=bus_id, 
-                               route_id=route_id, travel_date=travel_date)
-        
-        # Create booking
-        date_obj = datetime.strptime(travel_date, '%Y-%m-%d').date()
-        schedule, created = BusSchedule.objects.get_or_create(
-            route=route,
-            date=date_obj,
-            defaults={'available_seats': bus.total_seats, 'fare': route.base_fare}
-        )
-        
-        total_amount = float(route.base_fare) * len(seat_ids)
-        booking = Booking.objects.create(
-            user=request.user,
-            booking_type='bus',
-            total_amount=total_amount,
-            customer_name=passenger_name or request.user.get_full_name() or request.user.username,
-            customer_email=request.user.email,
-            customer_phone=getattr(request.user, 'phone', '') or '',
-        )
-        
-        # Create bus booking details
-        # Resolve display text for boarding/dropping (IDs may be fallback tokens)
-        try:
-            from .models import BoardingPoint as BP, DroppingPoint as DP
-            if boarding_point and boarding_point not in ['__source__', '__dest__']:
-                bp_obj = BP.objects.filter(id=boarding_point).first()
-                boarding_point_text = bp_obj.name if bp_obj else ''
-            else:
-                boarding_point_text = f"{route.source_city.name} ({route.departure_time.strftime('%H:%M')})"
-            if dropping_point and dropping_point not in ['__source__', '__dest__']:
-                dp_obj = DP.objects.filter(id=dropping_point).first()
-                dropping_point_text = dp_obj.name if dp_obj else ''
-            else:
-                dropping_point_text = f"{route.destination_city.name} ({route.arrival_time.strftime('%H:%M')})"
-        except Exception:
-            boarding_point_text = ''
-            dropping_point_text = ''
-
-        bus_booking = BusBooking.objects.create(
-            booking=booking,
-            bus_schedule=schedule,
-            bus_route=route,
-            journey_date=date_obj,
-            boarding_point=boarding_point_text,
-            dropping_point=dropping_point_text,
+        booking = create_bus_booking(
+            request.user,
+            bus,
+            route,
+            datetime.strptime(travel_date, '%Y-%m-%d').date(),
+            seat_ids,
+            {
+                'name': request.POST.get('passenger_name'),
+                'age': request.POST.get('passenger_age'),
+                'gender': passenger_gender,
+            },
+            boarding_point=request.POST.get('boarding_point'),
+            dropping_point=request.POST.get('dropping_point'),
         )
         
-        # Create seat bookings
-        booked_seats = []
-        for seat_id in seat_ids:
-            seat = SeatLayout.objects.get(id=seat_id)
-            BusBookingSeat.objects.create(
-                bus_booking=bus_booking,
-                seat=seat,
-                passenger_name=passenger_name,
-                passenger_age=passenger_age or 0,
-                passenger_gender=passenger_gender,
-            )
-            booked_seats.append(seat)
-        
-        # Update schedule availability
-        schedule.book_seats(len(seat_ids))
-        
         messages.success(request, f'Bus booked successfully! Booking ID: {booking.booking_id}')
         return redirect(reverse('bookings:booking-confirm', kwargs={'booking_id': booking.booking_id}))
     
+    except (BookingValidationError, SeatUnavailableError) as e:
+        messages.error(request, str(e))
+        return redirect(f"{reverse('buses:bus_detail', args=[bus_id])}?route_id={route_id}&travel_date={travel_date}")
     except Exception as e:
         messages.error(request, f'Booking failed: {str(e)}')
         return redirect('buses:bus_detail', bus_id=bus_id)
@@ -331,67 +294,60 @@ class BusSearchView(generics.ListAPIView):
         destination_city = self.request.query_params.get('destination')
         date = self.request.query_params.get('date')
         
-        # First get matching routes
-        routes = BusRoute.objects.filter(is_active=True)
+        # Single range scan over the denormalized search index
+        queryset = BusSearchEntry.objects.all()
         
         if source_city:
             try:
-                scid = int(source_city)
-                routes = routes.filter(source_city_id=scid)
+                queryset = queryset.filter(source_city_id=int(source_city))
             except (ValueError, TypeError):
-                routes = routes.filter(source_city__name__iexact=source_city)
+                queryset = queryset.filter(source_name__iexact=source_city)
         
         if destination_city:
             try:
-                dcid = int(destination_city)
-                routes = routes.filter(destination_city_id=dcid)
+                queryset = queryset.filter(destination_city_id=int(destination_city))
             except (ValueError, TypeError):
-                routes = routes.filter(destination_city__name__iexact=destination_city)
-        
-        # Then get schedules for these routes
-        queryset = BusSchedule.objects.filter(route__in=routes, is_active=True).select_related(
-            'route__bus__operator', 'route__source_city', 'route__destination_city'
-        )
+                queryset = queryset.filter(destination_name__iexact=destination_city)
         
         if date:
             queryset = queryset.filter(date=date)
         
-        return queryset.order_by('route__departure_time')
+        return queryset.order_by('departure_time')
     
     def list(self, request, *args, **kwargs):
         """Override list to provide custom response format"""
         queryset = self.filter_queryset(self.get_queryset())
         
-        # Transform the data for better frontend consumption
         results = []
-        for schedule in queryset:
-            if schedule.route and schedule.route.bus:
-                results.append({
-                    'id': schedule.route.bus.id,
-                    'route_id': schedule.route.id,
-                    'schedule_id': schedule.id,
-                    'bus_number': schedule.route.bus.bus_number,
-                    'bus_name': schedule.route.bus.bus_name,
-                    'bus_type': schedule.route.bus.bus_type,
-                    'operator': schedule.route.bus.operator.name if schedule.route.bus.operator else 'Unknown',
-                    'source_city': schedule.route.source_city.name,
-                    'destination_city': schedule.route.destination_city.name,
-                    'departure_time': schedule.route.departure_time.strftime('%H:%M') if schedule.route.departure_time else '--:--',
-                    'arrival_time': schedule.route.arrival_time.strftime('%H:%M') if schedule.route.arrival_time else '--:--',
-                    'duration_hours': float(schedule.route.duration_hours) if schedule.route.duration_hours else 0,
-                    'distance_km': int(schedule.route.distance_km) if schedule.route.distance_km else 0,
-                    'base_fare': float(schedule.route.base_fare) if schedule.route.base_fare else 0,
-                    'available_seats': schedule.available_seats,
-                    'fare': float(schedule.fare) if schedule.fare else 0,
-                    'amenities': {
-                        'ac': schedule.route.bus.has_ac,
-                        'wifi': schedule.route.bus.has_wifi,
-                        'charging': schedule.route.bus.has_charging_point,
-                        'blanket': schedule.route.bus.has_blanket,
-                        'water': schedule.route.bus.has_water_bottle,
-                        'tv': schedule.route.bus.has_tv,
-                    }
-                })
+        for entry in queryset:
+            amenities = amenity_flags(entry.amenities)
+            results.append({
+                'id': entry.bus_id,
+                'route_id': entry.route_id,
+                'schedule_id': entry.schedule_id,
+                'bus_number': entry.bus_number,
+                'bus_name': entry.bus_name,
+                'bus_type': entry.bus_type,
+                'operator': entry.operator_name,
+                'source_city': entry.source_name,
+                'destination_city': entry.destination_name,
+                'date': entry.date.isoformat(),
+                'departure_time': entry.departure_time.strftime('%H:%M'),
+                'arrival_time': entry.arrival_time.strftime('%H:%M'),
+                'duration_hours': float(entry.duration_hours),
+                'distance_km': int(entry.distance_km),
+                'base_fare': float(entry.base_fare),
+                'available_seats': entry.available_seats,
+                'fare': float(entry.fare),
+                'amenities': {
+                    'ac': amenities['ac'],
+                    'wifi': amenities['wifi'],
+                    'charging': amenities['charging'],
+                    'blanket': amenities['blanket'],
+                    'water': amenities['water'],
+                    'tv': amenities['tv'],
+                }
+            })
         
         return Response({
             'count': len(results),
@@ -399,6 +355,235 @@ class BusSearchView(generics.ListAPIView):
         })
 
 
+def _resolve_city(value):
+    try:
+        return City.objects.filter(id=int(value)).first()
+    except (ValueError, TypeError):
+        return City.objects.filter(name__iexact=value).first()
+
+
+@api_view(['GET'])
+def connection_search_view(request):
+    """
+    Search direct and one-transfer bus journeys
+    
+    Query Parameters:
+    - source: Source city id or name
+    - destination: Destination city id or name
+    - date: Travel date (YYYY-MM-DD)
+    - min_layover: Minimum minutes between buses (default 30)
+    - passengers: Seats needed on every leg (default 1)
+    - limit: Maximum itineraries (default 5, max 20)
+    """
+    serializer = ConnectionSearchSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    source = _resolve_city(data['source'])
+    destination = _resolve_city(data['destination'])
+    if source is None or destination is None:
+        return Response(
+            {'error': 'Unknown source or destination city'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    itineraries = search_connections(
+        source.id, destination.id, data['date'],
+        min_layover=data['min_layover'], passengers=data['passengers'], limit=data['limit']
+    )
+    return Response({
+        'success': True,
+        'count': len(itineraries),
+        'itineraries': itineraries
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def fare_calendar_view(request):
+    """
+    Cheapest fare and seats left per day on a corridor
+    
+    Query Parameters:
+    - source: Source city id or name
+    - destination: Destination city id or name
+    - from: First travel date (YYYY-MM-DD, default today)
+    - days: Number of days (default 30, max 60)
+    """
+    params = request.query_params.dict()
+    if 'from' in params:
+        params['start'] = params.pop('from')
+    serializer = FareCalendarSerializer(data=params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    source = _resolve_city(data['source'])
+    destination = _resolve_city(data['destination'])
+    if source is None or destination is None:
+        return Response(
+            {'error': 'Unknown source or destination city'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    start = max(data.get('start') or timezone.localdate(), timezone.localdate())
+    calendar = get_fare_calendar(source.id, destination.id, start, data['days'])
+    priced = [day for day in calendar if day['min_fare'] is not None]
+    return Response({
+        'success': True,
+        'source': source.name,
+        'destination': destination.name,
+        'from': start.isoformat(),
+        'days': data['days'],
+        'cheapest_date': min(priced, key=lambda day: day['min_fare'])['date'] if priced else None,
+        'calendar': calendar
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def schedule_seat_map_view(request, schedule_id):
+    """
+    Seat map for one departure: the cached layout template merged with occupancy
+    
+    Query Parameters:
+    - boarding_point: Boarding point id (default route source)
+    - dropping_point: Dropping point id (default route destination)
+    """
+    schedule = get_object_or_404(BusSchedule.objects.select_related('route'), id=schedule_id)
+    route = schedule.route
+    try:
+        segments = journey_segments(
+            route,
+            _point_city(route.boarding_points, request.query_params.get('boarding_point')),
+            _point_city(route.dropping_points, request.query_params.get('dropping_point')),
+        )
+    except InvalidJourneyError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    template = get_layout(route.bus_id)
+    seats = merge_occupancy(
+        template, blocked_positions(schedule.segment_masks, segments), schedule.seat_prices,
+        departure_reservations(template, schedule.id, schedule.segment_masks)
+    )
+    
+    return Response({
+        'success': True,
+        'schedule_id': schedule.id,
+        'bus_id': route.bus_id,
+        'layout_version': template['version'],
+        'fare': float(schedule.fare),
+        'available_seats': schedule.available_seats,
+        'decks': template['decks'],
+        'seats': seats
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def recommend_seats_view(request, schedule_id):
+    """
+    Recommend seat blocks for a group travelling together
+    
+    Query Parameters:
+    - count: Number of travellers (1-6)
+    - genders: Comma-separated M/F/O per traveller (default O)
+    - window: true to prefer window seats
+    - deck: Preferred deck (1 lower, 2 upper)
+    - boarding_point / dropping_point: Point ids for partial journeys
+    - limit: Number of suggestions (default 3)
+    """
+    serializer = SeatRecommendationSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    schedule = get_object_or_404(BusSchedule.objects.select_related('route'), id=schedule_id)
+    route = schedule.route
+    try:
+        segments = journey_segments(
+            route,
+            _point_city(route.boarding_points, data.get('boarding_point')),
+            _point_city(route.dropping_points, data.get('dropping_point')),
+        )
+    except InvalidJourneyError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    recommendations = recommend_seats(
+        schedule, blocked_positions(schedule.segment_masks, segments), data['count'], data['genders'],
+        prefer_window=data['window'], deck=data.get('deck'), limit=data['limit']
+    )
+    return Response({
+        'success': True,
+        'schedule_id': schedule.id,
+        'count': data['count'],
+        'recommendations': recommendations
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def telemetry_ingest_view(request):
+    """
+    Accept a batch of GPS pings from vehicles
+    
+    Body: {"pings": [{"bus": "<bus number>", "ts": "<ISO datetime>", "lat": .., "lng": ..,
+    "speed": .., "heading": ..}, ...]}, at most MAX_BATCH_SIZE pings.
+    Devices send the X-Telemetry-Token header (BUS_TELEMETRY_TOKEN); without a
+    configured token only staff may post.
+    """
+    telemetry_token = getattr(settings, 'BUS_TELEMETRY_TOKEN', '')
+    if telemetry_token:
+        if request.headers.get('X-Telemetry-Token') != telemetry_token:
+            return Response({'error': 'Invalid telemetry token'}, status=status.HTTP_403_FORBIDDEN)
+    elif not request.user.is_staff:
+        return Response({'error': 'Telemetry requires a device token'}, status=status.HTTP_403_FORBIDDEN)
+    
+    pings = request.data.get('pings') if isinstance(request.data, dict) else None
+    if not isinstance(pings, list) or not pings:
+        return Response({'error': 'pings must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(pings) > MAX_BATCH_SIZE:
+        return Response(
+            {'error': f'At most {MAX_BATCH_SIZE} pings per batch'}, status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    result = ingest_pings(pings)
+    return Response({'success': True, **result}, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+def live_position_view(request, schedule_id):
+    """
+    Where is my bus: last known position and expected pickup for a departure
+    
+    Query Parameters:
+    - boarding_point: Boarding point id (default first pickup of the route)
+    """
+    schedule = get_object_or_404(BusSchedule.objects.select_related('route', 'route__bus'), id=schedule_id)
+    route = schedule.route
+    points = route.boarding_points.filter(is_active=True)
+    boarding_point = None
+    if request.query_params.get('boarding_point'):
+        try:
+            boarding_point = points.filter(id=int(request.query_params['boarding_point'])).first()
+        except ValueError:
+            pass
+        if boarding_point is None:
+            return Response({'error': 'Unknown boarding point'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        boarding_point = points.first()
+    
+    position = latest_position(route.bus_id) if route.bus.has_gps_tracking else None
+    if position is not None:
+        age = (timezone.now() - datetime.fromisoformat(position['recorded_at'])).total_seconds()
+        position = dict(position, age_seconds=int(age), is_stale=age > STALE_AFTER_SECONDS)
+    
+    return Response({
+        'success': True,
+        'schedule_id': schedule.id,
+        'bus_id': route.bus_id,
+        'tracking': route.bus.has_gps_tracking,
+        'is_cancelled': schedule.is_cancelled,
+        'position': position,
+        'pickup': estimate_pickup(schedule, boarding_point, position) if boarding_point else None,
+    }, status=status.HTTP_200_OK)
+
+
 class BusRouteListView(generics.ListAPIView):
     """List all bus routes"""
     queryset = BusRoute.objects.filter(is_active=True)
@@ -0,0 +1,45 @@
+"""
+Rollup Helpers
+Incremental upserts for the daily dashboard rollup tables
+"""
+
+from typing import Collection, Dict, Optional, Sequence, Tuple
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+def status_delta(old_status: Optional[str], new_status: str, statuses: Collection[str]) -> int:
+    """
+    +1 when a row moves into one of the statuses, -1 when it leaves them,
+    else 0
+
+    Rollup counters driven by this always equal the number of rows
+    currently in those statuses, which is what a rebuild counts.
+    """
+    return int(new_status in statuses) - int(old_status in statuses)
+
+
+def apply_deltas(model, key_fields: Sequence[str], rows: Dict[tuple, Tuple[dict, dict]]):
+    """
+    Add counter deltas to rollup rows, creating missing rows first
+
+    rows maps a key tuple (values for key_fields) to (defaults, deltas):
+    defaults fill a row the first time it is created, deltas are added to
+    its counters with F() expressions so concurrent writers never lose an
+    increment. One INSERT for the batch, then one UPDATE per row.
+    """
+    rows = {key: (defaults, deltas) for key, (defaults, deltas) in rows.items() if any(deltas.values())}
+    if not rows:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        model.objects.bulk_create(
+            [model(**dict(zip(key_fields, key)), **defaults) for key, (defaults, _) in rows.items()],
+            ignore_conflicts=True,
+        )
+        for key, (_, deltas) in rows.items():
+            model.objects.filter(**dict(zip(key_fields, key))).update(
+                updated_at=now, **{field: F(field) + value for field, value in deltas.items() if value}
+            )
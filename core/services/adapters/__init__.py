@@ -5,8 +5,10 @@ Adapters should subclass the corresponding Base classes in core.services.
 """
 
 __all__ = [
+    'http_bus_adapter',
     'redbus_adapter',
     'abhibus_adapter',
+    'fake_bus_provider',
     'ezee_adapter',
     'staah_adapter',
 ]
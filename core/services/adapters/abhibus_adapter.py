@@ -1,17 +1,52 @@
-from ..bus_channel_base import BusChannelBase
+from .http_bus_adapter import HttpBusChannelAdapter
 
 
-class AbhiBusAdapter(BusChannelBase):
-    """Stub adapter for AbhiBus provider."""
+class AbhiBusAdapter(HttpBusChannelAdapter):
+    """Adapter for the AbhiBus partner API.
 
-    def push_inventory(self, inventory_data: dict) -> dict:
-        raise NotImplementedError()
+    credentials: base_url, api_key, partner_id.
+    """
 
-    def fetch_inventory(self, params: dict) -> dict:
-        raise NotImplementedError()
+    provider = 'abhibus'
+    max_batch_size = 50
+    requests_per_second = 5.0
 
-    def create_booking(self, booking_payload: dict) -> dict:
-        raise NotImplementedError()
+    push_path = '/api/v2/availability'
+    fetch_path = '/api/v2/availability'
+    booking_path = '/api/v2/bookings'
+    cancel_path = '/api/v2/bookings/{booking_id}/cancel'
 
-    def cancel_booking(self, external_booking_id: str, reason: str = '') -> dict:
-        raise NotImplementedError()
+    def auth_headers(self) -> dict:
+        return {
+            'X-Api-Key': self.credentials.get('api_key', ''),
+            'X-Partner-Id': str(self.credentials.get('partner_id', '')),
+        }
+
+    def inventory_payload(self, updates):
+        return {
+            'trips': [
+                {
+                    'tripCode': update['service_id'],
+                    'travelDate': update['date'],
+                    'seatsAvailable': update['available_seats'],
+                    'fare': update['fare'],
+                    'active': update['is_active'],
+                }
+                for update in updates
+            ],
+        }
+
+    def fetch_params(self, params):
+        return {'source': params['source'], 'destination': params['destination'], 'travelDate': params['date']}
+
+    def parse_inventory(self, data):
+        return [
+            {
+                'service_id': str(trip['tripCode']),
+                'date': trip['travelDate'],
+                'available_seats': int(trip['seatsAvailable']),
+                'fare': str(trip['fare']),
+                'is_active': bool(trip.get('active', True)),
+            }
+            for trip in data.get('trips', [])
+        ]
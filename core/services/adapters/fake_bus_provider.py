@@ -0,0 +1,184 @@
+"""In-process fake of the redBus and AbhiBus APIs for tests and benchmarks.
+
+    server = FakeBusProviderServer(rate_limit=20).start()
+    adapter = RedbusAdapter({'base_url': server.url('redbus'), 'api_key': 'test', 'operator_code': 'GOEXP'})
+    ...
+    server.stop()
+
+Each provider lives under its own path prefix. Pushed inventory is stored
+in memory and served back by the fetch endpoints; requests beyond
+rate_limit per second get HTTP 429 with a Retry-After header.
+"""
+
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Endpoints and wire field names (service id, date, seats, fare) per provider
+DIALECTS = {
+    'redbus': {
+        'auth_header': 'Authorization',
+        'inventory': '/v1/inventory',
+        'push': '/v1/inventory/batch',
+        'bookings': '/v1/bookings',
+        'collection': 'inventory',
+        'fetch_collection': 'services',
+        'fields': ('serviceId', 'journeyDate', 'availableSeats', 'fare'),
+        'date_param': 'journeyDate',
+    },
+    'abhibus': {
+        'auth_header': 'X-Api-Key',
+        'inventory': '/api/v2/availability',
+        'push': '/api/v2/availability',
+        'bookings': '/api/v2/bookings',
+        'collection': 'trips',
+        'fetch_collection': 'trips',
+        'fields': ('tripCode', 'travelDate', 'seatsAvailable', 'fare'),
+        'date_param': 'travelDate',
+    },
+}
+
+
+class FakeBusProviderServer:
+    """Threaded HTTP server holding per-provider inventory in memory"""
+
+    def __init__(self, rate_limit: Optional[float] = None, latency: float = 0.0):
+        self.rate_limit = rate_limit
+        self.latency = latency
+        # provider -> {(service_id, date): wire-format row}
+        self.inventory: Dict[str, Dict[tuple, dict]] = {provider: {} for provider in DIALECTS}
+        self.requests: List[dict] = []
+        self.lock = threading.Lock()
+        self._window = (0, 0)
+        self._server = None
+        self._thread = None
+
+    def start(self) -> 'FakeBusProviderServer':
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def url(self, provider: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/{provider}'
+
+    def seed(self, provider: str, rows: List[dict]):
+        """Store normalized rows ({service_id, date, available_seats, fare}) as if pushed by another seller"""
+        service, day, seats, fare = DIALECTS[provider]['fields']
+        with self.lock:
+            for row in rows:
+                self.inventory[provider][(row['service_id'], row['date'])] = {
+                    service: row['service_id'], day: row['date'], seats: row['available_seats'], fare: row['fare'],
+                }
+
+    def pushes(self, provider: str) -> List[dict]:
+        return [request for request in self.requests if request['provider'] == provider and request['kind'] == 'push']
+
+    def reset(self):
+        with self.lock:
+            self.inventory = {provider: {} for provider in DIALECTS}
+            self.requests = []
+            self._window = (0, 0)
+
+    def _admit(self) -> bool:
+        """Fixed one-second window; False once the window is spent"""
+        if not self.rate_limit:
+            return True
+        with self.lock:
+            second = int(time.monotonic())
+            window, count = self._window
+            count = count + 1 if window == second else 1
+            self._window = (second, count)
+            return count <= self.rate_limit
+
+
+def _handler_for(server: FakeBusProviderServer):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status: int, body: dict, headers: Optional[dict] = None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _route(self):
+            url = urlparse(self.path)
+            provider, _, path = url.path.lstrip('/').partition('/')
+            return provider, '/' + path, parse_qs(url.query)
+
+        def _guard(self, provider) -> Optional[dict]:
+            if server.latency:
+                time.sleep(server.latency)
+            dialect = DIALECTS.get(provider)
+            if dialect is None:
+                self._reply(404, {'error': 'unknown provider'})
+            elif not self.headers.get(dialect['auth_header'], '').replace('Bearer', '').strip():
+                self._reply(401, {'error': 'missing credentials'})
+            elif not server._admit():
+                self._reply(429, {'error': 'rate limited'}, {'Retry-After': '1'})
+            else:
+                return dialect
+            return None
+
+        def do_GET(self):
+            provider, path, query = self._route()
+            dialect = self._guard(provider)
+            if dialect is None:
+                return
+            if path != dialect['inventory']:
+                return self._reply(404, {'error': 'not found'})
+            day = query.get(dialect['date_param'], [''])[0]
+            with server.lock:
+                rows = [row for (_, row_day), row in server.inventory[provider].items() if not day or row_day == day]
+                server.requests.append({'provider': provider, 'kind': 'fetch', 'size': len(rows)})
+            self._reply(200, {dialect['fetch_collection']: rows})
+
+        def do_POST(self):
+            provider, path, _ = self._route()
+            dialect = self._guard(provider)
+            if dialect is None:
+                return
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+            except ValueError:
+                return self._reply(400, {'error': 'invalid json'})
+
+            if path == dialect['push']:
+                rows = body.get(dialect['collection'], [])
+                service, day = dialect['fields'][:2]
+                with server.lock:
+                    for row in rows:
+                        server.inventory[provider][(row[service], row[day])] = row
+                    server.requests.append({'provider': provider, 'kind': 'push', 'size': len(rows), 'body': body})
+                return self._reply(200, {'accepted': len(rows)})
+            if path == dialect['bookings']:
+                with server.lock:
+                    server.requests.append({'provider': provider, 'kind': 'booking', 'size': 1, 'body': body})
+                return self._reply(201, {'bookingId': f'FAKE-{uuid.uuid4().hex[:10].upper()}', 'status': 'CONFIRMED'})
+            if path.startswith(dialect['bookings'] + '/') and path.endswith('/cancel'):
+                booking_id = path[len(dialect['bookings']) + 1:-len('/cancel')]
+                with server.lock:
+                    server.requests.append({'provider': provider, 'kind': 'cancel', 'size': 1, 'body': body})
+                return self._reply(200, {'bookingId': booking_id, 'status': 'CANCELLED'})
+            self._reply(404, {'error': 'not found'})
+
+    return Handler
@@ -0,0 +1,159 @@
+"""Shared HTTP transport for bus channel adapters.
+
+Provider adapters subclass HttpBusChannelAdapter and only describe their
+endpoints and payload shapes. Updates and fetched services use one
+normalized shape across providers:
+
+    {"service_id": str, "date": "YYYY-MM-DD", "available_seats": int,
+     "fare": "850.00", "is_active": bool}
+"""
+
+import logging
+import threading
+import time
+from abc import abstractmethod
+from typing import Dict, List
+
+import requests
+
+from ..bus_channel_base import BusChannelBase
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelError(Exception):
+    """Raised when a channel rejects a request or cannot be reached"""
+
+
+class ChannelRateLimited(ChannelError):
+    """Raised on HTTP 429; retry_after is the back-off the channel asked for, in seconds"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimiter:
+    """Token bucket; callers wait for a token rather than being refused"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Take the token now, even into debt, so waiters queue up in order
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+# One bucket per provider endpoint, shared by every adapter in the process
+_limiters: Dict[tuple, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, base_url: str, rate: float, burst: int) -> RateLimiter:
+    with _limiters_lock:
+        key = (provider, base_url, rate, burst)
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(rate, burst)
+        return _limiters[key]
+
+
+class HttpBusChannelAdapter(BusChannelBase):
+    """Bus channel over a JSON HTTP API with batching and rate limiting.
+
+    credentials: base_url and the provider's auth keys, plus optional
+    timeout, batch_size (capped at max_batch_size) and requests_per_second.
+    """
+
+    provider = ''
+    max_batch_size = 100
+    requests_per_second = 5.0
+    timeout = 10
+
+    push_path = ''
+    fetch_path = ''
+    booking_path = ''
+    cancel_path = ''
+
+    def __init__(self, credentials: dict):
+        super().__init__(credentials)
+        self.base_url = credentials['base_url'].rstrip('/')
+        self.timeout = credentials.get('timeout', self.timeout)
+        self.batch_size = min(int(credentials.get('batch_size', self.max_batch_size)), self.max_batch_size)
+        rate = float(credentials.get('requests_per_second', self.requests_per_second))
+        self.limiter = get_limiter(self.provider, self.base_url, rate, int(credentials.get('burst', rate) or 1))
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json', **self.auth_headers()})
+
+    # Provider hooks
+
+    @abstractmethod
+    def auth_headers(self) -> dict:
+        """Headers that authenticate every request."""
+
+    @abstractmethod
+    def inventory_payload(self, updates: List[dict]) -> dict:
+        """Request body pushing one batch of normalized updates."""
+
+    @abstractmethod
+    def fetch_params(self, params: dict) -> dict:
+        """Query string for fetching a corridor's inventory on a date."""
+
+    @abstractmethod
+    def parse_inventory(self, data: dict) -> List[dict]:
+        """Normalized services from a fetch response."""
+
+    # Transport
+
+    def _request(self, method: str, path: str, **kwargs) -> dict:
+        self.limiter.acquire()
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            raise ChannelError(f'{self.provider} {method} {path} failed: {exc}') from exc
+        if response.status_code == 429:
+            retry_after = response.headers.get('Retry-After', '1')
+            raise ChannelRateLimited(
+                f'{self.provider} rate limited {method} {path}',
+                retry_after=float(retry_after) if retry_after.replace('.', '', 1).isdigit() else 1.0,
+            )
+        if response.status_code >= 400:
+            raise ChannelError(f'{self.provider} {method} {path}: HTTP {response.status_code} {response.text[:200]}')
+        if not response.content:
+            return {}
+        try:
+            return response.json()
+        except ValueError as exc:
+            raise ChannelError(f'{self.provider} {method} {path}: invalid JSON {response.text[:200]}') from exc
+
+    # BusChannelBase
+
+    def push_inventory(self, inventory_data: dict) -> dict:
+        """Send {"updates": [...]} in batches of batch_size, one request per batch."""
+        updates = inventory_data.get('updates', [])
+        responses = []
+        for start in range(0, len(updates), self.batch_size):
+            batch = updates[start:start + self.batch_size]
+            responses.append(self._request('POST', self.push_path, json=self.inventory_payload(batch)))
+        return {'provider': self.provider, 'sent': len(updates), 'batches': len(responses), 'responses': responses}
+
+    def fetch_inventory(self, params: dict) -> dict:
+        """Availability for {"source", "destination", "date"} (city codes, ISO date) as normalized services."""
+        data = self._request('GET', self.fetch_path, params=self.fetch_params(params))
+        return {'provider': self.provider, 'services': self.parse_inventory(data)}
+
+    def create_booking(self, booking_payload: dict) -> dict:
+        return self._request('POST', self.booking_path, json=booking_payload)
+
+    def cancel_booking(self, external_booking_id: str, reason: str = '') -> dict:
+        return self._request('POST', self.cancel_path.format(booking_id=external_booking_id), json={'reason': reason})
@@ -1,22 +1,54 @@
-from ..bus_channel_base import BusChannelBase
+from .http_bus_adapter import HttpBusChannelAdapter
 
 
-class RedbusAdapter(BusChannelBase):
-    """Stub adapter for RedBus. Fill network calls and auth handling here.
+class RedbusAdapter(HttpBusChannelAdapter):
+    """Adapter for the redBus operator API.
+
+    credentials: base_url, api_key (bearer token), operator_code.
 
     Example usage:
         adapter = RedbusAdapter(credentials)
-        resp = adapter.create_booking(payload)
-"""
+        adapter.push_inventory({'updates': [...]})
+    """
+
+    provider = 'redbus'
+    max_batch_size = 100
+    requests_per_second = 10.0
+
+    push_path = '/v1/inventory/batch'
+    fetch_path = '/v1/inventory'
+    booking_path = '/v1/bookings'
+    cancel_path = '/v1/bookings/{booking_id}/cancel'
 
-    def push_inventory(self, inventory_data: dict) -> dict:
-        raise NotImplementedError('Implement Redbus inventory push')
+    def auth_headers(self) -> dict:
+        return {'Authorization': f"Bearer {self.credentials.get('api_key', '')}"}
 
-    def fetch_inventory(self, params: dict) -> dict:
-        raise NotImplementedError('Implement Redbus inventory fetch')
+    def inventory_payload(self, updates):
+        return {
+            'operatorCode': self.credentials.get('operator_code', ''),
+            'inventory': [
+                {
+                    'serviceId': update['service_id'],
+                    'journeyDate': update['date'],
+                    'availableSeats': update['available_seats'],
+                    'fare': update['fare'],
+                    'status': 'OPEN' if update['is_active'] else 'CLOSED',
+                }
+                for update in updates
+            ],
+        }
 
-    def create_booking(self, booking_payload: dict) -> dict:
-        raise NotImplementedError('Implement Redbus create booking')
+    def fetch_params(self, params):
+        return {'fromCity': params['source'], 'toCity': params['destination'], 'journeyDate': params['date']}
 
-    def cancel_booking(self, external_booking_id: str, reason: str = '') -> dict:
-        raise NotImplementedError('Implement Redbus cancel booking')
+    def parse_inventory(self, data):
+        return [
+            {
+                'service_id': str(service['serviceId']),
+                'date': service['journeyDate'],
+                'available_seats': int(service['availableSeats']),
+                'fare': str(service['fare']),
+                'is_active': service.get('status', 'OPEN') == 'OPEN',
+            }
+            for service in data.get('services', [])
+        ]
@@ -6,6 +6,7 @@ Simple, predictable, easy to maintain.
 from pathlib import Path
 from decouple import config
 import dj_database_url
+from celery.schedules import crontab
 
 # --------------------------------------------------
 # Base
@@ -166,6 +167,32 @@ RAZORPAY_KEY_SECRET = config("RAZORPAY_KEY_SECRET", default="")
 STRIPE_PUBLIC_KEY = config("STRIPE_PUBLIC_KEY", default="")
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
 
+# --------------------------------------------------
+# Meta-search feed (partners pass ?token=; empty = staff only)
+# --------------------------------------------------
+META_FEED_TOKEN = config("META_FEED_TOKEN", default="")
+
+# --------------------------------------------------
+# Bus GPS telemetry (devices send X-Telemetry-Token; empty = staff only)
+# --------------------------------------------------
+BUS_TELEMETRY_TOKEN = config("BUS_TELEMETRY_TOKEN", default="")
+
+# --------------------------------------------------
+# Bus channels (inventory sync; empty base URL = channel off)
+# --------------------------------------------------
+BUS_CHANNELS = {
+    "redbus": {
+        "base_url": config("REDBUS_API_URL", default=""),
+        "api_key": config("REDBUS_API_KEY", default=""),
+        "operator_code": config("REDBUS_OPERATOR_CODE", default=""),
+    },
+    "abhibus": {
+        "base_url": config("ABHIBUS_API_URL", default=""),
+        "api_key": config("ABHIBUS_API_KEY", default=""),
+        "partner_id": config("ABHIBUS_PARTNER_ID", default=""),
+    },
+}
+
 # --------------------------------------------------
 # CORS (DEV)
 # --------------------------------------------------
@@ -199,6 +226,54 @@ CACHES = {
 }
 SESSION_ENGINE = "django.contrib.sessions.backends.db"
 
+# --------------------------------------------------
+# Celery (background jobs)
+# --------------------------------------------------
+CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://127.0.0.1:6379/0")
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    "expire-stale-inventory-locks": {
+        "task": "hotels.tasks.expire_stale_locks_task",
+        "schedule": 60.0,
+    },
+    "expire-stale-seat-holds": {
+        "task": "buses.tasks.expire_stale_seat_holds_task",
+        "schedule": 60.0,
+    },
+    "generate-bus-schedules": {
+        "task": "buses.tasks.generate_bus_schedules_task",
+        "schedule": crontab(hour=1, minute=0),
+    },
+    "recompute-bus-fares": {
+        "task": "buses.tasks.recompute_bus_fares_task",
+        "schedule": 900.0,
+    },
+    "flush-bus-channel-updates": {
+        "task": "buses.tasks.flush_bus_channel_updates_task",
+        "schedule": 60.0,
+    },
+    "refresh-bus-channel-inventory": {
+        "task": "buses.tasks.refresh_bus_channel_inventory_task",
+        "schedule": 900.0,
+    },
+    "compact-bus-telemetry": {
+        "task": "buses.tasks.compact_bus_telemetry_task",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "rebalance-inventory-shards": {
+        "task": "hotels.tasks.rebalance_inventory_shards_task",
+        "schedule": 300.0,
+    },
+    "compute-hotel-popularity": {
+        "task": "hotels.tasks.compute_hotel_popularity_task",
+        "schedule": crontab(hour=2, minute=0),
+    },
+    "build-cobooking-recommendations": {
+        "task": "bookings.tasks.build_recommendations_task",
+        "schedule": crontab(hour=2, minute=30),
+    },
+}
+
 # --------------------------------------------------
 # Crispy Forms
 # --------------------------------------------------
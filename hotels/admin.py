@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Hotel, HotelImage, RoomType, RoomAvailability, ChannelManagerRoomMapping
+from .models import (
+    Hotel, HotelImage, RoomType, RatePlan, RoomAvailability, RoomAvailabilityShard, ChannelManagerRoomMapping,
+    FeedExport,
+)
 
 
 class HotelImageInline(admin.TabularInline):
@@ -13,6 +16,14 @@ class RoomTypeInline(admin.TabularInline):
     fields = ['name', 'room_type', 'max_occupancy', 'base_price', 'total_rooms', 'is_available']
 
 
+class RatePlanInline(admin.TabularInline):
+    model = RatePlan
+    fk_name = 'room_type'
+    extra = 0
+    fields = ['name', 'code', 'parent', 'meal_plan', 'is_refundable', 'adjustment_type',
+              'adjustment_value', 'meal_supplement', 'is_active']
+
+
 @admin.register(Hotel)
 class HotelAdmin(admin.ModelAdmin):
     list_display = ['name', 'city', 'star_rating', 'review_rating', 'is_featured', 'is_active']
@@ -20,6 +31,7 @@ class HotelAdmin(admin.ModelAdmin):
     search_fields = ['name', 'city__name', 'address']
     list_editable = ['is_featured', 'is_active']
     list_select_related = ['city']
+    readonly_fields = ['popularity_score', 'popularity_updated_at']
     inlines = [HotelImageInline, RoomTypeInline]
     
     fieldsets = (
@@ -31,7 +43,7 @@ class HotelAdmin(admin.ModelAdmin):
             'description': 'Hotel main image (will be used as thumbnail)'
         }),
         ('Ratings & Reviews', {
-            'fields': ('star_rating', 'review_rating', 'review_count')
+            'fields': ('star_rating', 'review_rating', 'review_count', 'popularity_score', 'popularity_updated_at')
         }),
         ('Inventory & Channel Manager', {
             'fields': ('inventory_source', 'channel_manager_name')
@@ -53,11 +65,21 @@ class HotelAdmin(admin.ModelAdmin):
 
 @admin.register(RoomType)
 class RoomTypeAdmin(admin.ModelAdmin):
-    list_display = ['name', 'hotel', 'room_type', 'max_occupancy', 'base_price', 'total_rooms', 'is_available']
+    list_display = ['name', 'hotel', 'room_type', 'max_occupancy', 'base_price', 'total_rooms', 'inventory_shards', 'is_available']
     list_filter = ['room_type', 'is_available', 'hotel__city']
     search_fields = ['name', 'hotel__name']
     list_select_related = ['hotel', 'hotel__city']
     list_editable = ['is_available']
+    inlines = [RatePlanInline]
+
+
+@admin.register(RatePlan)
+class RatePlanAdmin(admin.ModelAdmin):
+    list_display = ['name', 'room_type', 'code', 'parent', 'meal_plan', 'is_refundable',
+                    'adjustment_type', 'adjustment_value', 'meal_supplement', 'is_active']
+    list_filter = ['meal_plan', 'is_refundable', 'adjustment_type', 'is_active']
+    search_fields = ['name', 'code', 'room_type__name', 'room_type__hotel__name']
+    list_select_related = ['room_type', 'room_type__hotel', 'parent']
 
 
 @admin.register(RoomAvailability)
@@ -69,9 +91,26 @@ class RoomAvailabilityAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
 
 
+@admin.register(RoomAvailabilityShard)
+class RoomAvailabilityShardAdmin(admin.ModelAdmin):
+    list_display = ['room_type', 'date', 'shard', 'available_rooms']
+    list_select_related = ['room_type', 'room_type__hotel']
+    list_filter = ['date', 'room_type__hotel']
+    search_fields = ['room_type__name', 'room_type__hotel__name']
+    date_hierarchy = 'date'
+
+
 @admin.register(ChannelManagerRoomMapping)
 class ChannelManagerRoomMappingAdmin(admin.ModelAdmin):
     list_display = ['hotel', 'room_type', 'provider', 'external_room_id', 'is_active']
     list_filter = ['provider', 'is_active', 'hotel__city']
     search_fields = ['hotel__name', 'room_type__name', 'external_room_id']
     list_select_related = ['hotel', 'room_type']
+
+
+@admin.register(FeedExport)
+class FeedExportAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'feed_format', 'is_delta', 'changed_since', 'row_count', 'completed_at']
+    list_filter = ['feed_format', 'is_delta']
+    readonly_fields = ['feed_format', 'is_delta', 'changed_since', 'started_at', 'completed_at',
+                       'start_date', 'days', 'row_count', 'file_path']
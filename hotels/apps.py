@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class HotelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'hotels'
+
+    def ready(self):
+        # Import signals to wire cache invalidation
+        from . import signals  # noqa: F401
@@ -1,4 +1,5 @@
 import logging
+import random
 import uuid
 from datetime import date, datetime, timedelta
 from typing import Optional
@@ -6,11 +7,12 @@ from typing import Optional
 import requests
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Min
+from django.db.models import F, Min, Sum
 from django.utils import timezone
 
 from bookings.models import InventoryLock
-from .models import ChannelManagerRoomMapping, Hotel, RoomAvailability, RoomType
+from .discount_service import release_discount_for_lock
+from .models import ChannelManagerRoomMapping, Hotel, RoomAvailability, RoomAvailabilityShard, RoomType
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,19 @@ def _date_range(start: date, end: date):
         current += timedelta(days=1)
 
 
+def _split_evenly(total: int, parts: int):
+    base, remainder = divmod(max(total, 0), parts)
+    return [base + (1 if index < remainder else 0) for index in range(parts)]
+
+
+def sharded_night_rooms(shard_rooms: int, available_rooms: int, shard_total: Optional[int]) -> int:
+    """Rooms left on a sharded night: the shard sum plus RoomAvailability edits not yet rebalanced in."""
+    if shard_total is None:
+        return shard_rooms
+    # Rooms taken away below what is already held leave the night sold out
+    return max(shard_rooms + available_rooms - shard_total, 0)
+
+
 class ExternalChannelManagerClient:
     """Simple HTTP client for external channel manager integrations."""
 
@@ -172,10 +187,55 @@ class InternalInventoryService:
                 defaults={"available_rooms": room_type.total_rooms, "price": room_type.base_price},
             )
 
+    def ensure_shard_rows(self, room_type: RoomType, check_in: date, check_out: date):
+        """Split nights that have no shard rows yet across the room type's shards."""
+        self.ensure_availability_rows(room_type, check_in, check_out)
+        shard_count = room_type.inventory_shards
+        sharded_dates = set(
+            RoomAvailabilityShard.objects.filter(
+                room_type=room_type, date__gte=check_in, date__lt=check_out
+            ).values_list("date", flat=True)
+        )
+        missing = list(
+            RoomAvailability.objects.filter(
+                room_type=room_type, date__gte=check_in, date__lt=check_out
+            ).exclude(date__in=sharded_dates)
+        )
+
+        rows = []
+        for slot in missing:
+            slot.shard_total = slot.available_rooms
+            for shard, count in enumerate(_split_evenly(slot.available_rooms, shard_count)):
+                rows.append(
+                    RoomAvailabilityShard(room_type=room_type, date=slot.date, shard=shard, available_rooms=count)
+                )
+        if rows:
+            RoomAvailabilityShard.objects.bulk_create(rows, ignore_conflicts=True)
+            RoomAvailability.objects.bulk_update(missing, ["shard_total"])
+
+    def sharded_availability(self, room_type: RoomType, check_in: date, check_out: date):
+        """Rooms left per night: the shard sum plus RoomAvailability edits not yet rebalanced in."""
+        self.ensure_shard_rows(room_type, check_in, check_out)
+        totals = dict(
+            RoomAvailabilityShard.objects.filter(room_type=room_type, date__gte=check_in, date__lt=check_out)
+            .values("date")
+            .annotate(rooms=Sum("available_rooms"))
+            .values_list("date", "rooms")
+        )
+        for day, rooms, shard_total in RoomAvailability.objects.filter(
+            room_type=room_type, date__gte=check_in, date__lt=check_out, shard_total__isnull=False
+        ).values_list("date", "available_rooms", "shard_total"):
+            if day in totals:
+                totals[day] = sharded_night_rooms(totals[day], rooms, shard_total)
+        return totals
+
     def summarize(self, room_type: RoomType, check_in: date, check_out: date):
         self.ensure_availability_rows(room_type, check_in, check_out)
         qs = RoomAvailability.objects.filter(room_type=room_type, date__gte=check_in, date__lt=check_out)
-        available = qs.aggregate(min_rooms=Min("available_rooms")).get("min_rooms")
+        if room_type.inventory_shards > 1:
+            available = min(self.sharded_availability(room_type, check_in, check_out).values(), default=None)
+        else:
+            available = qs.aggregate(min_rooms=Min("available_rooms")).get("min_rooms")
         rate = qs.aggregate(min_rate=Min("price")).get("min_rate") or room_type.base_price
         return {"available_rooms": available, "rate": float(rate), "currency": "INR"}
 
@@ -183,6 +243,9 @@ class InternalInventoryService:
         check_in = _ensure_date(check_in)
         check_out = _ensure_date(check_out)
 
+        if room_type.inventory_shards > 1:
+            return self._lock_sharded_inventory(room_type, check_in, check_out, num_rooms, hold_minutes)
+
         with transaction.atomic():
             self.ensure_availability_rows(room_type, check_in, check_out)
             slots = list(
@@ -199,7 +262,7 @@ class InternalInventoryService:
 
             for slot in slots:
                 slot.available_rooms -= num_rooms
-                slot.save(update_fields=["available_rooms"])
+                slot.save(update_fields=["available_rooms", "updated_at"])
 
             reference_id = f"ICM-{uuid.uuid4().hex[:10].upper()}"
             lock = InventoryLock.objects.create(
@@ -217,6 +280,83 @@ class InternalInventoryService:
             )
             return lock
 
+    def _lock_sharded_inventory(self, room_type: RoomType, check_in: date, check_out: date, num_rooms: int, hold_minutes: int):
+        """Hold rooms by decrementing one random shard per night, spilling over to the others.
+
+        Each decrement is a conditional UPDATE on a single shard row, so
+        concurrent buyers only queue behind each other when they land on the
+        same shard.
+        """
+        self.ensure_shard_rows(room_type, check_in, check_out)
+        # Edits made to RoomAvailability since the last rebalance count before selling
+        for day in (
+            RoomAvailability.objects.filter(
+                room_type=room_type, date__gte=check_in, date__lt=check_out, shard_total__isnull=False
+            )
+            .exclude(available_rooms=F("shard_total"))
+            .values_list("date", flat=True)
+        ):
+            _rebalance_night(room_type, day)
+        shard_ids = {}
+        for shard_id, day in (
+            RoomAvailabilityShard.objects.filter(room_type=room_type, date__gte=check_in, date__lt=check_out)
+            .order_by("date", "shard")
+            .values_list("id", "date")
+        ):
+            shard_ids.setdefault(day, []).append(shard_id)
+
+        with transaction.atomic():
+            taken = {}
+            for day in _date_range(check_in, check_out):
+                ids = shard_ids.get(day, [])
+                taken[day.isoformat()] = self._take_from_shards(ids, num_rooms, day)
+
+            reference_id = f"ICM-{uuid.uuid4().hex[:10].upper()}"
+            return InventoryLock.objects.create(
+                hotel=self.hotel,
+                room_type=room_type,
+                reference_id=reference_id,
+                lock_id=reference_id,
+                source="internal_cm",
+                provider="internal",
+                check_in=check_in,
+                check_out=check_out,
+                num_rooms=num_rooms,
+                expires_at=timezone.now() + timedelta(minutes=hold_minutes),
+                payload={"type": "hold", "shards": taken},
+            )
+
+    def _take_from_shards(self, ids, num_rooms: int, day: date):
+        """Decrement shards for one night and return [[shard_id, rooms], ...]."""
+        if ids:
+            start = random.randrange(len(ids))
+            for shard_id in ids[start:] + ids[:start]:
+                updated = RoomAvailabilityShard.objects.filter(
+                    id=shard_id, available_rooms__gte=num_rooms
+                ).update(available_rooms=F("available_rooms") - num_rooms)
+                if updated:
+                    return [[shard_id, num_rooms]]
+
+        # No single shard can cover the request: lock the night's shards and
+        # drain them in order. Only fragmented inventory takes this path.
+        shards = list(RoomAvailabilityShard.objects.select_for_update().filter(id__in=ids).order_by("shard"))
+        available = sum(shard.available_rooms for shard in shards)
+        if available < num_rooms:
+            raise InventoryLockError(f"Only {available} rooms left for {day}. Requested {num_rooms}.")
+        needed = num_rooms
+        taken = []
+        for shard in shards:
+            take = min(needed, shard.available_rooms)
+            if take <= 0:
+                continue
+            shard.available_rooms -= take
+            shard.save(update_fields=["available_rooms"])
+            taken.append([shard.id, take])
+            needed -= take
+            if not needed:
+                break
+        return taken
+
     def confirm_lock(self, lock: InventoryLock):
         if lock.source != "internal_cm":
             return lock
@@ -230,6 +370,19 @@ class InternalInventoryService:
 
         check_in = lock.check_in
         check_out = lock.check_out
+        shard_takes = (lock.payload or {}).get("shards")
+        if shard_takes:
+            with transaction.atomic():
+                for takes in shard_takes.values():
+                    for shard_id, rooms in takes:
+                        RoomAvailabilityShard.objects.filter(id=shard_id).update(
+                            available_rooms=F("available_rooms") + rooms
+                        )
+                lock.status = "released"
+                lock.save(update_fields=["status", "updated_at"])
+                release_discount_for_lock(lock)
+            return lock
+
         with transaction.atomic():
             slots = list(
                 RoomAvailability.objects.select_for_update()
@@ -238,9 +391,10 @@ class InternalInventoryService:
             )
             for slot in slots:
                 slot.available_rooms += lock.num_rooms
-                slot.save(update_fields=["available_rooms"])
+                slot.save(update_fields=["available_rooms", "updated_at"])
             lock.status = "released"
             lock.save(update_fields=["status", "updated_at"])
+            release_discount_for_lock(lock)
         return lock
 
 
@@ -275,11 +429,20 @@ def get_hotel_availability_snapshot(hotel: Hotel, check_in, check_out, num_rooms
 
 
 def finalize_booking_after_payment(booking, payment_reference: Optional[str] = None):
-    """Finalize inventory after successful payment."""
+    """Finalize inventory after successful payment.
+
+    A bus booking whose seats were resold after its holds lapsed raises
+    SeatUnavailableError and is left unconfirmed.
+    """
     lock = getattr(booking, "inventory_lock", None)
     if payment_reference:
         booking.payment_reference = payment_reference
 
+    if booking.booking_type == "bus":
+        from buses.seat_hold_service import confirm_holds
+
+        confirm_holds(booking)
+
     if not lock:
         booking.status = "confirmed"
         booking.save(update_fields=["status", "payment_reference", "updated_at"])
@@ -302,6 +465,12 @@ def finalize_booking_after_payment(booking, payment_reference: Optional[str] = N
 
 
 def release_inventory_on_failure(booking):
+    if booking.booking_type == "bus":
+        from buses.seat_hold_service import release_booking
+
+        release_booking(booking)
+        return
+
     lock = getattr(booking, "inventory_lock", None)
     if not lock:
         return
@@ -311,6 +480,7 @@ def release_inventory_on_failure(booking):
             ExternalChannelManagerClient(provider=lock.provider).release_lock(lock.lock_id or lock.reference_id)
             lock.status = "released"
             lock.save(update_fields=["status", "updated_at"])
+            release_discount_for_lock(lock)
         except InventoryLockError:
             pass
     else:
@@ -328,4 +498,68 @@ def expire_stale_locks():
         else:
             lock.status = "expired"
             lock.save(update_fields=["status", "updated_at"])
+            release_discount_for_lock(lock)
+
+
+
+def _rebalance_night(rt: RoomType, day: date):
+    """Fold pending RoomAvailability edits into one night's shards and even them out."""
+    with transaction.atomic():
+        slot = RoomAvailability.objects.select_for_update().filter(room_type=rt, date=day).first()
+        shards = list(
+            RoomAvailabilityShard.objects.select_for_update()
+            .filter(room_type=rt, date=day)
+            .order_by("shard")
+        )
+        total = sum(shard.available_rooms for shard in shards)
+        if slot is not None:
+            total = sharded_night_rooms(total, slot.available_rooms, slot.shard_total)
+        counts = _split_evenly(total, rt.inventory_shards)
+        by_index = {shard.shard: shard for shard in shards}
+
+        for index, count in enumerate(counts):
+            shard = by_index.pop(index, None)
+            if shard is None:
+                RoomAvailabilityShard.objects.create(room_type=rt, date=day, shard=index, available_rooms=count)
+            elif shard.available_rooms != count:
+                shard.available_rooms = count
+                shard.save(update_fields=["available_rooms"])
+        # Shards beyond the configured count are drained rather than
+        # deleted: active holds may still release rooms back into them.
+        for shard in by_index.values():
+            if shard.available_rooms:
+                shard.available_rooms = 0
+                shard.save(update_fields=["available_rooms"])
+
+        if slot is not None and (slot.available_rooms, slot.shard_total) != (total, total):
+            RoomAvailability.objects.filter(pk=slot.pk).update(
+                available_rooms=total, shard_total=total, updated_at=timezone.now()
+            )
+
 
+def rebalance_inventory_shards(room_type: Optional[RoomType] = None, start: Optional[date] = None, days: int = 90):
+    """Even out shard counters and refresh RoomAvailability totals from them.
+
+    Rooms added to or removed from RoomAvailability.available_rooms since
+    the last run (admin or channel edits) are folded into the shards first,
+    so the shards stay the single source of truth without losing the edit.
+    Also reshapes nights whose shard rows no longer match the room type's
+    configured shard count. Returns the number of nights rebalanced.
+    """
+    start = start or timezone.localdate()
+    end = start + timedelta(days=days)
+    room_types = RoomType.objects.filter(inventory_shards__gt=1)
+    if room_type is not None:
+        room_types = room_types.filter(id=room_type.id)
+
+    rebalanced = 0
+    for rt in room_types:
+        nights = (
+            RoomAvailabilityShard.objects.filter(room_type=rt, date__gte=start, date__lt=end)
+            .values_list("date", flat=True)
+            .distinct()
+        )
+        for day in nights:
+            _rebalance_night(rt, day)
+            rebalanced += 1
+    return rebalanced
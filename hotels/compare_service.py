@@ -0,0 +1,183 @@
+"""
+Hotel Comparison Service
+Side-by-side amenities, cheapest rates and availability for several hotels
+for the same stay, loaded with a fixed number of queries
+"""
+
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List
+
+from django.db.models import Prefetch, Sum
+from django.utils import timezone
+
+from .channel_manager_service import sharded_night_rooms
+from .models import Hotel, HotelDiscount, RoomAvailability, RoomAvailabilityShard, RoomType
+
+MAX_COMPARE_HOTELS = 5
+
+AMENITY_FIELDS = [
+    ('wifi', 'has_wifi'),
+    ('parking', 'has_parking'),
+    ('pool', 'has_pool'),
+    ('gym', 'has_gym'),
+    ('restaurant', 'has_restaurant'),
+    ('spa', 'has_spa'),
+    ('ac', 'has_ac'),
+]
+
+
+def _load_hotels(hotel_ids: List[int]) -> List[Hotel]:
+    """Hotels with bookable room types and currently valid discounts (3 queries)"""
+    now = timezone.now()
+    hotels = (
+        Hotel.objects.filter(id__in=hotel_ids, is_active=True)
+        .select_related('city')
+        .prefetch_related(
+            Prefetch(
+                'room_types',
+                queryset=RoomType.objects.filter(is_available=True).order_by('base_price', 'id'),
+            ),
+            Prefetch(
+                'discounts',
+                queryset=HotelDiscount.objects.filter(is_active=True, valid_from__lte=now, valid_till__gte=now),
+                to_attr='current_discounts',
+            ),
+        )
+    )
+    by_id = {hotel.id: hotel for hotel in hotels}
+    # Keep the caller's column order
+    return [by_id[hotel_id] for hotel_id in hotel_ids if hotel_id in by_id]
+
+
+def _load_nights(room_types: List[RoomType], check_in: date, check_out: date) -> Dict[int, dict]:
+    """
+    Stored nightly rows for every room type in one query, plus one grouped
+    query for sharded room types. Returns {room_type_id: {date: (rooms, price)}}.
+    """
+    nights = {room_type.id: {} for room_type in room_types}
+    rows = RoomAvailability.objects.filter(
+        room_type_id__in=nights, date__gte=check_in, date__lt=check_out
+    ).values_list('room_type_id', 'date', 'available_rooms', 'price', 'shard_total')
+    shard_totals = {}
+    for room_type_id, night, rooms, price, shard_total in rows:
+        nights[room_type_id][night] = (rooms, price)
+        shard_totals[room_type_id, night] = shard_total
+
+    sharded = [room_type.id for room_type in room_types if room_type.inventory_shards > 1]
+    if sharded:
+        shard_sums = (
+            RoomAvailabilityShard.objects.filter(room_type_id__in=sharded, date__gte=check_in, date__lt=check_out)
+            .values('room_type_id', 'date')
+            .annotate(rooms=Sum('available_rooms'))
+        )
+        for row in shard_sums:
+            key = (row['room_type_id'], row['date'])
+            stored = nights[key[0]].get(key[1])
+            if stored is not None:
+                rooms = sharded_night_rooms(row['rooms'], stored[0], shard_totals[key])
+                nights[key[0]][key[1]] = (rooms, stored[1])
+    return nights
+
+
+def _quote_room(room_type: RoomType, stored: dict, check_in: date, num_nights: int, num_rooms: int) -> dict:
+    """Stay price and minimum availability for one room type from preloaded nights"""
+    prices = []
+    available = []
+    for offset in range(num_nights):
+        rooms, price = stored.get(check_in + timedelta(days=offset), (room_type.total_rooms, room_type.base_price))
+        prices.append(price)
+        available.append(rooms)
+    stay_total = sum(prices, Decimal('0.00')) * num_rooms
+    min_available = min(available)
+    return {
+        'room_type_id': room_type.id,
+        'name': room_type.name,
+        'max_occupancy': room_type.max_occupancy,
+        'average_nightly_price': stay_total / num_rooms / num_nights,
+        'stay_total': stay_total,
+        'min_available_rooms': min_available,
+        'is_available': min_available >= num_rooms,
+    }
+
+
+def _best_offer(discounts: List[HotelDiscount], amount: Decimal):
+    """Pick the discount saving the most on an amount"""
+    best, best_saving = None, Decimal('0.00')
+    for discount in discounts:
+        if discount.usage_limit is not None and discount.usage_count >= discount.usage_limit:
+            continue
+        saving = discount.calculate_discount(amount)
+        if saving > best_saving:
+            best, best_saving = discount, saving
+    return best, best_saving
+
+
+def compare_hotels(hotel_ids: List[int], check_in: date, check_out: date, num_rooms: int = 1) -> Dict:
+    """
+    Build a comparison matrix for a stay
+
+    Query count is fixed (at most five) regardless of how many hotels are
+    compared. Rates and availability come from the stored nightly grid,
+    falling back to room defaults for nights without a row.
+    """
+    num_nights = (check_out - check_in).days
+    if num_nights <= 0:
+        raise ValueError("Check-out date must be after check-in date")
+
+    hotels = _load_hotels(hotel_ids)
+    room_types = [room_type for hotel in hotels for room_type in hotel.room_types.all()]
+    nights = _load_nights(room_types, check_in, check_out)
+
+    columns = []
+    for hotel in hotels:
+        quotes = [
+            _quote_room(room_type, nights[room_type.id], check_in, num_nights, num_rooms)
+            for room_type in hotel.room_types.all()
+        ]
+        bookable = [quote for quote in quotes if quote['is_available']]
+        cheapest = min(bookable or quotes, key=lambda quote: quote['stay_total'], default=None)
+
+        column = {
+            'hotel_id': hotel.id,
+            'name': hotel.name,
+            'city': hotel.city.name,
+            'star_rating': hotel.star_rating,
+            'review_rating': float(hotel.review_rating),
+            'review_count': hotel.review_count,
+            'is_available': bool(bookable),
+            'available_room_types': len(bookable),
+            'cheapest_room': None,
+            'best_offer': None,
+        }
+        if cheapest is not None:
+            offer, saving = _best_offer(hotel.current_discounts, cheapest['stay_total'])
+            after_discount = cheapest['stay_total'] - saving
+            column['cheapest_room'] = {
+                **cheapest,
+                'average_nightly_price': float(cheapest['average_nightly_price']),
+                'stay_total': float(cheapest['stay_total']),
+                'total_with_gst': float(
+                    after_discount * (1 + hotel.gst_percentage / Decimal('100'))
+                ),
+            }
+            if offer is not None:
+                column['best_offer'] = {
+                    'discount_id': offer.id,
+                    'code': offer.code,
+                    'description': offer.description,
+                    'saving': float(saving),
+                }
+        columns.append(column)
+
+    return {
+        'check_in': check_in.isoformat(),
+        'check_out': check_out.isoformat(),
+        'num_nights': num_nights,
+        'num_rooms': num_rooms,
+        'hotels': columns,
+        'amenities': {
+            label: [getattr(hotel, field) for hotel in hotels]
+            for label, field in AMENITY_FIELDS
+        },
+    }
@@ -0,0 +1,112 @@
+"""
+Discount Redemption Service
+Cached discount code lookups and atomic usage reservation for hotel holds
+"""
+
+import time
+from typing import Dict, Optional
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import HotelDiscount
+
+# Upper bound on how long another process may serve a code after it was
+# edited; reservations re-check validity in the database regardless.
+CODE_CACHE_TTL_SECONDS = 300
+
+# hotel_id -> (monotonic expiry, {code: HotelDiscount})
+_code_cache: Dict[int, tuple] = {}
+
+
+class DiscountRedemptionService:
+    """Look up discount codes from a per-process cache and reserve uses atomically"""
+
+    @staticmethod
+    def _load_codes(hotel_id: int):
+        now = timezone.now()
+        discounts = list(
+            HotelDiscount.objects.filter(
+                hotel_id=hotel_id,
+                is_active=True,
+                code__isnull=False,
+                valid_till__gte=now,
+            )
+        )
+        ttl = CODE_CACHE_TTL_SECONDS
+        for discount in discounts:
+            # Expire the entry when the first code expires or becomes valid
+            for boundary in (discount.valid_till, discount.valid_from):
+                seconds = (boundary - now).total_seconds()
+                if seconds > 0:
+                    ttl = min(ttl, seconds)
+        codes = {discount.code: discount for discount in discounts}
+        _code_cache[hotel_id] = (time.monotonic() + ttl, codes)
+        return codes
+
+    @classmethod
+    def get_codes(cls, hotel_id: int) -> Dict[str, HotelDiscount]:
+        """Return the cached {code: discount} map for a hotel, loading it if stale"""
+        entry = _code_cache.get(hotel_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return cls._load_codes(hotel_id)
+        return entry[1]
+
+    @classmethod
+    def lookup(cls, hotel, code: str) -> Optional[HotelDiscount]:
+        """Return the discount for a code, or None if unknown. No queries when warm."""
+        if not code:
+            return None
+        return cls.get_codes(hotel.id).get(code)
+
+    @staticmethod
+    def invalidate(hotel_id: int):
+        _code_cache.pop(hotel_id, None)
+
+    @classmethod
+    def reserve(cls, discount: HotelDiscount) -> bool:
+        """
+        Consume one use of a discount if it is still redeemable
+
+        Runs a single conditional UPDATE so concurrent holds can never push
+        usage_count past usage_limit.
+        """
+        now = timezone.now()
+        reserved = HotelDiscount.objects.filter(
+            Q(usage_limit__isnull=True) | Q(usage_count__lt=F('usage_limit')),
+            pk=discount.pk,
+            is_active=True,
+            valid_from__lte=now,
+            valid_till__gte=now,
+        ).update(usage_count=F('usage_count') + 1)
+        if reserved:
+            # Keep the cached copy's usage in step for this process
+            cached = cls.get_codes(discount.hotel_id).get(discount.code)
+            if cached is not None:
+                cached.usage_count += 1
+        return bool(reserved)
+
+    @classmethod
+    def release(cls, discount_id: int) -> bool:
+        """Give back a use reserved by a hold that did not convert"""
+        released = HotelDiscount.objects.filter(
+            pk=discount_id, usage_count__gt=0
+        ).update(usage_count=F('usage_count') - 1)
+        if released:
+            hotel_id = HotelDiscount.objects.filter(pk=discount_id).values_list('hotel_id', flat=True).first()
+            if hotel_id is not None:
+                cls.invalidate(hotel_id)
+        return bool(released)
+
+
+def release_discount_for_lock(lock):
+    """Release the discount use attached to an inventory hold, at most once"""
+    payload = lock.payload or {}
+    discount_id = payload.get('discount_id')
+    if not discount_id or payload.get('discount_released'):
+        return False
+    DiscountRedemptionService.release(discount_id)
+    payload['discount_released'] = True
+    lock.payload = payload
+    lock.save(update_fields=['payload', 'updated_at'])
+    return True
@@ -0,0 +1,169 @@
+"""
+Meta-Search Feed Service
+Streams daily rate & availability (ARI) rows for every active hotel room
+without materializing the feed in memory
+"""
+
+import gzip
+import json
+import zlib
+from datetime import date, timedelta
+from typing import Iterable, Iterator, Optional
+from xml.sax.saxutils import quoteattr
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import FeedExport, RoomAvailability, RoomType
+
+FEED_CHUNK_SIZE = 2000
+GZIP_FLUSH_BYTES = 64 * 1024
+
+
+def iter_ari_rows(start_date: date, days: int = 90, since=None, chunk_size: int = FEED_CHUNK_SIZE) -> Iterator[dict]:
+    """
+    Yield one rate & availability row per room type per night
+
+    Room types and availability rows are streamed in room type order and
+    merge-joined, so memory stays bounded by one room type's nights. Full
+    feeds fill nights without a stored row from the room defaults; delta
+    feeds (since given) only emit rows changed since the cutoff, plus every
+    night of room types or hotels edited since then. Room types or hotels
+    switched off since the cutoff are sent as closed with no rooms, so
+    partners stop selling them.
+    """
+    end_date = start_date + timedelta(days=days)
+    bookable = Q(hotel__is_active=True, is_available=True)
+    if since is not None:
+        bookable |= Q(updated_at__gte=since) | Q(hotel__updated_at__gte=since)
+    room_types = (
+        RoomType.objects.filter(bookable)
+        .select_related('hotel', 'hotel__city')
+        .order_by('id')
+        .iterator(chunk_size=chunk_size)
+    )
+    availability = RoomAvailability.objects.filter(
+        room_type__hotel__is_active=True,
+        room_type__is_available=True,
+        date__gte=start_date,
+        date__lt=end_date,
+    )
+    if since is not None:
+        availability = availability.filter(updated_at__gte=since)
+    availability = (
+        availability.order_by('room_type_id', 'date')
+        .values_list('room_type_id', 'date', 'available_rooms', 'price')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    pending = next(availability, None)
+    for room_type in room_types:
+        while pending is not None and pending[0] < room_type.id:
+            pending = next(availability, None)
+        stored = {}
+        while pending is not None and pending[0] == room_type.id:
+            stored[pending[1]] = pending
+            pending = next(availability, None)
+
+        hotel = room_type.hotel
+        closed = not (hotel.is_active and room_type.is_available)
+        emit_all = since is None or room_type.updated_at >= since or hotel.updated_at >= since
+        nights = (
+            (start_date + timedelta(days=offset) for offset in range(days))
+            if emit_all else sorted(stored)
+        )
+        for night in nights:
+            row = stored.get(night)
+            yield {
+                'hotel_id': hotel.id,
+                'hotel_name': hotel.name,
+                'city': hotel.city.name,
+                'room_type_id': room_type.id,
+                'room_type': room_type.name,
+                'date': night.isoformat(),
+                'available_rooms': 0 if closed else row[2] if row else room_type.total_rooms,
+                'rate': float(row[3] if row else room_type.base_price),
+                'currency': 'INR',
+                'closed': closed,
+            }
+
+
+def iter_feed_chunks(feed_format: str, rows: Iterable[dict], is_delta: bool = False) -> Iterator[str]:
+    """Serialize ARI rows as JSON lines or XML, one chunk per row"""
+    if feed_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row) + '\n'
+        return
+
+    feed_type = 'delta' if is_delta else 'full'
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<AvailabilityRateFeed type="{feed_type}" generated={quoteattr(timezone.now().isoformat())}>\n'
+    )
+    for row in rows:
+        attrs = ' '.join(f'{key}={quoteattr(str(value))}' for key, value in row.items())
+        yield f'  <Rate {attrs}/>\n'
+    yield '</AvailabilityRateFeed>\n'
+
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip-compress a text stream incrementally for streaming responses"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    buffered = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        buffered += len(chunk)
+        if data:
+            yield data
+        if buffered >= GZIP_FLUSH_BYTES:
+            yield compressor.flush(zlib.Z_SYNC_FLUSH)
+            buffered = 0
+    yield compressor.flush()
+
+
+def last_export_cutoff(feed_format: str):
+    """Return when the last completed export of this format started, if any"""
+    return (
+        FeedExport.objects.filter(feed_format=feed_format, completed_at__isnull=False)
+        .values_list('started_at', flat=True)
+        .first()
+    )
+
+
+def write_feed(path: str, feed_format: str = 'jsonl', start_date: Optional[date] = None,
+               days: int = 90, delta: bool = False, chunk_size: int = FEED_CHUNK_SIZE) -> FeedExport:
+    """
+    Write a gzip-compressed feed file incrementally and record the export
+
+    Delta exports cover rows changed since the previous completed export of
+    the same format; without one they fall back to a full export.
+    """
+    start_date = start_date or timezone.localdate()
+    since = last_export_cutoff(feed_format) if delta else None
+    export = FeedExport.objects.create(
+        feed_format=feed_format,
+        is_delta=since is not None,
+        changed_since=since,
+        started_at=timezone.now(),
+        start_date=start_date,
+        days=days,
+        file_path=str(path),
+    )
+
+    row_count = 0
+
+    def counted(rows):
+        nonlocal row_count
+        for row in rows:
+            row_count += 1
+            yield row
+
+    rows = counted(iter_ari_rows(start_date, days, since=since, chunk_size=chunk_size))
+    with gzip.open(path, 'wt', encoding='utf-8') as feed_file:
+        for chunk in iter_feed_chunks(feed_format, rows, is_delta=export.is_delta):
+            feed_file.write(chunk)
+
+    export.row_count = row_count
+    export.completed_at = timezone.now()
+    export.save(update_fields=['row_count', 'completed_at', 'updated_at'])
+    return export
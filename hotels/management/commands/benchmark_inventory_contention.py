@@ -0,0 +1,108 @@
+"""
+Benchmark concurrent internal inventory holds with and without sharded counters
+Usage: python manage.py benchmark_inventory_contention --shards 1 4 8 --workers 16 --holds 25
+
+Creates a throwaway hotel, hammers one room type for the next few nights from
+parallel workers and reports holds per second. Run against PostgreSQL for
+meaningful numbers; SQLite serializes every writer regardless of sharding.
+"""
+
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from core.models import City
+from hotels.channel_manager_service import InternalInventoryService, InventoryLockError
+from hotels.models import Hotel, RoomType
+
+
+class Command(BaseCommand):
+    help = 'Benchmark concurrent inventory hold throughput for different shard counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 4, 8], help='Shard counts to compare')
+        parser.add_argument('--workers', type=int, default=16, help='Concurrent buyers')
+        parser.add_argument('--holds', type=int, default=25, help='Holds attempted per worker')
+        parser.add_argument('--nights', type=int, default=2, help='Nights per hold')
+
+    def handle(self, *args, **options):
+        city, _ = City.objects.get_or_create(
+            code='BENCH', defaults={'name': 'Benchmark City', 'state': 'Benchmark'}
+        )
+        hotel = Hotel.objects.create(
+            name='Inventory Benchmark Hotel',
+            description='Temporary hotel for contention benchmarks',
+            city=city,
+            address='N/A',
+            contact_phone='0000000000',
+            contact_email='bench@example.com',
+            is_active=False,
+        )
+        try:
+            for shard_count in options['shards']:
+                self._run(hotel, shard_count, options)
+        finally:
+            hotel.delete()
+
+    def _run(self, hotel, shard_count, options):
+        workers = options['workers']
+        holds = options['holds']
+        total_rooms = workers * holds
+        room_type = RoomType.objects.create(
+            hotel=hotel,
+            name=f'Bench x{shard_count}',
+            description='Benchmark room',
+            base_price=Decimal('1000.00'),
+            total_rooms=total_rooms,
+            inventory_shards=shard_count,
+        )
+        check_in = timezone.localdate() + timedelta(days=1)
+        check_out = check_in + timedelta(days=options['nights'])
+        service = InternalInventoryService(hotel)
+        # Materialize rows up front so the timed section measures holds only
+        if shard_count > 1:
+            service.ensure_shard_rows(room_type, check_in, check_out)
+        else:
+            service.ensure_availability_rows(room_type, check_in, check_out)
+
+        results = {'ok': 0, 'rejected': 0, 'errors': 0}
+        results_lock = threading.Lock()
+        barrier = threading.Barrier(workers)
+
+        def buyer():
+            ok = rejected = errors = 0
+            try:
+                barrier.wait()
+                for _ in range(holds):
+                    try:
+                        service.lock_inventory(room_type, check_in, check_out, num_rooms=1)
+                        ok += 1
+                    except InventoryLockError:
+                        rejected += 1
+                    except DatabaseError:
+                        errors += 1
+            finally:
+                connection.close()
+                with results_lock:
+                    results['ok'] += ok
+                    results['rejected'] += rejected
+                    results['errors'] += errors
+
+        threads = [threading.Thread(target=buyer) for _ in range(workers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"shards={shard_count:<3} workers={workers} holds={results['ok']} "
+            f"rejected={results['rejected']} db_errors={results['errors']} "
+            f"elapsed={elapsed:.2f}s throughput={results['ok'] / elapsed if elapsed else 0:.1f} holds/s"
+        ))
@@ -0,0 +1,19 @@
+"""
+Management command to recompute hotel popularity scores
+Usage: python manage.py compute_hotel_popularity
+"""
+
+from django.core.management.base import BaseCommand
+
+from hotels.popularity_service import update_popularity_scores
+
+
+class Command(BaseCommand):
+    help = 'Recompute the popularity score behind the "recommended" hotel sort'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk update')
+
+    def handle(self, *args, **options):
+        updated = update_popularity_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Updated popularity for {updated} hotels'))
@@ -0,0 +1,54 @@
+"""
+Management command to export the meta-search rate & availability feed
+Usage: python manage.py export_hotel_feed [--format jsonl|xml] [--days 90] [--delta] [--output PATH]
+"""
+
+from datetime import date
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from hotels.feed_service import write_feed
+
+
+class Command(BaseCommand):
+    help = 'Stream a gzip-compressed rate & availability feed for meta-search partners'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['jsonl', 'xml'], default='jsonl', help='Feed format')
+        parser.add_argument('--days', type=int, default=90, help='Number of nights to export')
+        parser.add_argument('--start', help='First night (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--delta', action='store_true', help='Only rows changed since the last export')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per database round trip')
+        parser.add_argument('--output', help='Output file path (defaults to MEDIA_ROOT/feeds/)')
+
+    def handle(self, *args, **options):
+        if options['days'] <= 0:
+            raise CommandError('--days must be positive')
+        try:
+            start_date = date.fromisoformat(options['start']) if options['start'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('--start must be YYYY-MM-DD')
+
+        feed_format = options['format']
+        output = options['output']
+        if not output:
+            feed_dir = Path(settings.MEDIA_ROOT) / 'feeds'
+            feed_dir.mkdir(parents=True, exist_ok=True)
+            kind = 'delta' if options['delta'] else 'full'
+            output = feed_dir / f"ari_{kind}_{timezone.now():%Y%m%d%H%M%S}.{feed_format}.gz"
+
+        export = write_feed(
+            output,
+            feed_format=feed_format,
+            start_date=start_date,
+            days=options['days'],
+            delta=options['delta'],
+            chunk_size=options['chunk_size'],
+        )
+        kind = 'delta' if export.is_delta else 'full'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Exported {export.row_count} rows ({kind}) to {export.file_path}'
+        ))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:23
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0005_hotel_property_rules_hotel_property_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatePlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('name', models.CharField(max_length=100)),
+                ('code', models.CharField(max_length=50)),
+                ('meal_plan', models.CharField(choices=[('room_only', 'Room Only'), ('breakfast', 'Breakfast Included'), ('half_board', 'Half Board'), ('full_board', 'Full Board')], default='room_only', max_length=20)),
+                ('is_refundable', models.BooleanField(default=True)),
+                ('adjustment_type', models.CharField(choices=[('none', 'No Adjustment'), ('percentage', 'Percentage'), ('fixed', 'Fixed Amount')], default='none', max_length=20)),
+                ('adjustment_value', models.DecimalField(decimal_places=2, default=0, help_text='Percent or amount applied to the parent rate (negative for discounts)', max_digits=10)),
+                ('meal_supplement', models.DecimalField(decimal_places=2, default=0, help_text='Added per room per night after the adjustment', max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('is_active', models.BooleanField(default=True)),
+                ('parent', models.ForeignKey(blank=True, help_text='Leave empty to sell at the stored room price', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='derived_plans', to='hotels.rateplan')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_plans', to='hotels.roomtype')),
+            ],
+            options={
+                'ordering': ['room_type', 'name'],
+                'unique_together': {('room_type', 'code')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:24
+
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0006_rateplan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomtype',
+            name='inventory_shards',
+            field=models.PositiveSmallIntegerField(default=1, help_text="Split each night's internal inventory across this many counters to reduce lock contention (1 = off)", validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(32)]),
+        ),
+        migrations.CreateModel(
+            name='RoomAvailabilityShard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('available_rooms', models.IntegerField()),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_shards', to='hotels.roomtype')),
+            ],
+            options={
+                'ordering': ['date', 'shard'],
+                'unique_together': {('room_type', 'date', 'shard')},
+            },
+        ),
+    ]
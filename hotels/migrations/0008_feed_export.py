@@ -0,0 +1,40 @@
+# Generated by Django 4.2.9 on 2026-10-19 10:12
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0007_inventory_shards'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('feed_format', models.CharField(choices=[('jsonl', 'JSON Lines'), ('xml', 'XML')], default='jsonl', max_length=10)),
+                ('is_delta', models.BooleanField(default=False)),
+                ('changed_since', models.DateTimeField(blank=True, help_text='Cutoff used for delta feeds', null=True)),
+                ('started_at', models.DateTimeField(help_text='Rows changed after this time belong to the next delta')),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('start_date', models.DateField()),
+                ('days', models.IntegerField(default=90)),
+                ('row_count', models.IntegerField(default=0)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='roomavailability',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.9 on 2026-10-19 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0008_feed_export'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hotel',
+            name='popularity_score',
+            field=models.FloatField(default=0, help_text='Recommended-sort score (higher ranks first)'),
+        ),
+        migrations.AddField(
+            model_name='hotel',
+            name='popularity_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='hotel',
+            index=models.Index(fields=['-popularity_score', 'name'], name='hotel_popularity_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hotels', '0009_hotel_popularity_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomavailability',
+            name='shard_total',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -96,8 +96,15 @@ class Hotel(TimeStampedModel):
     contact_phone = models.CharField(max_length=20)
     contact_email = models.EmailField()
     
+    # Offline ranking signal, recomputed nightly by compute_hotel_popularity
+    popularity_score = models.FloatField(default=0, help_text="Recommended-sort score (higher ranks first)")
+    popularity_updated_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         ordering = ['-is_featured', '-review_rating', 'name']
+        indexes = [
+            models.Index(fields=['-popularity_score', 'name'], name='hotel_popularity_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.city.name}"
@@ -180,6 +187,11 @@ class RoomType(TimeStampedModel):
     
     total_rooms = models.IntegerField(default=1)
     is_available = models.BooleanField(default=True)
+    inventory_shards = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(32)],
+        help_text="Split each night's internal inventory across this many counters to reduce lock contention (1 = off)",
+    )
     
     image = models.ImageField(upload_to='hotels/rooms/', null=True, blank=True)
     
@@ -190,6 +202,92 @@ class RoomType(TimeStampedModel):
         return f"{self.hotel.name} - {self.name}"
 
 
+class RatePlan(TimeStampedModel):
+    """Sellable rate plan for a room type.
+
+    Root plans (no parent) sell at the stored price grid (RoomAvailability.price,
+    falling back to RoomType.base_price). Derived plans are rules over their
+    parent's rate, so inventory and the price grid are shared across plans.
+    """
+    ADJUSTMENT_TYPES = [
+        ('none', 'No Adjustment'),
+        ('percentage', 'Percentage'),
+        ('fixed', 'Fixed Amount'),
+    ]
+
+    MEAL_PLANS = [
+        ('room_only', 'Room Only'),
+        ('breakfast', 'Breakfast Included'),
+        ('half_board', 'Half Board'),
+        ('full_board', 'Full Board'),
+    ]
+
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='rate_plans')
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='derived_plans',
+        help_text="Leave empty to sell at the stored room price",
+    )
+    name = models.CharField(max_length=100)
+    code = models.CharField(max_length=50)
+    meal_plan = models.CharField(max_length=20, choices=MEAL_PLANS, default='room_only')
+    is_refundable = models.BooleanField(default=True)
+
+    adjustment_type = models.CharField(max_length=20, choices=ADJUSTMENT_TYPES, default='none')
+    adjustment_value = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        help_text="Percent or amount applied to the parent rate (negative for discounts)",
+    )
+    meal_supplement = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        validators=[MinValueValidator(0)],
+        help_text="Added per room per night after the adjustment",
+    )
+
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ['room_type', 'code']
+        ordering = ['room_type', 'name']
+
+    def __str__(self):
+        return f"{self.room_type} - {self.name}"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self.parent_id:
+            if self.parent_id == self.pk:
+                raise ValidationError({'parent': 'A rate plan cannot derive from itself.'})
+            if self.parent.room_type_id != self.room_type_id:
+                raise ValidationError({'parent': 'Parent plan must belong to the same room type.'})
+            # Walk up the saved chain; reaching this plan (or looping) means a cycle
+            seen = {self.pk}
+            ancestor_id = self.parent_id
+            while ancestor_id is not None:
+                if ancestor_id in seen:
+                    raise ValidationError({'parent': 'Rate plans cannot derive from each other in a loop.'})
+                seen.add(ancestor_id)
+                ancestor_id = RatePlan.objects.filter(pk=ancestor_id).values_list('parent_id', flat=True).first()
+
+    def derive_price(self, parent_price):
+        """Apply this plan's rules to the parent nightly rate"""
+        price = Decimal(parent_price)
+        if self.adjustment_type == 'percentage':
+            price += price * self.adjustment_value / Decimal('100')
+        elif self.adjustment_type == 'fixed':
+            price += self.adjustment_value
+        price += self.meal_supplement
+        return max(price, Decimal('0.00')).quantize(Decimal('0.01'))
+
+
 class ChannelManagerRoomMapping(TimeStampedModel):
     """Maps internal room types to external channel manager room identifiers."""
 
@@ -223,6 +321,10 @@ class RoomAvailability(models.Model):
     date = models.DateField()
     available_rooms = models.IntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Sharded room types only: available_rooms as last written from the
+    # shards, so edits made here since then can be folded back into them
+    shard_total = models.IntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         unique_together = ['room_type', 'date']
@@ -232,6 +334,26 @@ class RoomAvailability(models.Model):
         return f"{self.room_type} - {self.date}"
 
 
+class RoomAvailabilityShard(models.Model):
+    """Sub-counter of a night's inventory for sharded room types.
+
+    When RoomType.inventory_shards > 1 these rows hold the sellable counts.
+    The rebalancer folds edits made to RoomAvailability.available_rooms since
+    the last run into them, then refreshes it from their sum.
+    """
+    room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='availability_shards')
+    date = models.DateField()
+    shard = models.PositiveSmallIntegerField()
+    available_rooms = models.IntegerField()
+
+    class Meta:
+        unique_together = ['room_type', 'date', 'shard']
+        ordering = ['date', 'shard']
+
+    def __str__(self):
+        return f"{self.room_type} - {self.date} #{self.shard}"
+
+
 class HotelDiscount(TimeStampedModel):
     """Discounts for hotels/rooms"""
     DISCOUNT_TYPES = [
@@ -304,6 +426,31 @@ class HotelDiscount(TimeStampedModel):
         return Decimal('0.00')
 
 
+class FeedExport(TimeStampedModel):
+    """Record of a meta-search rate & availability feed export"""
+    FEED_FORMATS = [
+        ('jsonl', 'JSON Lines'),
+        ('xml', 'XML'),
+    ]
+
+    feed_format = models.CharField(max_length=10, choices=FEED_FORMATS, default='jsonl')
+    is_delta = models.BooleanField(default=False)
+    changed_since = models.DateTimeField(null=True, blank=True, help_text="Cutoff used for delta feeds")
+    started_at = models.DateTimeField(help_text="Rows changed after this time belong to the next delta")
+    completed_at = models.DateTimeField(null=True, blank=True)
+    start_date = models.DateField()
+    days = models.IntegerField(default=90)
+    row_count = models.IntegerField(default=0)
+    file_path = models.CharField(max_length=500, blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+
+    def __str__(self):
+        kind = 'delta' if self.is_delta else 'full'
+        return f"{self.get_feed_format_display()} {kind} feed - {self.started_at:%Y-%m-%d %H:%M}"
+
+
 class PriceLog(TimeStampedModel):
     """Log for price changes (audit trail)"""
     room_type = models.ForeignKey(RoomType, on_delete=models.CASCADE, related_name='price_logs')
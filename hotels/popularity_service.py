@@ -0,0 +1,127 @@
+"""
+Hotel Popularity Service
+Offline popularity score used by the "recommended" sort
+"""
+
+import math
+from datetime import timedelta
+from typing import Dict, List
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from bookings.models import HotelBooking
+from .models import Hotel
+
+COUNTED_STATUSES = ['confirmed', 'completed']
+
+# Bookings are bucketed by age and each bucket weighted by exponential decay
+# at its midpoint, so the aggregation stays a single grouped query.
+RECENCY_HALF_LIFE_DAYS = 60
+RECENCY_BUCKETS = [(0, 30), (30, 90), (90, 180), (180, 365)]
+
+# Reviews are shrunk towards the catalog mean until a hotel has this many
+RATING_PRIOR_WEIGHT = 20
+
+SCORE_WEIGHTS = {
+    'bookings': 0.45,
+    'revenue': 0.25,
+    'rating': 0.30,
+}
+
+
+def _bucket_weight(start_day: int, end_day: int) -> float:
+    midpoint = (start_day + end_day) / 2
+    return math.exp(-math.log(2) * midpoint / RECENCY_HALF_LIFE_DAYS)
+
+
+def _log_scaled(values: List[float]) -> List[float]:
+    """log1p-compress a column and scale it to 0..1 by its maximum"""
+    logged = [math.log1p(max(value, 0.0)) for value in values]
+    peak = max(logged, default=0.0)
+    return [value / peak if peak else 0.0 for value in logged]
+
+
+def collect_booking_stats(now=None) -> Dict[int, dict]:
+    """Aggregate decayed booking counts and revenue per hotel in one query"""
+    now = now or timezone.now()
+    annotations = {'revenue': Sum('booking__total_amount')}
+    for index, (start_day, end_day) in enumerate(RECENCY_BUCKETS):
+        annotations[f'bucket_{index}'] = Count(
+            'id',
+            filter=Q(
+                booking__created_at__gt=now - timedelta(days=end_day),
+                booking__created_at__lte=now - timedelta(days=start_day),
+            ),
+        )
+    horizon = now - timedelta(days=RECENCY_BUCKETS[-1][1])
+    rows = (
+        HotelBooking.objects.filter(booking__status__in=COUNTED_STATUSES, booking__created_at__gt=horizon)
+        .values('room_type__hotel_id')
+        .annotate(**annotations)
+    )
+
+    stats = {}
+    for row in rows:
+        decayed = sum(
+            row[f'bucket_{index}'] * _bucket_weight(*bucket)
+            for index, bucket in enumerate(RECENCY_BUCKETS)
+        )
+        stats[row['room_type__hotel_id']] = {
+            'decayed_bookings': decayed,
+            'revenue': float(row['revenue'] or 0),
+        }
+    return stats
+
+
+def compute_popularity_scores(now=None) -> Dict[int, float]:
+    """
+    Score every hotel in the catalog
+
+    Each signal is computed column-wise over the whole catalog (log scaling
+    and normalization against the catalog maximum) before weighting.
+    """
+    now = now or timezone.now()
+    catalog = list(Hotel.objects.values_list('id', 'is_active', 'review_rating', 'review_count'))
+    if not catalog:
+        return {}
+    stats = collect_booking_stats(now)
+
+    ids = [row[0] for row in catalog]
+    bookings = [stats.get(hotel_id, {}).get('decayed_bookings', 0.0) for hotel_id in ids]
+    revenue = [stats.get(hotel_id, {}).get('revenue', 0.0) for hotel_id in ids]
+    ratings = [float(row[2] or 0) for row in catalog]
+    review_counts = [row[3] or 0 for row in catalog]
+
+    total_reviews = sum(review_counts)
+    prior_mean = (
+        sum(rating * count for rating, count in zip(ratings, review_counts)) / total_reviews
+        if total_reviews else 0.0
+    )
+    rating_scores = [
+        (rating * count + prior_mean * RATING_PRIOR_WEIGHT) / (count + RATING_PRIOR_WEIGHT) / 5
+        for rating, count in zip(ratings, review_counts)
+    ]
+
+    columns = zip(_log_scaled(bookings), _log_scaled(revenue), rating_scores)
+    scores = {}
+    for (hotel_id, is_active, _, _), (booking_score, revenue_score, rating_score) in zip(catalog, columns):
+        score = (
+            SCORE_WEIGHTS['bookings'] * booking_score
+            + SCORE_WEIGHTS['revenue'] * revenue_score
+            + SCORE_WEIGHTS['rating'] * rating_score
+        )
+        scores[hotel_id] = round(score * 100, 4) if is_active else 0.0
+    return scores
+
+
+def update_popularity_scores(batch_size: int = 500) -> int:
+    """Recompute and store popularity scores for all hotels. Returns rows updated."""
+    now = timezone.now()
+    scores = compute_popularity_scores(now)
+    hotels = [
+        Hotel(id=hotel_id, popularity_score=score, popularity_updated_at=now)
+        for hotel_id, score in scores.items()
+    ]
+    Hotel.objects.bulk_update(hotels, ['popularity_score', 'popularity_updated_at'], batch_size=batch_size)
+    return len(hotels)
@@ -6,7 +6,8 @@ Handles complex pricing calculations with taxes, discounts, and surcharges
 from decimal import Decimal
 from datetime import date, timedelta
 from typing import Dict, List, Optional, Tuple
-from .models import RoomAvailability, HotelDiscount, Hotel
+from .models import RoomAvailability, Hotel
+from .discount_service import DiscountRedemptionService
 
 
 class PricingCalculator:
@@ -15,12 +16,94 @@ class PricingCalculator:
     def __init__(self, hotel: Hotel):
         self.hotel = hotel
         self.gst_rate = hotel.gst_percentage / Decimal('100')
+        # Per stay query memo: (kind, room_type_id, check_in, check_out) -> prices
+        self._stay_cache = {}
     
-    def get_room_price(self, room_type, check_in: date, check_out: date) -> Decimal:
+    def get_nightly_prices(self, room_type, check_in: date, check_out: date) -> List[Decimal]:
+        """
+        Get the stored nightly price grid for a stay
+        Nights without an availability record fall back to the room base price
+        """
+        key = ('grid', room_type.id, check_in, check_out)
+        if key not in self._stay_cache:
+            stored = dict(
+                RoomAvailability.objects.filter(
+                    room_type=room_type,
+                    date__gte=check_in,
+                    date__lt=check_out
+                ).values_list('date', 'price')
+            )
+            nights = (check_out - check_in).days
+            self._stay_cache[key] = [
+                stored.get(check_in + timedelta(days=offset), room_type.base_price)
+                for offset in range(max(nights, 0))
+            ]
+        return self._stay_cache[key]
+    
+    def get_rate_plan_prices(self, room_type, check_in: date, check_out: date) -> Dict[int, List[Decimal]]:
+        """
+        Get nightly prices for every active rate plan of a room type
+        
+        Derived plans are resolved on the fly from the single stored price
+        grid, walking parent chains once per stay query.
+        """
+        key = ('plans', room_type.id, check_in, check_out)
+        if key in self._stay_cache:
+            return self._stay_cache[key]
+        
+        grid = self.get_nightly_prices(room_type, check_in, check_out)
+        plans = {plan.id: plan for plan in room_type.rate_plans.all()}
+        resolved = {}
+        
+        def resolve(plan, chain):
+            if plan.id not in resolved:
+                parent = plans.get(plan.parent_id)
+                if parent is None or parent.id in chain:
+                    parent_prices = grid
+                else:
+                    parent_prices = resolve(parent, chain | {plan.id})
+                resolved[plan.id] = [plan.derive_price(price) for price in parent_prices]
+            return resolved[plan.id]
+        
+        for plan in plans.values():
+            resolve(plan, {plan.id})
+        
+        prices = {plan_id: resolved[plan_id] for plan_id, plan in plans.items() if plan.is_active}
+        self._stay_cache[key] = prices
+        return prices
+    
+    def get_rate_plan_quotes(self, room_type, check_in: date, check_out: date) -> List[Dict]:
+        """Get per-room stay totals for all active rate plans of a room type"""
+        plan_prices = self.get_rate_plan_prices(room_type, check_in, check_out)
+        quotes = []
+        for plan in room_type.rate_plans.all():
+            prices = plan_prices.get(plan.id)
+            if prices is None:
+                continue
+            total = sum(prices, Decimal('0.00'))
+            quotes.append({
+                'rate_plan_id': plan.id,
+                'code': plan.code,
+                'name': plan.name,
+                'meal_plan': plan.meal_plan,
+                'is_refundable': plan.is_refundable,
+                'average_nightly_price': float(total / len(prices)) if prices else 0.0,
+                'stay_total_per_room': float(total),
+            })
+        return quotes
+    
+    def get_room_price(self, room_type, check_in: date, check_out: date, rate_plan=None) -> Decimal:
         """
         Get base price for room for given dates
         Returns average price if multiple dates or base price
+        When a rate plan is given, returns the plan's average derived price
         """
+        if rate_plan is not None:
+            prices = self.get_rate_plan_prices(room_type, check_in, check_out).get(rate_plan.id)
+            if prices is None:
+                raise ValueError("Rate plan is not available for this room")
+            return sum(prices, Decimal('0.00')) / Decimal(str(len(prices))) if prices else room_type.base_price
+        
         availability_records = RoomAvailability.objects.filter(
             room_type=room_type,
             date__gte=check_in,
@@ -43,10 +126,12 @@ class PricingCalculator:
         check_in: date,
         check_out: date,
         num_rooms: int = 1,
-        discount_code: Optional[str] = None
+        discount_code: Optional[str] = None,
+        rate_plan=None
     ) -> Dict:
         """
         Calculate total price with all taxes, discounts and fees
+        Pass a rate_plan to price the stay at that plan's derived rate
         
         Returns:
             {
@@ -66,8 +151,11 @@ class PricingCalculator:
         if nights <= 0:
             raise ValueError("Check-out date must be after check-in date")
         
+        if rate_plan is not None and rate_plan.room_type_id != room_type.id:
+            raise ValueError("Rate plan does not belong to this room type")
+        
         # Get base price per night
-        base_price = self.get_room_price(room_type, check_in, check_out)
+        base_price = self.get_room_price(room_type, check_in, check_out, rate_plan=rate_plan)
         
         # Calculate subtotal
         subtotal = base_price * Decimal(str(num_rooms)) * Decimal(str(nights))
@@ -100,6 +188,13 @@ class PricingCalculator:
             'gst_percentage': float(self.hotel.gst_percentage),
             'total_amount': float(total_amount),
             'discount_details': discount_info,
+            'rate_plan': {
+                'rate_plan_id': rate_plan.id,
+                'code': rate_plan.code,
+                'name': rate_plan.name,
+                'meal_plan': rate_plan.meal_plan,
+                'is_refundable': rate_plan.is_refundable,
+            } if rate_plan is not None else None,
             'currency': 'INR',
             'breakdown': {
                 'base_price_per_night': float(base_price),
@@ -112,28 +207,24 @@ class PricingCalculator:
     
     def _apply_discount(self, code: str, amount: Decimal) -> Tuple[Decimal, Dict]:
         """Apply discount code and return discount amount and details"""
-        try:
-            discount = HotelDiscount.objects.get(
-                code=code,
-                hotel=self.hotel,
-                is_active=True
-            )
-            
-            if not discount.is_valid():
-                return Decimal('0.00'), {'error': 'Discount code has expired'}
-            
-            discount_amount = discount.calculate_discount(amount)
-            
-            return discount_amount, {
-                'code': code,
-                'description': discount.description,
-                'discount_type': discount.discount_type,
-                'discount_value': float(discount.discount_value),
-                'discount_amount': float(discount_amount),
-                'is_valid': True
-            }
-        except HotelDiscount.DoesNotExist:
+        discount = DiscountRedemptionService.lookup(self.hotel, code)
+        if discount is None:
             return Decimal('0.00'), {'error': 'Invalid discount code', 'is_valid': False}
+        
+        if not discount.is_valid():
+            return Decimal('0.00'), {'error': 'Discount code has expired'}
+        
+        discount_amount = discount.calculate_discount(amount)
+        
+        return discount_amount, {
+            'discount_id': discount.id,
+            'code': code,
+            'description': discount.description,
+            'discount_type': discount.discount_type,
+            'discount_value': float(discount.discount_value),
+            'discount_amount': float(discount_amount),
+            'is_valid': True
+        }
     
     def check_availability(
         self,
@@ -223,7 +314,8 @@ class BulkPricingCalculator:
                 'room_type_id': int,
                 'check_in': '2024-01-10',
                 'check_out': '2024-01-15',
-                'num_rooms': 2
+                'num_rooms': 2,
+                'rate_plan_id': int (optional)
             }
         ]
         """
@@ -237,13 +329,17 @@ class BulkPricingCalculator:
         for config in room_configs:
             from .models import RoomType
             room_type = RoomType.objects.get(id=config['room_type_id'])
+            rate_plan = None
+            if config.get('rate_plan_id'):
+                rate_plan = room_type.rate_plans.get(id=config['rate_plan_id'], is_active=True)
             
             pricing = self.calculator.calculate_total_price(
                 room_type,
                 date.fromisoformat(config['check_in']),
                 date.fromisoformat(config['check_out']),
                 num_rooms=config.get('num_rooms', 1),
-                discount_code=config.get('discount_code')
+                discount_code=config.get('discount_code'),
+                rate_plan=rate_plan
             )
             
             total_breakdown['rooms'].append(pricing)
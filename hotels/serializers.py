@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from datetime import date
 from django.db.models import Min
-from .models import Hotel, RoomType, HotelImage, RoomAvailability, HotelDiscount, PriceLog
+from .models import Hotel, RoomType, RatePlan, HotelImage, RoomAvailability, HotelDiscount, PriceLog
 from .pricing_service import PricingCalculator
 
 
@@ -17,8 +17,18 @@ class RoomAvailabilitySerializer(serializers.ModelSerializer):
         fields = ['id', 'date', 'available_rooms', 'price']
 
 
+class RatePlanSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RatePlan
+        fields = [
+            'id', 'parent', 'name', 'code', 'meal_plan', 'is_refundable',
+            'adjustment_type', 'adjustment_value', 'meal_supplement'
+        ]
+
+
 class RoomTypeSerializer(serializers.ModelSerializer):
     availability = RoomAvailabilitySerializer(many=True, read_only=True)
+    rate_plans = serializers.SerializerMethodField()
     amenities = serializers.SerializerMethodField()
     
     class Meta:
@@ -27,9 +37,14 @@ class RoomTypeSerializer(serializers.ModelSerializer):
             'id', 'name', 'room_type', 'description', 'max_occupancy',
             'number_of_beds', 'room_size', 'base_price', 'has_balcony',
             'has_tv', 'has_minibar', 'has_safe', 'total_rooms',
-            'is_available', 'image', 'availability', 'amenities'
+            'is_available', 'image', 'availability', 'rate_plans', 'amenities'
         ]
     
+    def get_rate_plans(self, obj):
+        # Iterate .all() so a prefetch of room_types__rate_plans is reused
+        plans = [plan for plan in obj.rate_plans.all() if plan.is_active]
+        return RatePlanSerializer(plans, many=True).data
+    
     def get_amenities(self, obj):
         return {
             'balcony': obj.has_balcony,
@@ -127,6 +142,7 @@ class PricingRequestSerializer(serializers.Serializer):
     check_out = serializers.DateField()
     num_rooms = serializers.IntegerField(default=1, min_value=1)
     discount_code = serializers.CharField(required=False, allow_blank=True)
+    rate_plan_id = serializers.IntegerField(required=False)
     
     def validate(self, data):
         if data['check_out'] <= data['check_in']:
@@ -147,6 +163,29 @@ class AvailabilityCheckSerializer(serializers.Serializer):
         return data
 
 
+class HotelCompareSerializer(serializers.Serializer):
+    """Serializer for hotel comparison requests"""
+    ids = serializers.CharField(help_text="Comma-separated hotel ids")
+    check_in = serializers.DateField()
+    check_out = serializers.DateField()
+    rooms = serializers.IntegerField(default=1, min_value=1)
+    
+    def validate_ids(self, value):
+        from .compare_service import MAX_COMPARE_HOTELS
+        try:
+            ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+        except ValueError:
+            raise serializers.ValidationError("ids must be comma-separated integers")
+        if not 2 <= len(ids) <= MAX_COMPARE_HOTELS:
+            raise serializers.ValidationError(f"Compare between 2 and {MAX_COMPARE_HOTELS} hotels")
+        return ids
+    
+    def validate(self, data):
+        if data['check_out'] <= data['check_in']:
+            raise serializers.ValidationError("Check-out must be after check-in")
+        return data
+
+
 class HotelSearchFilterSerializer(serializers.Serializer):
     """Serializer for hotel search filters"""
     city_id = serializers.IntegerField(required=False)
@@ -163,7 +202,7 @@ class HotelSearchFilterSerializer(serializers.Serializer):
     has_restaurant = serializers.BooleanField(required=False)
     has_spa = serializers.BooleanField(required=False)
     sort_by = serializers.ChoiceField(
-        choices=['price_asc', 'price_desc', 'rating_asc', 'rating_desc', 'name'],
+        choices=['price_asc', 'price_desc', 'rating_asc', 'rating_desc', 'recommended', 'name'],
         required=False
     )
     page = serializers.IntegerField(default=1, min_value=1)
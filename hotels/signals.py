@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .discount_service import DiscountRedemptionService
+from .models import HotelDiscount
+
+
+@receiver(post_save, sender=HotelDiscount)
+@receiver(post_delete, sender=HotelDiscount)
+def invalidate_discount_codes(sender, instance, **kwargs):
+    """Drop this process's cached codes for the hotel when a discount changes"""
+    DiscountRedemptionService.invalidate(instance.hotel_id)
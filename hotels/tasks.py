@@ -0,0 +1,28 @@
+from celery import shared_task
+
+
+@shared_task
+def rebalance_inventory_shards_task(days=90):
+    """Even out sharded room inventory and refresh nightly totals"""
+    from .channel_manager_service import rebalance_inventory_shards
+
+    rebalanced = rebalance_inventory_shards(days=days)
+    return f"Rebalanced {rebalanced} sharded nights"
+
+
+@shared_task
+def expire_stale_locks_task():
+    """Release internal inventory held by expired locks"""
+    from .channel_manager_service import expire_stale_locks
+
+    expire_stale_locks()
+    return "Expired stale inventory locks"
+
+
+@shared_task
+def compute_hotel_popularity_task():
+    """Nightly recompute of hotel popularity scores"""
+    from .popularity_service import update_popularity_scores
+
+    updated = update_popularity_scores()
+    return f"Updated popularity for {updated} hotels"
@@ -3,16 +3,27 @@ Hotel Backend Tests
 Comprehensive testing for pricing, search, filter, and availability logic
 """
 
+import gzip
 import json
+import os
+import tempfile
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
 from datetime import date, datetime, timedelta
 
-from .models import Hotel, RoomType, RoomAvailability, HotelDiscount, City
+from .models import Hotel, RoomType, RatePlan, RoomAvailability, RoomAvailabilityShard, HotelDiscount, City
 from .pricing_service import PricingCalculator, OccupancyCalculator
+from .channel_manager_service import InternalInventoryService, InventoryLockError, rebalance_inventory_shards
+from .discount_service import DiscountRedemptionService, release_discount_for_lock
+from .feed_service import iter_ari_rows, write_feed
+from .popularity_service import update_popularity_scores
+from bookings.models import Booking, HotelBooking
+from django.contrib.auth import get_user_model
 from .serializers import HotelListSerializer, PricingRequestSerializer
 
 
@@ -372,6 +383,327 @@ class AvailabilityTests(HotelTestSetup):
         self.assertLess(availability['min_available_rooms'], 5)
 
 
+# ============================================
+# RATE PLAN TESTS
+# ============================================
+
+class RatePlanTests(HotelTestSetup):
+    """Test derived rate plan pricing"""
+    
+    def setUp(self):
+        super().setUp()
+        self.flexible = RatePlan.objects.create(
+            room_type=self.room_deluxe, name='Flexible', code='FLEX'
+        )
+        self.non_refundable = RatePlan.objects.create(
+            room_type=self.room_deluxe, parent=self.flexible, name='Non Refundable', code='NRF',
+            is_refundable=False, adjustment_type='percentage', adjustment_value=Decimal('-10.00')
+        )
+        self.nrf_breakfast = RatePlan.objects.create(
+            room_type=self.room_deluxe, parent=self.non_refundable, name='Non Refundable + Breakfast',
+            code='NRF-BB', is_refundable=False, meal_plan='breakfast', meal_supplement=Decimal('750.00')
+        )
+    
+    def test_derived_plans_follow_parent_chain(self):
+        """Derived plans apply their rules over the parent rate"""
+        calculator = PricingCalculator(self.hotel)
+        check_in = date.today()
+        check_out = check_in + timedelta(days=3)
+        
+        prices = calculator.get_rate_plan_prices(self.room_deluxe, check_in, check_out)
+        
+        self.assertEqual(prices[self.flexible.id], [Decimal('15000.00')] * 3)
+        self.assertEqual(prices[self.non_refundable.id], [Decimal('13500.00')] * 3)
+        self.assertEqual(prices[self.nrf_breakfast.id], [Decimal('14250.00')] * 3)
+    
+    def test_plan_prices_cached_per_stay(self):
+        """Repeated lookups for the same stay do not hit the database"""
+        calculator = PricingCalculator(self.hotel)
+        check_in = date.today()
+        check_out = check_in + timedelta(days=2)
+        calculator.get_rate_plan_prices(self.room_deluxe, check_in, check_out)
+        
+        with self.assertNumQueries(0):
+            calculator.get_rate_plan_prices(self.room_deluxe, check_in, check_out)
+            calculator.calculate_total_price(
+                self.room_deluxe, check_in, check_out, rate_plan=self.non_refundable
+            )
+    
+    def test_calculate_price_with_rate_plan(self):
+        """Total price uses the plan rate and reports the plan"""
+        calculator = PricingCalculator(self.hotel)
+        check_in = date.today()
+        check_out = check_in + timedelta(days=2)
+        
+        pricing = calculator.calculate_total_price(
+            self.room_deluxe, check_in, check_out, num_rooms=2, rate_plan=self.nrf_breakfast
+        )
+        
+        self.assertEqual(pricing['base_price'], 14250.0)
+        self.assertEqual(pricing['subtotal'], 14250 * 2 * 2)
+        self.assertEqual(pricing['rate_plan']['code'], 'NRF-BB')
+        self.assertFalse(pricing['rate_plan']['is_refundable'])
+    
+    def test_parent_cycles_rejected(self):
+        """A plan cannot derive from one of its own descendants"""
+        from django.core.exceptions import ValidationError
+        self.flexible.parent = self.nrf_breakfast
+        with self.assertRaises(ValidationError):
+            self.flexible.clean()
+        self.nrf_breakfast.parent = self.flexible
+        self.nrf_breakfast.clean()
+
+    def test_rate_plan_of_other_room_rejected(self):
+        """A plan from another room type cannot price this room"""
+        calculator = PricingCalculator(self.hotel)
+        check_in = date.today()
+        
+        with self.assertRaises(ValueError):
+            calculator.calculate_total_price(
+                self.room_suite, check_in, check_in + timedelta(days=1), rate_plan=self.flexible
+            )
+
+
+# ============================================
+# SHARDED INVENTORY TESTS
+# ============================================
+
+class ShardedInventoryTests(HotelTestSetup):
+    """Test sharded inventory counters"""
+    
+    def setUp(self):
+        super().setUp()
+        self.room_deluxe.inventory_shards = 4
+        self.room_deluxe.save(update_fields=['inventory_shards'])
+        self.service = InternalInventoryService(self.hotel)
+        self.check_in = date.today()
+        self.check_out = self.check_in + timedelta(days=2)
+    
+    def _night_total(self, day):
+        return sum(
+            RoomAvailabilityShard.objects.filter(room_type=self.room_deluxe, date=day)
+            .values_list('available_rooms', flat=True)
+        )
+    
+    def test_lock_and_release_use_shards(self):
+        """Holds decrement shard counters and releases return them"""
+        lock = self.service.lock_inventory(self.room_deluxe, self.check_in, self.check_out, num_rooms=2)
+        
+        self.assertEqual(self._night_total(self.check_in), 6)
+        self.assertEqual(len(lock.payload['shards']), 2)
+        
+        self.service.release_lock(lock)
+        self.assertEqual(self._night_total(self.check_in), 8)
+    
+    def test_fragmented_shards_spill_over(self):
+        """A request larger than any shard drains several shards"""
+        lock = self.service.lock_inventory(self.room_deluxe, self.check_in, self.check_out, num_rooms=7)
+        
+        self.assertEqual(self._night_total(self.check_in), 1)
+        self.assertGreater(len(lock.payload['shards'][self.check_in.isoformat()]), 1)
+        with self.assertRaises(InventoryLockError):
+            self.service.lock_inventory(self.room_deluxe, self.check_in, self.check_out, num_rooms=2)
+    
+    def test_rebalance_evens_shards_and_refreshes_totals(self):
+        """Rebalancer spreads remaining rooms and updates RoomAvailability"""
+        self.service.lock_inventory(self.room_deluxe, self.check_in, self.check_out, num_rooms=2)
+        
+        rebalance_inventory_shards(self.room_deluxe, start=self.check_in, days=2)
+        
+        counts = list(
+            RoomAvailabilityShard.objects.filter(room_type=self.room_deluxe, date=self.check_in)
+            .order_by('shard').values_list('available_rooms', flat=True)
+        )
+        self.assertEqual(counts, [2, 2, 1, 1])
+        availability = RoomAvailability.objects.get(room_type=self.room_deluxe, date=self.check_in)
+        self.assertEqual(availability.available_rooms, 6)
+
+        # A night already in step is left untouched
+        with CaptureQueriesContext(connection) as queries:
+            rebalance_inventory_shards(self.room_deluxe, start=self.check_in, days=2)
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "hotels_roomavailability"')])
+        self.assertEqual(
+            RoomAvailability.objects.get(room_type=self.room_deluxe, date=self.check_in).updated_at,
+            availability.updated_at,
+        )
+
+    def test_availability_edits_are_folded_into_shards(self):
+        """Rooms added on RoomAvailability between rebalances are not lost"""
+        self.service.lock_inventory(self.room_deluxe, self.check_in, self.check_out, num_rooms=2)
+        RoomAvailability.objects.filter(room_type=self.room_deluxe, date=self.check_in).update(available_rooms=11)
+
+        summary = self.service.summarize(self.room_deluxe, self.check_in, self.check_in + timedelta(days=1))
+        self.assertEqual(summary['available_rooms'], 9)
+
+        rebalance_inventory_shards(self.room_deluxe, start=self.check_in, days=2)
+        self.assertEqual(self._night_total(self.check_in), 9)
+        availability = RoomAvailability.objects.get(room_type=self.room_deluxe, date=self.check_in)
+        self.assertEqual((availability.available_rooms, availability.shard_total), (9, 9))
+
+        # Rooms removed are honoured before the next hold
+        RoomAvailability.objects.filter(room_type=self.room_deluxe, date=self.check_in).update(available_rooms=1)
+        with self.assertRaises(InventoryLockError):
+            self.service.lock_inventory(self.room_deluxe, self.check_in, self.check_out, num_rooms=2)
+
+
+# ============================================
+# DISCOUNT REDEMPTION TESTS
+# ============================================
+
+class DiscountRedemptionTests(HotelTestSetup):
+    """Test cached discount lookups and atomic usage reservation"""
+    
+    def test_warm_lookup_costs_no_queries(self):
+        """Second lookup of a code is served from the process cache"""
+        DiscountRedemptionService.lookup(self.hotel, 'SAVE20')
+        
+        with self.assertNumQueries(0):
+            discount = DiscountRedemptionService.lookup(self.hotel, 'SAVE20')
+            calculator = PricingCalculator(self.hotel)
+            calculator._apply_discount('OFF5K', Decimal('40000.00'))
+        
+        self.assertEqual(discount.id, self.discount_percentage.id)
+    
+    def test_saving_discount_invalidates_cache(self):
+        """Editing a discount drops the cached codes for its hotel"""
+        DiscountRedemptionService.lookup(self.hotel, 'SAVE20')
+        self.discount_percentage.is_active = False
+        self.discount_percentage.save()
+        
+        self.assertIsNone(DiscountRedemptionService.lookup(self.hotel, 'SAVE20'))
+    
+    def test_reserve_respects_usage_limit(self):
+        """Reservations stop once usage_limit is reached"""
+        self.discount_fixed.usage_limit = 2
+        self.discount_fixed.save()
+        
+        results = [DiscountRedemptionService.reserve(self.discount_fixed) for _ in range(3)]
+        
+        self.assertEqual(results, [True, True, False])
+        self.discount_fixed.refresh_from_db()
+        self.assertEqual(self.discount_fixed.usage_count, 2)
+    
+    def test_released_hold_returns_discount_use(self):
+        """Releasing a hold gives back its reserved use exactly once"""
+        service = InternalInventoryService(self.hotel)
+        lock = service.lock_inventory(self.room_deluxe, date.today(), date.today() + timedelta(days=1))
+        DiscountRedemptionService.reserve(self.discount_fixed)
+        lock.payload = {**lock.payload, 'discount_id': self.discount_fixed.id}
+        lock.save()
+        
+        service.release_lock(lock)
+        release_discount_for_lock(lock)
+        
+        self.discount_fixed.refresh_from_db()
+        self.assertEqual(self.discount_fixed.usage_count, 0)
+
+
+# ============================================
+# META-SEARCH FEED TESTS
+# ============================================
+
+class HotelFeedTests(HotelTestSetup):
+    """Test streaming rate & availability feed export"""
+    
+    def test_full_feed_covers_every_night(self):
+        """Full feeds emit each room for each night, filling gaps from defaults"""
+        rows = list(iter_ari_rows(date.today(), days=35))
+        
+        self.assertEqual(len(rows), 2 * 35)
+        gap = [r for r in rows if r['room_type_id'] == self.room_suite.id and r['date'] == (date.today() + timedelta(days=32)).isoformat()]
+        self.assertEqual(gap[0]['rate'], 50000.0)
+        self.assertEqual(gap[0]['available_rooms'], self.room_suite.total_rooms)
+    
+    def test_delta_feed_only_contains_changed_rows(self):
+        """Delta feeds only carry rows touched after the previous export"""
+        handle, path = tempfile.mkstemp(suffix='.jsonl.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        full = write_feed(path, days=30)
+        self.assertFalse(full.is_delta)
+        self.assertEqual(full.row_count, 60)
+        
+        slot = RoomAvailability.objects.get(room_type=self.room_deluxe, date=date.today())
+        slot.price = Decimal('16000.00')
+        slot.save()
+        delta = write_feed(path, days=30, delta=True)
+        
+        self.assertTrue(delta.is_delta)
+        with gzip.open(path, 'rt') as feed_file:
+            rows = [json.loads(line) for line in feed_file]
+        self.assertEqual(rows, [{
+            'hotel_id': self.hotel.id,
+            'hotel_name': self.hotel.name,
+            'city': self.city.name,
+            'room_type_id': self.room_deluxe.id,
+            'room_type': self.room_deluxe.name,
+            'date': date.today().isoformat(),
+            'available_rooms': 8,
+            'rate': 16000.0,
+            'currency': 'INR',
+            'closed': False,
+        }])
+
+        # Switched-off room types are closed out on every night
+        self.room_suite.is_available = False
+        self.room_suite.save()
+        write_feed(path, days=30, delta=True)
+        with gzip.open(path, 'rt') as feed_file:
+            rows = [json.loads(line) for line in feed_file]
+        self.assertEqual(len(rows), 30)
+        self.assertTrue(all(row['closed'] and row['available_rooms'] == 0 for row in rows))
+        self.assertEqual({row['room_type_id'] for row in rows}, {self.room_suite.id})
+    
+    def test_feed_endpoint_requires_staff(self):
+        """Anonymous users cannot pull the feed when no token is configured"""
+        response = Client().get('/hotels/api/feed/')
+        self.assertEqual(response.status_code, 403)
+
+
+# ============================================
+# POPULARITY RANKING TESTS
+# ============================================
+
+class HotelPopularityTests(HotelTestSetup):
+    """Test offline popularity scores and the recommended sort"""
+    
+    def setUp(self):
+        super().setUp()
+        self.quiet_hotel = Hotel.objects.create(
+            name='Aaa Quiet Inn', description='Rarely booked', city=self.city, address='Side street',
+            star_rating=3, review_rating=Decimal('4.9'), review_count=2,
+            contact_phone='1', contact_email='quiet@example.com'
+        )
+        user = get_user_model().objects.create_user(username='guest', password='pass')
+        for status_value in ['confirmed', 'completed', 'confirmed', 'cancelled']:
+            booking = Booking.objects.create(
+                user=user, booking_type='hotel', status=status_value, total_amount=Decimal('30000.00'),
+                customer_name='Guest', customer_email='guest@example.com', customer_phone='9999999999'
+            )
+            HotelBooking.objects.create(
+                booking=booking, room_type=self.room_deluxe, check_in=date.today(),
+                check_out=date.today() + timedelta(days=2), total_nights=2
+            )
+    
+    def test_booked_hotel_outranks_quiet_hotel(self):
+        """Bookings and well-supported reviews outweigh a thin rating"""
+        self.assertEqual(update_popularity_scores(), 2)
+        
+        self.hotel.refresh_from_db()
+        self.quiet_hotel.refresh_from_db()
+        self.assertGreater(self.hotel.popularity_score, self.quiet_hotel.popularity_score)
+        self.assertIsNotNone(self.hotel.popularity_updated_at)
+    
+    def test_recommended_sort_orders_by_score(self):
+        """The recommended sort is a plain ORDER BY on the stored score"""
+        update_popularity_scores()
+        
+        response = Client().get('/hotels/api/search/?sort_by=recommended')
+        names = [hotel['name'] for hotel in response.json()['results']]
+        
+        self.assertEqual(names, [self.hotel.name, self.quiet_hotel.name])
+
+
 # ============================================
 # API ENDPOINT TESTS
 # ============================================
@@ -483,6 +815,62 @@ class PricingAPITests(HotelTestSetup):
         self.assertEqual(pricing['currency'], 'INR')
 
 
+class HotelCompareAPITests(HotelTestSetup):
+    """Test the batched hotel comparison API"""
+    
+    def setUp(self):
+        super().setUp()
+        self.client = Client()
+        self.others = []
+        for index in range(3):
+            hotel = Hotel.objects.create(
+                name=f'Compare Hotel {index}', description='Budget stay', city=self.city, address='Andheri',
+                has_pool=False, contact_phone='1', contact_email=f'compare{index}@example.com'
+            )
+            RoomType.objects.create(
+                hotel=hotel, name='Standard', description='Standard room',
+                base_price=Decimal('4000.00') + index, total_rooms=3, inventory_shards=2 if index else 1
+            )
+            self.others.append(hotel)
+        self.check_in = date.today() + timedelta(days=1)
+        self.check_out = self.check_in + timedelta(days=2)
+    
+    def _compare(self, hotels, rooms=1):
+        ids = ','.join(str(hotel.id) for hotel in hotels)
+        return self.client.get(
+            f'/api/hotels/compare/?ids={ids}&check_in={self.check_in}&check_out={self.check_out}&rooms={rooms}'
+        )
+    
+    def test_side_by_side_matrix(self):
+        """Columns follow the requested order with cheapest rates and amenities"""
+        response = self._compare([self.hotel, self.others[0]])
+        self.assertEqual(response.status_code, 200)
+        comparison = response.json()['comparison']
+        
+        self.assertEqual([column['hotel_id'] for column in comparison['hotels']], [self.hotel.id, self.others[0].id])
+        self.assertEqual(comparison['hotels'][0]['cheapest_room']['room_type_id'], self.room_deluxe.id)
+        self.assertEqual(comparison['hotels'][1]['cheapest_room']['stay_total'], 8000.0)
+        self.assertEqual(comparison['amenities']['pool'], [True, False])
+    
+    def test_unavailable_when_rooms_exceed_inventory(self):
+        """Hotels without enough rooms for every night are flagged"""
+        comparison = self._compare([self.hotel, self.others[0]], rooms=9).json()['comparison']
+        self.assertFalse(comparison['hotels'][0]['is_available'])
+        self.assertFalse(comparison['hotels'][1]['is_available'])
+    
+    def test_query_count_does_not_grow_with_hotels(self):
+        """Comparing four hotels costs the same queries as comparing two"""
+        with CaptureQueriesContext(connection) as two:
+            self._compare([self.hotel, self.others[1]])
+        with CaptureQueriesContext(connection) as four:
+            self._compare([self.hotel] + self.others)
+        self.assertEqual(len(two.captured_queries), len(four.captured_queries))
+    
+    def test_requires_two_to_five_ids(self):
+        """A single id is rejected"""
+        self.assertEqual(self._compare([self.hotel]).status_code, 400)
+
+
 # ============================================
 # HTML VIEW / INTEGRATION TESTS
 # ============================================
@@ -18,4 +18,8 @@ urlpatterns = [
     path('api/calculate-price/', views.calculate_price, name='calculate-price'),
     path('api/check-availability/', views.check_availability, name='check-availability'),
     path('api/<int:hotel_id>/occupancy/', views.get_hotel_occupancy, name='hotel-occupancy'),
+    path('compare/', views.compare_hotels_view, name='hotel-compare'),
+    
+    # API endpoints - Meta-search feed
+    path('api/feed/', views.hotel_feed, name='hotel-feed'),
 ]
@@ -7,7 +7,10 @@ from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Min, Value, FloatField, Q, DecimalField, F
 from django.db.models.functions import Coalesce
 from datetime import date, datetime, timedelta
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, require_GET
+from django.http import HttpResponseForbidden, HttpResponseBadRequest, StreamingHttpResponse
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
 from django_filters.rest_framework import DjangoFilterBackend
 from decimal import Decimal
 from django.utils import timezone
@@ -20,15 +23,19 @@ from .channel_manager_service import (
     AvailabilityError,
     get_hotel_availability_snapshot,
 )
-from .models import Hotel, RoomType, RoomAvailability, HotelDiscount, ChannelManagerRoomMapping
+from .models import Hotel, RoomType, RatePlan, RoomAvailability, HotelDiscount, ChannelManagerRoomMapping
 from .serializers import (
     HotelListSerializer, HotelDetailSerializer, RoomTypeSerializer,
     PricingRequestSerializer, AvailabilityCheckSerializer,
-    HotelSearchFilterSerializer
+    HotelSearchFilterSerializer, HotelCompareSerializer
 )
 from .pricing_service import PricingCalculator, OccupancyCalculator
+from .discount_service import DiscountRedemptionService, release_discount_for_lock
+from .compare_service import compare_hotels
+from .feed_service import iter_ari_rows, iter_feed_chunks, gzip_stream, last_export_cutoff
 from core.models import City
 from bookings.models import Booking, HotelBooking, InventoryLock
+from bookings.recommendation_service import get_recommendations
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -49,13 +56,15 @@ class HotelListView(generics.ListAPIView):
     filterset_fields = ['city', 'star_rating', 'is_featured', 'property_type',
                         'has_wifi', 'has_parking', 'has_pool', 'has_gym', 'has_restaurant', 'has_spa']
     search_fields = ['name', 'description', 'city__name']
-    ordering_fields = ['review_rating', 'name']
+    ordering_fields = ['review_rating', 'popularity_score', 'name']
     pagination_class = StandardResultsSetPagination
 
 
 class HotelDetailView(generics.RetrieveAPIView):
     """Get hotel details with all room types and amenities"""
-    queryset = Hotel.objects.filter(is_active=True).prefetch_related('room_types', 'images', 'discounts')
+    queryset = Hotel.objects.filter(is_active=True).prefetch_related(
+        'room_types', 'room_types__rate_plans', 'images', 'discounts'
+    )
     serializer_class = HotelDetailSerializer
 
 
@@ -71,7 +80,7 @@ class HotelSearchView(generics.ListAPIView):
     - max_price: Maximum base price
     - star_rating: Hotel star rating (1-5)
     - has_wifi, has_parking, has_pool, has_gym, has_restaurant, has_spa: Boolean filters
-    - sort_by: price_asc, price_desc, rating_asc, rating_desc, name
+    - sort_by: price_asc, price_desc, rating_asc, rating_desc, recommended, name
     - page: Page number (default 1)
     - page_size: Items per page (default 10)
     """
@@ -142,6 +151,8 @@ class HotelSearchView(generics.ListAPIView):
             queryset = queryset.order_by('review_rating')
         elif sort_by == 'rating_desc':
             queryset = queryset.order_by('-review_rating')
+        elif sort_by == 'recommended':
+            queryset = queryset.order_by('-popularity_score', 'name')
         else:
             queryset = queryset.order_by('name')
         
@@ -169,7 +180,8 @@ def calculate_price(request):
         "check_in": "2024-01-10",
         "check_out": "2024-01-15",
         "num_rooms": 2,
-        "discount_code": "SAVE20" (optional)
+        "discount_code": "SAVE20" (optional),
+        "rate_plan_id": 3 (optional)
     }
     """
     serializer = PricingRequestSerializer(data=request.data)
@@ -177,20 +189,29 @@ def calculate_price(request):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     try:
-        room_type = RoomType.objects.get(id=serializer.validated_data['room_type_id'])
+        room_type = RoomType.objects.select_related('hotel').get(id=serializer.validated_data['room_type_id'])
         calculator = PricingCalculator(room_type.hotel)
         
+        rate_plan = None
+        rate_plan_id = serializer.validated_data.get('rate_plan_id')
+        if rate_plan_id:
+            rate_plan = room_type.rate_plans.get(id=rate_plan_id, is_active=True)
+        
+        check_in = serializer.validated_data['check_in']
+        check_out = serializer.validated_data['check_out']
         pricing = calculator.calculate_total_price(
             room_type=room_type,
-            check_in=serializer.validated_data['check_in'],
-            check_out=serializer.validated_data['check_out'],
+            check_in=check_in,
+            check_out=check_out,
             num_rooms=serializer.validated_data.get('num_rooms', 1),
-            discount_code=serializer.validated_data.get('discount_code')
+            discount_code=serializer.validated_data.get('discount_code'),
+            rate_plan=rate_plan
         )
         
         return Response({
             'success': True,
-            'pricing': pricing
+            'pricing': pricing,
+            'rate_plan_options': calculator.get_rate_plan_quotes(room_type, check_in, check_out)
         }, status=status.HTTP_200_OK)
     
     except RoomType.DoesNotExist:
@@ -198,6 +219,11 @@ def calculate_price(request):
             {'error': 'Room type not found'},
             status=status.HTTP_404_NOT_FOUND
         )
+    except RatePlan.DoesNotExist:
+        return Response(
+            {'error': 'Rate plan not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
     except ValueError as e:
         return Response(
             {'error': str(e)},
@@ -290,6 +316,87 @@ def get_hotel_occupancy(request, hotel_id):
         )
 
 
+@api_view(['GET'])
+def compare_hotels_view(request):
+    """
+    Compare several hotels side by side for the same stay
+    
+    Query Parameters:
+    - ids: Comma-separated hotel ids (2-5)
+    - check_in: Check-in date (YYYY-MM-DD)
+    - check_out: Check-out date (YYYY-MM-DD)
+    - rooms: Number of rooms (default 1)
+    """
+    serializer = HotelCompareSerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    comparison = compare_hotels(data['ids'], data['check_in'], data['check_out'], data['rooms'])
+    if not comparison['hotels']:
+        return Response(
+            {'error': 'No active hotels found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({
+        'success': True,
+        'comparison': comparison
+    }, status=status.HTTP_200_OK)
+
+
+@require_GET
+def hotel_feed(request):
+    """
+    Stream the meta-search rate & availability feed
+    
+    Query Parameters:
+    - token: Partner token (required when META_FEED_TOKEN is configured, otherwise staff only)
+    - format: jsonl (default) or xml
+    - start: First night (YYYY-MM-DD), defaults to today
+    - days: Number of nights (default 90, max 365)
+    - since: ISO datetime; only rows changed since then. Use "last" for the last export cutoff
+    - compress: 1 to gzip the stream
+    """
+    feed_token = getattr(settings, 'META_FEED_TOKEN', '')
+    if feed_token:
+        if request.GET.get('token') != feed_token:
+            return HttpResponseForbidden('Invalid feed token')
+    elif not request.user.is_staff:
+        return HttpResponseForbidden('Feed access requires a staff account')
+    
+    feed_format = request.GET.get('format', 'jsonl')
+    if feed_format not in ('jsonl', 'xml'):
+        return HttpResponseBadRequest('format must be jsonl or xml')
+    try:
+        start_date = date.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+        days = min(int(request.GET.get('days', 90)), 365)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid start or days')
+    
+    since = None
+    since_param = request.GET.get('since')
+    if since_param == 'last':
+        since = last_export_cutoff(feed_format)
+    elif since_param:
+        since = parse_datetime(since_param)
+        if since is None:
+            return HttpResponseBadRequest('since must be an ISO datetime')
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+    
+    chunks = iter_feed_chunks(feed_format, iter_ari_rows(start_date, days, since=since), is_delta=since is not None)
+    content_type = 'application/x-ndjson' if feed_format == 'jsonl' else 'application/xml'
+    filename = f"ari_{'delta' if since else 'full'}.{feed_format}"
+    if request.GET.get('compress') == '1':
+        response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
 # ============================================
 # HTML WEB VIEWS
 # ============================================
@@ -361,6 +468,8 @@ def hotel_list(request):
         hotels = hotels.order_by('-review_rating')
     elif sort == 'rating_asc':
         hotels = hotels.order_by('review_rating')
+    elif sort == 'recommended':
+        hotels = hotels.order_by('-popularity_score', 'name')
     
     availability_errors = {}
     if checkin and checkout:
@@ -421,6 +530,7 @@ def hotel_detail(request, pk):
         'prefill_guests': default_guests,
         'prefill_room_type': default_room_type,
         'availability_snapshot': availability_snapshot,
+        'recommendations': get_recommendations('hotel', hotel.id),
     }
     
     return render(request, 'hotels/hotel_detail.html', context)
@@ -500,6 +610,17 @@ def book_hotel(request, pk):
         nights = (checkout - checkin).days
         total = room_type.base_price * nights * num_rooms
 
+        # Reserve one use of the discount code for the duration of the hold
+        discount_code = (request.POST.get('discount_code') or '').strip()
+        if discount_code and lock:
+            discount = DiscountRedemptionService.lookup(hotel, discount_code)
+            if discount is None or not discount.is_valid() or not DiscountRedemptionService.reserve(discount):
+                _release_hold(hotel, lock)
+                return render(request, 'hotels/hotel_detail.html', {'hotel': hotel, 'error': 'Discount code is invalid or fully redeemed'})
+            total -= discount.calculate_discount(total)
+            lock.payload = {**(lock.payload or {}), 'discount_id': discount.id}
+            lock.save(update_fields=['payload', 'updated_at'])
+
         try:
             booking = Booking.objects.create(
                 user=request.user,
@@ -531,13 +652,20 @@ def book_hotel(request, pk):
             # Use the public booking UUID, not the numeric PK, to match URL patterns
             return redirect(f'/bookings/{booking.booking_id}/confirm/')
         except Exception as exc:
-            if lock and lock.source == 'internal_cm':
-                InternalInventoryService(hotel).release_lock(lock)
-            elif lock and lock.source == 'external_cm':
-                try:
-                    ExternalChannelManagerClient(provider=lock.provider).release_lock(lock.lock_id or lock.reference_id)
-                except InventoryLockError:
-                    pass
+            if lock:
+                _release_hold(hotel, lock)
             return render(request, 'hotels/hotel_detail.html', {'hotel': hotel, 'error': str(exc)})
 
     return redirect(f'/hotels/{pk}/')
+
+
+def _release_hold(hotel, lock):
+    """Release an inventory hold (and any reserved discount use) after a failed booking"""
+    if lock.source == 'internal_cm':
+        InternalInventoryService(hotel).release_lock(lock)
+    elif lock.source == 'external_cm':
+        try:
+            ExternalChannelManagerClient(provider=lock.provider).release_lock(lock.lock_id or lock.reference_id)
+        except InventoryLockError:
+            pass
+        release_discount_for_lock(lock)
@@ -8,6 +8,7 @@ from django.db import transaction
 from django.db.models import Q
 from .models import Package, PackageDeparture
 from bookings.models import Booking
+from bookings.recommendation_service import get_recommendations
 from .serializers import PackageListSerializer, PackageDetailSerializer
 
 
@@ -68,6 +69,7 @@ def package_detail(request, package_id):
         'package': package,
         'departures': departures,
         'highlights': highlights,
+        'recommendations': get_recommendations('package', package.id),
     }
     return render(request, 'packages/package_detail.html', context)
 
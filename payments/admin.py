@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.http import HttpResponse
 from django.utils import timezone
 import csv
-from .models import Payment, Invoice, Wallet, WalletTransaction, CashbackLedger
+from .models import Payment, Invoice, Wallet, WalletTransaction, CashbackLedger, Refund
 
 
 @admin.register(Payment)
@@ -163,3 +163,12 @@ class CashbackLedgerAdmin(admin.ModelAdmin):
         count = queryset.filter(is_expired=False, is_used=False).update(is_expired=True, expired_on=now)
         self.message_user(request, f"{count} cashback entries marked as expired.")
     expire_selected_cashback.short_description = "Expire selected cashback"
+
+
+@admin.register(Refund)
+class RefundAdmin(admin.ModelAdmin):
+    list_display = ['booking', 'amount', 'reason', 'status', 'processed_at', 'created_at']
+    list_filter = ['status', 'reason', 'created_at']
+    search_fields = ['booking__booking_id']
+    raw_id_fields = ['booking', 'payment']
+    readonly_fields = ['created_at', 'updated_at']
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_refund'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='refund',
+            name='reason',
+            field=models.CharField(choices=[('schedule_cancelled', 'Departure cancelled by operator'), ('customer_cancelled', 'Cancelled by customer'), ('seats_unavailable', 'Seats resold before payment completed')], max_length=30),
+        ),
+    ]
@@ -235,3 +235,36 @@ class CashbackLedger(TimeStampedModel):
             description=description
         )
         return cashback
+
+
+class Refund(TimeStampedModel):
+    """Refund owed on a booking, queued for processing by the payment gateway"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('processed', 'Processed'),
+        ('failed', 'Failed'),
+    ]
+    
+    REASON_CHOICES = [
+        ('schedule_cancelled', 'Departure cancelled by operator'),
+        ('customer_cancelled', 'Cancelled by customer'),
+        ('seats_unavailable', 'Seats resold before payment completed'),
+    ]
+    
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='refunds')
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='refunds')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    reason = models.CharField(max_length=30, choices=REASON_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # Re-running a disruption never refunds the same booking twice
+            models.UniqueConstraint(fields=['booking', 'reason'], name='unique_refund_per_reason'),
+        ]
+    
+    def __str__(self):
+        return f"Refund ₹{self.amount} for {self.booking.booking_id} ({self.get_status_display()})"
@@ -12,6 +12,7 @@ import hashlib
 import json
 from decimal import Decimal
 
+from buses.seat_inventory import SeatUnavailableError
 from hotels.channel_manager_service import finalize_booking_after_payment, release_inventory_on_failure
 
 
@@ -68,7 +69,7 @@ class VerifyPaymentView(APIView):
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
-        from .models import Payment
+        from .models import Payment, Refund
         
         razorpay_order_id = request.data.get('razorpay_order_id')
         razorpay_payment_id = request.data.get('razorpay_payment_id')
@@ -98,7 +99,20 @@ class VerifyPaymentView(APIView):
                 booking.save(update_fields=['paid_amount', 'payment_reference', 'updated_at'])
 
                 if booking.paid_amount >= booking.total_amount:
-                    finalize_booking_after_payment(booking, payment_reference=razorpay_payment_id)
+                    try:
+                        finalize_booking_after_payment(booking, payment_reference=razorpay_payment_id)
+                    except SeatUnavailableError:
+                        # Captured money for seats someone else bought after the hold lapsed
+                        Refund.objects.get_or_create(
+                            booking=booking, reason='seats_unavailable',
+                            defaults={'payment': payment, 'amount': payment.amount},
+                        )
+                        booking.status = 'cancelled'
+                        booking.save(update_fields=['status', 'updated_at'])
+                        return Response(
+                            {'status': 'failed', 'message': 'Seats are no longer available, a refund has been initiated'},
+                            status=status.HTTP_409_CONFLICT
+                        )
                 
                 return Response({'status': 'success', 'message': 'Payment verified successfully'})
             else:
@@ -228,6 +242,12 @@ def process_wallet_payment(request):
                 'payment_id': str(payment.id)
             })
     
+    except SeatUnavailableError:
+        # The wallet debit rolled back with the failed confirmation
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Seats are no longer available, please choose again'
+        }, status=409)
     except Exception as exc:
         return JsonResponse({
             'status': 'error',
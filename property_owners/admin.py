@@ -4,7 +4,7 @@ from django.urls import reverse
 from django.utils import timezone
 from django.db.models import Count
 from datetime import datetime
-from .models import PropertyType, PropertyOwner, Property, PropertyImage, PropertyAmenity
+from .models import PropertyType, PropertyOwner, Property, PropertyImage, PropertyAmenity, PropertyDailyStats
 
 
 def get_verification_badge(status):
@@ -579,3 +579,14 @@ class PropertyAmenityAdmin(admin.ModelAdmin):
             return obj.icon
         return format_html('<span style="color: #999;">-</span>')
     icon_display.short_description = 'Icon'
+
+
+
+@admin.register(PropertyDailyStats)
+class PropertyDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('property', 'date', 'bookings', 'nights_sold', 'revenue', 'cancellations')
+    list_filter = ('owner',)
+    search_fields = ('property__name',)
+    list_select_related = ('property', 'property__owner')
+    date_hierarchy = 'date'
+    readonly_fields = [field.name for field in PropertyDailyStats._meta.fields]
@@ -5,3 +5,7 @@ class PropertyOwnersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'property_owners'
     verbose_name = 'Property Owners (Homestays, Resorts, Villas)'
+
+    def ready(self):
+        # Import signals to keep dashboard rollups in step with bookings
+        from . import signals  # noqa: F401
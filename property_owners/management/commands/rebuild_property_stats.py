@@ -0,0 +1,16 @@
+"""
+Management command to rebuild the property owner dashboard rollups
+Usage: python manage.py rebuild_property_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from property_owners.stats_service import rebuild_property_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute PropertyDailyStats from property bookings (backfill or repair)'
+
+    def handle(self, *args, **options):
+        written = rebuild_property_stats()
+        self.stdout.write(self.style.SUCCESS(f'✓ Wrote {written} property daily stats rows'))
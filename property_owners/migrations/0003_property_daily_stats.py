@@ -0,0 +1,33 @@
+# Generated by Django 4.2.9 on 2026-10-19 03:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('property_owners', '0002_propertyamenity_propertyimage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Check-in date')),
+                ('bookings', models.IntegerField(default=0)),
+                ('nights_sold', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('cancellations', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='property_owners.propertyowner')),
+                ('property', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='property_owners.property')),
+            ],
+            options={
+                'verbose_name_plural': 'Property daily stats',
+                'indexes': [models.Index(fields=['owner', 'date'], name='property_daily_stats_owner_idx')],
+                'unique_together': {('property', 'date')},
+            },
+        ),
+    ]
@@ -163,3 +163,32 @@ class PropertyAmenity(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class PropertyDailyStats(models.Model):
+    """
+    Daily rollup per property and check-in date for owner dashboards
+
+    Maintained incrementally by property_owners.stats_service as bookings
+    are confirmed and cancelled; counters are net of cancellations.
+    """
+    owner = models.ForeignKey(PropertyOwner, on_delete=models.CASCADE, related_name='daily_stats')
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField(help_text="Check-in date")
+    
+    bookings = models.IntegerField(default=0)
+    nights_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    cancellations = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['property', 'date']
+        indexes = [
+            models.Index(fields=['owner', 'date'], name='property_daily_stats_owner_idx'),
+        ]
+        verbose_name_plural = 'Property daily stats'
+    
+    def __str__(self):
+        return f"{self.property_id} on {self.date}: {self.nights_sold} nights, ₹{self.revenue}"
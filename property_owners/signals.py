@@ -0,0 +1,22 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .models import PropertyBooking
+from .stats_service import record_booking_changes
+
+
+@receiver(post_init, sender=PropertyBooking)
+def remember_booking_status(sender, instance, **kwargs):
+    # Read from __dict__ so a deferred status is not fetched on every load
+    if 'status' in instance.__dict__:
+        instance._rollup_status = instance.status
+
+
+@receiver(post_save, sender=PropertyBooking)
+def roll_up_booking_status(sender, instance, created, **kwargs):
+    if not created and not hasattr(instance, '_rollup_status'):
+        return
+    previous = None if created else instance._rollup_status
+    if previous != instance.status:
+        record_booking_changes([(instance, previous, instance.status)])
+    instance._rollup_status = instance.status
@@ -0,0 +1,127 @@
+"""
+Property Stats Service
+Daily owner rollups kept in step with property booking state changes, and
+the dashboard reads over them
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.rollups import apply_deltas, status_delta
+from .models import PropertyBooking, PropertyDailyStats
+
+SOLD_STATUSES = {'confirmed', 'completed'}
+CANCELLED_STATUSES = {'cancelled'}
+CHART_DAYS = 30
+
+
+def record_booking_changes(changes: Iterable[tuple]):
+    """
+    Fold (booking, old_status, new_status) changes into the rollups
+
+    Confirming or completing a booking adds it; leaving those statuses
+    takes it back out. Cancellations count bookings in a cancelled status
+    the same way, so a reinstated booking stops counting.
+    """
+    rows = {}
+    for booking, old_status, new_status in changes:
+        sign = status_delta(old_status, new_status, SOLD_STATUSES)
+        cancelled = status_delta(old_status, new_status, CANCELLED_STATUSES)
+        if not sign and not cancelled:
+            continue
+        key = (booking.property_id, booking.check_in)
+        defaults = {'owner_id': booking.property.owner_id}
+        deltas = rows.setdefault(key, (defaults, defaultdict(int)))[1]
+        deltas['bookings'] += sign
+        deltas['nights_sold'] += sign * max((booking.check_out - booking.check_in).days, 1)
+        deltas['revenue'] += sign * booking.total_price
+        deltas['cancellations'] += cancelled
+    apply_deltas(PropertyDailyStats, ['property_id', 'date'], rows)
+
+
+def rebuild_property_stats() -> int:
+    """Recompute every rollup row from property bookings, for backfills and repairs"""
+    sold = Q(status__in=SOLD_STATUSES)
+    rows = [
+        PropertyDailyStats(
+            property_id=row['property_id'],
+            owner_id=row['property__owner_id'],
+            date=row['check_in'],
+            bookings=row['bookings'],
+            nights_sold=0,
+            revenue=row['revenue'],
+            cancellations=row['cancellations'],
+        )
+        for row in PropertyBooking.objects.values('property_id', 'property__owner_id', 'check_in').annotate(
+            bookings=Count('id', filter=sold),
+            revenue=Coalesce(Sum('total_price', filter=sold), Decimal('0')),
+            cancellations=Count('id', filter=Q(status__in=CANCELLED_STATUSES)),
+        )
+        if row['bookings'] or row['cancellations']
+    ]
+    # Nights need each stay's length, which a grouped query cannot sum on every backend
+    nights = defaultdict(int)
+    for property_id, check_in, check_out in PropertyBooking.objects.filter(sold).values_list(
+        'property_id', 'check_in', 'check_out'
+    ).iterator():
+        nights[property_id, check_in] += max((check_out - check_in).days, 1)
+    for row in rows:
+        row.nights_sold = nights[row.property_id, row.date]
+    PropertyDailyStats.objects.all().delete()
+    PropertyDailyStats.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def owner_property_stats(owner, days: int = CHART_DAYS) -> Dict[int, dict]:
+    """
+    Lifetime totals per property for an owner, one grouped query
+
+    occupancy is nights sold for stays starting in the last `days` days
+    over those days.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    stats = {}
+    rows = PropertyDailyStats.objects.filter(owner=owner).values('property_id').annotate(
+        total_bookings=Sum('bookings'),
+        total_nights_sold=Sum('nights_sold'),
+        total_revenue=Sum('revenue'),
+        total_cancellations=Sum('cancellations'),
+        recent_nights=Coalesce(Sum('nights_sold', filter=Q(date__gte=since, date__lte=timezone.localdate())), 0),
+    )
+    for row in rows:
+        stats[row['property_id']] = {
+            'bookings': row['total_bookings'],
+            'nights_sold': row['total_nights_sold'],
+            'revenue': row['total_revenue'],
+            'cancellations': row['total_cancellations'],
+            'occupancy': min(round(100 * row['recent_nights'] / days, 1), 100),
+        }
+    return stats
+
+
+def owner_daily_chart(owner, days: int = CHART_DAYS) -> List[dict]:
+    """Revenue and nights per check-in date for the last `days` days, gaps filled with zeros"""
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rows = {
+        row['date']: row
+        for row in PropertyDailyStats.objects.filter(owner=owner, date__gte=start, date__lte=today)
+        .values('date')
+        .annotate(day_revenue=Sum('revenue'), day_nights_sold=Sum('nights_sold'))
+    }
+    series = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day, {})
+        series.append({'date': day, 'revenue': row.get('day_revenue') or Decimal('0'),
+                       'nights_sold': row.get('day_nights_sold') or 0})
+    peak = max((row['revenue'] for row in series), default=0) or 1
+    for row in series:
+        row['height'] = int(100 * row['revenue'] / peak)
+    return series
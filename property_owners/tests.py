@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, Client
+
+from core.models import City
+from property_owners.models import Property, PropertyBooking, PropertyDailyStats, PropertyOwner
+
+
+class PropertyRollupTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = get_user_model().objects.create_user(username='host', password='pass', email='host@example.com')
+        city = City.objects.create(name='Coorg', state='Karnataka', code='CRG')
+        self.owner = PropertyOwner.objects.create(
+            user=self.user, business_name='Hill Stays', description='Homestays', owner_name='Host',
+            owner_phone='9999999999', owner_email='host@example.com', city=city, address='Madikeri', pincode='571201'
+        )
+        self.property = Property.objects.create(
+            owner=self.owner, name='Coffee Cottage', description='Cottage', amenities='wifi', base_price=2500
+        )
+        self.check_in = date.today()
+
+    def _book(self, status='pending', nights=3):
+        return PropertyBooking.objects.create(
+            property=self.property, guest_name='Guest', guest_email='guest@example.com', guest_phone='8888888888',
+            check_in=self.check_in, check_out=self.check_in + timedelta(days=nights), total_price=7500, status=status
+        )
+
+    def test_rollup_follows_booking_status(self):
+        booking = self._book()
+        self.assertFalse(PropertyDailyStats.objects.exists())
+
+        booking.status = 'confirmed'
+        booking.save()
+        self._book(status='confirmed', nights=2)
+        stats = PropertyDailyStats.objects.get(property=self.property, date=self.check_in)
+        self.assertEqual((stats.bookings, stats.nights_sold, stats.revenue), (2, 5, Decimal('15000')))
+
+        booking.status = 'cancelled'
+        booking.save()
+        stats.refresh_from_db()
+        self.assertEqual((stats.bookings, stats.nights_sold, stats.cancellations), (1, 2, 1))
+
+    def test_rebuild_matches_incremental_rollup(self):
+        from property_owners.stats_service import rebuild_property_stats
+        self._book(status='confirmed')
+        self._book(status='cancelled')
+        reinstated = self._book()
+        reinstated.status = 'cancelled'
+        reinstated.save()
+        reinstated.status = 'confirmed'
+        reinstated.save()
+        incremental = list(PropertyDailyStats.objects.values('bookings', 'nights_sold', 'revenue', 'cancellations'))
+
+        self.assertEqual(rebuild_property_stats(), 1)
+        self.assertEqual(
+            list(PropertyDailyStats.objects.values('bookings', 'nights_sold', 'revenue', 'cancellations')), incremental
+        )
+
+    def test_dashboard_shows_rollup_totals(self):
+        self._book(status='confirmed')
+        self.client.login(username='host', password='pass')
+        response = self.client.get('/properties/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_bookings'], 1)
+        self.assertEqual(response.context['total_earnings'], Decimal('7500'))
+        self.assertEqual(response.context['properties'][0].occupancy, 10.0)
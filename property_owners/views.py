@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from .models import PropertyOwner, Property
 from .forms import PropertyOwnerRegistrationForm, PropertyForm
+from .stats_service import owner_daily_chart, owner_property_stats
 
 
 def register_property_owner(request):
@@ -40,16 +41,29 @@ def property_owner_dashboard(request):
         messages.warning(request, "Please register as a property owner first.")
         return redirect('property_owners:register')
     
-    properties = owner.properties.all()
+    properties = list(owner.properties.all())
+    # Bookings, revenue and occupancy come from the daily rollups in one grouped query
+    property_stats = owner_property_stats(owner)
+    for property_obj in properties:
+        stats = property_stats.get(property_obj.id, {})
+        property_obj.total_bookings = stats.get('bookings', 0)
+        property_obj.occupancy = stats.get('occupancy', 0)
     stats = {
-        'total_properties': properties.count(),
-        'total_bookings': sum(p.bookings.count() for p in properties),
+        'total_properties': len(properties),
+        'total_bookings': sum(row['bookings'] for row in property_stats.values()),
         'verification_status': owner.get_verification_status_display(),
     }
     
     context = {
         'owner': owner,
+        'property_owner': owner,
         'properties': properties,
+        'properties_count': len(properties),
+        'total_bookings': stats['total_bookings'],
+        'total_earnings': sum(row['revenue'] for row in property_stats.values()),
+        'total_cancellations': sum(row['cancellations'] for row in property_stats.values()),
+        'average_rating': owner.average_rating,
+        'chart': owner_daily_chart(owner),
         'stats': stats,
     }
     return render(request, 'property_owners/dashboard.html', context)